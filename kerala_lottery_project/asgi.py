@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "kerala_lottery_project.settings")
 
 application = get_asgi_application()
+
+# Re-render stale result snapshots and the static JSON export (one server process at a time does it)
+from results.services.result_snapshot import ResultSnapshotService  # noqa: E402
+
+ResultSnapshotService.start_regenerator()
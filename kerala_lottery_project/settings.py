@@ -316,6 +316,22 @@ if DEBUG:
 else:
     STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Static JSON export of results (see results/services/static_export.py)
+# Files under public/ are served by whitenoise at the site root (the build command writes the
+# export, so they are there when whitenoise indexes them at startup); exports written after a
+# worker started, and the manifest kept outside public/, are served by results.views.serve_results_export
+PUBLIC_ROOT = BASE_DIR / 'public'
+RESULTS_EXPORT_ROOT = PUBLIC_ROOT / 'exports'
+RESULTS_MANIFEST_ROOT = BASE_DIR / 'export_manifest'
+RESULTS_EXPORT_URL = '/exports/'
+RESULTS_EXPORT_ROOT.mkdir(parents=True, exist_ok=True)
+WHITENOISE_ROOT = PUBLIC_ROOT
+
+# Columnar archive of all published prizes, memory-mapped by every worker for number analytics
+# (see results/services/prize_archive.py; built by the web service's build command and refreshed
+# by its snapshot regenerator threads, since it lives on the local disk)
+PRIZE_ARCHIVE_ROOT = Path(os.getenv('PRIZE_ARCHIVE_ROOT', BASE_DIR / 'prize_archive'))
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -346,7 +362,33 @@ LOTTERY_SETTINGS = {
     'ENABLE_AUTO_CONSOLATION_GENERATION': True,
     'ENABLE_BULK_ENTRY': True,
     'MAX_SEARCH_RESULTS': 100,
+    'MAX_TICKET_RANGE_SIZE': 10000,  # Tickets covered by one range/series check
     'DEFAULT_PAGINATION_SIZE': 20,
+    'EXPORT_KEEP_VERSIONS': 3,  # Static JSON export version directories kept on disk
+    'SNAPSHOT_POLL_SECONDS': 10,  # Result snapshot regenerator: check for snapshots made stale by other processes
+    'SNAPSHOT_SHUTDOWN_SECONDS': 10,  # Wait for a running snapshot regeneration at exit
+    'PRIZE_ARCHIVE_REFRESH_SECONDS': 300,  # Least time between two prize archive builds of a process after publishes
+    'RESULT_CHANGE_RETENTION_DAYS': 90,  # Delta-sync change log kept by prune_result_changes
+    'LIVE_STREAM_HEARTBEAT_SECONDS': 15,  # Keepalive comment on idle live draw streams
+    'LIVE_STREAM_QUEUE_SIZE': 256,  # Pending events per stream before a slow client is dropped
+    'USER_ACTIVITY_FLUSH_SECONDS': 30,  # Buffered app-open hits are written to UserActivity this often
+    'USER_ACTIVITY_RETENTION_DAYS': 90,  # Raw UserActivity rows idle this long are pruned (summaries are kept)
+    'NOTIFICATION_BATCH_SIZE': 500,  # Tokens per FCM batch request and outbox checkpoint
+    'NOTIFICATION_BATCH_RETRIES': 3,  # Retries of a batch's throttled/failed tokens before they are parked for a later run
+    'NOTIFICATION_RETRY_BASE_SECONDS': 1,  # Backoff before a batch retry: 1s, 2s, 4s, ...
+    'NOTIFICATION_MAX_ATTEMPTS': 5,  # Runs stopped by FCM being unavailable before a notification job is marked failed
+    'NOTIFICATION_TOKEN_MAX_ATTEMPTS': 5,  # Runs a token is sent in before the job gives up on it
+    'NOTIFICATION_LEASE_SECONDS': 300,  # A job whose worker stopped checkpointing this long is claimed again
+    'TOKEN_UPDATE_CHUNK_SIZE': 1000,  # Tokens per UPDATE ... WHERE fcm_token IN (...) after a send batch
+    'FCM_TRANSPORT': os.getenv('FCM_TRANSPORT', 'httpx'),  # 'httpx' (pooled HTTP/2 FCM v1 client) or 'firebase_admin'
+    'FCM_INITIAL_CONCURRENCY': 20,  # FCM requests in flight per process when a worker starts (adaptive window)
+    'FCM_MIN_CONCURRENCY': 1,
+    'FCM_MAX_CONCURRENCY': int(os.getenv('FCM_MAX_CONCURRENCY', 200)),
+    'FCM_RATE_PER_SECOND': int(os.getenv('FCM_RATE_PER_SECOND', 0)),  # Sends per second per process (0: no limit, only the window)
+    'FCM_RATE_BURST': 50,  # Sends allowed at once above FCM_RATE_PER_SECOND
+    'FCM_LATENCY_TARGET_MS': 500,  # The window shrinks while the average FCM response time is above this
+    'FCM_MAX_CONNECTIONS': 4,  # Pooled HTTP/2 connections to FCM (httpx transport)
+    'FCM_TIMEOUT_SECONDS': 10,
 }
 
 # Live Scraper API Token
@@ -378,6 +420,7 @@ FEATURE_FLAGS = {
     'ENABLE_API_RATE_LIMITING': True,
     'ENABLE_DETAILED_LOGGING': True,
     'ENABLE_CACHING': True,
+    'ENABLE_STATIC_EXPORT': True,
     'ENABLE_EMAIL_NOTIFICATIONS': not DEBUG,
     'ENABLE_ADMIN_HONEYPOT': not DEBUG,
 }
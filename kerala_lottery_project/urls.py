@@ -6,6 +6,7 @@ from django.conf import settings
 from django.views.generic import RedirectView
 from django.http import HttpResponse
 from .views import HealthCheckView
+from results.views import serve_results_export
 
 def loaderio_verification(request):
     return HttpResponse('loaderio-d52bdf3f8ccd2f18052f318fb808f51c', content_type='text/plain')
@@ -21,6 +22,9 @@ urlpatterns = [
     path('api/results/', include('results.urls')),
     path('api/users/', include('users.urls')),
 
+    # Static JSON export of results: the manifest, and files whitenoise has not indexed yet
+    path('exports/<path:path>', serve_results_export, name='results_export'),
+
     # Health check
     path('health/', HealthCheckView.as_view(), name='health_check'),
 
@@ -5,6 +5,8 @@ from django.utils import timezone
 from django.db import connection
 from django.core.cache import cache
 from results.models import LotteryResult, PrizeEntry
+from results.utils.response_cache import get_cache_stats
+from results.services.live_events import LiveEventService
 import logging
 
 logger = logging.getLogger('lottery_app')
@@ -40,6 +42,8 @@ class HealthCheckView(APIView):
                 'timestamp': timezone.now().isoformat(),
                 'database': db_status,
                 'cache': cache_status,
+                'response_cache': get_cache_stats(),
+                'live_streams': LiveEventService.get_stats(),
                 'stats': stats
             }
             
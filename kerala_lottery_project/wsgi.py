@@ -3,4 +3,9 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kerala_lottery_project.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Re-render stale result snapshots and the static JSON export (one server process at a time does it)
+from results.services.result_snapshot import ResultSnapshotService  # noqa: E402
+
+ResultSnapshotService.start_regenerator()
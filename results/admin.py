@@ -3,6 +3,8 @@ from django.contrib import admin, messages
 from .models import Lottery, LotteryResult, PrizeEntry, ImageUpdate, News, LiveVideo, FcmToken
 from .models import DailyPointsPool, UserPointsBalance, PointsTransaction, DailyPointsAwarded
 from .models import DailyCashPool, UserCashBalance, CashTransaction, DailyCashAwarded  # Added cash back models
+from .models import DailyCashSlot  # Pre-drawn cash back awards
+from .models import NotificationJob  # Notification outbox
 from .models import LiveScrapingSession  # Live scraping model
 from .models import TextUpdate  # Text update model
 from django.contrib.auth.models import Group
@@ -15,7 +17,7 @@ import re
 from django.utils.html import format_html
 from django.shortcuts import render, redirect
 from .services.fcm_service import FCMService
-from django.db.models import Count
+from django.db.models import Count, Max
 
 # Custom widget that prevents spaces
 class NoSpaceTextInput(TextInput):
@@ -546,11 +548,11 @@ class FcmTokenAdmin(admin.ModelAdmin):
     actions = ['send_test_notification', 'activate_tokens', 'deactivate_tokens']
     
     def send_test_notification(self, request, queryset):
-        """Send test notification to selected users"""
-        from .services.fcm_service import FCMService
+        """Queue a test notification to the selected users"""
+        from .services.notification_outbox import NotificationOutboxService
         
-        active_tokens = queryset.filter(is_active=True, notifications_enabled=True)
-        if not active_tokens.exists():
+        active_token_ids = list(queryset.filter(is_active=True, notifications_enabled=True).values_list('id', flat=True))
+        if not active_token_ids:
             self.message_user(
                 request,
                 "No active tokens selected for notification.",
@@ -558,17 +560,19 @@ class FcmTokenAdmin(admin.ModelAdmin):
             )
             return
         
-        # Send test notification
-        result = FCMService.send_to_all_users(
+        # Sent by the notification worker
+        job = NotificationOutboxService.enqueue(
+            'custom',
             title="Test Notification",
             body="This is a test notification from admin panel.",
-            data={'type': 'test', 'source': 'admin'}
+            data={'type': 'test', 'source': 'admin'},
+            target_token_ids=active_token_ids
         )
         
         self.message_user(
             request,
-            f"Test notification sent: {result['success_count']} success, {result['failure_count']} failed",
-            messages.SUCCESS if result['success_count'] > 0 else messages.WARNING
+            f"Test notification queued for {len(active_token_ids)} device(s) (job {job.pk})",
+            messages.SUCCESS
         )
     
     send_test_notification.short_description = 'Send test notification'
@@ -587,6 +591,27 @@ class FcmTokenAdmin(admin.ModelAdmin):
     
     deactivate_tokens.short_description = 'Deactivate selected tokens'
 
+@admin.register(NotificationJob)
+class NotificationJobAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'kind', 'title', 'status', 'sent_count', 'failure_count', 'deactivated_count', 'active_set_shrink_display',
+        'attempts', 'next_attempt_at', 'created_at'
+    ]
+    list_filter = ['status', 'kind', 'created_at']
+    search_fields = ['title']
+    readonly_fields = [
+        'max_token_id', 'cursor_token_id', 'retry_token_ids', 'retry_attempts', 'sent_count', 'failure_count', 'attempts',
+        'active_tokens_at_start', 'deactivated_count', 'error_counts',
+        'locked_by', 'locked_until', 'last_error', 'created_at', 'started_at', 'completed_at'
+    ]
+    raw_id_fields = ['lottery_result']
+    ordering = ['-created_at']
+
+    def active_set_shrink_display(self, obj):
+        shrink = obj.active_set_shrink
+        return f"{shrink:.2f}%" if shrink is not None else "-"
+    active_set_shrink_display.short_description = "Active Set Shrink"
+
 #<---------------POINTS SYSTEM SECTION---------------->
 @admin.register(DailyPointsPool)
 class DailyPointsPoolAdmin(admin.ModelAdmin):
@@ -710,12 +735,23 @@ class DailyPointsAwardedAdmin(admin.ModelAdmin):
         return False
 
 #<---------------CASH BACK SYSTEM SECTION---------------->
+class DailyCashSlotInline(admin.TabularInline):
+    model = DailyCashSlot
+    extra = 0
+    can_delete = False
+    fields = ['slot_number', 'cash_amount', 'phone_number', 'claimed_at']
+    readonly_fields = ['slot_number', 'cash_amount', 'phone_number', 'claimed_at']
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(DailyCashPool)
 class DailyCashPoolAdmin(admin.ModelAdmin):
     list_display = ('date', 'formatted_budget', 'formatted_distributed', 'formatted_remaining', 'users_awarded', 'max_users', 'pool_status')
     list_filter = ('date', 'created_at')
     readonly_fields = ('created_at', 'updated_at')
     ordering = ('-date',)
+    inlines = [DailyCashSlotInline]
     
     def formatted_budget(self, obj):
         return f"₹{obj.total_budget}"
@@ -951,6 +987,11 @@ def reset_daily_cash_pool(modeladmin, request, queryset):
         pool.remaining_amount = pool.total_budget
         pool.users_awarded = 0
         pool.save(update_fields=['distributed_amount', 'remaining_amount', 'users_awarded'])
+
+        # Redraw the free slots, numbered after the claimed ones so their cashback ids stay unique
+        pool.slots.filter(claimed_at__isnull=True).delete()
+        last_slot = pool.slots.aggregate(last=Max('slot_number'))['last'] or 0
+        pool.draw_slots(first_slot=last_slot + 1)
     
     count = queryset.count()
     modeladmin.message_user(request, f"Successfully reset {count} daily cash pools.")
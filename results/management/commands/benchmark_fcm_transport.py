@@ -0,0 +1,105 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from results.services.fcm_fake import FakeFCMServer
+from results.services.fcm_rate import AdaptiveRateController
+from results.services.fcm_service import FCMService
+
+
+class Command(BaseCommand):
+    help = ('Benchmark FCM send throughput of the pooled httpx transport against the in-process fake server, '
+            'at fixed concurrency levels and with the adaptive rate controller')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--messages',
+            type=int,
+            default=5000,
+            help='Messages sent at each concurrency level'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[5, 25, 100, 200],
+            help='Requests in flight to benchmark'
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=20,
+            help='Simulated FCM response time'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Tokens per send_to_tokens batch'
+        )
+        parser.add_argument(
+            '--capacity',
+            type=int,
+            help='Requests in flight the fake accepts before answering 429 (simulated FCM throttling)'
+        )
+        parser.add_argument(
+            '--retry-after',
+            type=float,
+            default=0,
+            help='Retry-After seconds of the fake\'s 429 responses (0: no header)'
+        )
+        parser.add_argument(
+            '--no-adaptive',
+            action='store_true',
+            help='Skip the adaptive rate controller run'
+        )
+        parser.add_argument(
+            '--sender-threads',
+            type=int,
+            default=4,
+            help='Threads submitting batches at the same time'
+        )
+
+    def handle(self, *args, **options):
+        messages, batch_size = options['messages'], options['batch_size']
+        tokens = [f"bench-token-{index:07d}" for index in range(messages)]
+        batches = [tokens[i:i + batch_size] for i in range(0, messages, batch_size)]
+
+        self.stdout.write(self.style.SUCCESS("=== FCM Transport Benchmark (fake server) ==="))
+        self.stdout.write(f"📨 {messages:,} messages in batches of {batch_size}, "
+                          f"{options['latency_ms']:.0f} ms simulated latency, {options['sender_threads']} sender threads")
+
+        if options['capacity']:
+            self.stdout.write(f"🚦 Fake FCM throttles above {options['capacity']} requests in flight")
+
+        runs = [(f"concurrency {concurrency:>4}", AdaptiveRateController.fixed(concurrency))
+                for concurrency in options['concurrency']]
+        if not options['no_adaptive']:
+            # Starts from the configured initial window and finds the highest one FCM accepts
+            runs.append(("adaptive        ", AdaptiveRateController.from_settings()))
+
+        for label, controller in runs:
+            server = FakeFCMServer(latency=options['latency_ms'] / 1000, capacity=options['capacity'],
+                                   retry_after=options['retry_after'])
+            transport = server.client(controller=controller)
+            previous = FCMService.set_transport(transport)
+            try:
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options['sender_threads']) as executor:
+                    outcomes = list(executor.map(
+                        lambda batch: FCMService.send_to_tokens(batch, 'Benchmark', 'Throughput test'), batches
+                    ))
+                seconds = time.perf_counter() - start
+            finally:
+                FCMService.set_transport(previous)
+                transport.close()
+
+            delivered = sum(len(outcome['delivered']) for outcome in outcomes)
+            stats = controller.snapshot()
+            self.stdout.write(
+                f"⚡ {label}: {delivered / seconds:>9,.0f} msg/s  "
+                f"({seconds * 1000:,.0f} ms, {delivered:,} delivered, {server.throttled:,} throttled, "
+                f"max {server.max_in_flight} in flight, window {stats['min_window']}-{stats['max_window']} "
+                f"ended at {stats['window']})"
+            )
@@ -0,0 +1,112 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from results.models import LotteryResult, PrizeEntry
+from results.services.ticket_index import TicketIndexService
+
+
+class Command(BaseCommand):
+    help = 'Benchmark ticket checks: per-scan PrizeEntry queries vs the in-memory winning ticket index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--result-id',
+            type=int,
+            help='LotteryResult id to check tickets against (defaults to the latest published result)'
+        )
+        parser.add_argument(
+            '--checks',
+            type=int,
+            default=1000,
+            help='Number of ticket checks to run on each path'
+        )
+        parser.add_argument(
+            '--winning-ratio',
+            type=float,
+            default=0.2,
+            help='Share of checked tickets taken from the winning tickets of the result'
+        )
+
+    def handle(self, *args, **options):
+        lottery_result = self.get_lottery_result(options.get('result_id'))
+        tickets = self.sample_tickets(lottery_result, options['checks'], options['winning_ratio'])
+
+        self.stdout.write(self.style.SUCCESS(f"=== Ticket Check Benchmark ({lottery_result}) ==="))
+        self.stdout.write(f"🎫 Checks: {len(tickets):,}")
+
+        # Old path: two PrizeEntry queries per scan
+        start = time.perf_counter()
+        query_wins = [self.check_with_queries(ticket, lottery_result) for ticket in tickets]
+        query_seconds = time.perf_counter() - start
+
+        # New path: one query to build the index, then hash lookups
+        TicketIndexService.invalidate(lottery_result.pk)
+        start = time.perf_counter()
+        TicketIndexService.get_index(lottery_result)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index_wins = [self.check_with_index(ticket, lottery_result) for ticket in tickets]
+        index_seconds = time.perf_counter() - start
+
+        if query_wins != index_wins:
+            raise CommandError('Index lookups returned different prizes than the PrizeEntry queries')
+
+        self.stdout.write(f"🐢 PrizeEntry queries: {query_seconds * 1000:.1f} ms "
+                          f"({query_seconds / len(tickets) * 1e6:.1f} µs/check)")
+        self.stdout.write(f"🏗️ Index build: {build_seconds * 1000:.1f} ms")
+        self.stdout.write(f"⚡ Index lookups: {index_seconds * 1000:.1f} ms "
+                          f"({index_seconds / len(tickets) * 1e6:.1f} µs/check)")
+        if index_seconds:
+            self.stdout.write(self.style.SUCCESS(f"Speedup: {query_seconds / index_seconds:,.0f}x"))
+
+    def get_lottery_result(self, result_id):
+        """Get the result to benchmark against"""
+        queryset = LotteryResult.objects.all()
+        if result_id:
+            queryset = queryset.filter(pk=result_id)
+        else:
+            queryset = queryset.filter(is_published=True).order_by('-date', '-id')
+
+        lottery_result = queryset.first()
+        if not lottery_result:
+            raise CommandError('No lottery result found to benchmark against')
+        return lottery_result
+
+    def sample_tickets(self, lottery_result, checks, winning_ratio):
+        """Mix of winning ticket numbers (full and series) and random losing tickets"""
+        rng = random.Random(42)
+        winning = list(PrizeEntry.objects.filter(
+            lottery_result=lottery_result
+        ).values_list('ticket_number', flat=True))
+
+        tickets = []
+        for _ in range(checks):
+            if winning and rng.random() < winning_ratio:
+                ticket = rng.choice(winning)
+                if len(ticket) == 4:
+                    # Series prizes are matched on the last 4 digits of a full ticket
+                    ticket = f"{lottery_result.lottery.code}{rng.choice('ABCDEFGHJKLM')}{rng.randint(10, 99)}{ticket}"
+            else:
+                ticket = f"{lottery_result.lottery.code}{rng.choice('ABCDEFGHJKLM')}{rng.randint(100000, 999999)}"
+            tickets.append(ticket)
+        return tickets
+
+    def check_with_queries(self, ticket_number, lottery_result):
+        """Previous TicketCheckView lookup"""
+        last_4_digits = ticket_number[-4:] if len(ticket_number) >= 4 else ticket_number
+        winning_tickets = PrizeEntry.objects.filter(
+            ticket_number=ticket_number,
+            lottery_result=lottery_result
+        ).order_by('id')
+        small_prize_tickets = PrizeEntry.objects.filter(
+            ticket_number=last_4_digits,
+            lottery_result=lottery_result
+        ).exclude(ticket_number=ticket_number).order_by('id')
+        return [prize.id for prize in list(winning_tickets) + list(small_prize_tickets)]
+
+    def check_with_index(self, ticket_number, lottery_result):
+        winning_tickets, small_prize_tickets = TicketIndexService.find_wins(ticket_number, lottery_result)
+        return [prize.id for prize in winning_tickets + small_prize_tickets]
@@ -0,0 +1,134 @@
+import random
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from results.models import LotteryResult, PrizeEntry
+from results.services.ticket_index import (
+    SERIES_LETTERS, WinningTicketIndex, TicketIndexService, decode_ticket, expand_ticket_pattern
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark range/series ticket checks: per-ticket index lookups vs vectorized NumPy matching'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--result-id',
+            type=int,
+            help='LotteryResult id to match against (defaults to the latest published bumper result)'
+        )
+        parser.add_argument(
+            '--synthetic',
+            action='store_true',
+            help='Match against a generated bumper-sized draw instead of a stored result'
+        )
+        parser.add_argument(
+            '--tickets',
+            type=int,
+            default=10000,
+            help='Number of tickets to check (rounded to whole series of a range)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs of each path (best time is reported)'
+        )
+
+    def handle(self, *args, **options):
+        index, label = self.get_index(options.get('result_id'), options['synthetic'])
+        code = label[0]
+
+        # A*100000-A*1xxxxx: every series of a number range, like an agent's bundle
+        per_series = max(1, options['tickets'] // len(SERIES_LETTERS))
+        pattern = f"{code}*100000-{code}*{100000 + per_series - 1}"
+        ticket_codes = expand_ticket_pattern(pattern, max_tickets=len(SERIES_LETTERS) * per_series)
+        ticket_numbers = [decode_ticket(ticket_code) for ticket_code in ticket_codes.tolist()]
+
+        self.stdout.write(self.style.SUCCESS(f"=== Ticket Range Benchmark ({label}) ==="))
+        self.stdout.write(f"🏆 Winning entries: {len(index):,} "
+                          f"({len(index.full_codes):,} full tickets, {len(index.last_4_codes):,} last 4 digits)")
+        self.stdout.write(f"🎫 Tickets: {len(ticket_codes):,} ({pattern})")
+
+        loop_seconds, loop_wins = self.best_of(options['repeat'], lambda: self.match_loop(index, ticket_numbers))
+        expand_seconds, _ = self.best_of(
+            options['repeat'], lambda: expand_ticket_pattern(pattern, max_tickets=len(ticket_codes))
+        )
+        match_seconds, _ = self.best_of(options['repeat'], lambda: index.match_positions(ticket_codes))
+        vector_seconds, vector_wins = self.best_of(options['repeat'], lambda: index.match_codes(ticket_codes))
+
+        if self.summarize(loop_wins) != self.summarize(vector_wins):
+            raise CommandError('Vectorized matching returned different winners than per-ticket lookups')
+
+        self.stdout.write(f"🎯 Winning tickets: {len(vector_wins):,}")
+        self.stdout.write(f"🐢 Per-ticket lookups: {loop_seconds * 1000:.2f} ms")
+        self.stdout.write(f"🧮 Pattern expansion: {expand_seconds * 1000:.2f} ms")
+        self.stdout.write(f"⚡ Vectorized match: {match_seconds * 1000:.2f} ms "
+                          f"({vector_seconds * 1000:.2f} ms with the winners' prize rows)")
+        if match_seconds and vector_seconds:
+            self.stdout.write(self.style.SUCCESS(
+                f"Speedup: {loop_seconds / match_seconds:,.1f}x matching, "
+                f"{loop_seconds / vector_seconds:,.1f}x with prize rows"
+            ))
+
+    def match_loop(self, index, ticket_numbers):
+        """Previous path: one index lookup per ticket in Python"""
+        wins = []
+        for ticket_number in ticket_numbers:
+            full, last_4 = index.match(ticket_number)
+            if full or last_4:
+                wins.append((ticket_number, full, last_4))
+        return wins
+
+    def best_of(self, repeat, func):
+        best, value = None, None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            value = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, value
+
+    def summarize(self, wins):
+        return [
+            (ticket_number, [prize.ticket_number for prize in full], [prize.ticket_number for prize in last_4])
+            for ticket_number, full, last_4 in wins
+        ]
+
+    def get_index(self, result_id, synthetic):
+        """Index of a stored result, or of a generated bumper draw"""
+        if not synthetic:
+            queryset = LotteryResult.objects.select_related('lottery')
+            if result_id:
+                queryset = queryset.filter(pk=result_id)
+            else:
+                queryset = queryset.filter(is_published=True, is_bumper=True).order_by('-date', '-id')
+
+            lottery_result = queryset.first()
+            if lottery_result:
+                return TicketIndexService.build_index(lottery_result), f"{lottery_result.lottery.code} {lottery_result}"
+            if result_id:
+                raise CommandError(f'Lottery result {result_id} not found')
+            self.stdout.write(self.style.WARNING('No published bumper result found, using a synthetic draw'))
+
+        return self.synthetic_index(), 'B synthetic bumper draw'
+
+    def synthetic_index(self):
+        """Bumper-sized draw: full ticket prizes for every series plus thousands of last 4 digit prizes"""
+        rng = random.Random(42)
+        prizes = []
+        for prize_type, count, amount in (('1st', 1, 250000000), ('2nd', 20, 10000000), ('3rd', 20, 1000000),
+                                          ('4th', 20, 500000), ('5th', 20, 200000)):
+            for _ in range(count):
+                ticket = f"B{rng.choice(SERIES_LETTERS)}{rng.randint(100000, 999999)}"
+                prizes.append(PrizeEntry(prize_type=prize_type, prize_amount=Decimal(amount), ticket_number=ticket))
+
+        last_4 = np.random.default_rng(42).choice(10000, size=4000, replace=False)
+        for position, digits in enumerate(last_4):
+            prize_type = ('6th', '7th', '8th', '9th')[position % 4]
+            prizes.append(PrizeEntry(prize_type=prize_type, prize_amount=Decimal(5000), ticket_number=f"{digits:04d}"))
+
+        return WinningTicketIndex(0, None, prizes)
@@ -0,0 +1,100 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from results.models import FcmToken
+from results.services.token_stream import active_tokens, iter_token_batches
+
+
+class Command(BaseCommand):
+    help = 'Benchmark token fan-out enumeration: OFFSET batches held in memory vs the keyset batches the outbox worker reads (synthetic tokens, rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tokens',
+            type=int,
+            nargs='+',
+            default=[10000, 200000],
+            help='Synthetic token table sizes to benchmark'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Tokens per batch'
+        )
+        parser.add_argument(
+            '--skip-offset',
+            action='store_true',
+            help='Only run the streaming path (OFFSET paging is quadratic on large tables)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("=== Token Stream Benchmark ==="))
+        for size in options['tokens']:
+            with transaction.atomic():
+                self.seed_tokens(size)
+                self.stdout.write(f"📱 Active tokens: {active_tokens().count():,}")
+
+                if not options['skip_offset']:
+                    seconds, peak, count = self.measure(self.offset_batches, options['batch_size'])
+                    self.stdout.write(f"🐢 OFFSET batches in memory: {seconds * 1000:,.0f} ms, "
+                                      f"peak {peak / 1024 / 1024:,.1f} MiB, {count:,} tokens")
+
+                seconds, peak, count = self.measure(self.streamed_batches, options['batch_size'])
+                self.stdout.write(f"⚡ Keyset stream: {seconds * 1000:,.0f} ms, "
+                                  f"peak {peak / 1024 / 1024:,.1f} MiB, {count:,} tokens")
+
+                transaction.set_rollback(True)
+
+    def seed_tokens(self, size):
+        """Replace the token table with `size` synthetic tokens (rolled back afterwards)"""
+        FcmToken.objects.all().delete()
+        start = time.perf_counter()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {FcmToken._meta.db_table} "
+                    "(phone_number, name, fcm_token, notifications_enabled, is_active, created_at, last_used) "
+                    "SELECT lpad(i::text, 10, '9'), 'Benchmark ' || i, "
+                    "'bench-' || md5(i::text) || md5((i * 7)::text) || md5((i * 13)::text), "
+                    "i %% 20 <> 0, i %% 50 <> 0, now(), now() "
+                    "FROM generate_series(1, %s) AS i",
+                    [size]
+                )
+                cursor.execute(f"ANALYZE {FcmToken._meta.db_table}")
+        else:
+            now = timezone.now()
+            FcmToken.objects.bulk_create((
+                FcmToken(
+                    phone_number=f"{i:010d}", name=f"Benchmark {i}", fcm_token=f"bench-{i:0160d}",
+                    notifications_enabled=i % 20 != 0, is_active=i % 50 != 0, created_at=now, last_used=now,
+                )
+                for i in range(1, size + 1)
+            ), batch_size=5000)
+        self.stdout.write(f"\n🧪 Seeded {size:,} tokens in {time.perf_counter() - start:.1f}s")
+
+    def measure(self, method, *args):
+        tracemalloc.start()
+        start = time.perf_counter()
+        count = method(*args)
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return seconds, peak, count
+
+    def offset_batches(self, batch_size):
+        """Previous send_to_all_users_batched: all batches sliced with OFFSET and kept before sending"""
+        tokens = active_tokens().values_list('fcm_token', flat=True)
+        total = tokens.count()
+        token_batches = []
+        for i in range(0, total, batch_size):
+            token_batches.append(list(tokens[i:i + batch_size]))
+        return sum(len(batch) for batch in token_batches)
+
+    def streamed_batches(self, batch_size):
+        """Keyset batches read one at a time, like the notification outbox worker"""
+        return sum(len(batch) for batch in iter_token_batches(batch_size=batch_size))
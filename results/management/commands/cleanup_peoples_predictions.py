@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from results.models import PeoplesPrediction
+
+
+class Command(BaseCommand):
+    help = "Expire people's predictions and tallies of past 3:00 PM cycles (schedule it, e.g. daily after 3:00 PM IST)"
+
+    def handle(self, *args, **options):
+        deleted = PeoplesPrediction.cleanup_old_predictions()
+        self.stdout.write(self.style.SUCCESS(f"🧹 Removed {deleted} people's predictions of past cycles"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from results.services.static_export import StaticExportService
+
+
+class Command(BaseCommand):
+    help = 'Export every published result as static JSON (today, 30-day list, details) and point the manifest at it'
+
+    def handle(self, *args, **options):
+        # Also run daily after midnight: today.json and the 30-day window depend on the date
+        summary = StaticExportService.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Static results export rebuilt: version {summary['version']}"))
+        self.stdout.write(f"📄 Result details: {summary['details']:,}")
+        self.stdout.write(f"📁 Location: {StaticExportService.get_export_root()}")
+        if not summary['brotli']:
+            self.stdout.write(self.style.WARNING("⚠️ brotli not installed - only gzip variants written"))
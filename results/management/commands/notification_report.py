@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from results.models import FcmToken, NotificationJob
+
+
+class Command(BaseCommand):
+    help = 'Report how much each notification job (campaign) shrank the active FCM token set'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Latest jobs to report'
+        )
+        parser.add_argument(
+            '--job',
+            type=int,
+            help='Only report this NotificationJob id'
+        )
+
+    def handle(self, *args, **options):
+        jobs = NotificationJob.objects.exclude(active_tokens_at_start=None)
+        if options['job']:
+            jobs = jobs.filter(pk=options['job'])
+        jobs = list(jobs.order_by('-created_at')[:options['limit']])
+
+        active_now = FcmToken.objects.filter(is_active=True, notifications_enabled=True).count()
+        self.stdout.write(self.style.SUCCESS("=== Notification Active Set Report ==="))
+        self.stdout.write(f"📱 Active tokens now: {active_now:,}")
+
+        if not jobs:
+            self.stdout.write("No started notification jobs")
+            return
+
+        total_deactivated = 0
+        for job in jobs:
+            total_deactivated += job.deactivated_count
+            errors = ', '.join(
+                f"{code} {count:,}" for code, count in sorted(job.error_counts.items(), key=lambda item: -item[1])
+            ) or '-'
+            self.stdout.write(
+                f"\n#{job.pk} {job.get_kind_display()} ({job.status}) {timezone.localtime(job.created_at):%Y-%m-%d %H:%M}: {job.title}"
+            )
+            self.stdout.write(
+                f"   Active at start: {job.active_tokens_at_start:,}  Delivered: {job.sent_count:,}  "
+                f"Deactivated: {job.deactivated_count:,} ({job.active_set_shrink or 0:.2f}% of the active set)"
+            )
+            self.stdout.write(f"   Errors: {errors}")
+
+        self.stdout.write(f"\n🧹 Dead tokens deactivated by these {len(jobs)} job(s): {total_deactivated:,}")
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from results.models import ResultChange
+
+
+class Command(BaseCommand):
+    help = 'Delete delta-sync change log entries older than the retention window (schedule it daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.LOTTERY_SETTINGS.get('RESULT_CHANGE_RETENTION_DAYS', 90),
+            help='Keep changes of this many days; clients that last synced before them get a reset'
+        )
+
+    def handle(self, *args, **options):
+        deleted = ResultChange.prune(options['days'])
+        self.stdout.write(self.style.SUCCESS(
+            f"🧹 Removed {deleted:,} result changes older than {options['days']} days"
+        ))
@@ -0,0 +1,22 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from results.models import LotteryResult
+from results.services.prize_frequency import PrizeFrequencyService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily prize frequency vectors used by the prediction endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Only rebuild the last N days (default: every published day)')
+
+    def handle(self, *args, **options):
+        results = LotteryResult.objects.filter(is_published=True)
+        if options['days']:
+            results = results.filter(date__gte=date.today() - timedelta(days=options['days']))
+
+        days = set(results.values_list('date', flat=True).distinct())
+        PrizeFrequencyService.rebuild_days(days)
+        self.stdout.write(self.style.SUCCESS(f"📊 Rebuilt prize frequencies of {len(days)} days"))
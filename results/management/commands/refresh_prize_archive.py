@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from results.services.prize_archive import PrizeArchiveService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the memory-mapped prize archive used by number analytics (web processes also refresh it after publishes)'
+
+    def handle(self, *args, **options):
+        manifest = PrizeArchiveService.build()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Prize archive refreshed: version {manifest['version']}"))
+        self.stdout.write(f"🎟️ Prizes: {manifest['rows']:,} (latest draw {manifest['latest_date']})")
+        self.stdout.write(f"📁 Location: {PrizeArchiveService.get_root()}")
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from results.services.fcm_service import FCMService
+from results.services.notification_outbox import NotificationOutboxService
+
+
+class Command(BaseCommand):
+    help = 'Send queued push notification jobs (run as a long-lived worker, or with --once from a scheduler)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the due jobs and exit'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=int,
+            default=5,
+            help='Seconds between checks for new jobs'
+        )
+        parser.add_argument(
+            '--allow-test-mode',
+            action='store_true',
+            help='Run without Firebase credentials: jobs complete without anything being sent (local development)'
+        )
+
+    def handle(self, *args, **options):
+        # In test mode every token counts as delivered, so jobs would complete with nothing sent
+        if FCMService.get_transport() is None and not options['allow_test_mode']:
+            raise CommandError(
+                'Firebase credentials are missing (FIREBASE_* environment variables): not starting, '
+                'queued notification jobs stay pending'
+            )
+
+        worker_id = NotificationOutboxService.worker_id()
+        self.stdout.write(f'📬 Notification worker {worker_id} started')
+
+        while True:
+            try:
+                processed = NotificationOutboxService.run_once(worker_id)
+                if processed:
+                    self.stdout.write(f'✅ Processed {processed} notification job(s)')
+            except Exception as e:
+                # Logged by the service; the job resumes from its checkpoint once its lease expires
+                self.stderr.write(self.style.ERROR(f'❌ Notification worker error: {e}'))
+            finally:
+                close_old_connections()
+
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
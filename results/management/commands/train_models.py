@@ -1,41 +1,40 @@
 from django.core.management.base import BaseCommand
-from results.prediction_engine import LotteryPredictionEngine
-from results.models import PredictionModel
+from results.prediction_engine import LotteryPredictionEngine, ALGORITHMS
 
 class Command(BaseCommand):
     help = 'Train and update prediction models'
-    
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lottery', help='Only train the models of this lottery name')
+        parser.add_argument('--workers', type=int, default=None, help='Backtest processes (default: CPU count, 1 runs in-process)')
+        parser.add_argument('--top-k', type=int, default=10, help='Numbers predicted per draw')
+        parser.add_argument('--min-history', type=int, default=10, help='Draws seen before the first backtested draw')
+        parser.add_argument('--keep-history', type=int, default=30, help='Latest backtested draws stored in PredictionHistory per model')
+
     def handle(self, *args, **options):
         """
-        Train prediction models and update their accuracy scores
+        Backtest every algorithm over the full draw history and update the models' accuracy scores
         """
-        engine = LotteryPredictionEngine()
-        
-        # You can add model training logic here
-        # For now, create/update default models
-        
-        algorithms = ['frequency', 'pattern', 'ensemble']
-        
-        for algorithm in algorithms:
-            model, created = PredictionModel.objects.get_or_create(
-                name=f'Default {algorithm.title()} Model',
-                algorithm=algorithm,
-                defaults={
-                    'accuracy_score': 0.3,  # Default score
-                    'parameters': {},
-                    'is_active': True
-                }
+        engine = LotteryPredictionEngine(
+            top_k=options['top_k'],
+            min_history=options['min_history'],
+            keep_history=options['keep_history'],
+            workers=options['workers'],
+        )
+
+        summary = engine.train(lottery_name=options['lottery'])
+
+        self.stdout.write(f"🎯 Jobs (lottery, prize type): {summary['jobs']:,} over {summary['draws']:,} draws")
+        self.stdout.write(f"📥 Load: {summary['load_seconds'] * 1000:.1f} ms")
+        self.stdout.write(f"⚙️ Backtest: {summary['backtest_seconds'] * 1000:.1f} ms on {engine.workers} worker(s)")
+        for algorithm in ALGORITHMS:
+            result = summary['algorithms'][algorithm]
+            self.stdout.write(
+                f"   {algorithm:<10} accuracy {result['accuracy']:.1%}  precision {result['precision']:.2%}  "
+                f"over {result['tested']:,} draws  ({result['seconds'] * 1000:.1f} ms scoring)"
             )
-            
-            if created:
-                self.stdout.write(
-                    self.style.SUCCESS(f'Created model: {model.name}')
-                )
-            else:
-                self.stdout.write(
-                    self.style.WARNING(f'Model already exists: {model.name}')
-                )
-        
+        self.stdout.write(f"💾 Save: {summary['save_seconds'] * 1000:.1f} ms")
+
         self.stdout.write(
             self.style.SUCCESS('Model training completed successfully!')
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,49 @@
+# Generated manually on 2026-10-17
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("results", "0037_lotteryresult_alphabet_set"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContentVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        choices=[
+                            ("results", "Lottery Results & Prizes"),
+                            ("news", "News"),
+                            ("updates", "Image & Text Updates"),
+                        ],
+                        max_length=20,
+                        unique=True,
+                    ),
+                ),
+                ("version", models.PositiveBigIntegerField(default=0)),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                "verbose_name": "Content Version",
+                "verbose_name_plural": "Content Versions",
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated manually on 2026-10-17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("results", "0038_contentversion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResultSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "content",
+                    models.TextField(help_text="Rendered get-by-unique-id response body"),
+                ),
+                (
+                    "source_updated_at",
+                    models.DateTimeField(
+                        help_text="LotteryResult.updated_at the snapshot was rendered from"
+                    ),
+                ),
+                (
+                    "is_stale",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Result changed and a new snapshot is being rendered",
+                    ),
+                ),
+                ("rendered_at", models.DateTimeField(auto_now=True)),
+                (
+                    "lottery_result",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshot",
+                        to="results.lotteryresult",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Result Snapshot",
+                "verbose_name_plural": "Result Snapshots",
+            },
+        ),
+    ]
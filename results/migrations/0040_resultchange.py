@@ -0,0 +1,53 @@
+# Generated manually on 2026-10-17
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("results", "0039_resultsnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResultChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("result", "Lottery Result"), ("prize", "Prize Entry")],
+                        max_length=10,
+                    ),
+                ),
+                ("object_id", models.BigIntegerField()),
+                ("lottery_result_id", models.BigIntegerField(db_index=True)),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[("upsert", "Inserted / Updated"), ("delete", "Deleted")],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                "verbose_name": "Result Change",
+                "verbose_name_plural": "Result Changes",
+                "ordering": ["id"],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated manually on 2026-10-17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0040_resultchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCashSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot_number', models.PositiveIntegerField()),
+                ('cash_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('phone_number', models.CharField(blank=True, max_length=15)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('pool', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='results.dailycashpool')),
+            ],
+            options={
+                'verbose_name': 'Daily Cash Slot',
+                'verbose_name_plural': 'Daily Cash Slots',
+                'ordering': ['pool', 'slot_number'],
+                'unique_together': {('pool', 'slot_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated manually on 2026-10-17
+
+from datetime import time, timedelta
+
+import pytz
+from django.db import migrations, models
+
+
+def tally_existing_predictions(apps, schema_editor):
+    """Count the predictions already stored into their cycles' tallies"""
+    PeoplesPrediction = apps.get_model('results', 'PeoplesPrediction')
+    PeoplesPredictionTally = apps.get_model('results', 'PeoplesPredictionTally')
+    ist = pytz.timezone('Asia/Kolkata')
+
+    tallies = {}
+    for prediction, created_at in PeoplesPrediction.objects.values_list('peoples_prediction', 'created_at').iterator():
+        if not prediction or len(prediction) != 1 or prediction not in '0123456789':
+            continue
+        created_ist = created_at.astimezone(ist)
+        cycle = created_ist.date() if created_ist.time() >= time(15, 0) else created_ist.date() - timedelta(days=1)
+        for digit in range(10):
+            tallies.setdefault((cycle, digit), 0)
+        tallies[(cycle, int(prediction))] += 1
+
+    PeoplesPredictionTally.objects.bulk_create([
+        PeoplesPredictionTally(cycle=cycle, digit=digit, count=count)
+        for (cycle, digit), count in tallies.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0042_dailycashslot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeoplesPredictionTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cycle', models.DateField(db_index=True, help_text='IST date of the 3:00 PM that started the cycle')),
+                ('digit', models.PositiveSmallIntegerField(help_text='Predicted digit (0-9)')),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': "People's Prediction Tally",
+                'verbose_name_plural': "People's Prediction Tallies",
+                'ordering': ['-cycle', 'digit'],
+                'unique_together': {('cycle', 'digit')},
+            },
+        ),
+        migrations.RunPython(tally_existing_predictions, migrations.RunPython.noop),
+    ]
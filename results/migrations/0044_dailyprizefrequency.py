@@ -0,0 +1,69 @@
+# Generated manually on 2026-10-17
+
+import re
+import zlib
+
+import numpy as np
+from django.db import migrations, models
+
+FREQUENCY_PRIZE_TYPES = ['4th', '5th', '6th', '7th', '8th', '9th', '10th']
+
+
+def build_existing_frequencies(apps, schema_editor):
+    """Count the 4th-10th prizes of already published results into daily vectors"""
+    PrizeEntry = apps.get_model('results', 'PrizeEntry')
+    DailyPrizeFrequency = apps.get_model('results', 'DailyPrizeFrequency')
+
+    days = {}
+    for day, ticket_number in PrizeEntry.objects.filter(
+        lottery_result__is_published=True,
+        prize_type__in=FREQUENCY_PRIZE_TYPES
+    ).values_list('lottery_result__date', 'ticket_number').iterator():
+        if day not in days:
+            days[day] = [np.zeros(10000, dtype=np.uint32), np.zeros(10, dtype=np.uint32), 0]
+        counts = days[day]
+        counts[2] += 1
+        ticket_str = str(ticket_number or '').strip()
+        if not ticket_str:
+            continue
+        if re.match(r'[0-9]{4}\Z', ticket_str[-4:]):
+            counts[0][int(ticket_str[-4:])] += 1
+        if ticket_str[-1] in '0123456789':
+            counts[1][int(ticket_str[-1])] += 1
+
+    DailyPrizeFrequency.objects.bulk_create([
+        DailyPrizeFrequency(
+            date=day,
+            last_4_counts=zlib.compress(last_4.tobytes()),
+            last_digit_counts=zlib.compress(last_digit.tobytes()),
+            prize_count=prize_count,
+        )
+        for day, (last_4, last_digit, prize_count) in days.items()
+    ], batch_size=200)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0043_peoplespredictiontally'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPrizeFrequency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True, unique=True)),
+                ('last_4_counts', models.BinaryField()),
+                ('last_digit_counts', models.BinaryField()),
+                ('prize_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Prize Frequency',
+                'verbose_name_plural': 'Daily Prize Frequencies',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.RunPython(build_existing_frequencies, migrations.RunPython.noop),
+    ]
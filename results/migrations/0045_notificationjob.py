@@ -0,0 +1,48 @@
+# Generated manually on 2026-10-17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0044_dailyprizefrequency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('new_result', 'New Result'), ('result_ready', 'Result Ready'), ('custom', 'Custom')], max_length=20)),
+                ('title', models.CharField(max_length=200)),
+                ('body', models.TextField()),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('image_url', models.URLField(blank=True, max_length=1000)),
+                ('target_token_ids', models.JSONField(blank=True, help_text='Only send to these FcmToken ids (all active tokens when empty)', null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Runs that stopped on a failed batch')),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('max_token_id', models.BigIntegerField(blank=True, help_text='Last FcmToken id when the job started', null=True)),
+                ('cursor_token_id', models.BigIntegerField(default=0, help_text='Tokens up to this id were handed to FCM')),
+                ('retry_token_ids', models.JSONField(blank=True, default=list, help_text='Token ids whose send must be retried')),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('failure_count', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('lottery_result', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notification_jobs', to='results.lotteryresult')),
+            ],
+            options={
+                'verbose_name': 'Notification Job',
+                'verbose_name_plural': 'Notification Jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='results_not_status_d44c15_idx')],
+            },
+        ),
+    ]
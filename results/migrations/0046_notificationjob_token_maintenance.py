@@ -0,0 +1,28 @@
+# Generated manually on 2026-10-17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0045_notificationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationjob',
+            name='active_tokens_at_start',
+            field=models.PositiveIntegerField(blank=True, help_text='Active recipients when the job started', null=True),
+        ),
+        migrations.AddField(
+            model_name='notificationjob',
+            name='deactivated_count',
+            field=models.PositiveIntegerField(default=0, help_text='Dead tokens deactivated by this job'),
+        ),
+        migrations.AddField(
+            model_name='notificationjob',
+            name='error_counts',
+            field=models.JSONField(blank=True, default=dict, help_text='Failed sends per FCM error code'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated manually on 2026-10-17
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0046_notificationjob_token_maintenance'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resultchange',
+            name='created_at',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), db_index=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated manually on 2026-10-17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0047_resultchange_db_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationjob',
+            name='retry_attempts',
+            field=models.JSONField(blank=True, default=dict, help_text='Failed runs of each retried token, by token id'),
+        ),
+        migrations.AlterField(
+            model_name='notificationjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Runs stopped because FCM was unavailable'),
+        ),
+    ]
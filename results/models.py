@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Now
 import uuid
 from django.utils import timezone
 from django.core.validators import URLValidator
@@ -10,7 +11,7 @@ import re
 import pytz
 from datetime import date, timedelta
 import random
-from django.db import transaction
+from django.db import transaction, connection, IntegrityError
 
 
 class Lottery(models.Model):
@@ -451,17 +452,41 @@ class DailyPointsPool(models.Model):
         return self.remaining_points >= points_amount
     
     def award_points(self, points_amount):
-        """Award points and update pool (with database transaction)"""
-        with transaction.atomic():
-            # Refresh from database to prevent race conditions
-            pool = DailyPointsPool.objects.select_for_update().get(id=self.id)
-            
-            if pool.remaining_points >= points_amount:
-                pool.distributed_points += points_amount
-                pool.remaining_points -= points_amount
-                pool.save(update_fields=['distributed_points', 'remaining_points', 'updated_at'])
-                return True
+        """Award points and update pool (single conditional UPDATE, see claim_points)"""
+        if not DailyPointsPool.claim_points(points_amount, self.date):
             return False
+        self.refresh_from_db(fields=['distributed_points', 'remaining_points', 'updated_at'])
+        return True
+
+    @classmethod
+    def claim_points(cls, points_amount, pool_date=None):
+        """
+        Take points from a day's pool with one conditional UPDATE (remaining_points >= amount).
+        No row is read or locked beforehand, so concurrent claims only wait for each other's
+        statement, and the pool can never go below zero.
+        Call it outside a transaction so the row lock is released right away.
+        """
+        if pool_date is None:
+            pool_date = cls.get_today_pool().date
+
+        claimed = cls.objects.filter(
+            date=pool_date,
+            remaining_points__gte=points_amount
+        ).update(
+            distributed_points=models.F('distributed_points') + points_amount,
+            remaining_points=models.F('remaining_points') - points_amount,
+            updated_at=timezone.now()
+        )
+        return claimed == 1
+
+    @classmethod
+    def release_points(cls, points_amount, pool_date):
+        """Give back points of a claim whose award failed"""
+        cls.objects.filter(date=pool_date).update(
+            distributed_points=models.F('distributed_points') - points_amount,
+            remaining_points=models.F('remaining_points') + points_amount,
+            updated_at=timezone.now()
+        )
 
 
 class UserPointsBalance(models.Model):
@@ -604,36 +629,128 @@ class DailyCashPool(models.Model):
         ist = pytz.timezone('Asia/Kolkata')
         today_ist = timezone.now().astimezone(ist).date()
         
-        pool, created = cls.objects.get_or_create(
-            date=today_ist,
-            defaults={
-                'total_budget': 100.00,
-                'distributed_amount': 0.00,
-                'remaining_amount': 100.00,
-                'users_awarded': 0,
-                'max_users': 30
-            }
-        )
+        pool = cls.objects.filter(date=today_ist).first()
+        if pool:
+            return pool
+
+        try:
+            # The day's awards are drawn together with the pool, so no request sees a pool without slots
+            with transaction.atomic():
+                pool = cls.objects.create(
+                    date=today_ist,
+                    total_budget=100.00,
+                    distributed_amount=0.00,
+                    remaining_amount=100.00,
+                    users_awarded=0,
+                    max_users=30
+                )
+                pool.draw_slots()
+        except IntegrityError:
+            # Created by a concurrent request
+            pool = cls.objects.get(date=today_ist)
         return pool
-    
-    def can_award_cash(self, cash_amount):
-        """Check if pool can award cash (has budget and user slots)"""
-        return (self.remaining_amount >= cash_amount and 
-                self.users_awarded < self.max_users)
-    
-    def award_cash(self, cash_amount):
-        """Award cash and update pool (with database transaction)"""
-        with transaction.atomic():
-            # Refresh from database to prevent race conditions
-            pool = DailyCashPool.objects.select_for_update().get(id=self.id)
-            
-            if pool.can_award_cash(cash_amount):
-                pool.distributed_amount += cash_amount
-                pool.remaining_amount -= cash_amount
-                pool.users_awarded += 1
-                pool.save(update_fields=['distributed_amount', 'remaining_amount', 'users_awarded', 'updated_at'])
-                return True
-            return False
+
+    def draw_slots(self, first_slot=1, count=None):
+        """
+        Pre-draw the day's cash back awards into DailyCashSlot rows: ₹1-₹10 each, in claim order,
+        until the remaining budget or the remaining user slots run out.
+        """
+        if count is None:
+            count = self.max_users - self.users_awarded
+        budget = int(self.remaining_amount)
+
+        slots = []
+        for slot_number in range(first_slot, first_slot + count):
+            if budget <= 0:
+                break
+            cash_amount = min(random.randint(1, 10), budget)
+            budget -= cash_amount
+            slots.append(DailyCashSlot(pool=self, slot_number=slot_number, cash_amount=cash_amount))
+
+        DailyCashSlot.objects.bulk_create(slots)
+        return slots
+
+    def claim_slot(self, phone_number):
+        """
+        Claim the next pre-drawn award for a phone number (see DailyCashSlot.claim_next).
+        Pools created before slots existed get theirs drawn on first use.
+        """
+        slot = DailyCashSlot.claim_next(self, phone_number)
+        if slot is None and not self.slots.exists():
+            with transaction.atomic():
+                # Lock the pool so concurrent requests draw its slots once
+                pool = DailyCashPool.objects.select_for_update().get(pk=self.pk)
+                if not pool.slots.exists():
+                    pool.draw_slots(first_slot=pool.users_awarded + 1)
+            slot = DailyCashSlot.claim_next(self, phone_number)
+        return slot
+
+    def record_slot_claimed(self, cash_amount):
+        """
+        Add a claimed slot to the pool totals once the award commits. The update runs after the
+        award's transaction, so the pool row is never locked while an award is in flight; the
+        totals are for reporting and may lag, availability is decided by claim_slot alone.
+        """
+        pool_id = self.pk
+        transaction.on_commit(lambda: DailyCashPool.objects.filter(pk=pool_id).update(
+            distributed_amount=models.F('distributed_amount') + cash_amount,
+            remaining_amount=models.F('remaining_amount') - cash_amount,
+            users_awarded=models.F('users_awarded') + 1,
+            updated_at=timezone.now()
+        ))
+
+
+class DailyCashSlot(models.Model):
+    """
+    One pre-drawn cash back award of a day's pool. Slots are drawn when the pool is created
+    and handed out in slot order, one per eligible user.
+    """
+    pool = models.ForeignKey(DailyCashPool, on_delete=models.CASCADE, related_name='slots')
+    slot_number = models.PositiveIntegerField()
+    cash_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    phone_number = models.CharField(max_length=15, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Daily Cash Slot"
+        verbose_name_plural = "Daily Cash Slots"
+        unique_together = ('pool', 'slot_number')
+        ordering = ['pool', 'slot_number']
+
+    def __str__(self):
+        status = f"claimed by {self.phone_number}" if self.claimed_at else "free"
+        return f"Slot {self.slot_number} ({self.pool.date}): ₹{self.cash_amount} - {status}"
+
+    @classmethod
+    def claim_next(cls, pool, phone_number):
+        """
+        Claim the pool's next free slot; returns it, or None when every slot is taken.
+        Call it inside the award's transaction: the slot stays taken only if the award commits.
+        """
+        free_slots = cls.objects.filter(pool=pool, claimed_at__isnull=True).order_by('slot_number')
+        claimed_at = timezone.now()
+
+        if connection.features.has_select_for_update_skip_locked:
+            # Concurrent claimers skip the slots locked by each other instead of queueing on them
+            slot = free_slots.select_for_update(skip_locked=True).first()
+            if slot is None:
+                return None
+            slot.phone_number = phone_number
+            slot.claimed_at = claimed_at
+            slot.save(update_fields=['phone_number', 'claimed_at'])
+            return slot
+
+        # No SKIP LOCKED (SQLite): take the first slot that is still free with a conditional UPDATE
+        for slot in free_slots:
+            claimed = cls.objects.filter(pk=slot.pk, claimed_at__isnull=True).update(
+                phone_number=phone_number,
+                claimed_at=claimed_at
+            )
+            if claimed:
+                slot.phone_number = phone_number
+                slot.claimed_at = claimed_at
+                return slot
+        return None
 
 
 class UserCashBalance(models.Model):
@@ -773,8 +890,33 @@ class DailyCashAwarded(models.Model):
             return False
     
     @classmethod
-    def record_cash_award(cls, phone_number, cash_amount, ticket_number, lottery_name):
-        """Record that user received cash back today"""
+    def get_rewards_received_today(cls, phone_number):
+        """
+        Rewards a user already received today (IST), cash back and points in one UNION query
+        Returns: set containing 'cash' and/or 'points'
+        """
+        try:
+            ist = pytz.timezone('Asia/Kolkata')
+            today_ist = timezone.now().astimezone(ist).date()
+
+            cash = cls.objects.filter(
+                phone_number=phone_number,
+                award_date=today_ist
+            ).annotate(kind=models.Value('cash', output_field=models.CharField())).values_list('kind', flat=True)
+            points = DailyPointsAwarded.objects.filter(
+                phone_number=phone_number,
+                award_date=today_ist
+            ).annotate(kind=models.Value('points', output_field=models.CharField())).values_list('kind', flat=True)
+
+            return set(cash.union(points))
+        except Exception as e:
+            logger = logging.getLogger(__name__)
+            logger.error(f"Error in get_rewards_received_today: {e}")
+            return set()
+
+    @classmethod
+    def record_cash_award(cls, phone_number, cash_amount, ticket_number, lottery_name, slot_number=None):
+        """Record that user received cash back today (slot_number: cash pool slot, see DailyCashSlot)"""
         try:
             ist = pytz.timezone('Asia/Kolkata')
             today_ist = timezone.now().astimezone(ist).date()
@@ -784,7 +926,9 @@ class DailyCashAwarded(models.Model):
                 award_date=today_ist,
                 cash_awarded=cash_amount,
                 ticket_number=ticket_number,
-                lottery_name=lottery_name
+                lottery_name=lottery_name,
+                # The pool slot is unique per day, so concurrent awards never share a cashback id
+                cashback_id=f"CB{today_ist.strftime('%Y%m%d')}{slot_number:03d}" if slot_number else ''
             )
         except Exception as e:
             logger = logging.getLogger(__name__)
@@ -886,9 +1030,9 @@ class PeoplesPrediction(models.Model):
         cutoff_datetime = datetime.combine(cutoff_date, time(15, 0))
         cutoff_datetime = india_tz.localize(cutoff_datetime)
 
-        # Delete old predictions
-        deleted_count = cls.objects.filter(created_at__lt=cutoff_datetime).count()
-        cls.objects.filter(created_at__lt=cutoff_datetime).delete()
+        # Delete old predictions and the tallies of past cycles
+        deleted_count, _ = cls.objects.filter(created_at__lt=cutoff_datetime).delete()
+        PeoplesPredictionTally.objects.filter(cycle__lt=cutoff_date).delete()
 
         if deleted_count > 0:
             logger.info(f"Cleaned up {deleted_count} old people's predictions")
@@ -896,6 +1040,25 @@ class PeoplesPrediction(models.Model):
         return deleted_count
 
 
+class PeoplesPredictionTally(models.Model):
+    """
+    Count of one digit's people's predictions in a 3:00 PM cycle (10 rows per cycle),
+    updated on each prediction so reading the top digits never scans the predictions
+    """
+    cycle = models.DateField(db_index=True, help_text="IST date of the 3:00 PM that started the cycle")
+    digit = models.PositiveSmallIntegerField(help_text="Predicted digit (0-9)")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "People's Prediction Tally"
+        verbose_name_plural = "People's Prediction Tallies"
+        unique_together = ('cycle', 'digit')
+        ordering = ['-cycle', 'digit']
+
+    def __str__(self):
+        return f"Cycle {self.cycle}: {self.digit} x{self.count}"
+
+
 #<---------------------TEXT UPDATE SECTION--------------------->
 class TextUpdate(models.Model):
     """
@@ -1037,4 +1200,239 @@ class LiveScrapingSession(models.Model):
         self.poll_count += 1
         self.last_polled_at = timezone.now()
         self.consecutive_errors = 0  # Reset errors on successful poll
-        self.save(update_fields=['prizes_found_count', 'poll_count', 'last_polled_at', 'consecutive_errors'])
\ No newline at end of file
+        self.save(update_fields=['prizes_found_count', 'poll_count', 'last_polled_at', 'consecutive_errors'])
+
+#<---------------------CONTENT VERSION SECTION--------------------->
+class ContentVersion(models.Model):
+    """
+    Monotonically increasing version per content scope, bumped on every write to that content.
+    Lets the polling endpoints answer conditional GETs (ETag / Last-Modified) without touching
+    the result and prize tables.
+    """
+    SCOPE_CHOICES = [
+        ('results', 'Lottery Results & Prizes'),
+        ('news', 'News'),
+        ('updates', 'Image & Text Updates'),
+    ]
+
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Content Version"
+        verbose_name_plural = "Content Versions"
+
+    def __str__(self):
+        return f"{self.get_scope_display()} v{self.version}"
+
+    @classmethod
+    def bump(cls, *scopes):
+        """Increment the version of each scope (single UPDATE per scope)"""
+        from django.db.models import F
+
+        now = timezone.now()
+        for scope in set(scopes):
+            updated = cls.objects.filter(scope=scope).update(version=F('version') + 1, updated_at=now)
+            if not updated:
+                cls.objects.get_or_create(scope=scope, defaults={'version': 1, 'updated_at': now})
+
+    @classmethod
+    def bump_on_commit(cls, *scopes):
+        """Bump scopes once the current transaction commits, deduplicated per transaction"""
+        from results.utils.on_commit import batch_on_commit
+
+        batch_on_commit('content_versions', scopes, lambda batch: cls.bump(*batch))
+
+    @classmethod
+    def get_versions(cls, scopes):
+        """Returns {scope: (version, updated_at)} for the given scopes in a single query"""
+        versions = {
+            row['scope']: (row['version'], row['updated_at'])
+            for row in cls.objects.filter(scope__in=scopes).values('scope', 'version', 'updated_at')
+        }
+        return {scope: versions.get(scope, (0, None)) for scope in scopes}
+
+
+#<---------------------RESULT SNAPSHOT SECTION--------------------->
+class ResultSnapshot(models.Model):
+    """
+    Pre-rendered detail JSON of a published result, served by unique_id without re-serializing.
+    Marked stale by result and prize writes and re-rendered by the background worker.
+    """
+    lottery_result = models.OneToOneField(
+        LotteryResult,
+        on_delete=models.CASCADE,
+        related_name='snapshot'
+    )
+    content = models.TextField(help_text="Rendered get-by-unique-id response body")
+    source_updated_at = models.DateTimeField(help_text="LotteryResult.updated_at the snapshot was rendered from")
+    is_stale = models.BooleanField(default=False, help_text="Result changed and a new snapshot is being rendered")
+    rendered_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Result Snapshot"
+        verbose_name_plural = "Result Snapshots"
+
+    def __str__(self):
+        return f"Snapshot of {self.lottery_result}"
+
+
+#<---------------------CHANGE FEED SECTION--------------------->
+class ResultChange(models.Model):
+    """
+    Global change log of lottery results and prize entries for delta sync.
+    The auto-increment id is the change sequence clients sync from; deleted rows are kept
+    as tombstones (action='delete').
+    """
+    KIND_CHOICES = [
+        ('result', 'Lottery Result'),
+        ('prize', 'Prize Entry'),
+    ]
+    ACTION_CHOICES = [
+        ('upsert', 'Inserted / Updated'),
+        ('delete', 'Deleted'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    # Plain id (not a foreign key) so tombstones survive the deletion of the result
+    lottery_result_id = models.BigIntegerField(db_index=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # Database clock, so the feed's settle window never depends on app servers' clocks agreeing
+    created_at = models.DateTimeField(db_default=Now(), db_index=True)
+
+    class Meta:
+        verbose_name = "Result Change"
+        verbose_name_plural = "Result Changes"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} {self.object_id} {self.action}"
+
+    @classmethod
+    def record_on_commit(cls, kind, object_id, lottery_result_id, action):
+        """Log a change once the current transaction commits, deduplicated per transaction"""
+        from results.utils.on_commit import batch_on_commit
+
+        batch_on_commit('result_changes', [(kind, object_id, lottery_result_id, action)], cls.record_batch)
+
+    @classmethod
+    def record_batch(cls, changes):
+        """Insert one change per object; a delete wins over an upsert of the same object"""
+        latest = {}
+        for kind, object_id, lottery_result_id, action in changes:
+            key = (kind, object_id)
+            if key not in latest or action == 'delete':
+                latest[key] = (lottery_result_id, action)
+
+        cls.objects.bulk_create([
+            cls(kind=kind, object_id=object_id, lottery_result_id=lottery_result_id, action=action)
+            for (kind, object_id), (lottery_result_id, action) in sorted(latest.items())
+        ])
+
+    @classmethod
+    def prune(cls, days):
+        """Delete changes older than `days`; clients syncing from before them are sent a reset"""
+        deleted, _ = cls.objects.filter(created_at__lt=Now() - timedelta(days=days)).delete()
+        return deleted
+
+
+#<---------------------PRIZE FREQUENCY SECTION--------------------->
+class DailyPrizeFrequency(models.Model):
+    """
+    Per-day frequency vectors of the 4th-10th prize tickets of published results:
+    how often each last 4 digits (10,000 slots) and each last digit (10 slots) won that day.
+    Vectors are zlib-compressed uint32 arrays; see PrizeFrequencyService.
+    """
+    date = models.DateField(unique=True, db_index=True)
+    last_4_counts = models.BinaryField()
+    last_digit_counts = models.BinaryField()
+    prize_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Daily Prize Frequency"
+        verbose_name_plural = "Daily Prize Frequencies"
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"Prize frequency {self.date} ({self.prize_count} prizes)"
+
+
+#<---------------------NOTIFICATION OUTBOX SECTION--------------------->
+class NotificationJob(models.Model):
+    """
+    Durable push notification fan-out, written in the same transaction as the publish that
+    triggers it and sent by `manage.py run_notification_worker`, never by a web request.
+
+    Tokens are sent in FcmToken id order. After each token batch the worker checkpoints
+    `cursor_token_id` (last id handed to FCM) and `retry_token_ids` (tokens of finished batches
+    that still have to be retried, with the runs each has failed in kept in `retry_attempts`),
+    so a resumed job skips tokens that were already delivered.
+    """
+    KIND_CHOICES = [
+        ('new_result', 'New Result'),
+        ('result_ready', 'Result Ready'),
+        ('custom', 'Custom'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    lottery_result = models.ForeignKey(
+        LotteryResult, on_delete=models.SET_NULL, null=True, blank=True, related_name='notification_jobs'
+    )
+    title = models.CharField(max_length=200)
+    body = models.TextField()
+    data = models.JSONField(default=dict, blank=True)
+    image_url = models.URLField(max_length=1000, blank=True)
+    target_token_ids = models.JSONField(
+        null=True, blank=True, help_text="Only send to these FcmToken ids (all active tokens when empty)"
+    )
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0, help_text="Runs stopped because FCM was unavailable")
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    # Checkpoint
+    max_token_id = models.BigIntegerField(null=True, blank=True, help_text="Last FcmToken id when the job started")
+    cursor_token_id = models.BigIntegerField(default=0, help_text="Tokens up to this id were handed to FCM")
+    retry_token_ids = models.JSONField(default=list, blank=True, help_text="Token ids whose send must be retried")
+    retry_attempts = models.JSONField(default=dict, blank=True, help_text="Failed runs of each retried token, by token id")
+    sent_count = models.PositiveIntegerField(default=0)
+    failure_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    # Token maintenance
+    active_tokens_at_start = models.PositiveIntegerField(null=True, blank=True, help_text="Active recipients when the job started")
+    deactivated_count = models.PositiveIntegerField(default=0, help_text="Dead tokens deactivated by this job")
+    error_counts = models.JSONField(default=dict, blank=True, help_text="Failed sends per FCM error code")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Notification Job"
+        verbose_name_plural = "Notification Jobs"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title} ({self.status})"
+
+    @property
+    def active_set_shrink(self):
+        """Share of the active recipients deactivated by this job, in percent"""
+        if not self.active_tokens_at_start:
+            return None
+        return self.deactivated_count / self.active_tokens_at_start * 100
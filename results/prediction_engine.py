@@ -0,0 +1,377 @@
+"""
+Lottery Prediction Engine
+
+Predicts the last 4 digits of the next draw's winning tickets for each (lottery, prize_type),
+with the algorithms of PredictionModel.ALGORITHM_CHOICES:
+
+- frequency: exponentially decayed count of each number's past wins
+- pattern:   per-position digit frequencies; a number scores the sum of its digits' log odds
+- ensemble:  weighted sum of the standardized frequency and pattern scores
+
+('lstm' has no implementation here; its PredictionModel rows are left untouched.)
+
+Every algorithm is backtested over the full draw history: before each draw, the top_k numbers
+are predicted from the draws before it and compared with the actual winners. Scoring works on
+10,000-slot NumPy vectors, so a draw costs a few vector operations whatever the history size.
+
+All draws are loaded up front, then each (lottery, prize_type) job runs in a process pool
+without touching the database. The results are written back with bulk inserts and updates.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from results.models import LotteryResult, PredictionHistory, PredictionModel, PrizeEntry
+from results.services.prize_archive import MISSING_LAST_4, parse_ticket
+
+logger = logging.getLogger('lottery_app')
+
+ALGORITHMS = ('frequency', 'pattern', 'ensemble')
+
+DEFAULT_PARAMETERS = {
+    'frequency': {'decay': 0.97},
+    'pattern': {'smoothing': 1.0},
+    'ensemble': {'frequency_weight': 0.6, 'pattern_weight': 0.4},
+}
+
+BACKTEST_CYCLE_PREFIX = 'BACKTEST'
+NEXT_DRAW_CYCLE_PREFIX = 'NEXT'
+
+# Digits of every 4 digit number, thousands to units: SLOT_DIGITS[1234] == [1, 2, 3, 4]
+SLOT_DIGITS = np.stack([(np.arange(10000) // divisor) % 10 for divisor in (1000, 100, 10, 1)], axis=1)
+POSITIONS = np.arange(4)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Slots of the k highest scores, score descending then slot ascending"""
+    k = min(k, scores.size)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    threshold = scores[candidates].min()
+    # Every slot tied with the threshold competes, so ties always go to the lowest slots
+    candidates = np.flatnonzero(scores >= threshold)
+    return candidates[np.lexsort((candidates, -scores[candidates]))][:k]
+
+
+def standardize(scores: np.ndarray) -> np.ndarray:
+    deviation = scores.std()
+    if not deviation:
+        return np.zeros_like(scores, dtype=np.float64)
+    return (scores - scores.mean()) / deviation
+
+
+class FrequencyScorer:
+    def __init__(self, decay):
+        self.decay = decay
+        self.counts = np.zeros(10000, dtype=np.float64)
+
+    def update(self, numbers: np.ndarray):
+        self.counts *= self.decay
+        self.counts += np.bincount(numbers, minlength=10000)
+
+    def scores(self) -> np.ndarray:
+        return self.counts
+
+
+class PatternScorer:
+    def __init__(self, smoothing):
+        self.smoothing = smoothing
+        self.position_counts = np.zeros((4, 10), dtype=np.float64)
+
+    def update(self, numbers: np.ndarray):
+        digits = SLOT_DIGITS[numbers]
+        np.add.at(self.position_counts, (np.broadcast_to(POSITIONS, digits.shape), digits), 1)
+
+    def scores(self) -> np.ndarray:
+        smoothed = self.position_counts + self.smoothing
+        log_odds = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        # Score of number abcd = log_odds[0, a] + log_odds[1, b] + log_odds[2, c] + log_odds[3, d], for all 10,000 at once
+        return np.add.outer(np.add.outer(log_odds[0], log_odds[1]), np.add.outer(log_odds[2], log_odds[3])).ravel()
+
+
+@dataclass
+class BacktestJob:
+    """Draw history of one (lottery, prize_type), as CSR arrays so it pickles cheaply"""
+    lottery_name: str
+    prize_type: str
+    dates: np.ndarray      # datetime64[D], one per draw, ascending
+    offsets: np.ndarray    # winners of draw i are numbers[offsets[i]:offsets[i + 1]]
+    numbers: np.ndarray    # uint16 last 4 digits
+    parameters: Dict
+    top_k: int
+    min_history: int
+    keep_history: int
+
+    def draw(self, index) -> np.ndarray:
+        return self.numbers[self.offsets[index]:self.offsets[index + 1]]
+
+
+@dataclass
+class AlgorithmResult:
+    tested: int = 0
+    hits: int = 0
+    hit_draws: int = 0
+    seconds: float = 0.0
+    history: List[Tuple] = field(default_factory=list)  # (draw date, predicted, actual, hits)
+    next_draw: List[int] = field(default_factory=list)
+
+    @property
+    def accuracy(self) -> float:
+        """Share of backtested draws where at least one predicted number won"""
+        return self.hit_draws / self.tested if self.tested else 0.0
+
+    def precision(self, k) -> float:
+        return self.hits / (self.tested * k) if self.tested else 0.0
+
+
+def run_backtest(job: BacktestJob) -> Tuple[str, str, Dict[str, AlgorithmResult]]:
+    """Walk a job's draws in order, predicting each one from the draws before it"""
+    frequency = FrequencyScorer(**job.parameters['frequency'])
+    pattern = PatternScorer(**job.parameters['pattern'])
+    weights = job.parameters['ensemble']
+    results = {algorithm: AlgorithmResult() for algorithm in ALGORITHMS}
+    draw_count = len(job.dates)
+    history_from = draw_count - job.keep_history
+
+    def predict():
+        start = time.perf_counter()
+        frequency_scores = frequency.scores()
+        predictions = {'frequency': top_k(frequency_scores, job.top_k)}
+        checkpoint = time.perf_counter()
+        results['frequency'].seconds += checkpoint - start
+
+        start = checkpoint
+        pattern_scores = pattern.scores()
+        predictions['pattern'] = top_k(pattern_scores, job.top_k)
+        checkpoint = time.perf_counter()
+        results['pattern'].seconds += checkpoint - start
+
+        # Reuses the component scores: its time is the combination only
+        start = checkpoint
+        predictions['ensemble'] = top_k(
+            weights['frequency_weight'] * standardize(frequency_scores)
+            + weights['pattern_weight'] * standardize(pattern_scores),
+            job.top_k
+        )
+        results['ensemble'].seconds += time.perf_counter() - start
+        return predictions
+
+    for index in range(draw_count + 1):
+        if index >= job.min_history:
+            predictions = predict()
+            if index == draw_count:
+                # Prediction for the next, not yet drawn, draw
+                for algorithm, predicted in predictions.items():
+                    results[algorithm].next_draw = predicted.tolist()
+                break
+
+            actual = np.unique(job.draw(index))
+            for algorithm, predicted in predictions.items():
+                hits = int(np.isin(predicted, actual, assume_unique=True).sum())
+                result = results[algorithm]
+                result.tested += 1
+                result.hits += hits
+                result.hit_draws += hits > 0
+                if index >= history_from:
+                    result.history.append((job.dates[index].item(), predicted.tolist(), actual.tolist(), hits))
+
+        if index < draw_count:
+            numbers = job.draw(index)
+            start = time.perf_counter()
+            frequency.update(numbers)
+            checkpoint = time.perf_counter()
+            results['frequency'].seconds += checkpoint - start
+            pattern.update(numbers)
+            results['pattern'].seconds += time.perf_counter() - checkpoint
+
+    return job.lottery_name, job.prize_type, results
+
+
+class LotteryPredictionEngine:
+    """
+    Train the prediction models: backtest every algorithm on every (lottery, prize_type)
+    and store real accuracy scores and prediction history
+    """
+
+    def __init__(self, parameters: Optional[Dict] = None, top_k=10, min_history=10, keep_history=30, workers=None):
+        self.parameters = {
+            algorithm: {**defaults, **(parameters or {}).get(algorithm, {})}
+            for algorithm, defaults in DEFAULT_PARAMETERS.items()
+        }
+        self.top_k = top_k
+        self.min_history = min_history
+        self.keep_history = keep_history
+        self.workers = workers or os.cpu_count() or 1
+
+    def load_jobs(self, lottery_name=None) -> List[BacktestJob]:
+        """Draw history of every (lottery, prize_type): one query for the results, one for their prizes"""
+        results = LotteryResult.objects.filter(is_published=True)
+        if lottery_name:
+            results = results.filter(lottery__name__iexact=lottery_name)
+        draw_of = {
+            result_id: (draw_date, name)
+            for result_id, draw_date, name in results.values_list('id', 'date', 'lottery__name')
+        }
+
+        # (lottery, prize_type) -> {result id: (date, [last 4 digits])}
+        draws = {}
+        prizes = PrizeEntry.objects.filter(lottery_result_id__in=list(draw_of)).values_list(
+            'lottery_result_id', 'prize_type', 'ticket_number'
+        )
+        for result_id, prize_type, ticket_number in prizes.iterator(chunk_size=5000):
+            last_4 = parse_ticket(ticket_number)[2]
+            if last_4 == MISSING_LAST_4:
+                continue
+            draw_date, name = draw_of[result_id]
+            job_draws = draws.setdefault((name, prize_type), {})
+            job_draws.setdefault(result_id, (draw_date, []))[1].append(last_4)
+
+        jobs = []
+        for (name, prize_type), by_result in draws.items():
+            job_draws = sorted(by_result.values(), key=lambda draw: draw[0])
+            if len(job_draws) <= self.min_history:
+                continue
+            sizes = [len(numbers) for _, numbers in job_draws]
+            jobs.append(BacktestJob(
+                lottery_name=name,
+                prize_type=prize_type,
+                dates=np.array([draw_date for draw_date, _ in job_draws], dtype='datetime64[D]'),
+                offsets=np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+                numbers=np.fromiter((number for _, numbers in job_draws for number in numbers), dtype=np.uint16),
+                parameters=self.parameters,
+                top_k=self.top_k,
+                min_history=self.min_history,
+                keep_history=self.keep_history,
+            ))
+        return jobs
+
+    def backtest(self, jobs: List[BacktestJob]):
+        """Run the jobs, in a process pool unless there is a single worker or job"""
+        if self.workers == 1 or len(jobs) <= 1:
+            return [run_backtest(job) for job in jobs]
+        # Forked workers inherit the loaded Django setup and never touch the database
+        # (they leave through os._exit, so the parent's connections are not closed either)
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs)), mp_context=context) as pool:
+            return list(pool.map(run_backtest, jobs, chunksize=max(1, len(jobs) // (self.workers * 4))))
+
+    def train(self, lottery_name=None) -> Dict:
+        """Backtest and store the models; returns per-algorithm accuracy and timings"""
+        start = time.perf_counter()
+        jobs = self.load_jobs(lottery_name)
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        outcomes = self.backtest(jobs)
+        backtest_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.save(outcomes)
+        save_seconds = time.perf_counter() - start
+
+        summary = {
+            'jobs': len(jobs),
+            'draws': sum(len(job.dates) for job in jobs),
+            'load_seconds': load_seconds,
+            'backtest_seconds': backtest_seconds,
+            'save_seconds': save_seconds,
+            'algorithms': {},
+        }
+        for algorithm in ALGORITHMS:
+            results = [outcome[2][algorithm] for outcome in outcomes]
+            tested = sum(result.tested for result in results)
+            summary['algorithms'][algorithm] = {
+                'tested': tested,
+                'accuracy': sum(result.hit_draws for result in results) / tested if tested else 0.0,
+                'precision': sum(result.hits for result in results) / (tested * self.top_k) if tested else 0.0,
+                'seconds': sum(result.seconds for result in results),
+            }
+        return summary
+
+    def save(self, outcomes):
+        """Store accuracy per (algorithm, lottery, prize_type) and the prediction history, in bulk"""
+        existing = {
+            (model.algorithm, model.lottery_type, model.prize_type): model
+            for model in PredictionModel.objects.filter(algorithm__in=ALGORITHMS)
+        }
+        created, updated = [], []
+        now = timezone.now()
+
+        def model_for(algorithm, lottery_type, prize_type, accuracy, parameters):
+            model = existing.get((algorithm, lottery_type, prize_type))
+            if model is None:
+                name = f"{lottery_type} {prize_type} {algorithm.title()} Model" if lottery_type else f"Default {algorithm.title()} Model"
+                model = PredictionModel(
+                    name=name, algorithm=algorithm, lottery_type=lottery_type, prize_type=prize_type, is_active=True
+                )
+                existing[(algorithm, lottery_type, prize_type)] = model
+                created.append(model)
+            else:
+                model.updated_at = now
+                updated.append(model)
+            model.accuracy_score = accuracy
+            model.parameters = parameters
+            return model
+
+        for algorithm in ALGORITHMS:
+            results = [outcome[2][algorithm] for outcome in outcomes]
+            tested = sum(result.tested for result in results)
+            model_for(algorithm, '', '', sum(result.hit_draws for result in results) / tested if tested else 0.0, {
+                **self.parameters[algorithm], 'top_k': self.top_k, 'tested_draws': tested
+            })
+            for lottery_name, prize_type, by_algorithm in outcomes:
+                result = by_algorithm[algorithm]
+                model_for(algorithm, lottery_name, prize_type, result.accuracy, {
+                    **self.parameters[algorithm],
+                    'top_k': self.top_k,
+                    'tested_draws': result.tested,
+                    'precision': result.precision(self.top_k),
+                })
+
+        with transaction.atomic():
+            PredictionModel.objects.bulk_create(created, batch_size=500)
+            PredictionModel.objects.bulk_update(updated, ['accuracy_score', 'parameters', 'updated_at'], batch_size=500)
+
+            # Replace the previous training run's history of these models
+            models = [existing[(algorithm, name, prize_type)]
+                      for name, prize_type, _ in outcomes for algorithm in ALGORITHMS]
+            PredictionHistory.objects.filter(
+                model_used__in=models, is_stable=False, cycle_identifier__startswith=BACKTEST_CYCLE_PREFIX
+            ).delete()
+            PredictionHistory.objects.filter(
+                model_used__in=models, cycle_identifier__startswith=NEXT_DRAW_CYCLE_PREFIX
+            ).delete()
+
+            history = []
+            for lottery_name, prize_type, by_algorithm in outcomes:
+                for algorithm, result in by_algorithm.items():
+                    model = existing[(algorithm, lottery_name, prize_type)]
+                    for draw_date, predicted, actual, hits in result.history:
+                        history.append(PredictionHistory(
+                            lottery_name=lottery_name,
+                            prize_type=prize_type,
+                            predicted_numbers=[f"{number:04d}" for number in predicted],
+                            actual_numbers=[f"{number:04d}" for number in actual],
+                            draw_date=draw_date,
+                            accuracy_score=hits / self.top_k,
+                            model_used=model,
+                            is_stable=False,
+                            cycle_identifier=f"{BACKTEST_CYCLE_PREFIX}_{lottery_name.upper()}_{prize_type}_{draw_date:%Y_%m_%d}",
+                        ))
+                    history.append(PredictionHistory(
+                        lottery_name=lottery_name,
+                        prize_type=prize_type,
+                        predicted_numbers=[f"{number:04d}" for number in result.next_draw],
+                        model_used=model,
+                        is_stable=True,
+                        cycle_identifier=f"{NEXT_DRAW_CYCLE_PREFIX}_{lottery_name.upper()}_{prize_type}",
+                    ))
+            PredictionHistory.objects.bulk_create(history, batch_size=1000)
@@ -1,10 +1,33 @@
 # serializers.py
 from rest_framework import serializers
 from django.core.exceptions import ValidationError
+from django.db.models import Prefetch
 from .models import Lottery, LotteryResult, PrizeEntry, News, LiveVideo
 from collections import defaultdict
 
 
+def ordered_prizes_prefetch():
+    """Prefetch for LotteryResult.prizes in insertion order, shared by the result serializers"""
+    return Prefetch('prizes', queryset=PrizeEntry.objects.order_by('created_at', 'id'))
+
+
+def get_ordered_prizes(lottery_result):
+    """Prizes of a result in insertion order, served from the prefetch cache when available"""
+    if 'prizes' in getattr(lottery_result, '_prefetched_objects_cache', {}):
+        return list(lottery_result.prizes.all())
+    return list(lottery_result.prizes.order_by('created_at', 'id'))
+
+
+def group_prizes_by_type(lottery_result):
+    """Single pass over the prizes of a result, grouped by prize_type (cached on the instance)"""
+    if not hasattr(lottery_result, '_prizes_by_type'):
+        prizes_by_type = defaultdict(list)
+        for prize in get_ordered_prizes(lottery_result):
+            prizes_by_type[prize.prize_type].append(prize)
+        lottery_result._prizes_by_type = prizes_by_type
+    return lottery_result._prizes_by_type
+
+
 class PrizeEntrySerializer(serializers.ModelSerializer):
     class Meta:
         model = PrizeEntry
@@ -42,8 +65,9 @@ class LotteryResultSerializer(serializers.ModelSerializer):
     
     def get_first_prize(self, obj):
         """Get first prize details"""
-        first_prize = obj.prizes.filter(prize_type='1st').first()
-        if first_prize:
+        first_prizes = group_prizes_by_type(obj).get('1st')
+        if first_prizes:
+            first_prize = first_prizes[0]
             return {
                 'amount': first_prize.prize_amount,
                 'ticket_number': first_prize.ticket_number,
@@ -53,7 +77,7 @@ class LotteryResultSerializer(serializers.ModelSerializer):
     
     def get_consolation_prizes(self, obj):
         """Get consolation prizes with amount shown once and ticket numbers grouped"""
-        consolation_prizes = obj.prizes.filter(prize_type='consolation')[:6]
+        consolation_prizes = group_prizes_by_type(obj).get('consolation', [])[:6]
 
         if not consolation_prizes:
             return None
@@ -100,8 +124,9 @@ class LotteryResultDetailSerializer(serializers.ModelSerializer):
     
     def get_prizes(self, obj):
         """Group prizes by prize_type and prize_amount, with detailed ticket info for certain prizes"""
-        # Get all prizes for this lottery result - order by creation time to preserve insertion order
-        all_prizes = obj.prizes.all().order_by('created_at')
+        # Get all prizes for this lottery result - ordered by creation time to preserve insertion order
+        # (from the ordered_prizes_prefetch() cache when the view set it up)
+        all_prizes = get_ordered_prizes(obj)
         
         if not all_prizes:
             return []
@@ -286,6 +311,35 @@ class TicketCheckSerializer(serializers.Serializer):
         return attrs
 
 
+class TicketBatchCheckSerializer(TicketCheckSerializer):
+    """Batch ticket check request: a book of tickets for one phone number and date"""
+    MAX_TICKETS = 50
+
+    ticket_number = None
+    ticket_numbers = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        min_length=1,
+        max_length=MAX_TICKETS,
+        help_text="Ticket numbers (e.g., [\"W123456\", \"W123457\"])"
+    )
+
+    def validate_ticket_numbers(self, value):
+        """Validate every ticket number like the single ticket check"""
+        ticket_numbers = []
+        from .services.ticket_index import is_ticket_pattern
+
+        for position, ticket_number in enumerate(value, start=1):
+            if is_ticket_pattern(ticket_number):
+                raise serializers.ValidationError(
+                    f"Ticket {position} ({ticket_number}): ranges and series patterns are checked with /check-ticket/"
+                )
+            try:
+                ticket_numbers.append(self.validate_ticket_number(ticket_number))
+            except serializers.ValidationError as e:
+                raise serializers.ValidationError(f"Ticket {position} ({ticket_number}): {e.detail[0]}")
+        return ticket_numbers
+
+
         
 # <--------NEWS SECTION --------->
 
@@ -0,0 +1,127 @@
+"""
+Result Change Feed Service
+
+Delta sync for the app: instead of re-downloading the 30-day results list, a client sends the
+last change sequence it has seen and receives only the results and prize entries inserted,
+updated or deleted since then.
+
+Contract:
+- Changed published results are returned in full, including all their current prizes.
+- Prize changes of results that did not change themselves are returned individually.
+- A result that was deleted or unpublished, and a deleted prize, come back as tombstones.
+- Changes are logged on commit, so the feed lags writes by SETTLE_SECONDS to make sure no
+  in-flight lower sequence number is skipped. Both the log's created_at and the cutoff come from
+  the database clock.
+- The log keeps RESULT_CHANGE_RETENTION_DAYS of changes (`manage.py prune_result_changes`). A
+  client syncing from a sequence that was pruned gets reset=true, like a client without state.
+"""
+
+from datetime import timedelta
+from typing import Dict
+
+from django.db.models.functions import Now
+
+from results.models import LotteryResult, PrizeEntry, ResultChange
+from results.serializers import LotteryResultSerializer, ordered_prizes_prefetch
+
+
+class ChangeFeedService:
+    """
+    Build delta-sync responses from the ResultChange log
+    """
+
+    DEFAULT_LIMIT = 500
+    MAX_LIMIT = 2000
+    SETTLE_SECONDS = 2
+
+    @classmethod
+    def serialize_prize(cls, prize, unique_id) -> Dict:
+        return {
+            'id': prize.id,
+            'result_unique_id': str(unique_id),
+            'prize_type': prize.prize_type,
+            'prize_amount': str(prize.prize_amount),
+            'ticket_number': prize.ticket_number,
+            'place': prize.place,
+        }
+
+    @classmethod
+    def get_changes(cls, since: int, limit: int = DEFAULT_LIMIT) -> Dict:
+        """Changes with a sequence greater than `since`, at most `limit` log entries per call"""
+        limit = max(1, min(limit, cls.MAX_LIMIT))
+        settled_before = Now() - timedelta(seconds=cls.SETTLE_SECONDS)
+
+        oldest = ResultChange.objects.order_by('id').values_list('id', flat=True).first()
+        if since <= 0 or (oldest is not None and since < oldest - 1):
+            # No sync state yet, or changes after it were pruned: the client loads the full list
+            # and syncs from the latest sequence
+            return {
+                'status': 'success',
+                'reset': True,
+                'since': since,
+                'next_since': ResultChange.objects.filter(
+                    created_at__lte=settled_before
+                ).order_by('-id').values_list('id', flat=True).first() or 0,
+                'has_more': False,
+                'results': [],
+                'prizes': [],
+                'deleted': {'results': [], 'prizes': []},
+            }
+
+        entries = list(ResultChange.objects.filter(
+            id__gt=since,
+            created_at__lte=settled_before
+        ).order_by('id')[:limit + 1])
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        next_since = entries[-1].id if entries else since
+
+        # Compact to the latest action per object
+        latest = {}
+        for entry in entries:
+            latest[(entry.kind, entry.object_id)] = entry
+
+        result_ids = {object_id for (kind, object_id), entry in latest.items()
+                      if kind == 'result' and entry.action == 'upsert'}
+        deleted_result_ids = {object_id for (kind, object_id), entry in latest.items()
+                              if kind == 'result' and entry.action == 'delete'}
+        prize_ids = {object_id for (kind, object_id), entry in latest.items()
+                     if kind == 'prize' and entry.action == 'upsert'}
+        deleted_prize_ids = {object_id for (kind, object_id), entry in latest.items()
+                             if kind == 'prize' and entry.action == 'delete'}
+
+        # Changed results: published ones in full, unpublished ones become tombstones
+        results = []
+        prizes = []
+        published_ids = set()
+        changed_results = LotteryResult.objects.filter(
+            id__in=result_ids
+        ).select_related('lottery').prefetch_related(ordered_prizes_prefetch()).order_by('-date', '-created_at')
+        for lottery_result in changed_results:
+            if not lottery_result.is_published:
+                continue
+            published_ids.add(lottery_result.id)
+            results.append(LotteryResultSerializer(lottery_result).data)
+            prizes.extend(cls.serialize_prize(prize, lottery_result.unique_id) for prize in lottery_result.prizes.all())
+        deleted_result_ids |= result_ids - published_ids
+
+        # Individual prize changes of published results not already sent in full
+        changed_prizes = PrizeEntry.objects.filter(
+            id__in=prize_ids,
+            lottery_result__is_published=True
+        ).exclude(lottery_result_id__in=published_ids).select_related('lottery_result').order_by('created_at', 'id')
+        prizes.extend(cls.serialize_prize(prize, prize.lottery_result.unique_id) for prize in changed_prizes)
+
+        return {
+            'status': 'success',
+            'reset': False,
+            'since': since,
+            'next_since': next_since,
+            'has_more': has_more,
+            'results': results,
+            'prizes': prizes,
+            'deleted': {
+                'results': sorted(deleted_result_ids),
+                'prizes': sorted(deleted_prize_ids),
+            },
+        }
@@ -0,0 +1,103 @@
+"""
+Fake FCM Server
+
+In-process stand-in for the FCM v1 send endpoint, mounted into HttpxFCMTransport as an httpx
+transport: the real client, encoding and error parsing run, no request leaves the process.
+Used by the tests and `manage.py benchmark_fcm_transport`.
+"""
+
+import asyncio
+import itertools
+import json
+from typing import Dict, Iterable, Tuple
+
+import httpx
+
+from results.services.fcm_transport import FCM_ERROR_TYPE, HttpxFCMTransport
+
+# FCM error code: (HTTP status, canonical status)
+ERROR_STATUSES = {
+    'UNREGISTERED': (404, 'NOT_FOUND'),
+    'SENDER_ID_MISMATCH': (403, 'PERMISSION_DENIED'),
+    'INVALID_ARGUMENT': (400, 'INVALID_ARGUMENT'),
+    'THIRD_PARTY_AUTH_ERROR': (401, 'UNAUTHENTICATED'),
+    'QUOTA_EXCEEDED': (429, 'RESOURCE_EXHAUSTED'),
+    'UNAVAILABLE': (503, 'UNAVAILABLE'),
+    'INTERNAL': (500, 'INTERNAL'),
+}
+
+# Error messages FCM sends with a code, where they matter to the client
+ERROR_MESSAGES = {
+    'INVALID_ARGUMENT': 'The registration token is not a valid FCM registration token',
+}
+
+
+class FakeFCMServer:
+    """
+    Answers every send after `latency` seconds. Tokens in invalid_tokens get UNREGISTERED,
+    tokens in errors get the given error code (with retry_after on 429/503 responses).
+    With a capacity, requests arriving while more than `capacity` are in flight get
+    QUOTA_EXCEEDED, like FCM throttling a sender that goes too fast. With a payload_error,
+    every message is rejected with INVALID_ARGUMENT and that message, like a malformed payload.
+    """
+
+    def __init__(self, project_id='fake-project', latency=0.0, invalid_tokens: Iterable[str] = (),
+                 errors: Dict[str, str] = None, retry_after=1, capacity: int = None, payload_error: str = None):
+        self.project_id = project_id
+        self.latency = latency
+        self.invalid_tokens = set(invalid_tokens)
+        self.errors = dict(errors or {})
+        self.payload_error = payload_error
+        self.retry_after = retry_after
+        self.capacity = capacity
+
+        self.received = []
+        self.throttled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._ids = itertools.count(1)
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def client(self, **options) -> HttpxFCMTransport:
+        """HttpxFCMTransport talking to this server"""
+        return HttpxFCMTransport(project_id=self.project_id, transport=self.transport(), **options)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        overloaded = self.capacity is not None and self.in_flight > self.capacity
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if overloaded:
+                self.throttled += 1
+                return self.error_response('QUOTA_EXCEEDED')
+            token = json.loads(request.content)['message']['token']
+            self.received.append(token)
+
+            if self.payload_error:
+                return self.error_response('INVALID_ARGUMENT', self.payload_error)
+            error_code = 'UNREGISTERED' if token in self.invalid_tokens else self.errors.get(token)
+            if error_code:
+                return self.error_response(error_code)
+            return httpx.Response(200, json={'name': f"projects/{self.project_id}/messages/{next(self._ids)}"})
+        finally:
+            self.in_flight -= 1
+
+    def error_response(self, error_code: str, message: str = None) -> httpx.Response:
+        status, canonical = self.error_status(error_code)
+        headers = {'Retry-After': str(self.retry_after)} if status in (429, 503) and self.retry_after else {}
+        return httpx.Response(status, headers=headers, json={
+            'error': {
+                'code': status,
+                'message': message or ERROR_MESSAGES.get(error_code, f"Fake FCM error {error_code}"),
+                'status': canonical,
+                'details': [{'@type': FCM_ERROR_TYPE, 'errorCode': error_code}],
+            }
+        })
+
+    @staticmethod
+    def error_status(error_code: str) -> Tuple[int, str]:
+        return ERROR_STATUSES.get(error_code, (500, 'INTERNAL'))
@@ -0,0 +1,162 @@
+"""
+FCM Rate Control
+
+AdaptiveRateController decides how fast the FCM transports send:
+
+- Concurrency window (AIMD): at most `window` requests are in flight. Every answered request
+  grows the window by 1/window (about +1 per round trip). A throttled or failed request
+  (429, 5xx, network error) halves it, and a latency average above the target shrinks it by
+  10%. Only requests sent after the last decrease can shrink it again, so one burst of
+  errors counts as one congestion signal.
+- Token bucket: sends are spaced to at most `rate` per second with bursts of `burst`, the
+  ceiling configured for the deployment (FCM project quota shared by all workers).
+- Retry-After: a 429/503 carrying Retry-After pauses the bucket until it has passed.
+
+Decisions are logged as "FCM rate" lines on the lottery_app logger; snapshot() returns the
+current state and counters, which fan-outs include in their results.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger('lottery_app')
+
+
+class AdaptiveRateController:
+    """Thread-safe; the transports call reserve() before and record() after every request"""
+
+    def __init__(self, initial_window=20, min_window=1, max_window=200, rate: Optional[float] = None, burst=50,
+                 latency_target=0.5, decrease_factor=0.5, latency_decrease_factor=0.9, max_pause=60.0,
+                 log_interval=10.0, clock=time.monotonic):
+        self.min_window = min_window
+        self.max_window = max_window
+        self.window = float(min(max(initial_window, min_window), max_window))
+        self.rate = rate
+        self.burst = burst
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.latency_decrease_factor = latency_decrease_factor
+        self.max_pause = max_pause
+        self.log_interval = log_interval
+        self.clock = clock
+
+        self.latency = None  # Exponentially weighted moving average, seconds
+        self.paused_until = 0.0
+        self._tat = 0.0  # Token bucket: theoretical arrival time of the next send
+        self._last_decrease = float('-inf')
+        self._last_log = clock()
+        self._lock = threading.Lock()
+        self.stats = {
+            'sent': 0, 'throttled': 0, 'errors': 0, 'slow': 0,
+            'increases': 0, 'decreases': 0, 'pauses': 0, 'paused_seconds': 0.0,
+            'min_window': self.window_size, 'max_window': self.window_size,
+        }
+
+    @classmethod
+    def fixed(cls, concurrency: int) -> 'AdaptiveRateController':
+        """Constant window and no rate limit (benchmarks, explicit concurrency)"""
+        return cls(initial_window=concurrency, min_window=concurrency, max_window=concurrency)
+
+    @classmethod
+    def from_settings(cls) -> 'AdaptiveRateController':
+        options = settings.LOTTERY_SETTINGS
+        return cls(
+            initial_window=options.get('FCM_INITIAL_CONCURRENCY', 20),
+            min_window=options.get('FCM_MIN_CONCURRENCY', 1),
+            max_window=options.get('FCM_MAX_CONCURRENCY', 200),
+            rate=options.get('FCM_RATE_PER_SECOND') or None,
+            burst=options.get('FCM_RATE_BURST', 50),
+            latency_target=options.get('FCM_LATENCY_TARGET_MS', 500) / 1000,
+        )
+
+    @property
+    def window_size(self) -> int:
+        return int(self.window)
+
+    def reserve(self) -> float:
+        """Take a send from the bucket; seconds the caller must wait before sending it"""
+        with self._lock:
+            now = self.clock()
+            start = max(now, self.paused_until)
+            if not self.rate:
+                return start - now
+            interval = 1 / self.rate
+            self._tat = max(self._tat, start)
+            wait = max(self._tat - self.burst * interval, start) - now
+            self._tat += interval
+            return wait
+
+    def record(self, status: int, latency: float, retry_after: Optional[float] = None, sent_at: Optional[float] = None):
+        """
+        Adjust the window and bucket from one response (status 0 when there was none).
+        sent_at is the clock() time the request was sent; without it, the request is assumed
+        to have been sent `latency` seconds ago.
+        """
+        with self._lock:
+            now = self.clock()
+            sent_at = now - latency if sent_at is None else sent_at
+            self.stats['sent'] += 1
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+            if status == 429 or status >= 500 or status == 0:
+                self.stats['throttled' if status in (429, 503) else 'errors'] += 1
+                if retry_after:
+                    self._pause(now, retry_after, status)
+                self._decrease(sent_at, self.decrease_factor, f"status {status}")
+            elif self.latency > self.latency_target:
+                self.stats['slow'] += 1
+                self._decrease(sent_at, self.latency_decrease_factor, f"latency {self.latency * 1000:.0f} ms")
+            else:
+                self._increase()
+
+            if now - self._last_log >= self.log_interval:
+                self._last_log = now
+                logger.info(f"📊 FCM rate: {self._describe()}")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'window': self.window_size,
+                'rate': self.rate,
+                'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+                'paused_for': round(max(self.paused_until - self.clock(), 0.0), 2),
+                **{name: round(value, 2) if isinstance(value, float) else value for name, value in self.stats.items()},
+            }
+
+    def _increase(self):
+        before = self.window_size
+        self.window = min(self.window + 1 / self.window, self.max_window)
+        if self.window_size > before:
+            self.stats['increases'] += 1
+            self.stats['max_window'] = max(self.stats['max_window'], self.window_size)
+
+    def _decrease(self, sent_at: float, factor: float, reason: str):
+        # Requests sent before the last decrease were sent at the old window and carry no new signal
+        if sent_at < self._last_decrease:
+            return
+        self._last_decrease = self.clock()
+        before = self.window_size
+        self.window = max(self.window * factor, self.min_window)
+        if self.window_size < before:
+            self.stats['decreases'] += 1
+            self.stats['min_window'] = min(self.stats['min_window'], self.window_size)
+            logger.warning(f"📉 FCM rate: window {before} -> {self.window_size} ({reason}); {self._describe()}")
+
+    def _pause(self, now: float, retry_after: float, status: int):
+        until = now + min(retry_after, self.max_pause)
+        if until <= self.paused_until:
+            return
+        self.stats['pauses'] += 1
+        self.stats['paused_seconds'] += until - max(self.paused_until, now)
+        self.paused_until = until
+        logger.warning(f"⏸️ FCM rate: paused {until - now:.1f}s (Retry-After, status {status})")
+
+    def _describe(self) -> str:
+        latency = f"{self.latency * 1000:.0f}" if self.latency is not None else '-'
+        return (f"window={self.window_size} rate={self.rate or 'unlimited'} latency_ms={latency} "
+                f"sent={self.stats['sent']} throttled={self.stats['throttled']} errors={self.stats['errors']} "
+                f"increases={self.stats['increases']} decreases={self.stats['decreases']} pauses={self.stats['pauses']}")
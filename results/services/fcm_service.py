@@ -1,12 +1,12 @@
 # Replace your results/services/fcm_service.py with this updated version:
 
 import logging
-from typing import List, Dict
+import threading
+from typing import List, Dict, Optional
 from django.conf import settings
-from django.utils import timezone
 from firebase_admin import credentials, messaging, initialize_app
 import firebase_admin
-from results.models import FcmToken
+from results.services.fcm_transport import FCMTransport, build_transport
 
 logger = logging.getLogger('lottery_app')
 
@@ -15,6 +15,8 @@ class FCMService:
     
     _initialized = False
     _test_mode = False
+    _transport = None
+    _transport_lock = threading.Lock()
     
     # 🖼️ LOTTERY IMAGE MAPPING
     LOTTERY_IMAGES = {
@@ -87,498 +89,145 @@ class FCMService:
                 cls._initialized = True
     
     @classmethod
-    def send_to_all_users_batched(cls, title: str, body: str, data: Dict = None, image_url: str = None) -> Dict:
-        """
-        SCALABLE: Send notifications using Firebase batch messaging
-        Handles 10,000+ users efficiently using multicast messages
-        """
-        try:
-            from firebase_admin import messaging
-            from results.models import FcmToken
-            import logging
-            import threading
-            from concurrent.futures import ThreadPoolExecutor, as_completed
-
-            logger = logging.getLogger('lottery_app')
-
-            # Initialize Firebase if needed
+    def get_transport(cls) -> Optional[FCMTransport]:
+        """Transport for FCM sends; None in test mode (no Firebase credentials)"""
+        if cls._transport is None:
             cls._initialize_firebase()
+            if cls._test_mode:
+                return None
+            with cls._transport_lock:
+                if cls._transport is None:
+                    cls._transport = build_transport()
+                    logger.info(f"✅ FCM transport: {cls._transport.name}")
+        return cls._transport
 
-            # Get all active FCM tokens in batches
-            batch_size = 500  # Firebase multicast limit
-            active_tokens = FcmToken.objects.filter(
-                is_active=True,
-                notifications_enabled=True
-            ).values_list('fcm_token', flat=True)
-
-            total_tokens = active_tokens.count()
-
-            if total_tokens == 0:
-                logger.warning("No active FCM tokens found")
-                return {'success_count': 0, 'failure_count': 0, 'message': 'No active tokens'}
-
-            logger.info(f"Sending notifications to {total_tokens} users using batch processing")
-
-            # Use fallback image if no image provided
-            if not image_url:
-                image_url = cls.FALLBACK_IMAGE
-
-            # Build the message template
-            message_template = cls._build_multicast_message(title, body, data, image_url)
-
-            # Process in batches using thread pool for parallel processing
-            total_success = 0
-            total_failure = 0
-
-            # Create batches of tokens
-            token_batches = []
-            for i in range(0, total_tokens, batch_size):
-                batch_tokens = list(active_tokens[i:i + batch_size])
-                token_batches.append(batch_tokens)
-
-            logger.info(f"📦 Created {len(token_batches)} batches of max {batch_size} tokens each")
-
-            # Use ThreadPoolExecutor for parallel batch processing
-            max_workers = min(10, len(token_batches))  # Max 10 concurrent batches
-
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # Submit all batch jobs
-                future_to_batch = {
-                    executor.submit(cls._send_batch_multicast, message_template, batch_tokens, batch_idx): batch_idx
-                    for batch_idx, batch_tokens in enumerate(token_batches)
-                }
-
-                # Collect results as they complete
-                for future in as_completed(future_to_batch):
-                    batch_idx = future_to_batch[future]
-                    try:
-                        batch_result = future.result()
-                        total_success += batch_result['success_count']
-                        total_failure += batch_result['failure_count']
-
-                        logger.info(f"✅ Batch {batch_idx + 1} completed: "
-                                  f"{batch_result['success_count']} success, "
-                                  f"{batch_result['failure_count']} failed")
-
-                    except Exception as e:
-                        logger.error(f"❌ Batch {batch_idx + 1} failed: {e}")
-                        total_failure += len(token_batches[batch_idx])
-
-            success_rate = (total_success / total_tokens * 100) if total_tokens > 0 else 0
-
-            logger.info(f"🎯 Batch notification completed: {total_success}/{total_tokens} "
-                       f"({success_rate:.1f}% success rate)")
-
-            return {
-                'success_count': total_success,
-                'failure_count': total_failure,
-                'total_tokens': total_tokens,
-                'success_rate': success_rate,
-                'message': f'Sent to {total_success}/{total_tokens} devices ({success_rate:.1f}% success)'
-            }
-
-        except Exception as e:
-            logger.error(f"❌ Batch notification system failed: {e}")
-            import traceback
-            logger.error(f"❌ Traceback: {traceback.format_exc()}")
-
-            # Fallback to old method for small user bases
-            if total_tokens < 100:
-                logger.info("🔄 Falling back to sequential method for small user base")
-                return cls.send_to_all_users_sequential(title, body, data, image_url)
-
-            return {
-                'success_count': 0,
-                'failure_count': total_tokens,
-                'message': f'Batch system failed: {str(e)}'
-            }
+    @classmethod
+    def rate_snapshot(cls) -> Optional[Dict]:
+        """Window, rate and throttling counters of the transport's rate controller"""
+        transport = cls._transport
+        if transport is None or transport.controller is None:
+            return None
+        return transport.controller.snapshot()
 
     @classmethod
-    def _build_multicast_message(cls, title: str, body: str, data: Dict = None, image_url: str = None):
-        """Build Firebase multicast message template"""
-        from firebase_admin import messaging
+    def set_transport(cls, transport: Optional[FCMTransport]) -> Optional[FCMTransport]:
+        """Replace the transport (tests, benchmarks); returns the previous one"""
+        with cls._transport_lock:
+            previous, cls._transport = cls._transport, transport
+        return previous
 
-        # Android-specific configuration
-        android_config = messaging.AndroidConfig(
-            priority='high',
-            notification=messaging.AndroidNotification(
-                channel_id='default_channel',
-                sound='default',
-                icon='ic_notification',
-                color='#FF6B6B',
-                image=image_url,
-                click_action='FLUTTER_NOTIFICATION_CLICK',
-                tag='lottery_notification'
-            ),
+    @classmethod
+    def _build_message(cls, token: str, title: str, body: str, data: Dict = None, image_url: str = None):
+        """Single-token message with the same payload as the sequential sender"""
+        return messaging.Message(
+            notification=messaging.Notification(title=title, body=body),
             data={
+                **{k: str(v) for k, v in (data or {}).items()},
                 'image_url': image_url,
-                'big_picture': 'true'
-            }
-        )
-
-        # iOS-specific configuration
-        apns_config = messaging.APNSConfig(
-            payload=messaging.APNSPayload(
-                aps=messaging.Aps(
-                    alert=messaging.ApsAlert(title=title, body=body),
+                'notification_icon': cls.NOTIFICATION_ICON
+            },
+            token=token,
+            android=messaging.AndroidConfig(
+                priority='high',
+                notification=messaging.AndroidNotification(
+                    channel_id='default_channel',
                     sound='default',
-                    badge=1,
-                    thread_id='lottery_results'
-                )
+                    icon='ic_notification',
+                    color='#FF6B6B',
+                    image=image_url,
+                    click_action='FLUTTER_NOTIFICATION_CLICK',
+                    tag='lottery_notification'
+                ),
+                data={
+                    'image_url': image_url,
+                    'big_picture': 'true'
+                }
             ),
-            headers={
-                'apns-push-type': 'alert',
-                'apns-priority': '10'
-            }
-        )
-
-        return {
-            'notification': messaging.Notification(title=title, body=body),
-            'data': {**{k: str(v) for k, v in (data or {}).items()}},
-            'android': android_config,
-            'apns': apns_config
-        }
-
-    @classmethod
-    def _send_batch_multicast(cls, message_template: Dict, tokens: List[str], batch_idx: int) -> Dict:
-        """Send multicast message to a batch of tokens"""
-        try:
-            from firebase_admin import messaging
-            import logging
-
-            logger = logging.getLogger('lottery_app')
-
-            # Create multicast message
-            multicast_message = messaging.MulticastMessage(
-                tokens=tokens,
-                **message_template
+            apns=messaging.APNSConfig(
+                payload=messaging.APNSPayload(
+                    aps=messaging.Aps(
+                        alert=messaging.ApsAlert(title=title, body=body),
+                        sound='default',
+                        badge=1,
+                        thread_id='lottery_results'
+                    ),
+                ),
+                headers={
+                    'apns-push-type': 'alert',
+                    'apns-priority': '10'
+                }
             )
-
-            # Send multicast (up to 500 tokens at once)
-            response = messaging.send_multicast(multicast_message)
-
-            # Process response
-            success_count = response.success_count
-            failure_count = response.failure_count
-
-            # Log failed tokens for debugging (optional)
-            if response.responses:
-                failed_tokens = []
-                for idx, resp in enumerate(response.responses):
-                    if not resp.success:
-                        failed_tokens.append({
-                            'token_preview': tokens[idx][:20] + '...',
-                            'error': str(resp.exception) if resp.exception else 'Unknown'
-                        })
-
-                if failed_tokens:
-                    logger.warning(f"⚠️ Batch {batch_idx + 1} had {len(failed_tokens)} failed tokens")
-
-            return {
-                'success_count': success_count,
-                'failure_count': failure_count,
-                'batch_size': len(tokens)
-            }
-
-        except Exception as e:
-            logger.error(f"❌ Multicast batch {batch_idx + 1} failed: {e}")
-            return {
-                'success_count': 0,
-                'failure_count': len(tokens),
-                'batch_size': len(tokens)
-            }
+        )
 
     @classmethod
-    def send_to_all_users(cls, title: str, body: str, data: Dict = None, image_url: str = None) -> Dict:
+    def send_to_tokens(cls, tokens: List[str], title: str, body: str, data: Dict = None, image_url: str = None) -> Dict:
         """
-        Smart notification dispatcher:
-        - FIXED: Always use sequential method due to Firebase HTTP/2 SSL issues in production
-        - Batched method causes protocol violations on some servers
+        Send one notification to a batch of tokens through the transport.
+        Returns the tokens grouped by outcome: delivered, invalid (dead tokens), rejected (FCM
+        refused the message, see SendResult.outcome) and retry, plus the error and FCM error code
+        of each failed token. Retry tokens that failed because of FCM itself (network errors,
+        throttling, server errors) are listed again under unavailable.
         """
-        from results.models import FcmToken
+        image_url = image_url or cls.FALLBACK_IMAGE
+        outcome = {'delivered': [], 'invalid': [], 'rejected': [], 'retry': [], 'unavailable': [],
+                   'errors': {}, 'error_codes': {}}
+        if not tokens:
+            return outcome
+
+        transport = cls.get_transport()
+        if transport is None:
+            logger.info(f"🧪 Test mode: {len(tokens)} notifications not sent ({title})")
+            outcome['delivered'] = list(tokens)
+            return outcome
 
-        # PRODUCTION FIX: Always use sequential method to avoid HTTP/2 SSL protocol issues
-        # The batched multicast method is causing "EOF occurred in violation of protocol" errors
-        logger.info("Using sequential method to avoid Firebase HTTP/2 protocol issues")
-        return cls.send_to_all_users_sequential(title, body, data, image_url)
-
-    @classmethod
-    def send_to_all_users_sequential(cls, title: str, body: str, data: Dict = None, image_url: str = None) -> Dict:
-        """OPTIMIZED: Send notifications using parallel threading for speed"""
         try:
-            from firebase_admin import messaging
-            from results.models import FcmToken
-            from django.utils import timezone
-            import logging
-            import threading
-            from concurrent.futures import ThreadPoolExecutor, as_completed
-            import time
-
-            logger = logging.getLogger('lottery_app')
-
-            # Initialize Firebase if needed
-            cls._initialize_firebase()
-
-            # Get all active FCM tokens
-            active_tokens = list(FcmToken.objects.filter(
-                is_active=True,
-                notifications_enabled=True
-            ).values_list('fcm_token', flat=True))
-
-            if not active_tokens:
-                logger.warning("No active FCM tokens found")
-                return {'success_count': 0, 'failure_count': 0, 'message': 'No active tokens'}
-
-            # Use fallback image if no image provided
-            if not image_url:
-                image_url = cls.FALLBACK_IMAGE
-
-            logger.info(f"🚀 FAST MODE: Sending to {len(active_tokens)} users using {min(20, len(active_tokens))} parallel threads")
-
-            # Thread-safe counters
-            success_count = 0
-            failure_count = 0
-            success_lock = threading.Lock()
-            failure_lock = threading.Lock()
-
-            def send_single_notification(token):
-                """Send notification to a single token (thread-safe)"""
-                nonlocal success_count, failure_count
-                try:
-                    # Create base notification without image (to ensure proper icon display)
-                    notification = messaging.Notification(
-                        title=title,
-                        body=body
-                        # Don't set image here - it affects the small icon
-                    )
-                    
-                    # Android-specific configuration with proper icon/image separation
-                    android_config = messaging.AndroidConfig(
-                        priority='high',
-                        notification=messaging.AndroidNotification(
-                            channel_id='default_channel',
-                            sound='default',
-                            icon='ic_notification',  # Your app's small icon on left
-                            color='#FF6B6B',
-                            image=image_url,  # Big picture ONLY when expanded
-                            click_action='FLUTTER_NOTIFICATION_CLICK',
-                            tag='lottery_notification'
-                        ),
-                        # Add image as data for better control
-                        data={
-                            'image_url': image_url,
-                            'big_picture': 'true'
-                        }
-                    )
-                    
-                    # iOS-specific configuration
-                    apns_config = messaging.APNSConfig(
-                        payload=messaging.APNSPayload(
-                            aps=messaging.Aps(
-                                alert=messaging.ApsAlert(title=title, body=body),
-                                sound='default',
-                                badge=1,
-                                thread_id='lottery_results'
-                            ),
-                            # iOS doesn't support images in basic notifications
-                            # but we can add custom data for rich notifications
-                        ),
-                        headers={
-                            'apns-push-type': 'alert',
-                            'apns-priority': '10'
-                        }
-                    )
-                    
-                    message = messaging.Message(
-                        notification=notification,
-                        data={
-                            **{k: str(v) for k, v in (data or {}).items()},
-                            'image_url': image_url,  # Pass image as data
-                            'notification_icon': cls.NOTIFICATION_ICON
-                        },
-                        token=token,
-                        android=android_config,
-                        apns=apns_config
-                    )
-                    
-                    response = messaging.send(message)
-                    with success_lock:
-                        success_count += 1
-                    return True
-
-                except Exception as e:
-                    with failure_lock:
-                        failure_count += 1
-                    error_str = str(e)
-
-                    # Deactivate invalid tokens
-                    if ("not a valid FCM registration token" in error_str or
-                        "Requested entity was not found" in error_str or
-                        "registration-token-not-registered" in error_str):
-                        FcmToken.objects.filter(fcm_token=token).update(is_active=False)
-
-                    # Small delay for rate limiting
-                    time.sleep(0.05)
-                    return False
-
-            # 🚀 PARALLEL EXECUTION: Use ThreadPoolExecutor for speed
-            start_time = time.time()
-            max_workers = min(20, len(active_tokens))  # Max 20 concurrent threads
-
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # Submit all notification jobs
-                future_to_token = {
-                    executor.submit(send_single_notification, token): token
-                    for token in active_tokens
-                }
-
-                # Wait for completion with progress logging
-                completed = 0
-                for future in as_completed(future_to_token):
-                    completed += 1
-                    if completed % 100 == 0:  # Log progress every 100 notifications
-                        logger.info(f"📊 Progress: {completed}/{len(active_tokens)} notifications processed")
-
-            elapsed_time = time.time() - start_time
-            rate = len(active_tokens) / elapsed_time if elapsed_time > 0 else 0
-
-            # Update last_used for successful tokens (if any succeeded)
-            if success_count > 0:
-                FcmToken.objects.filter(
-                    fcm_token__in=active_tokens,
-                    is_active=True
-                ).update(last_used=timezone.now())
-
-            logger.info(f"🚀 FAST NOTIFICATION COMPLETE: {success_count} success, {failure_count} failed")
-            logger.info(f"⚡ Performance: {len(active_tokens)} notifications in {elapsed_time:.2f}s ({rate:.1f}/sec)")
-
-            return {
-                'success_count': success_count,
-                'failure_count': failure_count,
-                'message': f'Sent to {success_count}/{len(active_tokens)} devices in {elapsed_time:.2f}s ({rate:.1f}/sec)',
-                'image_url': image_url,
-                'elapsed_time': elapsed_time,
-                'notifications_per_second': rate
-            }
-            
+            results = transport.send([cls._build_message(token, title, body, data, image_url) for token in tokens])
         except Exception as e:
-            logger.error(f"❌ Failed to send notifications: {str(e)}")
-            return {'success_count': 0, 'failure_count': 0, 'message': f'Error: {str(e)}'}
-    
-    @classmethod
-    def _send_multicast(cls, tokens: List[str], title: str, body: str, data: Dict = None, image_url: str = None) -> tuple:
-        """Send notification to multiple tokens using real Firebase with image support"""
-        try:
-            # Use fallback image if no image provided
-            if not image_url:
-                image_url = cls.FALLBACK_IMAGE
-            
-            message = messaging.MulticastMessage(
-                notification=messaging.Notification(
-                    title=title, 
-                    body=body
-                    # No image here to avoid affecting small icon
-                ),
-                data={
-                    **{k: str(v) for k, v in (data or {}).items()},
-                    'image_url': image_url,
-                    'notification_icon': cls.NOTIFICATION_ICON
-                },
-                tokens=tokens,
-                android=messaging.AndroidConfig(
-                    priority='high',
-                    notification=messaging.AndroidNotification(
-                        channel_id='default_channel',
-                        sound='default',
-                        icon='ic_notification',  # App icon on left
-                        color='#FF6B6B',
-                        image=image_url,  # Big picture when expanded
-                        click_action='OPEN_RESULTS',
-                        tag='lottery_notification'
-                    ),
-                ),
-                apns=messaging.APNSConfig(
-                    payload=messaging.APNSPayload(
-                        aps=messaging.Aps(
-                            alert=messaging.ApsAlert(title=title, body=body),
-                            sound='default',
-                            badge=1,
-                            thread_id='lottery_results'
-                        ),
-                    ),
-                    headers={
-                        'apns-push-type': 'alert',
-                        'apns-priority': '10'
-                    }
-                ),
-            )
-            
-            response = messaging.send_multicast(message)
-            
-            # Handle failed tokens
-            if response.failure_count > 0:
-                failed_tokens = []
-                for idx, resp in enumerate(response.responses):
-                    if not resp.success:
-                        failed_token = tokens[idx]
-                        error = resp.exception
-                        
-                        # Deactivate invalid tokens
-                        if isinstance(error, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
-                            FcmToken.objects.filter(fcm_token=failed_token).update(is_active=False)
-                            logger.info(f"Deactivated invalid token: {failed_token[:20]}...")
-                        
-                        failed_tokens.append(failed_token)
-            
-            # Update last_used for successful tokens
-            successful_tokens = [tokens[idx] for idx, resp in enumerate(response.responses) if resp.success]
-            if successful_tokens:
-                FcmToken.objects.filter(fcm_token__in=successful_tokens).update(last_used=timezone.now())
-            
-            return response.success_count, response.failure_count
-            
-        except Exception as e:
-            logger.error(f"❌ Multicast send failed: {str(e)}")
-            return 0, len(tokens)
-    
+            # The whole request failed: every token is retried
+            outcome['retry'] = list(tokens)
+            outcome['unavailable'] = list(tokens)
+            outcome['errors'] = dict.fromkeys(tokens, str(e))
+            outcome['error_codes'] = dict.fromkeys(tokens, 'UNAVAILABLE')
+            return outcome
+
+        for result in results:
+            outcome[result.outcome].append(result.token)
+            if result.outcome == 'retry' and result.unavailable:
+                outcome['unavailable'].append(result.token)
+            if not result.success:
+                outcome['errors'][result.token] = f"{result.error_code}: {result.error}"
+                outcome['error_codes'][result.token] = result.error_code
+        return outcome
+
     @classmethod
-    def send_new_result_notification(cls, lottery_name: str) -> Dict:
-        """Send notification when new result is added with lottery-specific image"""
-        title = f"🎯 {lottery_name} Results Live!"
-        body = f"Fresh {lottery_name} results are being added. Check them out now!"
-        
-        # Get the appropriate image for this lottery
+    def new_result_content(cls, lottery_name: str) -> Dict:
+        """Title, body, data and image of the new result notification"""
         image_url = cls._get_lottery_image(lottery_name)
-        
-        data = {
-            'type': 'new_result',
-            'lottery_name': lottery_name,
-            'click_action': 'OPEN_RESULTS',
-            'image_url': image_url
+        return {
+            'title': f"🎯 {lottery_name} Results Live!",
+            'body': f"Fresh {lottery_name} results are being added. Check them out now!",
+            'data': {
+                'type': 'new_result',
+                'lottery_name': lottery_name,
+                'click_action': 'OPEN_RESULTS',
+                'image_url': image_url
+            },
+            'image_url': image_url,
         }
-        
-        logger.info(f"Sending notification for {lottery_name} with image: {image_url}")
-        
-        return cls.send_to_all_users(title, body, data, image_url)
-    
+
     @classmethod
-    def send_result_ready_notification(cls, lottery_name: str, draw_number: str) -> Dict:
-        """Send notification when result is ready with lottery-specific image"""
-        title = f"🎉 {lottery_name} Results Ready!"
-        body = f"{lottery_name} Draw {draw_number} results are now available. Check if you won!"
-        
-        # Get the appropriate image for this lottery
+    def result_ready_content(cls, lottery_name: str, draw_number: str) -> Dict:
+        """Title, body, data and image of the result ready notification"""
         image_url = cls._get_lottery_image(lottery_name)
-        
-        data = {
-            'type': 'result_ready',
-            'lottery_name': lottery_name,
-            'draw_number': draw_number,
-            'click_action': 'OPEN_RESULTS',
-            'image_url': image_url
+        return {
+            'title': f"🎉 {lottery_name} Results Ready!",
+            'body': f"{lottery_name} Draw {draw_number} results are now available. Check if you won!",
+            'data': {
+                'type': 'result_ready',
+                'lottery_name': lottery_name,
+                'draw_number': draw_number,
+                'click_action': 'OPEN_RESULTS',
+                'image_url': image_url
+            },
+            'image_url': image_url,
         }
-        
-        logger.info(f"Sending ready notification for {lottery_name} with image: {image_url}")
-        
-        return cls.send_to_all_users(title, body, data, image_url)
-
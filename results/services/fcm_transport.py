@@ -0,0 +1,309 @@
+"""
+FCM Transports
+
+FCMService hands every batch of messages to a transport, chosen by LOTTERY_SETTINGS['FCM_TRANSPORT']:
+
+- 'httpx': HttpxFCMTransport posts each message to the FCM v1 send endpoint from one asyncio
+  event loop, over a pooled HTTP/2 httpx client. Requests from every calling thread are
+  multiplexed on a few long-lived connections.
+- 'firebase_admin': messaging.send_each, which opens a thread per message of the batch.
+
+Either way an AdaptiveRateController (fcm_rate.py) paces the requests: how many are in
+flight and how many start per second follow FCM's throttling responses and latency.
+
+Both return one SendResult per message. Failures carry the FCM error code (UNREGISTERED,
+QUOTA_EXCEEDED, UNAVAILABLE, ...) so callers can tell dead tokens from throttling.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import List, Optional
+
+import httpx
+from django.conf import settings
+from firebase_admin import messaging
+
+from results.services.fcm_rate import AdaptiveRateController
+
+logger = logging.getLogger('lottery_app')
+
+FCM_BASE_URL = 'https://fcm.googleapis.com'
+FCM_SEND_PATH = '/v1/projects/{project_id}/messages:send'
+FCM_ERROR_TYPE = 'type.googleapis.com/google.firebase.fcm.v1.FcmError'
+
+# Tokens failing with these codes will never accept a message again
+INVALID_TOKEN_CODES = {'UNREGISTERED', 'SENDER_ID_MISMATCH'}
+
+# FCM also answers INVALID_ARGUMENT for a malformed message (bad data or image URL, oversized
+# payload). It means a dead token only when the error names the registration token, as in
+# "The registration token is not a valid FCM registration token"
+INVALID_ARGUMENT = 'INVALID_ARGUMENT'
+INVALID_TOKEN_ERROR = 'registration token'
+
+# FCM could not deliver through APNs or web push with the project's credentials. It persists for
+# every token of that platform until the setup is fixed, so sending again cannot help either
+REJECTED_CODES = {'THIRD_PARTY_AUTH_ERROR'}
+
+# firebase-admin exception classes by FCM error code
+FIREBASE_ERROR_CODES = {
+    messaging.UnregisteredError: 'UNREGISTERED',
+    messaging.SenderIdMismatchError: 'SENDER_ID_MISMATCH',
+    messaging.QuotaExceededError: 'QUOTA_EXCEEDED',
+    messaging.ThirdPartyAuthError: 'THIRD_PARTY_AUTH_ERROR',
+}
+
+
+@dataclass
+class SendResult:
+    token: str
+    success: bool
+    status: int = 200  # HTTP status (0 when the request never got a response)
+    error_code: str = ''
+    error: str = ''
+    retry_after: Optional[float] = None  # Seconds, from the Retry-After header
+    latency: float = 0.0
+
+    @property
+    def outcome(self) -> str:
+        """
+        'delivered', 'invalid' (dead token), 'rejected' (FCM refused the message itself, sending
+        it again cannot help) or 'retry'
+        """
+        if self.success:
+            return 'delivered'
+        if self.error_code in INVALID_TOKEN_CODES:
+            return 'invalid'
+        if self.error_code == INVALID_ARGUMENT:
+            return 'invalid' if INVALID_TOKEN_ERROR in self.error.lower() else 'rejected'
+        if self.error_code in REJECTED_CODES:
+            return 'rejected'
+        return 'retry'
+
+    @property
+    def unavailable(self) -> bool:
+        """The failure comes from FCM, not the token: no response, throttled (429) or a server error"""
+        return not self.success and (self.status == 0 or self.status == 429 or self.status >= 500)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header as seconds (it is either a number of seconds or an HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def fcm_error_code(response: httpx.Response) -> str:
+    """FCM error code of a failed v1 send response, falling back to the canonical status"""
+    try:
+        error = response.json().get('error', {})
+    except ValueError:
+        return 'UNAVAILABLE' if response.status_code >= 500 else 'UNKNOWN'
+    for detail in error.get('details', []):
+        if detail.get('@type') == FCM_ERROR_TYPE and detail.get('errorCode'):
+            return detail['errorCode']
+    return error.get('status') or 'UNKNOWN'
+
+
+class FCMTransport:
+    """Sends a batch of messaging.Message objects, one SendResult per message in the same order"""
+
+    name = ''
+    controller: AdaptiveRateController = None
+
+    def send(self, messages: List[messaging.Message]) -> List[SendResult]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FirebaseAdminTransport(FCMTransport):
+    """send_each in chunks of the controller's window, waiting for the token bucket before each chunk"""
+
+    name = 'firebase_admin'
+
+    def __init__(self, controller: AdaptiveRateController = None):
+        self.controller = controller or AdaptiveRateController.from_settings()
+
+    def send(self, messages: List[messaging.Message]) -> List[SendResult]:
+        results = []
+        while len(results) < len(messages):
+            chunk = messages[len(results):len(results) + self.controller.window_size]
+            wait = max(self.controller.reserve() for _ in chunk)
+            if wait > 0:
+                time.sleep(wait)
+            results += self.send_chunk(chunk)
+        return results
+
+    def send_chunk(self, messages: List[messaging.Message]) -> List[SendResult]:
+        sent_at = self.controller.clock()
+        start = time.perf_counter()
+        response = messaging.send_each(messages)
+        latency = time.perf_counter() - start
+
+        results = []
+        for message, resp in zip(messages, response.responses):
+            if resp.success:
+                result = SendResult(message.token, True, latency=latency)
+            else:
+                error = resp.exception
+                http_response = getattr(error, 'http_response', None)
+                result = SendResult(
+                    message.token,
+                    False,
+                    status=http_response.status_code if http_response is not None else 0,
+                    error_code=FIREBASE_ERROR_CODES.get(type(error)) or getattr(error, 'code', '') or 'UNKNOWN',
+                    error=str(error) if error else 'Unknown',
+                    retry_after=parse_retry_after(http_response.headers.get('Retry-After')) if http_response is not None else None,
+                    latency=latency,
+                )
+            self.controller.record(result.status, result.latency, result.retry_after, sent_at)
+            results.append(result)
+        return results
+
+
+class HttpxFCMTransport(FCMTransport):
+    """
+    FCM v1 API over a pooled HTTP/2 httpx.AsyncClient. The client and its event loop live in
+    a background thread shared by every caller; send() blocks the calling thread until its
+    batch is done, send_async() can be awaited from code already running on the loop.
+    """
+
+    name = 'httpx'
+
+    def __init__(self, project_id: str, credential=None, controller: AdaptiveRateController = None,
+                 concurrency: int = None, max_connections=4, timeout=10.0, http2=True, base_url=FCM_BASE_URL,
+                 transport: httpx.AsyncBaseTransport = None):
+        self.url = base_url + FCM_SEND_PATH.format(project_id=project_id)
+        # google.auth credentials; None sends unauthenticated requests (the local fake)
+        self.credential = credential
+        # A fixed concurrency replaces the adaptive window
+        if controller is None:
+            controller = AdaptiveRateController.fixed(concurrency) if concurrency else AdaptiveRateController.from_settings()
+        self.controller = controller
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.http2 = http2
+        self.transport = transport
+
+        self._client = None
+        self._window = None
+        self._in_flight = 0
+        self._token_lock = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='fcm-transport', daemon=True)
+        self._thread.start()
+
+    def send(self, messages: List[messaging.Message]) -> List[SendResult]:
+        return asyncio.run_coroutine_threadsafe(self.send_async(messages), self._loop).result()
+
+    async def send_async(self, messages: List[messaging.Message]) -> List[SendResult]:
+        client = self._get_client()
+        headers = await self._headers()
+        return list(await asyncio.gather(*(self._send_one(client, headers, message) for message in messages)))
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created on the loop thread, so the condition and lock belong to it
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                timeout=self.timeout,
+                transport=self.transport,
+            )
+            self._window = asyncio.Condition()
+            self._token_lock = asyncio.Lock()
+        return self._client
+
+    async def _headers(self):
+        headers = {'X-GOOG-API-FORMAT-VERSION': '2'}
+        if self.credential is None:
+            return headers
+        async with self._token_lock:
+            if not self.credential.valid:
+                # google-auth refreshes synchronously; keep the loop free for in-flight sends
+                from google.auth.transport.requests import Request
+                await asyncio.get_running_loop().run_in_executor(None, self.credential.refresh, Request())
+        headers['Authorization'] = f"Bearer {self.credential.token}"
+        return headers
+
+    async def _send_one(self, client: httpx.AsyncClient, headers, message: messaging.Message) -> SendResult:
+        payload = {'message': messaging._MessagingService.encode_message(message)}
+        async with self._window:
+            await self._window.wait_for(lambda: self._in_flight < self.controller.window_size)
+            self._in_flight += 1
+        try:
+            wait = self.controller.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            sent_at = self.controller.clock()
+            result = await self._post(client, headers, payload, message.token)
+            self.controller.record(result.status, result.latency, result.retry_after, sent_at)
+            return result
+        finally:
+            async with self._window:
+                self._in_flight -= 1
+                # Wake only as many waiters as there are free slots (the window may have grown)
+                self._window.notify(max(self.controller.window_size - self._in_flight, 1))
+
+    async def _post(self, client: httpx.AsyncClient, headers, payload, token: str) -> SendResult:
+        start = time.perf_counter()
+        try:
+            response = await client.post(self.url, json=payload, headers=headers)
+        except httpx.HTTPError as e:
+            return SendResult(token, False, status=0, error_code='UNAVAILABLE',
+                              error=f"{type(e).__name__}: {e}", latency=time.perf_counter() - start)
+        latency = time.perf_counter() - start
+
+        if response.status_code == 200:
+            return SendResult(token, True, latency=latency)
+        return SendResult(
+            token,
+            False,
+            status=response.status_code,
+            error_code=fcm_error_code(response),
+            error=response.text[:200],
+            retry_after=parse_retry_after(response.headers.get('Retry-After')),
+            latency=latency,
+        )
+
+
+def build_transport(name: str = None) -> FCMTransport:
+    """Transport configured in LOTTERY_SETTINGS for the initialized default Firebase app"""
+    import firebase_admin
+
+    options = settings.LOTTERY_SETTINGS
+    name = name or options.get('FCM_TRANSPORT', 'httpx')
+    if name == 'firebase_admin':
+        return FirebaseAdminTransport()
+    if name != 'httpx':
+        raise ValueError(f"Unknown FCM transport: {name}")
+
+    app = firebase_admin.get_app()
+    return HttpxFCMTransport(
+        project_id=app.project_id,
+        credential=app.credential.get_credential(),
+        controller=AdaptiveRateController.from_settings(),
+        max_connections=options.get('FCM_MAX_CONNECTIONS', 4),
+        timeout=options.get('FCM_TIMEOUT_SECONDS', 10),
+    )
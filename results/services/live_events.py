@@ -0,0 +1,395 @@
+"""
+Live Draw Event Service
+
+Pushes prizes merged by the live scraper, and scraping session status changes, to clients
+subscribed to a result's Server-Sent Events stream.
+
+Fan-out goes through a broker, so a poll committed by any process (ASGI workers, the
+run_live_scraper command) reaches every stream:
+- RedisBroker: used when REDIS_URL is set. Writes PUBLISH to Redis and each ASGI worker keeps
+  one pattern subscription that feeds its local subscribers.
+- PostgresBroker: used otherwise on PostgreSQL. Writes pg_notify() and each ASGI worker keeps
+  one LISTEN connection, in a background thread, that feeds its local subscribers.
+- InProcessBroker: subscribers of this process only (SQLite development and tests).
+
+Each event is rendered to an SSE frame once and shared by all subscribers. Subscribers are
+grouped per event loop, so one publish costs one loop wakeup per worker, not one per client.
+A client that falls too far behind is disconnected and resumes with Last-Event-ID.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from results.models import LiveScrapingSession, PrizeEntry
+from results.services.change_feed import ChangeFeedService
+from results.utils.on_commit import batch_on_commit
+
+logger = logging.getLogger('lottery_app')
+
+
+def encode_message(channel, event_id, frame: bytes) -> str:
+    """Message of a cross-process broker"""
+    return json.dumps({'channel': channel, 'id': event_id, 'frame': frame.decode('utf-8')})
+
+
+def decode_message(payload):
+    """(channel, (event_id, frame)) of a cross-process broker message"""
+    message = json.loads(payload)
+    return message['channel'], (message['id'], message['frame'].encode('utf-8'))
+
+
+class Subscription:
+    """Queue of (event_id, frame) messages of one stream, owned by the stream's event loop"""
+
+    __slots__ = ('channel', 'loop', 'queue')
+
+    def __init__(self, channel, loop, queue_size):
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too slow: drop the backlog and end the stream, the client resumes from Last-Event-ID
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """
+    Pub/sub between threads of one process. publish() may be called from any thread;
+    messages are handed to each subscriber's event loop.
+    """
+
+    def __init__(self, queue_size=256):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._channels = {}  # channel -> {event loop: set of subscriptions}
+
+    def subscribe(self, channel) -> Subscription:
+        """Subscribe to a channel (called from the stream's event loop)"""
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(channel, loop, self.queue_size)
+        with self._lock:
+            self._channels.setdefault(channel, {}).setdefault(loop, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            loops = self._channels.get(subscription.channel)
+            if not loops:
+                return
+            subscriptions = loops.get(subscription.loop)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del loops[subscription.loop]
+            if not loops:
+                del self._channels[subscription.channel]
+
+    def publish(self, channel, event_id, frame: bytes):
+        self.fan_out(channel, (event_id, frame))
+
+    def fan_out(self, channel, message) -> int:
+        """Deliver a message to the local subscribers of a channel, one wakeup per event loop"""
+        with self._lock:
+            targets = [(loop, tuple(subscriptions)) for loop, subscriptions in self._channels.get(channel, {}).items()]
+
+        delivered = 0
+        for loop, subscriptions in targets:
+            try:
+                loop.call_soon_threadsafe(self._deliver, subscriptions, message)
+                delivered += len(subscriptions)
+            except RuntimeError:
+                # Event loop closed: its streams are gone
+                for subscription in subscriptions:
+                    self.unsubscribe(subscription)
+        return delivered
+
+    @staticmethod
+    def _deliver(subscriptions, message):
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscriptions) for loops in self._channels.values() for subscriptions in loops.values())
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Cross-process broker: publish() goes to Redis, and one pattern subscription per process
+    feeds the local subscribers.
+    """
+
+    CHANNEL_PREFIX = 'lottery_live:'
+
+    def __init__(self, url, queue_size=256):
+        super().__init__(queue_size)
+        self.url = url
+        self._client = None
+        self._listener = None
+
+    def get_client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def publish(self, channel, event_id, frame: bytes):
+        self.get_client().publish(f"{self.CHANNEL_PREFIX}{channel}", encode_message(channel, event_id, frame))
+
+    def subscribe(self, channel) -> Subscription:
+        subscription = super().subscribe(channel)
+        if self._listener is None or self._listener.done():
+            self._listener = subscription.loop.create_task(self.listen())
+        return subscription
+
+    async def listen(self):
+        import redis.asyncio as aioredis
+
+        while True:
+            try:
+                client = aioredis.Redis.from_url(self.url)
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+                    async for message in pubsub.listen():
+                        if message['type'] != 'pmessage':
+                            continue
+                        self.fan_out(*decode_message(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Live event listener error: {e}")
+                await asyncio.sleep(1)
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Cross-process broker over PostgreSQL LISTEN/NOTIFY: publish() runs pg_notify() (delivered
+    when the publishing transaction commits), and one listener thread per process feeds the
+    local subscribers.
+    """
+
+    NOTIFY_CHANNEL = 'lottery_live'
+    POLL_SECONDS = 5
+
+    def __init__(self, queue_size=256):
+        super().__init__(queue_size)
+        self.listening = threading.Event()
+        self._stop = threading.Event()
+        self._listener = None
+
+    def publish(self, channel, event_id, frame: bytes):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.NOTIFY_CHANNEL, encode_message(channel, event_id, frame)])
+
+    def subscribe(self, channel) -> Subscription:
+        subscription = super().subscribe(channel)
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self.listen, name='LiveEventListener', daemon=True)
+                self._listener.start()
+        return subscription
+
+    def listen(self):
+        # Runs on its own thread, so it holds its own database connection
+        while not self._stop.is_set():
+            try:
+                connection.ensure_connection()
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.NOTIFY_CHANNEL}")
+                self.listening.set()
+
+                raw = connection.connection
+                while not self._stop.is_set():
+                    if select.select([raw], [], [], self.POLL_SECONDS) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        self.fan_out(*decode_message(raw.notifies.pop(0).payload))
+            except Exception as e:
+                logger.error(f"Live event listener error: {e}")
+                self._stop.wait(1)
+            finally:
+                self.listening.clear()
+                connection.close()
+
+    def close(self):
+        """Stop the listener thread"""
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.join()
+
+
+class LiveEventService:
+    """
+    Publish live draw events and serve them as Server-Sent Events streams
+    """
+
+    _broker = None
+    _broker_lock = threading.Lock()
+
+    @classmethod
+    def get_broker(cls):
+        if cls._broker is None:
+            with cls._broker_lock:
+                if cls._broker is None:
+                    queue_size = settings.LOTTERY_SETTINGS.get('LIVE_STREAM_QUEUE_SIZE', 256)
+                    redis_url = getattr(settings, 'REDIS_URL', None)
+                    if redis_url:
+                        cls._broker = RedisBroker(redis_url, queue_size)
+                    elif connection.vendor == 'postgresql':
+                        cls._broker = PostgresBroker(queue_size)
+                    else:
+                        logger.error("Live streams use the in-process broker: prizes published by other "
+                                     "processes (run_live_scraper, other workers) will not reach them")
+                        cls._broker = InProcessBroker(queue_size)
+        return cls._broker
+
+    @classmethod
+    def set_broker(cls, broker):
+        """Swap the broker (tests use an InProcessBroker)"""
+        cls._broker = broker
+
+    @staticmethod
+    def channel_for(lottery_result_id) -> str:
+        return f"result:{lottery_result_id}"
+
+    @staticmethod
+    def format_event(event: str, data, event_id=None) -> bytes:
+        """Render one SSE frame"""
+        lines = []
+        if event_id is not None:
+            lines.append(f"id: {event_id}")
+        lines.append(f"event: {event}")
+        lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+        return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+    @classmethod
+    def prize_event(cls, prize, unique_id):
+        return prize.id, cls.format_event('prize', ChangeFeedService.serialize_prize(prize, unique_id), prize.id)
+
+    @classmethod
+    def session_event(cls, session):
+        return None, cls.format_event('status', {
+            'status': session.status,
+            'is_active': session.is_active,
+            'prizes_found': session.prizes_found_count,
+            'poll_count': session.poll_count,
+            'last_polled_at': session.last_polled_at.isoformat() if session.last_polled_at else None,
+        })
+
+    # Publishing (called on commit, from the scraper / admin / signal thread)
+
+    @classmethod
+    def publish_prizes(cls, prize_ids: Iterable[int]):
+        """Publish newly committed prizes of published results"""
+        try:
+            broker = cls.get_broker()
+            prizes = PrizeEntry.objects.filter(
+                id__in=prize_ids,
+                lottery_result__is_published=True
+            ).select_related('lottery_result').order_by('id')
+            for prize in prizes:
+                event_id, frame = cls.prize_event(prize, prize.lottery_result.unique_id)
+                broker.publish(cls.channel_for(prize.lottery_result_id), event_id, frame)
+        except Exception as e:
+            logger.error(f"Error publishing live prize events: {e}")
+
+    @classmethod
+    def publish_sessions(cls, session_ids: Iterable[int]):
+        """Publish the current status of scraping sessions of published results"""
+        try:
+            broker = cls.get_broker()
+            sessions = LiveScrapingSession.objects.filter(
+                id__in=session_ids,
+                lottery_result__is_published=True
+            )
+            for session in sessions:
+                event_id, frame = cls.session_event(session)
+                broker.publish(cls.channel_for(session.lottery_result_id), event_id, frame)
+        except Exception as e:
+            logger.error(f"Error publishing live session events: {e}")
+
+    @classmethod
+    def prize_created_on_commit(cls, prize_id):
+        batch_on_commit('live_prize_events', [prize_id], cls.publish_prizes)
+
+    @classmethod
+    def session_changed_on_commit(cls, session_id):
+        batch_on_commit('live_session_events', [session_id], cls.publish_sessions)
+
+    # Streaming (runs on the ASGI event loop)
+
+    @classmethod
+    def initial_events(cls, lottery_result_id, last_event_id: Optional[int]) -> List:
+        """Current session status, plus the prizes a reconnecting client missed"""
+        events = []
+        session = LiveScrapingSession.objects.filter(lottery_result_id=lottery_result_id).first()
+        if session:
+            events.append(cls.session_event(session))
+
+        if last_event_id is not None:
+            prizes = PrizeEntry.objects.filter(
+                lottery_result_id=lottery_result_id,
+                id__gt=last_event_id
+            ).select_related('lottery_result').order_by('id')
+            events.extend(cls.prize_event(prize, prize.lottery_result.unique_id) for prize in prizes)
+        return events
+
+    @classmethod
+    async def stream(cls, lottery_result_id, last_event_id: Optional[int] = None):
+        """SSE byte stream of a result; ends when the client disconnects or falls behind"""
+        heartbeat = settings.LOTTERY_SETTINGS.get('LIVE_STREAM_HEARTBEAT_SECONDS', 15)
+        broker = cls.get_broker()
+
+        # Subscribe before reading the backlog so nothing committed in between is lost
+        subscription = broker.subscribe(cls.channel_for(lottery_result_id))
+        try:
+            yield b'retry: 3000\n\n'
+
+            sent_up_to = last_event_id or 0
+            for event_id, frame in await sync_to_async(cls.initial_events)(lottery_result_id, last_event_id):
+                if event_id is not None:
+                    sent_up_to = max(sent_up_to, event_id)
+                yield frame
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing idle streams and surfaces dead clients
+                    yield b': keepalive\n\n'
+                    continue
+
+                if message is None:
+                    break
+                event_id, frame = message
+                if event_id is not None and event_id <= sent_up_to:
+                    continue
+                yield frame
+        finally:
+            broker.unsubscribe(subscription)
+
+    @classmethod
+    def get_stats(cls) -> Dict:
+        broker = cls.get_broker()
+        return {
+            'broker': type(broker).__name__,
+            'subscribers': broker.subscriber_count(),
+        }
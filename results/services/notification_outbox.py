@@ -0,0 +1,336 @@
+"""
+Notification Outbox Service
+
+Push notification fan-outs are queued as NotificationJob rows in the transaction that publishes
+the result, and sent by `manage.py run_notification_worker`. Web requests never talk to FCM, and
+a worker restart or deploy in the middle of a 10k+ token fan-out only pauses it:
+
+- A worker claims a job with a lease (locked_by / locked_until). A job whose worker died is
+  claimed again once the lease expires.
+- Tokens are read in FcmToken id order, one batch at a time, up to the last id that existed
+  when the job started.
+- After each batch the job is checkpointed: cursor_token_id moves past the batch and tokens
+  whose send failed with a retryable error are parked in retry_token_ids, with the number of
+  runs each has failed in (retry_attempts). A resumed job sends those first, then continues
+  after the cursor, so delivered tokens are not sent again.
+  (A crash between FCM accepting a batch and its checkpoint re-sends that one batch.)
+- Retryable failures are retried a few times with exponential backoff within the run. Tokens
+  that still fail are parked and the run goes on with the next batch; when the cursor reaches
+  the end, the job is rescheduled to send the parked tokens again. A token that failed in
+  NOTIFICATION_TOKEN_MAX_ATTEMPTS runs is given up on and counted as failed, so one bad token
+  never holds back the tokens after it.
+- When FCM itself is unavailable (no response, 429 or 5xx) the whole job backs off: it is
+  rescheduled with a longer backoff, and marked failed after NOTIFICATION_MAX_ATTEMPTS such runs.
+- Dead tokens of each batch are deactivated and delivered ones stamped (TokenMaintenanceService);
+  the job keeps the active recipients at its start, the deactivated count and the failures per
+  error code, for `manage.py notification_report`.
+- Tokens whose message FCM rejected (INVALID_ARGUMENT about the payload) count as failed and are
+  not retried. When most of a batch is rejected with the same error, the message itself is bad:
+  the job is marked failed right away instead of sending it to every remaining token.
+"""
+
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from results.models import FcmToken, LotteryResult, NotificationJob
+from results.services.fcm_service import FCMService
+from results.services.token_maintenance import TokenMaintenanceService
+from results.services.token_stream import active_tokens, fetch_token_batch
+
+logger = logging.getLogger('lottery_app')
+
+UNFINISHED_STATUSES = ('pending', 'running')
+
+
+class NotificationOutboxService:
+    """
+    Queue notification fan-outs and send them from a worker process
+    """
+
+    @staticmethod
+    def get_setting(name, default):
+        return settings.LOTTERY_SETTINGS.get(name, default)
+
+    @classmethod
+    def worker_id(cls) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    # Queueing (called from signals and the admin, inside the caller's transaction)
+
+    @classmethod
+    def enqueue(cls, kind: str, title: str, body: str, data: Dict = None, image_url: str = '',
+                lottery_result: Optional[LotteryResult] = None, target_token_ids: List[int] = None) -> NotificationJob:
+        return NotificationJob.objects.create(
+            kind=kind,
+            lottery_result=lottery_result,
+            title=title,
+            body=body,
+            data=data or {},
+            image_url=image_url or '',
+            target_token_ids=target_token_ids,
+        )
+
+    @classmethod
+    def enqueue_new_result(cls, lottery_result: LotteryResult) -> NotificationJob:
+        content = FCMService.new_result_content(lottery_result.lottery.name)
+        return cls.enqueue('new_result', lottery_result=lottery_result, **content)
+
+    @classmethod
+    def enqueue_result_ready(cls, lottery_result: LotteryResult) -> Optional[NotificationJob]:
+        """Queue the result ready fan-out unless one is already queued or running for this result"""
+        if NotificationJob.objects.filter(
+            kind='result_ready', lottery_result=lottery_result, status__in=UNFINISHED_STATUSES
+        ).exists():
+            return None
+        content = FCMService.result_ready_content(lottery_result.lottery.name, lottery_result.draw_number)
+        return cls.enqueue('result_ready', lottery_result=lottery_result, **content)
+
+    # Worker
+
+    @classmethod
+    def claim(cls, worker_id: str) -> Optional[NotificationJob]:
+        """Lease the next due job: pending ones, or running ones whose worker stopped renewing its lease"""
+        now = timezone.now()
+        skip_locked = connection.features.has_select_for_update_skip_locked
+        with transaction.atomic():
+            job = NotificationJob.objects.select_for_update(skip_locked=skip_locked).filter(
+                Q(status='pending', next_attempt_at__lte=now) | Q(status='running', locked_until__lt=now)
+            ).order_by('next_attempt_at', 'id').first()
+            if job is None:
+                return None
+
+            if job.max_token_id is None:
+                # Tokens registered after the job started are not part of this fan-out
+                job.max_token_id = FcmToken.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+                job.active_tokens_at_start = cls.recipients(job).filter(id__lte=job.max_token_id).count()
+            job.status = 'running'
+            job.locked_by = worker_id
+            job.locked_until = now + timedelta(seconds=cls.get_setting('NOTIFICATION_LEASE_SECONDS', 300))
+            job.started_at = job.started_at or now
+            job.save(update_fields=[
+                'max_token_id', 'active_tokens_at_start', 'status', 'locked_by', 'locked_until', 'started_at'
+            ])
+        return job
+
+    @classmethod
+    def recipients(cls, job: NotificationJob):
+        tokens = active_tokens()
+        if job.target_token_ids is not None:
+            tokens = tokens.filter(id__in=job.target_token_ids)
+        return tokens
+
+    @classmethod
+    def next_batch(cls, job: NotificationJob, batch_size: int, retries_due: int = None) -> Tuple[List[Tuple[int, str]], bool]:
+        """
+        (id, token) pairs to send next, and whether they are retries of earlier batches.
+        Up to retries_due parked tokens (all of them by default) are sent before the cursor moves on.
+        """
+        if retries_due is None:
+            retries_due = len(job.retry_token_ids)
+        if retries_due:
+            retry_ids = job.retry_token_ids[:min(batch_size, retries_due)]
+            batch = list(cls.recipients(job).filter(id__in=retry_ids).order_by('id').values_list('id', 'fcm_token'))
+            # Retried tokens that were deactivated meanwhile are dropped
+            job.retry_token_ids = job.retry_token_ids[len(retry_ids):]
+            dropped = set(retry_ids) - {token_id for token_id, _ in batch}
+            job.retry_attempts = {
+                token_id: attempts for token_id, attempts in job.retry_attempts.items() if int(token_id) not in dropped
+            }
+            return batch, True
+
+        return fetch_token_batch(cls.recipients(job), job.cursor_token_id, batch_size, job.max_token_id), False
+
+    @classmethod
+    def send_batch(cls, job: NotificationJob, batch: List[Tuple[int, str]]) -> Dict:
+        """Send a batch, retrying tokens with retryable errors with exponential backoff"""
+        ids_by_token = {token: token_id for token_id, token in batch}
+        pending = [token for _, token in batch]
+        delivered, invalid, rejected, unavailable, errors, error_codes = [], [], [], [], {}, {}
+        retries = cls.get_setting('NOTIFICATION_BATCH_RETRIES', 3)
+        base_delay = cls.get_setting('NOTIFICATION_RETRY_BASE_SECONDS', 1)
+
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(base_delay * 2 ** (attempt - 1))
+            outcome = FCMService.send_to_tokens(pending, job.title, job.body, job.data, job.image_url)
+            delivered += outcome['delivered']
+            invalid += outcome['invalid']
+            rejected += outcome.get('rejected', [])
+            errors.update(outcome['errors'])
+            error_codes.update(outcome.get('error_codes', {}))
+            pending = outcome['retry']
+            # Tokens still failing because of FCM itself on the last attempt
+            unavailable = outcome.get('unavailable', [])
+            if not pending:
+                break
+
+        failed = invalid + rejected + pending
+        last_failed = (unavailable or pending)[:1]
+        return {
+            'delivered': delivered,
+            'invalid': invalid,
+            'rejected': rejected,
+            'retry': pending,
+            'unavailable': unavailable,
+            'failed_ids': [ids_by_token[token] for token in pending],
+            'last_error': errors.get(last_failed[0], '') if last_failed else '',
+            # Final error of each token that was not delivered
+            'errors': {token: errors[token] for token in failed if token in errors},
+            'error_codes': {token: error_codes[token] for token in failed if token in error_codes},
+        }
+
+    @classmethod
+    def park(cls, job: NotificationJob, batch: List[Tuple[int, str]], failed_ids: List[int]) -> Tuple[List[int], Dict, int]:
+        """
+        Count one more failed run for each of the batch's failed tokens: the retry_token_ids and
+        retry_attempts to store, and how many tokens were given up on
+        """
+        max_attempts = cls.get_setting('NOTIFICATION_TOKEN_MAX_ATTEMPTS', 5)
+        failed_ids = set(failed_ids)
+        retry_token_ids, retry_attempts, given_up = list(job.retry_token_ids), dict(job.retry_attempts), 0
+        for token_id, _ in batch:
+            attempts = retry_attempts.pop(str(token_id), 0) + 1
+            if token_id not in failed_ids:
+                continue
+            if attempts >= max_attempts:
+                given_up += 1
+            else:
+                retry_token_ids.append(token_id)
+                retry_attempts[str(token_id)] = attempts
+        return retry_token_ids, retry_attempts, given_up
+
+    @staticmethod
+    def backoff_seconds(attempts: int) -> int:
+        return min(60 * 2 ** (attempts - 1), 3600)
+
+    @classmethod
+    def checkpoint(cls, job: NotificationJob, worker_id: str, **fields) -> bool:
+        """Store progress and renew the lease; False when another worker took the job over"""
+        for name, value in fields.items():
+            setattr(job, name, value)
+        lease = timedelta(seconds=cls.get_setting('NOTIFICATION_LEASE_SECONDS', 300))
+        job.locked_until = timezone.now() + lease
+        fields['locked_until'] = job.locked_until
+        updated = NotificationJob.objects.filter(pk=job.pk, locked_by=worker_id).update(**fields)
+        if not updated:
+            logger.warning(f"⚠️ Notification job {job.pk} was taken over by another worker")
+        return bool(updated)
+
+    @classmethod
+    def process(cls, job: NotificationJob, worker_id: str) -> str:
+        """Send a claimed job batch by batch; returns its status when this run stops"""
+        batch_size = cls.get_setting('NOTIFICATION_BATCH_SIZE', 500)
+        # Tokens parked by earlier runs; the ones this run parks wait for the next run
+        retries_due = len(job.retry_token_ids)
+
+        while True:
+            parked = len(job.retry_token_ids)
+            batch, is_retry = cls.next_batch(job, batch_size, retries_due)
+            retries_due -= parked - len(job.retry_token_ids)
+            if not batch:
+                if is_retry:
+                    # Every retried token of this slice was deactivated; carry on
+                    if not cls.checkpoint(job, worker_id, retry_token_ids=job.retry_token_ids,
+                                          retry_attempts=job.retry_attempts):
+                        return 'running'
+                    continue
+                if job.retry_token_ids:
+                    return cls.reschedule_retries(job, worker_id)
+                return cls.complete(job, worker_id)
+
+            result = cls.send_batch(job, batch)
+            maintenance = TokenMaintenanceService.apply(result)
+            retry_token_ids, retry_attempts, given_up = cls.park(job, batch, result['failed_ids'])
+            progress = {
+                'sent_count': job.sent_count + len(result['delivered']),
+                'failure_count': job.failure_count + len(result['invalid']) + len(result['rejected']) + given_up,
+                'retry_token_ids': retry_token_ids,
+                'retry_attempts': retry_attempts,
+                'deactivated_count': job.deactivated_count + maintenance['deactivated'],
+                'error_counts': TokenMaintenanceService.merge_error_counts(job.error_counts, maintenance['error_counts']),
+            }
+            if not is_retry:
+                progress['cursor_token_id'] = batch[-1][0]
+            if result['failed_ids']:
+                progress['last_error'] = result['last_error']
+
+            logger.info(f"📨 Notification job {job.pk}: batch of {len(batch)} - "
+                        f"{len(result['delivered'])} delivered, {len(result['invalid'])} invalid, "
+                        f"{len(result['rejected'])} rejected, {len(result['failed_ids']) - given_up} to retry, "
+                        f"{given_up} given up")
+
+            if maintenance['payload_error']:
+                # Every remaining batch would be rejected the same way
+                progress.update(status='failed', completed_at=timezone.now(),
+                                last_error=maintenance['payload_error'], locked_by='')
+                cls.checkpoint(job, worker_id, **progress)
+                logger.error(f"❌ Notification job {job.pk} failed, FCM rejected its message: {maintenance['payload_error']}")
+                return job.status
+
+            if not result['unavailable']:
+                # Tokens failing on their own are parked; the rest of the fan-out goes on
+                if not cls.checkpoint(job, worker_id, **progress):
+                    return 'running'
+                continue
+
+            # FCM keeps failing: stop this run and retry the job later
+            attempts = job.attempts + 1
+            if attempts >= cls.get_setting('NOTIFICATION_MAX_ATTEMPTS', 5):
+                progress.update(status='failed', completed_at=timezone.now(),
+                                failure_count=progress['failure_count'] + len(retry_token_ids))
+            else:
+                progress.update(status='pending',
+                                next_attempt_at=timezone.now() + timedelta(seconds=cls.backoff_seconds(attempts)))
+            cls.checkpoint(job, worker_id, attempts=attempts, locked_by='', **progress)
+            logger.warning(f"⚠️ Notification job {job.pk} stopped after attempt {attempts}: {result['last_error']}")
+            return job.status
+
+    @classmethod
+    def reschedule_retries(cls, job: NotificationJob, worker_id: str) -> str:
+        """Every token was sent once; wait before sending the parked ones again"""
+        backoff = cls.backoff_seconds(max(job.retry_attempts.values(), default=1))
+        if not cls.checkpoint(job, worker_id, status='pending', locked_by='',
+                              next_attempt_at=timezone.now() + timedelta(seconds=backoff)):
+            return 'running'
+        logger.info(f"🔁 Notification job {job.pk}: {len(job.retry_token_ids)} tokens to retry in {backoff}s")
+        return 'pending'
+
+    @classmethod
+    def complete(cls, job: NotificationJob, worker_id: str) -> str:
+        with transaction.atomic():
+            if not cls.checkpoint(job, worker_id, status='completed', completed_at=timezone.now(), locked_by=''):
+                return 'running'
+            if job.kind == 'result_ready' and job.lottery_result_id:
+                LotteryResult.objects.filter(pk=job.lottery_result_id).update(notification_sent=True)
+        logger.info(f"🎯 Notification job {job.pk} completed: {job.sent_count} delivered, {job.failure_count} failed, "
+                    f"{job.deactivated_count} dead tokens deactivated")
+        rate_control = FCMService.rate_snapshot()
+        if rate_control:
+            logger.info(f"📊 FCM rate control: {rate_control}")
+        return 'completed'
+
+    @classmethod
+    def run_once(cls, worker_id: str = None) -> int:
+        """Process due jobs until none is left; returns the number of jobs processed"""
+        worker_id = worker_id or cls.worker_id()
+        processed = 0
+        while True:
+            job = cls.claim(worker_id)
+            if job is None:
+                return processed
+            try:
+                cls.process(job, worker_id)
+            except Exception as e:
+                # Unexpected error: the lease expires and the job is claimed again from its checkpoint
+                logger.error(f"❌ Notification job {job.pk} crashed: {e}")
+                raise
+            processed += 1
@@ -0,0 +1,125 @@
+"""
+People's Prediction Tally Service
+
+People's predictions run in cycles from 3:00 PM IST to the next day's 3:00 PM. Each cycle has
+ten counters, one per digit, kept in PeoplesPredictionTally and mirrored in the cache:
+
+- A prediction bumps its digit's row with a single UPDATE, then increments the cached counter.
+- Reading the top digits is one cache get_many of the ten counters, falling back to the ten
+  rows when the cache is cold. The cache entries are short-lived, so a counter that missed an
+  increment is corrected from the database within minutes.
+
+Expiring old cycles is a scheduled job (`manage.py cleanup_peoples_predictions`, run daily
+after 3:00 PM IST by the lottery-prediction-cleanup cron in render.yaml), never part of a request.
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+from typing import Dict, List
+
+import pytz
+from django.core.cache import cache
+from django.db import models, transaction
+from django.utils import timezone
+
+from results.models import PeoplesPrediction, PeoplesPredictionTally
+
+logger = logging.getLogger('lottery_app')
+
+DIGITS = range(10)
+CYCLE_START = time(15, 0)
+
+
+class PeoplesPredictionService:
+    """
+    Record people's predictions and read the current cycle's tallies in constant time
+    """
+
+    CACHE_PREFIX = 'peoples_prediction_tally'
+    CACHE_TIMEOUT = 300
+
+    @staticmethod
+    def cycle_for(moment=None):
+        """Cycle of a moment: IST date of the 3:00 PM that started it"""
+        ist = pytz.timezone('Asia/Kolkata')
+        current = (moment or timezone.now()).astimezone(ist)
+        if current.time() >= CYCLE_START:
+            return current.date()
+        return current.date() - timedelta(days=1)
+
+    @staticmethod
+    def cycle_start(cycle):
+        ist = pytz.timezone('Asia/Kolkata')
+        return ist.localize(datetime.combine(cycle, CYCLE_START))
+
+    @classmethod
+    def cache_key(cls, cycle, digit):
+        return f"{cls.CACHE_PREFIX}:{cycle.isoformat()}:{digit}"
+
+    @classmethod
+    def record(cls, digit: int, user_ip=None):
+        """Store a prediction and count it in the current cycle's tally"""
+        cycle = cls.cycle_for()
+
+        with transaction.atomic():
+            PeoplesPrediction.objects.create(peoples_prediction=str(digit), user_ip=user_ip)
+
+            updated = PeoplesPredictionTally.objects.filter(cycle=cycle, digit=digit).update(
+                count=models.F('count') + 1
+            )
+            if not updated:
+                # First prediction of the cycle: create its ten rows (once, even when concurrent), then count
+                PeoplesPredictionTally.objects.bulk_create([
+                    PeoplesPredictionTally(cycle=cycle, digit=each_digit) for each_digit in DIGITS
+                ], ignore_conflicts=True)
+                PeoplesPredictionTally.objects.filter(cycle=cycle, digit=digit).update(
+                    count=models.F('count') + 1
+                )
+
+            transaction.on_commit(lambda: cls.increment_cached(cycle, digit))
+
+    @classmethod
+    def increment_cached(cls, cycle, digit):
+        try:
+            cache.incr(cls.cache_key(cycle, digit))
+        except ValueError:
+            # Not cached: the next read loads the counters from the database
+            pass
+        except Exception as e:
+            logger.error(f"Error incrementing people's prediction tally cache: {e}")
+
+    @classmethod
+    def get_tallies(cls, cycle=None) -> Dict[int, int]:
+        """Count of each digit in a cycle (the current one by default)"""
+        cycle = cycle or cls.cycle_for()
+        keys = {cls.cache_key(cycle, digit): digit for digit in DIGITS}
+
+        try:
+            cached = cache.get_many(list(keys))
+        except Exception as e:
+            logger.error(f"Error reading people's prediction tally cache: {e}")
+            cached = {}
+        if len(cached) == len(keys):
+            return {keys[key]: int(count) for key, count in cached.items()}
+
+        tallies = dict.fromkeys(DIGITS, 0)
+        tallies.update(
+            PeoplesPredictionTally.objects.filter(cycle=cycle).values_list('digit', 'count')
+        )
+        try:
+            # add() keeps counters that a concurrent increment already cached
+            for key, digit in keys.items():
+                cache.add(key, tallies[digit], cls.CACHE_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Error caching people's prediction tallies: {e}")
+        return tallies
+
+    @classmethod
+    def get_top_digits(cls, limit=4) -> List[Dict]:
+        """Most predicted digits of the current cycle, as [{"digit": "5", "count": 12}, ...]"""
+        tallies = cls.get_tallies()
+        ranked = sorted(
+            ((digit, count) for digit, count in tallies.items() if count > 0),
+            key=lambda item: (-item[1], item[0])
+        )
+        return [{"digit": str(digit), "count": count} for digit, count in ranked[:limit]]
@@ -0,0 +1,303 @@
+"""
+Prize Archive Service
+
+Number analytics (hot numbers, gaps since last appearance, digit-position frequencies) run over
+every prize ever drawn. Instead of walking PrizeEntry rows through the ORM, published prizes are
+exported to a columnar archive of .npy files, one per column, sorted by draw date:
+
+    date        datetime64[D]   draw date
+    lottery_id  int32           Lottery primary key
+    prize_type  uint8           index of the prize type in PrizeEntry.PRIZE_CHOICES
+    series      S2              series letters (b'' for 4-digit prizes)
+    number      int32           digits of the ticket number (-1 when there are none)
+    last_4      uint16          last 4 digits (MISSING_LAST_4 when there are fewer than 4)
+
+A build writes a new version directory and switches manifest.json to it in one rename. Every
+worker memory-maps the current version read-only, so the pages are shared through the OS page
+cache, and notices a refresh by the manifest's modification time.
+
+The archive lives on the web server's own disk, so the web service builds it itself: once in its
+build command (`manage.py refresh_prize_archive`), then from each process's snapshot regenerator
+thread (see result_snapshot.py), which requests a refresh whenever it re-renders results whose
+prizes changed and builds at most every PRIZE_ARCHIVE_REFRESH_SECONDS, and once at startup.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from results.models import PrizeEntry
+from results.services.prize_frequency import top_slots
+
+logger = logging.getLogger('lottery_app')
+
+PRIZE_TYPES = [prize_type for prize_type, _ in PrizeEntry.PRIZE_CHOICES]
+MISSING_LAST_4 = np.iinfo(np.uint16).max
+TICKET_RE = re.compile(r'^([A-Z]*)[\s-]*([0-9]*)$')
+
+COLUMNS = {
+    'date': 'datetime64[D]',
+    'lottery_id': np.int32,
+    'prize_type': np.uint8,
+    'series': 'S2',
+    'number': np.int32,
+    'last_4': np.uint16,
+}
+
+
+def parse_ticket(ticket_number: str):
+    """(series letters, number or -1, last 4 digits or MISSING_LAST_4) of a ticket number"""
+    match = TICKET_RE.match(str(ticket_number or '').strip().upper())
+    if not match:
+        return b'', -1, MISSING_LAST_4
+    series, digits = match.groups()
+    number = int(digits[-9:]) if digits else -1
+    last_4 = int(digits[-4:]) if len(digits) >= 4 else MISSING_LAST_4
+    return series[:2].encode('ascii'), number, last_4
+
+
+class PrizeArchive:
+    """
+    Read-only view of one archive version. All queries are vectorized over the columns;
+    date ranges are binary searched since rows are sorted by date.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], manifest: Dict):
+        self.columns = columns
+        self.manifest = manifest
+        for name, values in columns.items():
+            setattr(self, name, values)
+
+    def __len__(self):
+        return len(self.date)
+
+    def select(self, start: Optional[date] = None, end: Optional[date] = None,
+               lottery_ids: Optional[Iterable[int]] = None, prize_types: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Row indices of draws between start and end (inclusive) matching the lottery and prize type filters"""
+        low = np.searchsorted(self.date, np.datetime64(start, 'D'), side='left') if start else 0
+        high = np.searchsorted(self.date, np.datetime64(end, 'D'), side='right') if end else len(self)
+        rows = np.arange(low, high)
+
+        if lottery_ids is not None:
+            rows = rows[self.lookup_mask(self.lottery_id[rows], lottery_ids)]
+        if prize_types is not None:
+            rows = rows[self.lookup_mask(self.prize_type[rows], [PRIZE_TYPES.index(prize_type) for prize_type in prize_types])]
+        return rows
+
+    @staticmethod
+    def lookup_mask(values: np.ndarray, allowed: Iterable[int]) -> np.ndarray:
+        """values in allowed, through a lookup table (faster than np.isin on small integer codes)"""
+        allowed = np.fromiter(allowed, dtype=np.int64)
+        size = int(max(values.max(initial=0), allowed.max(initial=0))) + 1
+        table = np.zeros(size, dtype=bool)
+        table[allowed[allowed >= 0]] = True
+        return table[values]
+
+    def last_4_counts(self, rows: np.ndarray) -> np.ndarray:
+        last_4 = self.last_4[rows]
+        return np.bincount(last_4[last_4 != MISSING_LAST_4], minlength=10000)
+
+    def hot_numbers(self, rows: np.ndarray, limit=10) -> List[Dict]:
+        """Most frequent last 4 digits"""
+        return [
+            {"number": f"{slot:04d}", "count": count}
+            for slot, count in top_slots(self.last_4_counts(rows), limit)
+        ]
+
+    def last_seen(self, rows: np.ndarray) -> np.ndarray:
+        """Last draw date of every last 4 digits (NaT for numbers never drawn)"""
+        last_4 = self.last_4[rows]
+        valid = last_4 != MISSING_LAST_4
+        days = self.date[rows][valid].astype(np.int64)
+
+        seen = np.full(10000, np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(seen, last_4[valid], days)
+        # The minimum int64 is NaT
+        return seen.astype('datetime64[D]')
+
+    @staticmethod
+    def gaps(seen: np.ndarray, numbers: Iterable[int], as_of: date) -> List[Dict]:
+        """Days since each number's last appearance (None when never drawn), from last_seen()"""
+        result = []
+        for number in numbers:
+            last = seen[number]
+            result.append({
+                "number": f"{number:04d}",
+                "last_seen": None if np.isnat(last) else str(last),
+                "days_since": None if np.isnat(last) else int((np.datetime64(as_of, 'D') - last).astype(int)),
+            })
+        return result
+
+    @staticmethod
+    def cold_numbers(seen: np.ndarray, as_of: date, limit=10) -> List[Dict]:
+        """Drawn numbers with the longest gap since their last appearance, from last_seen()"""
+        drawn = np.flatnonzero(~np.isnat(seen))
+        if not drawn.size:
+            return []
+        gap_days = (np.datetime64(as_of, 'D') - seen[drawn]).astype(np.int64)
+        return [
+            {"number": f"{drawn[index]:04d}", "last_seen": str(seen[drawn[index]]), "days_since": days}
+            for index, days in top_slots(gap_days, limit, min_count=0)
+        ]
+
+    def digit_positions(self, rows: np.ndarray) -> List[Dict]:
+        """How often each digit was drawn at each of the last 4 positions (thousands to units)"""
+        last_4 = self.last_4[rows]
+        last_4 = last_4[last_4 != MISSING_LAST_4].astype(np.int32)
+        result = []
+        for position, divisor in enumerate((1000, 100, 10, 1), start=1):
+            counts = np.bincount((last_4 // divisor) % 10, minlength=10)
+            result.append({"position": position, "counts": [int(count) for count in counts]})
+        return result
+
+
+class PrizeArchiveService:
+    """
+    Build the columnar prize archive and open it memory-mapped
+    """
+
+    MANIFEST_NAME = 'manifest.json'
+    KEEP_VERSIONS = 2
+
+    _archive = None
+    _manifest_mtime = None
+    _lock = threading.Lock()
+
+    # Refreshes of this process (see refresh_if_due); prizes may have been published since the
+    # archive on disk was built, so the first check after startup builds
+    _refresh_requested = True
+    _last_refresh = None
+
+    @classmethod
+    def get_root(cls) -> Path:
+        return Path(settings.PRIZE_ARCHIVE_ROOT)
+
+    @classmethod
+    def build(cls) -> Dict:
+        """Export all published prizes into a new archive version and make it current"""
+        root = cls.get_root()
+        root.mkdir(parents=True, exist_ok=True)
+
+        queryset = PrizeEntry.objects.filter(lottery_result__is_published=True).order_by(
+            'lottery_result__date', 'lottery_result_id', 'id'
+        ).values_list('lottery_result__date', 'lottery_result__lottery_id', 'prize_type', 'ticket_number')
+        count = queryset.count()
+
+        columns = {name: np.empty(count, dtype=dtype) for name, dtype in COLUMNS.items()}
+        prize_codes = {prize_type: code for code, prize_type in enumerate(PRIZE_TYPES)}
+        rows = 0
+        for draw_date, lottery_id, prize_type, ticket_number in queryset.iterator(chunk_size=5000):
+            if rows == count:
+                break  # Prizes published while exporting go into the next refresh
+            series, number, last_4 = parse_ticket(ticket_number)
+            columns['date'][rows] = draw_date
+            columns['lottery_id'][rows] = lottery_id
+            columns['prize_type'][rows] = prize_codes.get(prize_type, len(PRIZE_TYPES))
+            columns['series'][rows] = series
+            columns['number'][rows] = number
+            columns['last_4'][rows] = last_4
+            rows += 1
+
+        built_at = timezone.now()
+        version = f"{built_at:%Y%m%d%H%M%S%f}-{rows}"
+        manifest = {
+            'version': version,
+            'rows': rows,
+            'built_at': built_at.isoformat(),
+            'latest_date': str(columns['date'][rows - 1]) if rows else None,
+        }
+
+        # Write the version in a temporary directory, then publish it and the manifest by renames
+        tmp_dir = root / f".v{version}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir()
+        for name, values in columns.items():
+            np.save(tmp_dir / f"{name}.npy", values[:rows])
+        os.rename(tmp_dir, root / f"v{version}")
+
+        tmp_manifest = root / f".{cls.MANIFEST_NAME}.{os.getpid()}.tmp"
+        tmp_manifest.write_text(json.dumps(manifest))
+        os.replace(tmp_manifest, root / cls.MANIFEST_NAME)
+
+        cls.prune(root, keep=version)
+        return manifest
+
+    @classmethod
+    def request_refresh(cls):
+        """Published prizes changed: rebuild on the next refresh_if_due()"""
+        cls._refresh_requested = True
+
+    @classmethod
+    def refresh_if_due(cls) -> Optional[Dict]:
+        """
+        Build when a refresh was requested and this process's last build is at least
+        PRIZE_ARCHIVE_REFRESH_SECONDS old, so a live draw's prize writes cost one build per
+        interval. Returns the new manifest, or None when nothing was built.
+        """
+        if not cls._refresh_requested:
+            return None
+        interval = settings.LOTTERY_SETTINGS.get('PRIZE_ARCHIVE_REFRESH_SECONDS', 300)
+        now = time.monotonic()
+        if cls._last_refresh is not None and now - cls._last_refresh < interval:
+            return None
+
+        cls._refresh_requested = False
+        cls._last_refresh = now
+        try:
+            return cls.build()
+        except Exception:
+            cls._refresh_requested = True
+            raise
+
+    @classmethod
+    def prune(cls, root: Path, keep: str):
+        """Remove old versions; the previous ones stay for workers that still map them"""
+        versions = sorted(path for path in root.glob('v*') if path.is_dir())
+        for path in versions[:-cls.KEEP_VERSIONS]:
+            if path.name != f"v{keep}":
+                shutil.rmtree(path, ignore_errors=True)
+
+    @classmethod
+    def get_archive(cls) -> Optional[PrizeArchive]:
+        """Current archive of this process, reopened when a refresh replaced the manifest"""
+        manifest_path = cls.get_root() / cls.MANIFEST_NAME
+        try:
+            mtime = manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        if cls._archive is not None and cls._manifest_mtime == mtime:
+            return cls._archive
+
+        with cls._lock:
+            if cls._archive is None or cls._manifest_mtime != mtime:
+                try:
+                    cls._archive = cls.open(json.loads(manifest_path.read_text()))
+                    cls._manifest_mtime = mtime
+                except Exception as e:
+                    logger.error(f"Error opening prize archive: {e}")
+                    if cls._archive is None:
+                        return None
+        return cls._archive
+
+    @classmethod
+    def open(cls, manifest: Dict) -> PrizeArchive:
+        version_dir = cls.get_root() / f"v{manifest['version']}"
+        # Empty files cannot be memory-mapped
+        mmap_mode = 'r' if manifest['rows'] else None
+        columns = {
+            name: np.load(version_dir / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+            for name in COLUMNS
+        }
+        return PrizeArchive(columns, manifest)
@@ -0,0 +1,181 @@
+"""
+Prize Frequency Service
+
+The prediction endpoint ranks the last 4 digits and last digits that won 4th-10th prizes most
+often over the last 30 / 7 days. Instead of re-reading and string-processing every prize of the
+window per request, each day's counts are kept as fixed-size vectors in DailyPrizeFrequency:
+
+- last 4 digits: 10,000 slots (0000-9999)
+- last digit: 10 slots
+
+A day's vectors are rebuilt when its results are published or their prizes change. A window is
+the sum of its daily vectors (cached per process, keyed by each row's updated_at), and the top
+entries are picked with argpartition, so a request costs the same whatever the history size.
+"""
+
+import logging
+import re
+import threading
+import zlib
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from results.models import DailyPrizeFrequency, PrizeEntry
+from results.utils.on_commit import batch_on_commit
+
+logger = logging.getLogger('lottery_app')
+
+FREQUENCY_PRIZE_TYPES = ['4th', '5th', '6th', '7th', '8th', '9th', '10th']
+LAST_4_SLOTS = 10000
+DIGIT_SLOTS = 10
+CACHE_DAYS = 62  # Daily vectors kept in memory: the longest window with some slack
+
+# ASCII digits only: str.isdigit() also accepts characters like '²' that int() rejects
+LAST_4_RE = re.compile(r'[0-9]{4}\Z')
+ASCII_DIGITS = '0123456789'
+
+
+def pack_counts(counts: np.ndarray) -> bytes:
+    return zlib.compress(counts.astype(np.uint32).tobytes())
+
+
+def unpack_counts(data, size) -> np.ndarray:
+    counts = np.frombuffer(zlib.decompress(bytes(data)), dtype=np.uint32)
+    if counts.size != size:
+        raise ValueError(f'expected {size} counts, got {counts.size}')
+    return counts
+
+
+def top_slots(counts: np.ndarray, limit: int, min_count: int = 1) -> List[Tuple[int, int]]:
+    """
+    Highest (slot, count) pairs, count descending then slot ascending, without sorting every slot:
+    argpartition finds the limit-th largest count, only slots at or above it are sorted.
+    """
+    if limit <= 0 or counts.size == 0:
+        return []
+    limit = min(limit, counts.size)
+    threshold = counts[np.argpartition(counts, counts.size - limit)[counts.size - limit]]
+    threshold = max(int(threshold), min_count)
+
+    above = np.flatnonzero(counts > threshold)
+    above = above[np.lexsort((above, -counts[above].astype(np.int64)))]
+    at_threshold = np.flatnonzero(counts == threshold)[:limit - above.size]
+
+    return [(int(slot), int(counts[slot])) for slot in np.concatenate([above, at_threshold])]
+
+
+class PrizeFrequencyService:
+    """
+    Build daily prize frequency vectors and answer rolling window rankings from them
+    """
+
+    _cache = {}  # date -> (updated_at, last_4_counts, last_digit_counts)
+    _cache_lock = threading.Lock()
+
+    @staticmethod
+    def count_tickets(ticket_numbers: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Last 4 digit and last digit counts of ticket numbers"""
+        last_4 = np.zeros(LAST_4_SLOTS, dtype=np.uint32)
+        last_digit = np.zeros(DIGIT_SLOTS, dtype=np.uint32)
+        for ticket_number in ticket_numbers:
+            if not ticket_number:
+                continue
+            ticket_str = str(ticket_number).strip()
+            if not ticket_str:
+                continue
+            if LAST_4_RE.match(ticket_str[-4:]):
+                last_4[int(ticket_str[-4:])] += 1
+            if ticket_str[-1] in ASCII_DIGITS:
+                last_digit[int(ticket_str[-1])] += 1
+        return last_4, last_digit
+
+    @classmethod
+    def rebuild_day(cls, day: date):
+        """Recompute and store the vectors of one day (removed when the day has no prizes)"""
+        ticket_numbers = list(PrizeEntry.objects.filter(
+            lottery_result__date=day,
+            lottery_result__is_published=True,
+            prize_type__in=FREQUENCY_PRIZE_TYPES
+        ).values_list('ticket_number', flat=True))
+
+        if not ticket_numbers:
+            DailyPrizeFrequency.objects.filter(date=day).delete()
+            return None
+
+        last_4, last_digit = cls.count_tickets(ticket_numbers)
+        frequency, _ = DailyPrizeFrequency.objects.update_or_create(
+            date=day,
+            defaults={
+                'last_4_counts': pack_counts(last_4),
+                'last_digit_counts': pack_counts(last_digit),
+                'prize_count': len(ticket_numbers),
+            }
+        )
+        return frequency
+
+    @classmethod
+    def rebuild_days(cls, days: Iterable[date]):
+        for day in sorted(days):
+            try:
+                cls.rebuild_day(day)
+            except Exception as e:
+                logger.error(f"Error rebuilding prize frequency of {day}: {e}")
+
+    @classmethod
+    def rebuild_on_commit(cls, day: date):
+        """Rebuild a day's vectors once the current transaction commits (batched per day)"""
+        if day:
+            batch_on_commit('prize_frequency_days', [day], cls.rebuild_days)
+
+    @classmethod
+    def get_window(cls, start_date: date) -> Tuple[np.ndarray, np.ndarray]:
+        """Summed last 4 digit and last digit counts of every day from start_date on"""
+        stamps = dict(DailyPrizeFrequency.objects.filter(date__gte=start_date).values_list('date', 'updated_at'))
+
+        with cls._cache_lock:
+            missing = [day for day, updated_at in stamps.items()
+                       if day not in cls._cache or cls._cache[day][0] != updated_at]
+
+        if missing:
+            rows = DailyPrizeFrequency.objects.filter(date__in=missing).values_list(
+                'date', 'updated_at', 'last_4_counts', 'last_digit_counts'
+            )
+            loaded = {
+                day: (updated_at, unpack_counts(last_4, LAST_4_SLOTS), unpack_counts(last_digit, DIGIT_SLOTS))
+                for day, updated_at, last_4, last_digit in rows
+            }
+            with cls._cache_lock:
+                cls._cache.update(loaded)
+
+        last_4 = np.zeros(LAST_4_SLOTS, dtype=np.uint32)
+        last_digit = np.zeros(DIGIT_SLOTS, dtype=np.uint32)
+        with cls._cache_lock:
+            # Forget removed days and days older than any window
+            oldest = date.today() - timedelta(days=CACHE_DAYS)
+            for day in [day for day in cls._cache if day < oldest or (day >= start_date and day not in stamps)]:
+                del cls._cache[day]
+            for day in stamps:
+                if day in cls._cache:
+                    last_4 += cls._cache[day][1]
+                    last_digit += cls._cache[day][2]
+        return last_4, last_digit
+
+    @classmethod
+    def get_repeated_numbers(cls, start_date: date, limit=9) -> List[Dict]:
+        """Last 4 digits that won more than once since start_date, most frequent first"""
+        last_4, _ = cls.get_window(start_date)
+        return [
+            {"number": f"{slot:04d}", "count": count}
+            for slot, count in top_slots(last_4, limit, min_count=2)
+        ]
+
+    @classmethod
+    def get_repeated_single_digits(cls, start_date: date, limit=4) -> List[Dict]:
+        """Most frequent last digits since start_date"""
+        _, last_digit = cls.get_window(start_date)
+        return [
+            {"digit": str(slot), "count": count}
+            for slot, count in top_slots(last_digit, limit, min_count=1)
+        ]
@@ -0,0 +1,82 @@
+"""
+Result Payload Builders
+
+Builds the JSON payloads of the public results endpoints so the API views and the static
+export write exactly the same documents.
+"""
+
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+from results.models import LotteryResult, ImageUpdate, TextUpdate
+from results.serializers import LotteryResultSerializer, ordered_prizes_prefetch
+
+
+def recent_results_queryset(lottery_code=None, result_date=None):
+    """Published results of the last 30 days, newest first"""
+    queryset = LotteryResult.objects.filter(is_published=True).select_related('lottery').prefetch_related(ordered_prizes_prefetch())
+
+    # Filter by lottery code if provided
+    if lottery_code:
+        queryset = queryset.filter(lottery__code=lottery_code)
+
+    # Filter by date if provided
+    if result_date:
+        queryset = queryset.filter(date=result_date)
+
+    # Get results from last 30 days
+    thirty_days_ago = timezone.now().date() - timedelta(days=30)
+    queryset = queryset.filter(date__gte=thirty_days_ago)
+
+    return queryset.order_by('-date', '-created_at')
+
+
+def build_results_list_payload(queryset):
+    """Payload of the results list endpoint"""
+    serializer = LotteryResultSerializer(queryset, many=True)
+
+    # Get image settings from database
+    image_settings = ImageUpdate.get_images()
+
+    # Get active text update from database
+    text_update = TextUpdate.get_active_text()
+
+    return {
+        'status': 'success',
+        'count': queryset.count(),
+        'total_points': 1250,  # Static value since points system removed
+        'text_update': text_update,  # Add text update to response
+        'updates': {
+            "image1": {
+                "image_url": image_settings.update_image1,
+                "redirect_link": image_settings.redirect_link1
+            },
+            "image2": {
+                "image_url": image_settings.update_image2,
+                "redirect_link": image_settings.redirect_link2
+            },
+            "image3": {
+                "image_url": image_settings.update_image3,
+                "redirect_link": image_settings.redirect_link3
+            }
+        },
+        'results': serializer.data
+    }
+
+
+def build_today_results_payload(today=None):
+    """Payload of the today's results endpoint"""
+    today = today or date.today()
+    results = LotteryResult.objects.filter(
+        date=today,
+        is_published=True
+    ).select_related('lottery').prefetch_related(ordered_prizes_prefetch())
+
+    serializer = LotteryResultSerializer(results, many=True)
+    return {
+        'status': 'success',
+        'date': today,
+        'count': results.count(),
+        'results': serializer.data
+    }
@@ -0,0 +1,241 @@
+"""
+Result Snapshot Service
+
+Renders the get-by-unique-id detail payload of a published result once and stores the JSON
+in ResultSnapshot, so share-link opens are served from a single row read.
+
+Result and prize writes mark the snapshot stale in their own transaction, so it is stale from
+the moment the write commits. A stale row carries the result's new updated_at, and a render of
+older data can never store over it. A stale or missing snapshot is never served: the view
+renders the payload itself and stores it.
+
+Each server process starts a regenerator thread (started from asgi.py / wsgi.py), and one of
+them does the work: the first to take a PostgreSQL advisory lock keeps it on its connection and
+re-renders stale snapshots and refreshes the static JSON export and the prize archive, which live
+on the server's own disk. The other threads only poll for the lock, so a publish costs one render,
+one export and one archive build whatever the number of workers, and another process takes over
+within a poll when the runner exits. The runner is woken when a write in its own process commits
+and polls for snapshots marked stale by other processes (other workers, the live scraper,
+management commands). At exit the thread is stopped and joined; whatever it did not get to stays
+stale in the database for the next runner.
+"""
+
+import atexit
+import logging
+import threading
+from typing import Optional
+
+from django.conf import settings
+from django.db import IntegrityError, connection
+from rest_framework.renderers import JSONRenderer
+
+from results.models import LotteryResult, ResultSnapshot
+from results.serializers import LotteryResultDetailSerializer, ordered_prizes_prefetch
+from results.utils.on_commit import batch_on_commit
+
+logger = logging.getLogger('lottery_app')
+
+
+class ResultSnapshotService:
+    """
+    Build, store and serve pre-rendered result detail payloads
+    """
+
+    # pg_try_advisory_lock key held by the process whose regenerator runs
+    RUNNER_LOCK_ID = 5_319_842_077
+
+    # Regenerator thread of this process
+    _thread = None
+    _runner_connection = None  # Database connection holding the runner lock
+    _thread_lock = threading.Lock()
+    _wake = threading.Event()
+    _stop = threading.Event()
+
+    @classmethod
+    def render(cls, lottery_result) -> str:
+        """Render the get-by-unique-id response body of a result"""
+        serializer = LotteryResultDetailSerializer(lottery_result)
+        return JSONRenderer().render({
+            'status': 'success',
+            'result': serializer.data,
+        }).decode('utf-8')
+
+    @classmethod
+    def get_content(cls, unique_id) -> Optional[str]:
+        """Stored JSON of a published result, or None when missing or stale"""
+        return ResultSnapshot.objects.filter(
+            lottery_result__unique_id=unique_id,
+            lottery_result__is_published=True,
+            is_stale=False
+        ).values_list('content', flat=True).first()
+
+    @classmethod
+    def store(cls, lottery_result) -> str:
+        """
+        Render and store the snapshot of a result (prizes should be prefetched).
+        The row is replaced in a single UPDATE so readers see either the old or the new payload,
+        and a render from older data never overwrites a newer one.
+        """
+        content = cls.render(lottery_result)
+        defaults = {
+            'content': content,
+            'source_updated_at': lottery_result.updated_at,
+            'is_stale': False,
+        }
+
+        updated = ResultSnapshot.objects.filter(
+            lottery_result_id=lottery_result.pk,
+            source_updated_at__lte=lottery_result.updated_at
+        ).update(**defaults)
+
+        if not updated and not ResultSnapshot.objects.filter(lottery_result_id=lottery_result.pk).exists():
+            try:
+                ResultSnapshot.objects.create(lottery_result_id=lottery_result.pk, **defaults)
+            except IntegrityError:
+                # Another worker stored it first
+                pass
+
+        return content
+
+    @classmethod
+    def regenerate(cls, lottery_result_ids):
+        """Re-render the snapshots of published results and drop those of unpublished ones"""
+        results = LotteryResult.objects.filter(
+            pk__in=lottery_result_ids
+        ).select_related('lottery').prefetch_related(ordered_prizes_prefetch())
+
+        published_ids = set()
+        details = {}
+        removed = []
+        for lottery_result in results:
+            if lottery_result.is_published:
+                details[str(lottery_result.unique_id)] = cls.store(lottery_result)
+                published_ids.add(lottery_result.pk)
+            else:
+                removed.append(str(lottery_result.unique_id))
+
+        # Unless the result was published again meanwhile
+        ResultSnapshot.objects.filter(
+            lottery_result_id__in=set(lottery_result_ids) - published_ids
+        ).exclude(lottery_result__is_published=True).delete()
+
+        # Publish the same payloads as static files
+        from results.services.static_export import StaticExportService
+        StaticExportService.export(details, removed)
+
+        # Published prizes changed: number analytics need a new archive
+        from results.services.prize_archive import PrizeArchiveService
+        PrizeArchiveService.request_refresh()
+
+        logger.info(f"Result snapshots regenerated: {len(published_ids)} stored, "
+                    f"{len(set(lottery_result_ids)) - len(published_ids)} dropped")
+
+    @classmethod
+    def mark_stale(cls, lottery_result_id, updated_at):
+        """
+        Mark a result's snapshot stale inside the caller's transaction, as of the result's new
+        updated_at. Inserts a stale placeholder for a result without a snapshot, so the worker
+        also exports newly published results.
+        """
+        ResultSnapshot.objects.bulk_create(
+            [ResultSnapshot(lottery_result_id=lottery_result_id, content='', source_updated_at=updated_at, is_stale=True)],
+            update_conflicts=True,
+            unique_fields=['lottery_result'],
+            update_fields=['source_updated_at', 'is_stale'],
+        )
+
+    @classmethod
+    def regenerate_stale(cls, limit=100) -> int:
+        """Re-render the oldest stale snapshots (run by the background worker); returns how many"""
+        lottery_result_ids = list(ResultSnapshot.objects.filter(
+            is_stale=True
+        ).order_by('source_updated_at').values_list('lottery_result_id', flat=True)[:limit])
+        if lottery_result_ids:
+            cls.regenerate(lottery_result_ids)
+        return len(lottery_result_ids)
+
+    @classmethod
+    def wake_on_commit(cls, lottery_result_id):
+        """Wake this process's regenerator once the current transaction commits"""
+        batch_on_commit('result_snapshots', [lottery_result_id], lambda batch: cls._wake.set())
+
+    @classmethod
+    def claim_runner(cls) -> bool:
+        """
+        Whether this thread's process runs the regeneration. The advisory lock is held by the
+        connection that took it until the process exits or the connection drops. Without
+        PostgreSQL every process runs it.
+        """
+        if connection.vendor != 'postgresql':
+            return True
+        connection.ensure_connection()
+        raw = connection.connection
+        if raw is cls._runner_connection and not raw.closed:
+            return True
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [cls.RUNNER_LOCK_ID])
+            if not cursor.fetchone()[0]:
+                return False
+        cls._runner_connection = raw
+        return True
+
+    @classmethod
+    def start_regenerator(cls):
+        with cls._thread_lock:
+            if cls._thread is not None:
+                return
+            cls._stop.clear()
+            cls._wake.set()  # Catch up with snapshots left stale by the previous process
+            cls._thread = threading.Thread(target=cls._run_regenerator, name='SnapshotRegenerator', daemon=True)
+            cls._thread.start()
+        atexit.register(cls.stop_regenerator)
+
+    @classmethod
+    def stop_regenerator(cls):
+        """Let the current regeneration finish (up to SNAPSHOT_SHUTDOWN_SECONDS) and stop the thread"""
+        with cls._thread_lock:
+            thread, cls._thread = cls._thread, None
+        if thread is None:
+            return
+        cls._stop.set()
+        cls._wake.set()
+        thread.join(settings.LOTTERY_SETTINGS.get('SNAPSHOT_SHUTDOWN_SECONDS', 10))
+
+    @classmethod
+    def _run_regenerator(cls, batch_size=100):
+        from results.services.prize_archive import PrizeArchiveService
+
+        poll_interval = settings.LOTTERY_SETTINGS.get('SNAPSHOT_POLL_SECONDS', 10)
+        while not cls._stop.is_set():
+            cls._wake.wait(poll_interval)
+            cls._wake.clear()
+            if cls._stop.is_set():
+                break
+            try:
+                is_runner = cls.claim_runner()
+            except Exception as e:
+                logger.error(f"Snapshot regenerator lock failed: {e}")
+                is_runner = False
+            if not is_runner:
+                # Another process regenerates; keep no idle connection meanwhile
+                connection.close()
+                continue
+
+            try:
+                if cls.regenerate_stale(batch_size) == batch_size:
+                    cls._wake.set()
+            except Exception as e:
+                # The snapshots stay stale and are retried on the next poll. The connection is
+                # reopened, and the runner lock taken again, in case it broke
+                logger.error(f"Snapshot regeneration failed: {e}")
+                connection.close()
+            try:
+                manifest = PrizeArchiveService.refresh_if_due()
+                if manifest:
+                    logger.info(f"Prize archive refreshed: version {manifest['version']}, {manifest['rows']} prizes")
+            except Exception as e:
+                # Still requested, retried on the next poll
+                logger.error(f"Prize archive refresh failed: {e}")
+
+        # Releases the runner lock for the next process
+        connection.close()
@@ -0,0 +1,255 @@
+"""
+Static Results Export Service
+
+Writes the public results payloads to disk as pre-compressed JSON (plain, gzip and brotli) so
+clients and edge caches can fetch them without any app-server work:
+
+    manifest.json                       current version and file URLs (short cache)
+    v<version>/today.json               today's results         (immutable)
+    v<version>/results.json             30-day results list     (immutable)
+    details/<unique_id>.<digest>.json   result detail by unique_id, named by its content (immutable)
+
+Whitenoise indexes public/ once at startup and keeps each file's size and ETag, so a path is
+never written twice: the version is derived from ContentVersion and a new directory appears
+whenever results, prizes or image/text updates change, and a detail whose content changes is
+written under a new name. The manifest is the only mutable file. It lives outside public/
+(RESULTS_MANIFEST_ROOT) and is served by the results.views.serve_results_export view, with the
+URL of every result detail in `result_details`.
+
+Files and version directories are written under unique temporary names (tempfile) and moved in
+place, so readers never see a partially written file and concurrent exporters never touch each
+other's work in progress. Files no longer referenced by the manifest (nor by the one it replaced,
+which clients may still follow) are pruned.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always written
+    brotli = None
+
+from results.models import ContentVersion, LotteryResult, ResultSnapshot
+from results.serializers import ordered_prizes_prefetch
+from results.services.result_payloads import (
+    recent_results_queryset, build_results_list_payload, build_today_results_payload
+)
+
+logger = logging.getLogger('lottery_app')
+
+
+class StaticExportService:
+    """
+    Publish-time exporter of results JSON files
+    """
+
+    MANIFEST_NAME = 'manifest.json'
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        return settings.FEATURE_FLAGS.get('ENABLE_STATIC_EXPORT', False)
+
+    @classmethod
+    def get_export_root(cls) -> Path:
+        return Path(settings.RESULTS_EXPORT_ROOT)
+
+    @classmethod
+    def get_manifest_path(cls) -> Path:
+        return Path(settings.RESULTS_MANIFEST_ROOT) / cls.MANIFEST_NAME
+
+    @classmethod
+    def get_version(cls, today=None) -> str:
+        """Export version: date (payloads depend on it) plus the results and updates content versions"""
+        today = today or timezone.localdate()
+        versions = ContentVersion.get_versions(['results', 'updates'])
+        return f"{today:%Y%m%d}-r{versions['results'][0]}-u{versions['updates'][0]}"
+
+    @staticmethod
+    def version_key(version: str):
+        """Sortable key of a version label like 20261017-r12-u3"""
+        day, results, updates = version.split('-')
+        return int(day), int(results[1:]), int(updates[1:])
+
+    @classmethod
+    def write_file(cls, path: Path, content: bytes):
+        """Write a JSON file with its .gz and .br variants, each replaced atomically"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        variants = [(path, content), (Path(f"{path}.gz"), gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((Path(f"{path}.br"), brotli.compress(content, quality=11)))
+
+        for variant_path, data in variants:
+            fd, tmp_path = tempfile.mkstemp(dir=variant_path.parent, prefix=f".{variant_path.name}.", suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, variant_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    @classmethod
+    def render(cls, payload) -> bytes:
+        return JSONRenderer().render(payload)
+
+    @classmethod
+    def detail_name(cls, unique_id: str, content: bytes) -> str:
+        """Path of a detail file relative to the export root, named by its content"""
+        return f"details/{unique_id}.{hashlib.sha256(content).hexdigest()[:16]}.json"
+
+    @classmethod
+    def export_details(cls, root: Path, details: Dict[str, str]) -> Dict[str, str]:
+        """Write detail files ({unique_id: rendered JSON}) not written yet; returns {unique_id: URL}"""
+        urls = {}
+        for unique_id, content in details.items():
+            content = content.encode('utf-8')
+            name = cls.detail_name(unique_id, content)
+            if not (root / name).exists():
+                cls.write_file(root / name, content)
+            urls[unique_id] = settings.RESULTS_EXPORT_URL + name
+        return urls
+
+    @classmethod
+    def export_lists(cls, root: Path, version: str):
+        """Write today's results and the 30-day list into the version directory"""
+        version_dir = root / f"v{version}"
+        if version_dir.exists():
+            return
+
+        # Build in a temporary directory and move it in place in one rename
+        root.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=root, prefix=f".v{version}.", suffix='.tmp'))
+        try:
+            cls.write_file(tmp_dir / 'today.json', cls.render(build_today_results_payload()))
+            cls.write_file(tmp_dir / 'results.json', cls.render(build_results_list_payload(recent_results_queryset())))
+            os.chmod(tmp_dir, 0o755)
+            os.rename(tmp_dir, version_dir)
+        except OSError:
+            # Another exporter published this version first
+            if not version_dir.exists():
+                raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def read_manifest(cls) -> Optional[Dict]:
+        try:
+            with open(cls.get_manifest_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def write_manifest(cls, version: str, detail_urls: Dict[str, str]) -> Optional[Dict]:
+        """Point the manifest at a version, unless a newer one is already published"""
+        current = cls.read_manifest()
+        if current and cls.version_key(current['version']) > cls.version_key(version):
+            return None
+
+        base_url = settings.RESULTS_EXPORT_URL
+        manifest = {
+            'version': version,
+            'generated_at': timezone.now().isoformat(),
+            'today': f"{base_url}v{version}/today.json",
+            'results': f"{base_url}v{version}/results.json",
+            'result_details': detail_urls,
+        }
+        cls.write_file(cls.get_manifest_path(), json.dumps(manifest).encode('utf-8'))
+        return manifest
+
+    @classmethod
+    def prune_details(cls, root: Path, detail_urls: Iterable[str]):
+        """Remove detail files none of the given URLs points to"""
+        base_url = settings.RESULTS_EXPORT_URL
+        keep = {url[len(base_url):] for url in detail_urls if url.startswith(base_url)}
+        details_dir = root / 'details'
+        if not details_dir.is_dir():
+            return
+        for path in details_dir.iterdir():
+            if path.name.startswith('.'):
+                # Another exporter's file in progress
+                continue
+            name = path.name
+            for suffix in ('.gz', '.br'):
+                name = name.removesuffix(suffix)
+            if f"details/{name}" not in keep:
+                path.unlink(missing_ok=True)
+
+    @classmethod
+    def prune_versions(cls, root: Path, keep: int):
+        """Keep only the newest version directories (clients may still follow an older manifest)"""
+        version_dirs = sorted(
+            (path for path in root.glob('v*') if path.is_dir()),
+            key=lambda path: cls.version_key(path.name[1:])
+        )
+        for path in version_dirs[:-keep]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    @classmethod
+    def export(cls, details: Dict[str, str], removed: Iterable[str] = ()):
+        """Publish-time export: changed details, the current version's lists and the manifest"""
+        if not cls.is_enabled():
+            return None
+
+        root = cls.get_export_root()
+        version = cls.get_version()
+
+        previous = cls.read_manifest() or {}
+        previous_urls = dict(previous.get('result_details', {}))
+        for unique_id in removed:
+            # Details of unpublished results go right away
+            previous_urls.pop(unique_id, None)
+        detail_urls = {**previous_urls, **cls.export_details(root, details)}
+
+        cls.export_lists(root, version)
+        if cls.write_manifest(version, detail_urls):
+            cls.prune_details(root, [*detail_urls.values(), *previous_urls.values()])
+        cls.prune_versions(root, settings.LOTTERY_SETTINGS.get('EXPORT_KEEP_VERSIONS', 3))
+
+        logger.info(f"Static results export {version}: {len(details)} details written")
+        return version
+
+    @classmethod
+    def rebuild(cls) -> Dict:
+        """Export every published result and point the manifest at the current version"""
+        root = cls.get_export_root()
+        root.mkdir(parents=True, exist_ok=True)
+
+        from results.services.result_snapshot import ResultSnapshotService
+
+        snapshots = dict(ResultSnapshot.objects.filter(
+            lottery_result__is_published=True,
+            is_stale=False
+        ).values_list('lottery_result__unique_id', 'content'))
+
+        details = {}
+        results = LotteryResult.objects.filter(
+            is_published=True
+        ).select_related('lottery').prefetch_related(ordered_prizes_prefetch())
+        for lottery_result in results.iterator(chunk_size=100):
+            content = snapshots.get(lottery_result.unique_id) or ResultSnapshotService.render(lottery_result)
+            details[str(lottery_result.unique_id)] = content
+
+        version = cls.get_version()
+        previous = cls.read_manifest() or {}
+        detail_urls = cls.export_details(root, details)
+        cls.export_lists(root, version)
+        if cls.write_manifest(version, detail_urls):
+            cls.prune_details(root, [*detail_urls.values(), *previous.get('result_details', {}).values()])
+
+        logger.info(f"Static results export rebuilt: {version} ({len(details)} details)")
+        return {'version': version, 'details': len(details), 'brotli': brotli is not None}
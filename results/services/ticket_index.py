@@ -0,0 +1,232 @@
+"""
+Winning Ticket Index Service
+
+Keeps a per-worker, in-memory index of the winning tickets of each LotteryResult so
+ticket checks can be resolved without querying PrizeEntry on every scan.
+
+The index for a result is built once (one query) the first time a worker checks a ticket
+against it, and is stamped with the result's updated_at. Every PrizeEntry write bumps
+LotteryResult.updated_at (see signals.py), so a worker notices stale prizes by comparing
+the stamp with the LotteryResult row it has already loaded - no extra round trip.
+
+Ticket ranges and series patterns (agents checking a whole bundle) are matched with NumPy:
+tickets are encoded as integers (series * 1,000,000 + number) and compared against sorted
+arrays of the encoded winning tickets and last 4 digits, without a Python loop per ticket.
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from results.models import PrizeEntry
+
+logger = logging.getLogger('lottery_app')
+
+# Series letters printed on Kerala lottery tickets (I is skipped)
+SERIES_LETTERS = 'ABCDEFGHJKLM'
+
+# ASCII digits only: \d and str.isdigit() also accept other scripts' digits and characters like '²'
+FULL_TICKET_RE = re.compile(r'^([A-Z])([A-Z])([0-9]{6})\Z')
+LAST_4_RE = re.compile(r'[0-9]{4}\Z')
+
+# AB123456, AB123400-AB123499, AB123400-123499, A*123456, A*123400-A*123499
+TICKET_PATTERN_RE = re.compile(r'^([A-Z])([A-Z*])([0-9]{6})(?:-(?:([A-Z])([A-Z*]))?([0-9]{6}))?\Z')
+
+
+def encode_ticket(ticket_number: str):
+    """Integer code of a full ticket number like AB123456, or None for other formats"""
+    match = FULL_TICKET_RE.match(ticket_number)
+    if not match:
+        return None
+    code, series, number = match.groups()
+    return ((ord(code) - 65) * 26 + ord(series) - 65) * 1_000_000 + int(number)
+
+
+def decode_ticket(ticket_code: int) -> str:
+    series_index, number = divmod(ticket_code, 1_000_000)
+    code, series = divmod(series_index, 26)
+    return f"{chr(65 + code)}{chr(65 + series)}{number:06d}"
+
+
+def lookup_sorted(values: np.ndarray, sorted_values: np.ndarray) -> np.ndarray:
+    """Vectorized binary search: position of each value in sorted_values, or -1 when absent"""
+    if not len(sorted_values):
+        return np.full(len(values), -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return np.where(sorted_values[positions] == values, positions, -1)
+
+
+def is_ticket_pattern(ticket_number: str) -> bool:
+    return '-' in ticket_number or '*' in ticket_number
+
+
+def expand_ticket_pattern(pattern: str, max_tickets: int) -> np.ndarray:
+    """
+    Integer codes of every ticket covered by a range or series pattern.
+    Raises ValueError for malformed patterns or ones covering more than max_tickets tickets.
+    """
+    match = TICKET_PATTERN_RE.match(pattern.replace(' ', ''))
+    if not match:
+        raise ValueError(f"Invalid ticket range or series pattern: {pattern}")
+
+    code, series, start, end_code, end_series, end = match.groups()
+    if end_code is not None and (end_code, end_series) != (code, series):
+        raise ValueError("A ticket range must start and end in the same series")
+
+    start = int(start)
+    end = int(end) if end is not None else start
+    if end < start:
+        raise ValueError("A ticket range must end after it starts")
+
+    series_letters = SERIES_LETTERS if series == '*' else series
+    total = len(series_letters) * (end - start + 1)
+    if total > max_tickets:
+        raise ValueError(f"Ticket range covers {total:,} tickets (max {max_tickets:,})")
+
+    series_indexes = np.array(
+        [(ord(code) - 65) * 26 + ord(letter) - 65 for letter in series_letters],
+        dtype=np.int64
+    )
+    numbers = np.arange(start, end + 1, dtype=np.int64)
+    return (series_indexes[:, None] * 1_000_000 + numbers[None, :]).ravel()
+
+
+class WinningTicketIndex:
+    """
+    Hash maps from full ticket number and from last 4 digits to the prize rows of one result
+
+    Prize rows are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, lottery_result_id, version, prizes):
+        self.lottery_result_id = lottery_result_id
+        self.version = version
+        self.full_tickets: Dict[str, List[PrizeEntry]] = {}
+        self.last_4_tickets: Dict[str, List[PrizeEntry]] = {}
+
+        for prize in prizes:
+            self.full_tickets.setdefault(prize.ticket_number, []).append(prize)
+            # 4th-10th prizes are stored as 4 digit numbers and are won on the last 4 digits
+            if len(prize.ticket_number) == 4:
+                self.last_4_tickets.setdefault(prize.ticket_number, []).append(prize)
+
+        # Sorted integer codes (and the prize rows at each position) for vectorized range matching
+        full_codes = sorted(
+            (code, prizes) for code, prizes in (
+                (encode_ticket(ticket_number), prizes) for ticket_number, prizes in self.full_tickets.items()
+            )
+            if code is not None
+        )
+        last_4_codes = sorted(
+            (int(digits), prizes) for digits, prizes in self.last_4_tickets.items() if LAST_4_RE.match(digits)
+        )
+        self.full_codes = np.array([code for code, _ in full_codes], dtype=np.int64)
+        self.full_code_prizes = [prizes for _, prizes in full_codes]
+        self.last_4_codes = np.array([code for code, _ in last_4_codes], dtype=np.int64)
+        self.last_4_code_prizes = [prizes for _, prizes in last_4_codes]
+
+    def __len__(self):
+        return sum(len(prizes) for prizes in self.full_tickets.values())
+
+    def match(self, ticket_number: str) -> Tuple[List[PrizeEntry], List[PrizeEntry]]:
+        """
+        Returns (full_matches, last_4_matches) for a ticket number.
+        Last 4 digit matches exclude the rows already matched on the full ticket number.
+        """
+        last_4_digits = ticket_number[-4:] if len(ticket_number) >= 4 else ticket_number
+
+        full_matches = self.full_tickets.get(ticket_number, [])
+        if last_4_digits == ticket_number:
+            return list(full_matches), []
+
+        return list(full_matches), list(self.last_4_tickets.get(last_4_digits, []))
+
+    def match_positions(self, ticket_codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorized match of encoded tickets. Returns the indexes of the winning tickets and,
+        for each, its position in full_codes and in last_4_codes (-1 when not matched there).
+        """
+        full_positions = lookup_sorted(ticket_codes, self.full_codes)
+        last_4_positions = lookup_sorted(ticket_codes % 10000, self.last_4_codes)
+        winners = np.flatnonzero((full_positions >= 0) | (last_4_positions >= 0))
+        return winners, full_positions[winners], last_4_positions[winners]
+
+    def match_codes(self, ticket_codes: np.ndarray) -> List[Tuple[str, List[PrizeEntry], List[PrizeEntry]]]:
+        """
+        Match encoded tickets in bulk. Returns (ticket_number, full_matches, last_4_matches)
+        for the winning tickets only, in input order.
+        """
+        winners, full_positions, last_4_positions = self.match_positions(ticket_codes)
+
+        # Only the winners go back to Python for their prize rows
+        return [
+            (
+                decode_ticket(ticket_code),
+                list(self.full_code_prizes[full_position]) if full_position >= 0 else [],
+                list(self.last_4_code_prizes[last_4_position]) if last_4_position >= 0 else [],
+            )
+            for ticket_code, full_position, last_4_position
+            in zip(ticket_codes[winners].tolist(), full_positions.tolist(), last_4_positions.tolist())
+        ]
+
+
+class TicketIndexService:
+    """
+    Per-worker registry of WinningTicketIndex objects keyed by LotteryResult id
+    """
+
+    # Only the most recently checked draws are kept in memory
+    MAX_CACHED_RESULTS = 64
+
+    _indexes: "OrderedDict[int, WinningTicketIndex]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def build_index(cls, lottery_result) -> WinningTicketIndex:
+        """Load all prize rows of a result in a single query and index them"""
+        prizes = PrizeEntry.objects.filter(lottery_result_id=lottery_result.pk).order_by('id')
+        index = WinningTicketIndex(lottery_result.pk, lottery_result.updated_at, prizes)
+        logger.debug(f"Built winning ticket index for result {lottery_result.pk} ({len(index)} prizes)")
+        return index
+
+    @classmethod
+    def get_index(cls, lottery_result) -> WinningTicketIndex:
+        """Get the index for a result, rebuilding it if the result's prizes changed since it was built"""
+        with cls._lock:
+            index = cls._indexes.get(lottery_result.pk)
+            if index is not None and index.version == lottery_result.updated_at:
+                cls._indexes.move_to_end(lottery_result.pk)
+                return index
+
+        index = cls.build_index(lottery_result)
+
+        with cls._lock:
+            cls._indexes[lottery_result.pk] = index
+            cls._indexes.move_to_end(lottery_result.pk)
+            while len(cls._indexes) > cls.MAX_CACHED_RESULTS:
+                cls._indexes.popitem(last=False)
+
+        return index
+
+    @classmethod
+    def find_wins(cls, ticket_number: str, lottery_result) -> Tuple[List[PrizeEntry], List[PrizeEntry]]:
+        """Resolve (full_matches, last_4_matches) for a ticket against a result"""
+        return cls.get_index(lottery_result).match(ticket_number)
+
+    @classmethod
+    def find_wins_bulk(cls, ticket_codes: np.ndarray, lottery_result) -> List[Tuple[str, List[PrizeEntry], List[PrizeEntry]]]:
+        """Resolve the winning tickets among encoded ticket numbers (see expand_ticket_pattern)"""
+        return cls.get_index(lottery_result).match_codes(ticket_codes)
+
+    @classmethod
+    def invalidate(cls, lottery_result_id=None):
+        """Drop the index of one result in this worker (or all indexes when no id is given)"""
+        with cls._lock:
+            if lottery_result_id is None:
+                cls._indexes.clear()
+            else:
+                cls._indexes.pop(lottery_result_id, None)
@@ -0,0 +1,107 @@
+"""
+FCM Token Maintenance
+
+After each send batch the per-token outcomes are applied to FcmToken in set-based statements,
+chunked to TOKEN_UPDATE_CHUNK_SIZE tokens:
+
+    UPDATE fcm_tokens SET is_active = false WHERE is_active AND fcm_token IN (...)   -- dead tokens
+    UPDATE fcm_tokens SET last_used = now() WHERE fcm_token IN (...)                -- delivered
+
+Dead tokens are the ones FCM answered UNREGISTERED or SENDER_ID_MISMATCH for, or INVALID_ARGUMENT
+naming the registration token (see SendResult.outcome); once deactivated, later fan-outs no longer
+send to them.
+
+When most of a batch fails with one and the same INVALID_ARGUMENT error, the message is what FCM
+rejects, not the tokens: nothing of the batch is deactivated and the caller is told to stop.
+"""
+
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.utils import timezone
+
+from results.models import FcmToken
+from results.services.fcm_transport import INVALID_ARGUMENT
+
+logger = logging.getLogger('lottery_app')
+
+
+class TokenMaintenanceService:
+    """
+    Apply send outcomes to FcmToken rows
+    """
+
+    # Smaller batches are too few tokens to tell a bad message from bad tokens
+    PAYLOAD_ERROR_MIN_BATCH = 10
+
+    @staticmethod
+    def get_chunk_size() -> int:
+        return settings.LOTTERY_SETTINGS.get('TOKEN_UPDATE_CHUNK_SIZE', 1000)
+
+    @staticmethod
+    def chunks(tokens: List[str], size: int) -> Iterable[List[str]]:
+        for start in range(0, len(tokens), size):
+            yield tokens[start:start + size]
+
+    @classmethod
+    def deactivate(cls, tokens: List[str]) -> int:
+        """Deactivate dead tokens; returns how many were still active"""
+        deactivated = 0
+        for chunk in cls.chunks(tokens, cls.get_chunk_size()):
+            deactivated += FcmToken.objects.filter(is_active=True, fcm_token__in=chunk).update(is_active=False)
+        return deactivated
+
+    @classmethod
+    def mark_delivered(cls, tokens: List[str]) -> int:
+        """Stamp last_used on delivered tokens"""
+        now = timezone.now()
+        stamped = 0
+        for chunk in cls.chunks(tokens, cls.get_chunk_size()):
+            stamped += FcmToken.objects.filter(fcm_token__in=chunk).update(last_used=now)
+        return stamped
+
+    @classmethod
+    def payload_error(cls, outcome: Dict) -> str:
+        """The INVALID_ARGUMENT error shared by most of a batch's tokens, or ''"""
+        error_codes = outcome.get('error_codes', {})
+        batch_size = sum(len(outcome.get(name, [])) for name in ('delivered', 'invalid', 'rejected', 'retry'))
+        if batch_size < cls.PAYLOAD_ERROR_MIN_BATCH:
+            return ''
+        errors = Counter(
+            outcome.get('errors', {}).get(token, '') for token in outcome['invalid'] + outcome.get('rejected', [])
+            if error_codes.get(token) == INVALID_ARGUMENT
+        )
+        if not errors:
+            return ''
+        error, count = errors.most_common(1)[0]
+        return error if count * 2 > batch_size else ''
+
+    @classmethod
+    def apply(cls, outcome: Dict) -> Dict:
+        """
+        Apply a send_to_tokens outcome; returns the deactivated and stamped counts, the failed
+        tokens per error code and the payload error ('' unless FCM rejected the message itself)
+        """
+        payload_error = cls.payload_error(outcome)
+        if payload_error:
+            logger.error(f"❌ FCM rejected the message for most of a batch, no token deactivated: {payload_error}")
+            deactivated = 0
+        else:
+            deactivated = cls.deactivate(outcome['invalid']) if outcome['invalid'] else 0
+        stamped = cls.mark_delivered(outcome['delivered']) if outcome['delivered'] else 0
+        if deactivated:
+            logger.info(f"🧹 Deactivated {deactivated} dead FCM tokens")
+        return {
+            'deactivated': deactivated,
+            'stamped': stamped,
+            'error_counts': Counter(outcome.get('error_codes', {}).values()),
+            'payload_error': payload_error,
+        }
+
+    @staticmethod
+    def merge_error_counts(counts: Dict[str, int], more: Dict[str, int]) -> Dict[str, int]:
+        merged = Counter(counts)
+        merged.update(more)
+        return dict(merged)
@@ -0,0 +1,38 @@
+"""
+FCM Token Streaming
+
+Fan-outs enumerate active FcmToken rows with keyset pagination on the primary key
+(`WHERE id > last_id ORDER BY id LIMIT n`), so every batch is one index range scan whatever
+its position, instead of an ever larger OFFSET over a re-sliced queryset. The notification
+outbox worker reads one batch at a time from its checkpointed cursor, so memory stays at one
+batch whether there are 10k or 2M tokens.
+"""
+
+from typing import Iterator, List, Optional, Tuple
+
+from results.models import FcmToken
+
+TokenBatch = List[Tuple[int, str]]
+
+
+def active_tokens():
+    return FcmToken.objects.filter(is_active=True, notifications_enabled=True)
+
+
+def fetch_token_batch(queryset, after_id: int, batch_size: int, max_id: Optional[int] = None) -> TokenBatch:
+    """Next (id, fcm_token) pairs after after_id, in id order"""
+    queryset = queryset.filter(id__gt=after_id)
+    if max_id is not None:
+        queryset = queryset.filter(id__lte=max_id)
+    return list(queryset.order_by('id').values_list('id', 'fcm_token')[:batch_size])
+
+
+def iter_token_batches(queryset=None, batch_size=500, after_id=0, max_id=None) -> Iterator[TokenBatch]:
+    """Keyset-paginated batches of (id, fcm_token), active tokens by default"""
+    queryset = active_tokens() if queryset is None else queryset
+    while True:
+        batch = fetch_token_batch(queryset, after_id, batch_size, max_id)
+        if not batch:
+            return
+        yield batch
+        after_id = batch[-1][0]
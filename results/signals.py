@@ -1,11 +1,31 @@
 import logging
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.db import transaction
 from django.dispatch import receiver
-from .models import LotteryResult
-from .services.fcm_service import FCMService
+from django.utils import timezone
+from .models import LotteryResult, PrizeEntry, News, LiveVideo, ImageUpdate, TextUpdate, ContentVersion, ResultChange
+from .models import LiveScrapingSession
+from .services.notification_outbox import NotificationOutboxService
+from .services.ticket_index import TicketIndexService
+from .services.result_snapshot import ResultSnapshotService
+from .services.live_events import LiveEventService
+from .services.prize_frequency import PrizeFrequencyService
+from .utils.response_cache import invalidate_tags_on_commit
 
 logger = logging.getLogger('lottery_app')
 
+
+def result_cache_tags(unique_id, lottery_code):
+    """Response cache tags covering a single lottery result"""
+    return ['results', f'lottery:{lottery_code}', f'result:{unique_id}']
+
+
+def result_content_changed(unique_id, lottery_code):
+    """Invalidate cached responses and bump the results content version after a result/prize write"""
+    invalidate_tags_on_commit(*result_cache_tags(unique_id, lottery_code))
+    ContentVersion.bump_on_commit('results')
+
+
 # Single consolidated signal handler for all LotteryResult operations
 @receiver(pre_save, sender=LotteryResult)
 def lottery_result_pre_save_handler(sender, instance, **kwargs):
@@ -18,14 +38,17 @@ def lottery_result_pre_save_handler(sender, instance, **kwargs):
             instance._original_published = old_instance.is_published
             instance._original_results_ready = old_instance.results_ready_notification
             instance._original_notification_sent = old_instance.notification_sent
+            instance._original_date = old_instance.date
         except LotteryResult.DoesNotExist:
             instance._original_published = False
             instance._original_results_ready = False
             instance._original_notification_sent = False
+            instance._original_date = None
     else:
         instance._original_published = False
         instance._original_results_ready = False
         instance._original_notification_sent = False
+        instance._original_date = None
 
 @receiver(post_save, sender=LotteryResult)
 def lottery_result_post_save_handler(sender, instance, created, **kwargs):
@@ -34,6 +57,20 @@ def lottery_result_post_save_handler(sender, instance, created, **kwargs):
     """
     try:
         # 1. Cache invalidation
+        result_content_changed(instance.unique_id, instance.lottery.code)
+        ResultChange.record_on_commit('result', instance.pk, instance.pk, 'upsert')
+
+        # Re-render the stored detail payload on publish and on edits of a published result
+        if instance.is_published or getattr(instance, '_original_published', False):
+            ResultSnapshotService.mark_stale(instance.pk, instance.updated_at)
+            ResultSnapshotService.wake_on_commit(instance.pk)
+
+            # Prize frequency vectors of the result's day (and of its old day when the date moved)
+            PrizeFrequencyService.rebuild_on_commit(instance.date)
+            original_date = getattr(instance, '_original_date', None)
+            if original_date and original_date != instance.date:
+                PrizeFrequencyService.rebuild_on_commit(original_date)
+
         if instance.is_published:
             try:
                 from results.utils.cache_utils import invalidate_prediction_cache
@@ -43,112 +80,102 @@ def lottery_result_post_save_handler(sender, instance, created, **kwargs):
             except Exception as e:
                 logger.error(f"Failed to invalidate cache: {e}")
 
-        # 2. Handle notifications
-        if created:
-            # New result created - send notification only if published
-            if instance.is_published:
-                logger.info(f"New lottery result created and published: {instance.lottery.name}")
-
-                # PERFORMANCE FIX: Send asynchronously
-                import threading
-
-                def send_new_result_async():
-                    try:
-                        result = FCMService.send_new_result_notification(instance.lottery.name)
-                        logger.info(f"Background new result notification sent: {result}")
-                    except Exception as e:
-                        logger.error(f"Background new result notification failed: {e}")
-
-                threading.Thread(
-                    target=send_new_result_async,
-                    name=f"NewResultThread-{instance.lottery.name}",
-                    daemon=True
-                ).start()
-
-                logger.info(f"New result notification queued in background")
-        else:
-            # Existing result updated
-
-            # Check if is_published changed from False to True
-
-
-
-            if (hasattr(instance, '_original_published') and
-                not instance._original_published and
-                instance.is_published):
-
-                logger.info(f"Lottery result published (False→True): {instance.lottery.name}")
-
-                # PERFORMANCE FIX: Send asynchronously
-                import threading
+        # 2. Queue notifications (sent by `manage.py run_notification_worker`, never by this request).
+        # The jobs are written in the publish's transaction, so they exist exactly when the publish commits.
+        newly_published = instance.is_published and (created or not getattr(instance, '_original_published', False))
+        if newly_published:
+            logger.info(f"Lottery result published: {instance.lottery.name}")
+            with transaction.atomic():
+                job = NotificationOutboxService.enqueue_new_result(instance)
+            logger.info(f"New result notification queued: job {job.pk}")
+
+        # Send the result ready notification if the checkbox is checked and it was not sent yet
+        if not created and (instance.results_ready_notification and
+            not instance.notification_sent and
+            instance.is_published):
+
+            logger.info(f"Result ready notification triggered: {instance.lottery.name}")
+            with transaction.atomic():
+                job = NotificationOutboxService.enqueue_result_ready(instance)
+            if job:
+                logger.info(f"Result ready notification queued: job {job.pk}")
 
-                def send_publication_async():
-                    try:
-                        result = FCMService.send_new_result_notification(instance.lottery.name)
-                        logger.info(f"Background publication notification sent: {result}")
-                    except Exception as e:
-                        logger.error(f"Background publication notification failed: {e}")
-
-                threading.Thread(
-                    target=send_publication_async,
-                    name=f"PublicationThread-{instance.lottery.name}",
-                    daemon=True
-                ).start()
-
-                logger.info(f"Publication notification queued in background")
+    except Exception as e:
+        logger.error(f"Error in lottery_result_post_save_handler: {e}")
+        import traceback
+        logger.error(f"Full traceback: {traceback.format_exc()}")
 
-            # Check if results_ready_notification was just checked
-            # Simplified logic: send notification if checkbox is checked and not already sent
-            if (instance.results_ready_notification and
-                not instance.notification_sent and
-                instance.is_published):
 
-                # For existing records, only send if this is a new request
-                should_send = True
-                if hasattr(instance, '_original_results_ready'):
-                    # If notification was already requested before, don't send again
-                    if instance._original_results_ready and getattr(instance, '_original_notification_sent', False):
-                        should_send = False
+@receiver(post_save, sender=PrizeEntry)
+@receiver(post_delete, sender=PrizeEntry)
+def prize_entry_changed_handler(sender, instance, **kwargs):
+    """
+    Bump the parent result's updated_at whenever a prize is added, edited or removed.
+    Workers compare it with the stamp of their winning ticket index to detect stale prizes.
+    """
+    try:
+        updated_at = timezone.now()
+        LotteryResult.objects.filter(pk=instance.lottery_result_id).update(updated_at=updated_at)
+        TicketIndexService.invalidate(instance.lottery_result_id)
+
+        # Feed the delta-sync change log (admin forms, auto_save_ticket and the live scraper all write through here)
+        action = 'delete' if kwargs.get('signal') is post_delete else 'upsert'
+        ResultChange.record_on_commit('prize', instance.pk, instance.lottery_result_id, action)
+
+        # Push new prizes to live draw streams
+        if kwargs.get('created'):
+            LiveEventService.prize_created_on_commit(instance.pk)
+
+        result = LotteryResult.objects.filter(
+            pk=instance.lottery_result_id
+        ).values('unique_id', 'lottery__code', 'date', 'is_published').first()
+        if result:
+            result_content_changed(result['unique_id'], result['lottery__code'])
+            if result['is_published']:
+                ResultSnapshotService.mark_stale(instance.lottery_result_id, updated_at)
+                ResultSnapshotService.wake_on_commit(instance.lottery_result_id)
+                PrizeFrequencyService.rebuild_on_commit(result['date'])
+    except Exception as e:
+        logger.error(f"Error in prize_entry_changed_handler: {e}")
 
-                if should_send:
-                    logger.info(f"Result ready notification triggered: {instance.lottery.name}")
 
-                    # PERFORMANCE FIX: Send notifications asynchronously in background
-                    # This makes admin interface respond immediately
-                    import threading
+@receiver(post_save, sender=LiveScrapingSession)
+def live_session_changed_handler(sender, instance, **kwargs):
+    """Push scraping status and poll stats to live draw streams"""
+    if instance.lottery_result_id:
+        LiveEventService.session_changed_on_commit(instance.pk)
 
-                    def send_notification_async():
-                        """Background thread function for sending notifications"""
-                        try:
-                            logger.info(f"Starting background notification for: {instance.lottery.name}")
 
-                            result = FCMService.send_result_ready_notification(
-                                instance.lottery.name,
-                                instance.draw_number
-                            )
+@receiver(post_delete, sender=LotteryResult)
+def lottery_result_deleted_handler(sender, instance, **kwargs):
+    """Drop cached responses of a deleted result"""
+    try:
+        TicketIndexService.invalidate(instance.pk)
+        result_content_changed(instance.unique_id, instance.lottery.code)
+        ResultChange.record_on_commit('result', instance.pk, instance.pk, 'delete')
+        if instance.is_published:
+            PrizeFrequencyService.rebuild_on_commit(instance.date)
+    except Exception as e:
+        logger.error(f"Error in lottery_result_deleted_handler: {e}")
 
-                            # Mark as sent after successful delivery
-                            LotteryResult.objects.filter(pk=instance.pk).update(notification_sent=True)
 
-                            logger.info(f"Background notification completed: {result}")
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def news_changed_handler(sender, instance, **kwargs):
+    invalidate_tags_on_commit('news')
+    ContentVersion.bump_on_commit('news')
 
-                        except Exception as e:
-                            logger.error(f"Background notification failed: {e}")
-                            # Don't mark as sent if failed, so admin can retry
 
-                    # Start background thread (non-blocking)
-                    notification_thread = threading.Thread(
-                        target=send_notification_async,
-                        name=f"NotificationThread-{instance.lottery.name}-{instance.pk}",
-                        daemon=True  # Thread dies when main process exits
-                    )
-                    notification_thread.start()
-
-                    logger.info(f"Notification queued in background for: {instance.lottery.name}")
-                # Admin interface returns immediately here!
+@receiver(post_save, sender=LiveVideo)
+@receiver(post_delete, sender=LiveVideo)
+def live_video_changed_handler(sender, instance, **kwargs):
+    invalidate_tags_on_commit('live_videos')
 
-    except Exception as e:
-        logger.error(f"Error in lottery_result_post_save_handler: {e}")
-        import traceback
-        logger.error(f"Full traceback: {traceback.format_exc()}")
 
+@receiver(post_save, sender=ImageUpdate)
+@receiver(post_save, sender=TextUpdate)
+@receiver(post_delete, sender=TextUpdate)
+def updates_changed_handler(sender, instance, **kwargs):
+    """Image and text updates are embedded in the results list payload"""
+    invalidate_tags_on_commit('updates')
+    ContentVersion.bump_on_commit('updates')
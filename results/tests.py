@@ -1,3 +1,1551 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+import numpy as np
+import pytz
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import Now
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_http_date
+
+from .models import (
+    Lottery, LotteryResult, PrizeEntry, ImageUpdate, ContentVersion, PredictionHistory, PredictionModel, FcmToken,
+    NotificationJob, ResultChange, ResultSnapshot, DailyCashPool, DailyCashSlot, DailyCashAwarded, CashTransaction,
+    DailyPointsPool, DailyPointsAwarded, PeoplesPrediction, PeoplesPredictionTally
+)
+from .prediction_engine import LotteryPredictionEngine, run_backtest
+from .serializers import TicketBatchCheckSerializer
+from .services.change_feed import ChangeFeedService
+from .services.fcm_fake import FakeFCMServer
+from .services.fcm_rate import AdaptiveRateController
+from .services.fcm_transport import SendResult
+from .services.fcm_service import FCMService
+from .services.live_events import InProcessBroker, LiveEventService, PostgresBroker
+from .services.notification_outbox import NotificationOutboxService
+from .services.peoples_predictions import PeoplesPredictionService
+from .services.prize_archive import PrizeArchiveService
+from .services.prize_frequency import PrizeFrequencyService, top_slots
+from .services.result_snapshot import ResultSnapshotService
+from .services.static_export import StaticExportService
+from .services.ticket_index import (
+    SERIES_LETTERS, TicketIndexService, WinningTicketIndex, decode_ticket, expand_ticket_pattern, lookup_sorted
+)
+from .services.token_stream import iter_token_batches
+from .utils import on_commit
+from .utils.response_cache import invalidate_tags
+from .views import TicketCheckView
+
+# Measure the serializers: no response cache, and throttling state kept out of the database
+NO_CACHING = {**settings.FEATURE_FLAGS, 'ENABLE_CACHING': False}
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(FEATURE_FLAGS=NO_CACHING, CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=['testserver'])
+class LotteryResultListQueryCountTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lottery = Lottery.objects.create(
+            name='Karunya Plus', code='KN', price=40, first_price=10000000, description=''
+        )
+        ImageUpdate.get_images()
+
+    def create_results(self, count):
+        # bulk_create skips the publish signals, which would start notification threads
+        today = timezone.now().date()
+        offset = LotteryResult.objects.count()
+        results = LotteryResult.objects.bulk_create([
+            LotteryResult(
+                lottery=self.lottery,
+                date=today - timedelta(days=i % 25),
+                draw_number=f'KN-{offset + i + 1}',
+                is_published=True
+            )
+            for i in range(count)
+        ])
+
+        prizes = []
+        for i, result in enumerate(results):
+            prizes.append(PrizeEntry(
+                lottery_result=result, prize_type='1st', prize_amount=10000000,
+                ticket_number=f'KN{100000 + i}', place='Kollam'
+            ))
+            prizes.extend(
+                PrizeEntry(
+                    lottery_result=result, prize_type='consolation', prize_amount=8000,
+                    ticket_number=f'K{chr(65 + j)}{100000 + i}'
+                )
+                for j in range(3)
+            )
+            prizes.append(PrizeEntry(
+                lottery_result=result, prize_type='5th', prize_amount=1000, ticket_number=f'{1000 + i}'
+            ))
+        PrizeEntry.objects.bulk_create(prizes)
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('results:lottery-results-list'))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.json()
+
+    def test_query_count_does_not_grow_with_results(self):
+        self.create_results(2)
+        small_count, small_payload = self.count_list_queries()
+
+        self.create_results(10)
+        large_count, large_payload = self.count_list_queries()
+
+        self.assertEqual(len(small_payload['results']), 2)
+        self.assertEqual(len(large_payload['results']), 12)
+        self.assertEqual(small_count, large_count)
+        # content versions, image updates, text update, count, results with lottery, prizes
+        self.assertEqual(large_count, 6)
+
+    def test_prizes_served_from_prefetch(self):
+        self.create_results(1)
+        _, payload = self.count_list_queries()
+
+        result = payload['results'][0]
+        self.assertEqual(result['first_prize']['ticket_number'], 'KN100000')
+        self.assertEqual(result['consolation_prizes']['ticket_numbers'], 'KA100000 KB100000 KC100000')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TicketIndexTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lottery = Lottery.objects.create(
+            name='Karunya', code='KR', price=40, first_price=10000000, description=''
+        )
+
+    def setUp(self):
+        TicketIndexService.invalidate()
+        self.addCleanup(TicketIndexService.invalidate)
+
+    def create_result(self, draw_number, tickets):
+        result = LotteryResult.objects.create(
+            lottery=self.lottery, date=date(2026, 10, 1), draw_number=draw_number
+        )
+        for ticket_number in tickets:
+            PrizeEntry.objects.create(
+                lottery_result=result, prize_type='5th', prize_amount=1000, ticket_number=ticket_number
+            )
+        return LotteryResult.objects.get(pk=result.pk)
+
+    def test_non_ascii_digits_are_not_indexed(self):
+        result = self.create_result('KR-9', ['12³4', '4567'])
+
+        _, last_4 = TicketIndexService.find_wins('KA104567', result)
+        self.assertEqual([p.ticket_number for p in last_4], ['4567'])
+
+    def test_index_reused_until_prizes_change(self):
+        result = self.create_result('KR-1', ['KR123456', '4567'])
+
+        full, last_4 = TicketIndexService.find_wins('KA104567', result)
+        self.assertEqual(([p.ticket_number for p in full], [p.ticket_number for p in last_4]), ([], ['4567']))
+        with self.assertNumQueries(0):
+            full, _ = TicketIndexService.find_wins('KR123456', result)
+        self.assertEqual([p.ticket_number for p in full], ['KR123456'])
+
+        # An edit in another worker only reaches this one through the bumped updated_at
+        prize = PrizeEntry.objects.get(lottery_result=result, ticket_number='4567')
+        prize.ticket_number = '7654'
+        with mock.patch.object(TicketIndexService, 'invalidate'):
+            prize.save()
+
+        # A result loaded before the edit still matches the cached index
+        self.assertEqual(TicketIndexService.get_index(result).version, result.updated_at)
+
+        result = LotteryResult.objects.get(pk=result.pk)
+        with self.assertNumQueries(1):
+            _, last_4 = TicketIndexService.find_wins('KA107654', result)
+        self.assertEqual([p.ticket_number for p in last_4], ['7654'])
+        self.assertEqual(TicketIndexService.find_wins('KA104567', result), ([], []))
+
+    def test_least_recently_checked_results_evicted(self):
+        first, second, third = (self.create_result(f'KR-{i}', [f'{1000 + i}']) for i in range(1, 4))
+
+        with mock.patch.object(TicketIndexService, 'MAX_CACHED_RESULTS', 2):
+            for result in (first, second, first, third):
+                TicketIndexService.get_index(result)
+
+        self.assertEqual(list(TicketIndexService._indexes), [first.pk, third.pk])
+
+        TicketIndexService.invalidate(first.pk)
+        self.assertEqual(list(TicketIndexService._indexes), [third.pk])
+
+
+class TicketRangeMatchTest(TestCase):
+
+    def decode(self, ticket_codes):
+        return [decode_ticket(ticket_code) for ticket_code in ticket_codes.tolist()]
+
+    def test_expand_ticket_pattern(self):
+        self.assertEqual(self.decode(expand_ticket_pattern('AB123400-AB123402', 10)), ['AB123400', 'AB123401', 'AB123402'])
+        self.assertEqual(self.decode(expand_ticket_pattern('AB 123400-123401', 10)), ['AB123400', 'AB123401'])
+
+        series = self.decode(expand_ticket_pattern('A*123456', 12))
+        self.assertEqual(series, [f'A{letter}123456' for letter in SERIES_LETTERS])
+        self.assertNotIn('AI123456', series)
+
+        for pattern in ('AB12345', 'AB123400-AC123402', 'AB123402-AB123400', 'A*123400-123401', 'AB12345²', 'AB١٢٣٤٥٦'):
+            with self.assertRaises(ValueError, msg=pattern):
+                expand_ticket_pattern(pattern, 20)
+
+    def test_lookup_sorted(self):
+        positions = lookup_sorted(np.array([5, 1, 9, 3, 0]), np.array([1, 3, 5]))
+        self.assertEqual(positions.tolist(), [2, 0, -1, 1, -1])
+        self.assertEqual(lookup_sorted(np.array([1, 2]), np.array([], dtype=np.int64)).tolist(), [-1, -1])
+
+    def test_vectorized_match_equals_per_ticket_lookups(self):
+        tickets = ['KA100005', 'KM100250', 'KB100250', 'KC999999', '0017', '0250', '0999', 'K4321', '12AB']
+        prizes = [
+            PrizeEntry(prize_type='5th', prize_amount=1000, ticket_number=ticket_number) for ticket_number in tickets
+        ]
+        prizes.append(PrizeEntry(prize_type='6th', prize_amount=500, ticket_number='0250'))
+        index = WinningTicketIndex(0, None, prizes)
+
+        ticket_codes = expand_ticket_pattern('K*100000-K*100999', 12000)
+        loop_wins = []
+        for ticket_number in self.decode(ticket_codes):
+            full, last_4 = index.match(ticket_number)
+            if full or last_4:
+                loop_wins.append((ticket_number, full, last_4))
+
+        vector_wins = index.match_codes(ticket_codes)
+        self.assertEqual(vector_wins, loop_wins)
+        # 12 series x (0017, 0250, 0999 on the last 4) plus KA100005 on the full number
+        self.assertEqual(len(vector_wins), 37)
+        self.assertEqual(
+            [(len(full), len(last_4)) for ticket_number, full, last_4 in vector_wins if ticket_number == 'KB100250'],
+            [(1, 2)]
+        )
+
+
+class BatchOnCommitTest(TestCase):
+    """Batched items reach the callback only when their transaction commits"""
+
+    def test_rolled_back_items_do_not_leak_into_the_next_transaction(self):
+        flushed = []
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                on_commit.batch_on_commit('test', [1, 2], flushed.append)
+                with transaction.atomic():
+                    on_commit.batch_on_commit('test', [3], flushed.append)
+                    transaction.set_rollback(True)
+                on_commit.batch_on_commit('test', [4], flushed.append)
+
+        # The rolled-back savepoint's items are gone, the rest flush once
+        self.assertEqual(flushed, [{1, 2, 4}])
+
+        flushed.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    on_commit.batch_on_commit('test', [5], flushed.append)
+                    raise ValueError
+            except ValueError:
+                pass
+            on_commit.batch_on_commit('test', [6], flushed.append)
+
+        self.assertEqual(flushed, [{6}])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=['testserver'])
+class ResponseCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.karunya = Lottery.objects.create(name='Karunya', code='KR', price=40, first_price=10000000, description='')
+        cls.nirmal = Lottery.objects.create(name='Nirmal', code='NR', price=40, first_price=7000000, description='')
+        cls.result = LotteryResult.objects.bulk_create([
+            LotteryResult(lottery=lottery, date=timezone.now().date(), draw_number=f'{lottery.code}-1', is_published=True)
+            for lottery in (cls.karunya, cls.nirmal)
+        ])[0]
+        ImageUpdate.get_images()
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **params):
+        response = self.client.get(reverse('results:lottery-results-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response['X-Cache'], response.json()
+
+    def test_query_params_are_part_of_the_key(self):
+        self.assertEqual(self.get()[0], 'MISS')
+        self.assertEqual(self.get()[0], 'HIT')
+        self.assertEqual(self.get(lottery_code='KR')[0], 'MISS')
+        self.assertEqual(self.get(lottery_code='NR')[0], 'MISS')
+        self.assertEqual(self.get(lottery_code='KR')[0], 'HIT')
+
+    def test_prize_write_invalidates_tagged_responses(self):
+        self.get()
+        self.get(lottery_code='KR')
+        self.get(lottery_code='NR')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PrizeEntry.objects.create(
+                lottery_result=self.result, prize_type='1st', prize_amount=10000000, ticket_number='KR123456'
+            )
+
+        status_code, payload = self.get()
+        self.assertEqual(status_code, 'MISS')
+        first_prizes = [result['first_prize']['ticket_number'] for result in payload['results'] if result['first_prize']]
+        self.assertEqual(first_prizes, ['KR123456'])
+        self.assertEqual(self.get(lottery_code='KR')[0], 'MISS')
+        # Other lotteries' lists do not carry the written result's tags
+        self.assertEqual(self.get(lottery_code='NR')[0], 'HIT')
+
+    def test_invalidated_tag_misses(self):
+        self.get(lottery_code='NR')
+        self.assertTrue(invalidate_tags('updates'))
+        self.assertEqual(self.get(lottery_code='NR')[0], 'MISS')
+
+
+@override_settings(FEATURE_FLAGS=NO_CACHING, CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=['testserver'])
+class ConditionalGetTest(TestCase):
+
+    def write_results(self, updated_at):
+        ContentVersion.bump('results')
+        ContentVersion.objects.filter(scope='results').update(updated_at=updated_at)
+
+    def get(self, **headers):
+        return self.client.get(reverse('results:today-results'), **headers)
+
+    def test_last_modified_only_once_its_second_is_over(self):
+        # Freeze the clock mid-second: the requests must not cross into the next second
+        now = timezone.now().replace(microsecond=500000)
+        self.enterContext(mock.patch('django.utils.timezone.now', return_value=now))
+
+        self.write_results(now)
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+        first_write = now.replace(microsecond=300000) - timedelta(seconds=5)
+        self.write_results(first_write)
+        response = self.get()
+        self.assertEqual(parse_http_date(response['Last-Modified']), int(first_write.timestamp()) + 1)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        # Any later write is newer than the rounded up date
+        self.write_results(first_write + timedelta(seconds=1, milliseconds=1))
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 200)
+
+
+@override_settings(FEATURE_FLAGS=NO_CACHING, CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=['testserver'])
+class ResultSnapshotTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        lottery = Lottery.objects.create(name='Karunya', code='KR', price=40, first_price=10000000, description='')
+        cls.result = LotteryResult.objects.bulk_create([
+            LotteryResult(lottery=lottery, date=date(2026, 10, 1), draw_number='KR-1', is_published=True)
+        ])[0]
+
+    def setUp(self):
+        self.export_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.export_root.cleanup)
+        self.enterContext(override_settings(RESULTS_EXPORT_ROOT=self.export_root.name,
+                                            RESULTS_MANIFEST_ROOT=f"{self.export_root.name}/manifest"))
+        self.enterContext(mock.patch.multiple(PrizeArchiveService, _refresh_requested=False, _last_refresh=None))
+
+    def add_prize(self, ticket_number):
+        return PrizeEntry.objects.create(
+            lottery_result=self.result, prize_type='5th', prize_amount=1000, ticket_number=ticket_number
+        )
+
+    def snapshot(self):
+        return ResultSnapshot.objects.get(lottery_result=self.result)
+
+    def fetch(self):
+        response = self.client.post(
+            reverse('results:lottery-result-by-unique-id'), {'unique_id': str(self.result.unique_id)},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_write_marks_snapshot_stale_in_its_transaction(self):
+        self.add_prize('1234')
+        self.assertTrue(self.snapshot().is_stale)
+        self.assertIsNone(ResultSnapshotService.get_content(self.result.unique_id))
+
+        # A stale snapshot is rendered by the view and stored fresh
+        content = self.fetch()
+        self.assertIn('1234', content)
+        self.assertEqual((self.snapshot().is_stale, self.snapshot().content), (False, content))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.fetch(), content)
+
+        # A write that rolls back leaves the snapshot fresh
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.add_prize('5678')
+            self.assertTrue(self.snapshot().is_stale)
+            raise RuntimeError
+        self.assertFalse(self.snapshot().is_stale)
+
+    def test_render_of_older_data_does_not_clear_stale(self):
+        self.add_prize('1234')
+        before_write = LotteryResult.objects.prefetch_related('prizes').get(pk=self.result.pk)
+        self.add_prize('5678')
+
+        ResultSnapshotService.store(before_write)
+        self.assertTrue(self.snapshot().is_stale)
+        self.assertIn('5678', self.fetch())
+
+    def test_regenerator_renders_stale_snapshots_and_exports_them(self):
+        self.add_prize('1234')
+        other = LotteryResult.objects.bulk_create([
+            LotteryResult(lottery=self.result.lottery, date=date(2026, 10, 2), draw_number='KR-2')
+        ])[0]
+        ResultSnapshotService.mark_stale(other.pk, timezone.now())
+
+        self.assertEqual(ResultSnapshotService.regenerate_stale(), 2)
+        snapshot = self.snapshot()
+        self.assertFalse(snapshot.is_stale)
+        self.assertIn('1234', snapshot.content)
+        # Unpublished results keep no snapshot
+        self.assertFalse(ResultSnapshot.objects.filter(lottery_result=other).exists())
+        url = StaticExportService.read_manifest()['result_details'][str(self.result.unique_id)]
+        with open(f"{self.export_root.name}/{url[len(settings.RESULTS_EXPORT_URL):]}") as f:
+            self.assertEqual(f.read(), snapshot.content)
+        # The prize archive is refreshed by the same thread
+        self.assertTrue(PrizeArchiveService._refresh_requested)
+
+        self.assertEqual(ResultSnapshotService.regenerate_stale(), 0)
+
+    def test_one_process_runs_the_regenerator(self):
+        self.enterContext(mock.patch.object(ResultSnapshotService, '_runner_connection', None))
+        self.addCleanup(self.release_runner_lock)
+
+        def claim_elsewhere():
+            # Another process: a connection of its own
+            claimed = []
+            thread = threading.Thread(target=lambda: (claimed.append(ResultSnapshotService.claim_runner()), connection.close()))
+            thread.start()
+            thread.join()
+            return claimed[0]
+
+        self.assertTrue(ResultSnapshotService.claim_runner())
+        with self.assertNumQueries(0):
+            self.assertTrue(ResultSnapshotService.claim_runner())
+        self.assertFalse(claim_elsewhere())
+
+        # The runner's connection is gone: the next process to poll takes over
+        self.release_runner_lock()
+        self.assertTrue(claim_elsewhere())
+
+    def release_runner_lock(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [ResultSnapshotService.RUNNER_LOCK_ID])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=['testserver'])
+class LiveResultStreamTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        lottery = Lottery.objects.create(name='Karunya', code='KR', price=40, first_price=10000000, description='')
+        cls.result, cls.hidden = LotteryResult.objects.bulk_create([
+            LotteryResult(lottery=lottery, date=date(2026, 10, 1), draw_number='KR-1', is_published=True),
+            LotteryResult(lottery=lottery, date=date(2026, 10, 2), draw_number='KR-2'),
+        ])
+        cls.first, cls.second = PrizeEntry.objects.bulk_create([
+            PrizeEntry(lottery_result=cls.result, prize_type='1st', prize_amount=10000000, ticket_number='KR123456'),
+            PrizeEntry(lottery_result=cls.result, prize_type='2nd', prize_amount=3000000, ticket_number='KR654321'),
+        ])
+
+    def setUp(self):
+        previous = LiveEventService._broker
+        LiveEventService.set_broker(InProcessBroker())
+        self.addCleanup(LiveEventService.set_broker, previous)
+
+    async def test_stream_sends_missed_prizes_then_live_ones(self):
+        response = await self.async_client.get(
+            reverse('results:live-result-stream', args=[self.result.unique_id]),
+            headers={'Last-Event-ID': str(self.first.id - 1)}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        try:
+            self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+            self.assertIn(b'KR123456', await anext(stream))
+            self.assertIn(b'KR654321', await anext(stream))
+
+            # A repeat of an event the client already has is skipped
+            await sync_to_async(LiveEventService.publish_prizes)([self.second.id, self.first.id])
+            prize = await sync_to_async(PrizeEntry.objects.create)(
+                lottery_result=self.result, prize_type='3rd', prize_amount=500000, ticket_number='KR111111'
+            )
+            await sync_to_async(LiveEventService.publish_prizes)([prize.id])
+            frame = await asyncio.wait_for(anext(stream), 5)
+            self.assertTrue(frame.startswith(f'id: {prize.id}\nevent: prize\n'.encode()))
+        finally:
+            await stream.aclose()
+
+    async def test_unpublished_result_not_found(self):
+        response = await self.async_client.get(reverse('results:live-result-stream', args=[self.hidden.unique_id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class PostgresBrokerTest(TransactionTestCase):
+
+    def test_notify_reaches_subscribers_of_another_broker(self):
+        listener, publisher = PostgresBroker(), PostgresBroker()
+        listener.POLL_SECONDS = 0.1
+        self.addCleanup(listener.close)
+
+        async def receive():
+            subscription = listener.subscribe('result:1')
+            self.assertTrue(await asyncio.to_thread(listener.listening.wait, 5))
+            await asyncio.to_thread(publisher.publish, 'result:2', 7, b'event: other\n\n')
+            await asyncio.to_thread(publisher.publish, 'result:1', 8, b'event: prize\n\n')
+            return await asyncio.wait_for(subscription.get(), 5)
+
+        self.assertEqual(asyncio.run(receive()), (8, b'event: prize\n\n'))
+        self.assertEqual(listener.subscriber_count(), 1)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class StaticExportTest(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+
+    def leftovers(self):
+        return sorted(path.name for path in self.root.rglob('.*'))
+
+    def test_concurrent_writes_replace_files_atomically(self):
+        path = self.root / 'details' / 'result.json'
+        contents = [f'{{"writer": {i}}}'.encode() * 1000 for i in range(8)]
+        errors = []
+
+        def write(content):
+            try:
+                for _ in range(20):
+                    StaticExportService.write_file(path, content)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(content,)) for content in contents]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertIn(path.read_bytes(), contents)
+        self.assertIn(gzip.decompress(Path(f"{path}.gz").read_bytes()), contents)
+        self.assertEqual(self.leftovers(), [])
+
+    def test_export_lists_leaves_other_exporters_work_alone(self):
+        in_progress = self.root / '.v20261017-r1-u0.other.tmp'
+        in_progress.mkdir(parents=True)
+
+        StaticExportService.export_lists(self.root, '20261017-r1-u0')
+
+        self.assertTrue((self.root / 'v20261017-r1-u0' / 'today.json').is_file())
+        self.assertTrue(in_progress.is_dir())
+        self.assertEqual(self.leftovers(), [in_progress.name])
+
+    def test_prune_keeps_newest_versions(self):
+        versions = ['20261015-r9-u0', '20261016-r2-u0', '20261016-r10-u0', '20261016-r10-u2']
+        for version in versions:
+            (self.root / f"v{version}").mkdir()
+        (self.root / '.v20261014-r1-u0.other.tmp').mkdir()
+
+        StaticExportService.prune_versions(self.root, keep=2)
+
+        self.assertEqual(
+            sorted(path.name for path in self.root.iterdir()),
+            ['.v20261014-r1-u0.other.tmp', 'v20261016-r10-u0', 'v20261016-r10-u2']
+        )
+
+    def test_changed_detail_written_under_a_new_path(self):
+        exports = self.root / 'exports'
+        self.enterContext(override_settings(RESULTS_EXPORT_ROOT=exports, RESULTS_MANIFEST_ROOT=self.root / 'manifest'))
+
+        def detail_path():
+            url = StaticExportService.read_manifest()['result_details']['abc']
+            return exports / url[len(settings.RESULTS_EXPORT_URL):]
+
+        StaticExportService.export({'abc': '{"prizes": 1}'})
+        first = detail_path()
+        inode = first.stat().st_ino
+
+        # Whitenoise keeps the size and ETag of files it indexed, so a path is never rewritten
+        StaticExportService.export({'abc': '{"prizes": 2}'})
+        second = detail_path()
+        self.assertNotEqual(first, second)
+        self.assertEqual((first.read_text(), first.stat().st_ino), ('{"prizes": 1}', inode))
+        self.assertEqual(second.read_text(), '{"prizes": 2}')
+
+        # Files referenced by neither the manifest nor the one it replaced are pruned
+        StaticExportService.export({'abc': '{"prizes": 3}'})
+        self.assertFalse(first.exists())
+        self.assertFalse(Path(f"{first}.gz").exists())
+        self.assertTrue(second.exists())
+
+        # The manifest lives outside public/ and is served by the view with a short cache
+        self.assertFalse((exports / StaticExportService.MANIFEST_NAME).exists())
+        response = self.client.get('/exports/manifest.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), StaticExportService.read_manifest())
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+
+        response = self.client.get(StaticExportService.read_manifest()['result_details']['abc'])
+        self.assertEqual(b''.join(response.streaming_content), b'{"prizes": 3}')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+        # Details of an unpublished result go right away
+        StaticExportService.export({}, removed=['abc'])
+        self.assertEqual(list((exports / 'details').iterdir()), [])
+        self.assertNotIn('abc', StaticExportService.read_manifest()['result_details'])
+
+
+class ChangeFeedTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        lottery = Lottery.objects.create(name='Karunya', code='KR', price=40, first_price=10000000, description='')
+        cls.published, cls.hidden = LotteryResult.objects.bulk_create([
+            LotteryResult(lottery=lottery, date=date(2026, 10, 1), draw_number='KR-1', is_published=True),
+            LotteryResult(lottery=lottery, date=date(2026, 10, 2), draw_number='KR-2'),
+        ])
+        cls.prize = PrizeEntry.objects.bulk_create([
+            PrizeEntry(lottery_result=cls.published, prize_type='1st', prize_amount=10000000, ticket_number='KR123456')
+        ])[0]
+
+    def record(self, *changes, age=60):
+        ResultChange.record_batch(changes)
+        # Age the entries past the settle window
+        ResultChange.objects.filter(created_at__gte=Now() - timedelta(seconds=1)).update(
+            created_at=Now() - timedelta(seconds=age)
+        )
+        return ResultChange.objects.order_by('-id').values_list('id', flat=True).first()
+
+    def test_cursor_walks_the_log_in_pages(self):
+        start = self.record(('result', self.hidden.pk, self.hidden.pk, 'upsert'))
+        self.assertEqual(ChangeFeedService.get_changes(0)['next_since'], start)
+
+        self.record(('prize', self.prize.pk, self.published.pk, 'upsert'), ('prize', 999, self.published.pk, 'delete'))
+        last = self.record(('result', self.published.pk, self.published.pk, 'upsert'))
+
+        page = ChangeFeedService.get_changes(start, limit=2)
+        self.assertEqual((page['reset'], page['has_more'], page['next_since']), (False, True, start + 2))
+        self.assertEqual([prize['ticket_number'] for prize in page['prizes']], ['KR123456'])
+        self.assertEqual(page['deleted'], {'results': [], 'prizes': [999]})
+
+        page = ChangeFeedService.get_changes(page['next_since'], limit=2)
+        self.assertEqual((page['has_more'], page['next_since']), (False, last))
+        self.assertEqual([result['unique_id'] for result in page['results']], [str(self.published.unique_id)])
+
+        # An empty page keeps the cursor; a changed unpublished result comes back as a tombstone
+        self.assertEqual(ChangeFeedService.get_changes(last)['next_since'], last)
+        self.record(('result', self.hidden.pk, self.hidden.pk, 'upsert'))
+        self.assertEqual(ChangeFeedService.get_changes(last)['deleted']['results'], [self.hidden.pk])
+
+    def test_unsettled_changes_wait_for_the_database_clock(self):
+        start = self.record(('result', self.hidden.pk, self.hidden.pk, 'upsert'))
+        self.record(('result', self.published.pk, self.published.pk, 'upsert'), age=0)
+
+        page = ChangeFeedService.get_changes(start)
+        self.assertEqual((page['next_since'], page['results']), (start, []))
+        self.assertEqual(ChangeFeedService.get_changes(0)['next_since'], start)
+
+    def test_pruned_cursor_resets(self):
+        old = self.record(('result', self.hidden.pk, self.hidden.pk, 'upsert'), age=100 * 86400)
+        self.record(('prize', self.prize.pk, self.published.pk, 'upsert'), age=100 * 86400)
+        recent = self.record(('result', self.published.pk, self.published.pk, 'upsert'))
+
+        self.assertEqual(ResultChange.prune(90), 2)
+        self.assertTrue(ChangeFeedService.get_changes(old)['reset'])
+        self.assertEqual(ChangeFeedService.get_changes(old)['next_since'], recent)
+        # The entry just before the oldest kept one is still a valid cursor
+        self.assertFalse(ChangeFeedService.get_changes(recent - 1)['reset'])
+
+
+
+class ProductionCashBalanceSchemaMixin:
+    """
+    0031 removed lifetime_earned_cash from the model state only, because the production table never
+    had it. The test database is built from the migrations and still has the NOT NULL column, so
+    drop it to create UserCashBalance rows the way production does.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with connection.cursor() as cursor:
+            cursor.execute("ALTER TABLE results_usercashbalance DROP COLUMN IF EXISTS lifetime_earned_cash")
+
+
+class RewardPoolConcurrencyTest(ProductionCashBalanceSchemaMixin, TransactionTestCase):
+    """Concurrent 3 PM awards must never oversubscribe the daily budgets or the 30-user cap"""
+
+    THREADS = 60
+
+    def run_concurrently(self, award):
+        """Run award(index) on THREADS threads released at the same moment; returns the results"""
+        barrier = threading.Barrier(self.THREADS)
+        results = [None] * self.THREADS
+
+        def worker(index):
+            try:
+                barrier.wait()
+                results[index] = award(index)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def award_cash(self, index):
+        cash_amount, _ = TicketCheckView().award_cash_back_to_user(
+            f'98765{index:05d}', f'KA{100000 + index}', 'Karunya', timezone.now().date()
+        )
+        return cash_amount
+
+    def assert_cash_pool_consistent(self, results):
+        pool = DailyCashPool.get_today_pool()
+        awards = DailyCashAwarded.objects.filter(award_date=pool.date)
+        awarded_total = awards.aggregate(total=Sum('cash_awarded'))['total'] or Decimal('0')
+        claimed_slots = pool.slots.filter(claimed_at__isnull=False)
+
+        self.assertLessEqual(pool.users_awarded, pool.max_users)
+        self.assertEqual(awards.count(), len([result for result in results if result]))
+        self.assertEqual(pool.users_awarded, awards.count())
+        self.assertEqual(claimed_slots.count(), awards.count())
+        self.assertEqual(len(set(claimed_slots.values_list('phone_number', flat=True))), awards.count())
+        self.assertEqual(pool.distributed_amount, awarded_total)
+        self.assertEqual(pool.remaining_amount, pool.total_budget - awarded_total)
+        self.assertGreaterEqual(pool.remaining_amount, 0)
+        self.assertEqual(CashTransaction.objects.aggregate(total=Sum('cash_amount'))['total'], awarded_total)
+        self.assertEqual(len(set(awards.values_list('cashback_id', flat=True))), awards.count())
+        # Every award paid out exactly its pre-drawn slot
+        for slot in claimed_slots:
+            award = awards.get(cashback_id=f"CB{pool.date.strftime('%Y%m%d')}{slot.slot_number:03d}")
+            self.assertEqual((award.phone_number, award.cash_awarded), (slot.phone_number, slot.cash_amount))
+        return pool
+
+    def test_pre_drawn_slots_fit_budget(self):
+        pool = DailyCashPool.get_today_pool()
+        amounts = list(pool.slots.values_list('cash_amount', flat=True))
+
+        self.assertTrue(1 <= len(amounts) <= pool.max_users)
+        self.assertLessEqual(sum(amounts), pool.total_budget)
+        self.assertTrue(all(1 <= amount <= 10 for amount in amounts))
+
+    def test_cash_user_cap_holds(self):
+        pool = DailyCashPool.get_today_pool()
+        pool.slots.all().delete()
+        DailyCashSlot.objects.bulk_create([
+            DailyCashSlot(pool=pool, slot_number=slot_number, cash_amount=1) for slot_number in range(1, 31)
+        ])
+
+        results = self.run_concurrently(self.award_cash)
+
+        pool = self.assert_cash_pool_consistent(results)
+        self.assertEqual(pool.users_awarded, 30)
+        self.assertEqual(pool.remaining_amount, Decimal('70.00'))
+
+    def test_cash_budget_holds(self):
+        results = self.run_concurrently(self.award_cash)
+
+        pool = self.assert_cash_pool_consistent(results)
+        # Every pre-drawn slot is handed out once, within the ₹100 budget
+        self.assertEqual(pool.users_awarded, pool.slots.count())
+        self.assertFalse(pool.slots.filter(claimed_at__isnull=True).exists())
+
+    def test_points_budget_holds(self):
+        def award(index):
+            success, _ = TicketCheckView().award_points_to_user(
+                f'98765{index:05d}', 300, f'KA{100000 + index}', 'Karunya', timezone.now().date()
+            )
+            return success
+
+        results = self.run_concurrently(award)
+
+        pool = DailyPointsPool.get_today_pool()
+        # 10,000 points cover exactly 33 awards of 300
+        self.assertEqual(results.count(True), 33)
+        self.assertEqual(DailyPointsAwarded.objects.count(), 33)
+        self.assertEqual(pool.distributed_points, 9900)
+        self.assertEqual(pool.remaining_points, 100)
+
+
+class RewardEligibilityQueryCountTest(ProductionCashBalanceSchemaMixin, TestCase):
+    """A scan resolves reward eligibility in one query, shared by the cash back and points checks"""
+
+    PHONE_NUMBER = '+919876500001'
+
+    def setUp(self):
+        self.view = TicketCheckView()
+        self.lottery = Lottery(name='Karunya', code='K')
+        self.today = timezone.now().astimezone(pytz.timezone('Asia/Kolkata')).date()
+
+    def award(self, won_prize=False):
+        return self.view.award_rewards(
+            'KA123456', self.PHONE_NUMBER, self.lottery, self.today, won_prize, True, time(16, 0)
+        )
+
+    def eligibility_queries(self, queries):
+        return [
+            query for query in queries.captured_queries
+            if query['sql'].lstrip('(').startswith('SELECT') and 'results_dailypointsawarded' in query['sql']
+        ]
+
+    def test_winning_ticket_costs_no_query(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.award(won_prize=True), (None, None))
+
+    def test_rewarded_user_costs_one_query(self):
+        DailyPointsAwarded.objects.create(
+            phone_number=self.PHONE_NUMBER, award_date=self.today, points_awarded=10,
+            ticket_number='KA654321', lottery_name='Karunya'
+        )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.award(), (None, None))
+
+    def test_points_fallback_reuses_eligibility(self):
+        pool = DailyCashPool.get_today_pool()
+        # Every slot is claimed while the totals (updated on commit) still show room
+        pool.slots.update(phone_number='+919876500002', claimed_at=timezone.now())
+
+        with CaptureQueriesContext(connection) as queries:
+            cash_back, points = self.award()
+
+        self.assertIsNone(cash_back)
+        self.assertTrue(points)
+        self.assertEqual(len(self.eligibility_queries(queries)), 1)
+
+    def test_stale_pool_totals_do_not_block_free_slots(self):
+        pool = DailyCashPool.get_today_pool()
+        DailyCashPool.objects.filter(pk=pool.pk).update(users_awarded=pool.max_users, remaining_amount=0)
+
+        cash_back, points = self.award()
+
+        self.assertTrue(cash_back)
+        self.assertIsNone(points)
+        self.assertTrue(pool.slots.filter(phone_number=self.PHONE_NUMBER, claimed_at__isnull=False).exists())
+
+    def test_cash_back_checks_eligibility_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            cash_back, points = self.award()
+
+        self.assertTrue(cash_back)
+        self.assertIsNone(points)
+        self.assertEqual(len(self.eligibility_queries(queries)), 1)
+
+@override_settings(CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=['testserver'])
+class TicketBatchCheckTest(TestCase):
+    """A book of tickets is checked in one request, with the reward rules applied once per scan"""
+
+    PHONE_NUMBER = '+919876500001'
+    # 16:00 IST, after the 3:00 PM result and reward time
+    NOW = datetime(2026, 10, 17, 10, 30, tzinfo=pytz.utc)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lottery = Lottery.objects.create(name='Karunya', code='K', price=40, first_price=10000000, description='')
+        # bulk_create skips the publish signals, which would queue notification jobs
+        cls.result = LotteryResult.objects.bulk_create([
+            LotteryResult(lottery=cls.lottery, date=date(2026, 10, 17), draw_number='K-1', is_published=True)
+        ])[0]
+        PrizeEntry.objects.bulk_create([
+            PrizeEntry(lottery_result=cls.result, prize_type='1st', prize_amount=10000000, ticket_number='KA123456'),
+            PrizeEntry(lottery_result=cls.result, prize_type='5th', prize_amount=1000, ticket_number='4567'),
+        ])
+
+    def setUp(self):
+        TicketIndexService.invalidate()
+        self.addCleanup(TicketIndexService.invalidate)
+        self.enterContext(mock.patch('django.utils.timezone.now', return_value=self.NOW))
+
+    def check(self, ticket_numbers, phone_number=PHONE_NUMBER):
+        return self.client.post(reverse('results:check-ticket-batch'), {
+            'ticket_numbers': ticket_numbers, 'phone_number': phone_number, 'date': '2026-10-17'
+        }, content_type='application/json')
+
+    def rewards(self):
+        return DailyCashAwarded.objects.count() + DailyPointsAwarded.objects.count()
+
+    def rewarded(self, results):
+        return [result['data']['ticketNumber'] for result in results if result['cashBack'] or result['points']]
+
+    def test_mixed_book_rewards_first_losing_ticket_once(self):
+        response = self.check(['ka123456', 'KB104567', 'KC111111', 'KD222222'])
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(payload['count'], 4)
+        results = payload['results']
+        self.assertEqual([result['data']['wonPrize'] for result in results], [True, True, False, False])
+        self.assertEqual(results[0]['data']['previousResult']['prizeDetails']['matchType'], 'Full ticket match')
+        self.assertEqual(results[1]['data']['previousResult']['prizeDetails']['matchType'], 'Last 4 digits match')
+        self.assertEqual([result['resultStatus'] for result in results[2:]], ['No Price Today', 'No Price Today'])
+
+        # One award for the scan, on its first non-winning ticket, reported at the top level too
+        self.assertEqual(self.rewarded(results), ['KC111111'])
+        self.assertEqual(self.rewards(), 1)
+        self.assertEqual((payload['cashBack'], payload['points']), (results[2]['cashBack'], results[2]['points']))
+
+        # The next scan of the day earns nothing more
+        payload = self.check(['KE333333', 'KF444444']).json()
+        self.assertEqual(self.rewarded(payload['results']), [])
+        self.assertEqual((payload['cashBack'], payload['points']), (None, None))
+        self.assertEqual(self.rewards(), 1)
+
+    def test_duplicate_tickets_answered_each_and_rewarded_once(self):
+        payload = self.check(['KC111111', 'KC111111', 'KA123456', 'KA123456']).json()
+
+        self.assertEqual(payload['count'], 4)
+        self.assertEqual([result['data']['ticketNumber'] for result in payload['results']],
+                         ['KC111111', 'KC111111', 'KA123456', 'KA123456'])
+        self.assertEqual([result['data']['wonPrize'] for result in payload['results']], [False, False, True, True])
+        self.assertEqual(len(self.rewarded(payload['results'])), 1)
+        self.assertTrue(payload['results'][0]['cashBack'] or payload['results'][0]['points'])
+        self.assertEqual(self.rewards(), 1)
+
+    def test_book_larger_than_max_rejected(self):
+        tickets = [f'KA{100000 + index}' for index in range(TicketBatchCheckSerializer.MAX_TICKETS + 1)]
+
+        response = self.check(tickets)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.json()['count'], response.json()['results']), (0, []))
+        self.assertIn(f"no more than {TicketBatchCheckSerializer.MAX_TICKETS}", response.json()['message'])
+        self.assertEqual(self.check(tickets[:-1]).status_code, 200)
+        self.assertEqual(self.check([]).status_code, 400)
+
+    def test_malformed_ticket_rejects_the_book(self):
+        for ticket_number, error in (('1A123456', 'Ticket 2 (1A123456)'), ('KA123400-KA123402', '/check-ticket/')):
+            response = self.check(['KC111111', ticket_number])
+
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(error, response.json()['message'])
+        self.assertEqual(self.rewards(), 0)
+
+    def test_unknown_lottery_codes_answered_per_ticket(self):
+        payload = self.check(['ZA123456', 'MA123456', 'KC111111']).json()
+
+        self.assertEqual(payload['statusCode'], 200)
+        self.assertEqual([(result['statusCode'], result['resultStatus']) for result in payload['results']], [
+            (400, 'Invalid Lottery Code'), (400, 'Lottery Not Found'), (200, 'No Price Today')
+        ])
+        self.assertEqual(self.rewarded(payload['results']), ['KC111111'])
+
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PrizeFrequencyTest(TestCase):
+    """Rolling window rankings are summed from daily frequency vectors"""
+
+    def setUp(self):
+        lottery = Lottery.objects.create(name='Karunya', code='KR', price=40, first_price=10000000, description='')
+        self.today = timezone.now().date()
+        # bulk_create skips the publish signals, which would start notification threads
+        self.results = LotteryResult.objects.bulk_create([
+            LotteryResult(lottery=lottery, date=self.today - timedelta(days=days_ago), draw_number=f'KR-{days_ago}', is_published=True)
+            for days_ago in (1, 10, 40)
+        ])
+        tickets = {0: ['1234', 'KR 561234', '0042', '7777'], 1: ['1234', '0042', '5551'], 2: ['1234', '1234', '9999']}
+        PrizeEntry.objects.bulk_create([
+            PrizeEntry(lottery_result=self.results[index], prize_type='6th', prize_amount=500, ticket_number=ticket)
+            for index, numbers in tickets.items() for ticket in numbers
+        ] + [
+            PrizeEntry(lottery_result=self.results[0], prize_type='1st', prize_amount=10000000, ticket_number='KR 111234')
+        ])
+        PrizeFrequencyService.rebuild_days({result.date for result in self.results})
+
+    def test_windows_match_prize_counts(self):
+        thirty_days_ago = self.today - timedelta(days=30)
+        seven_days_ago = self.today - timedelta(days=7)
+
+        self.assertEqual(PrizeFrequencyService.get_repeated_numbers(thirty_days_ago), [
+            {"number": "1234", "count": 3}, {"number": "0042", "count": 2},
+        ])
+        self.assertEqual(PrizeFrequencyService.get_repeated_single_digits(seven_days_ago), [
+            {"digit": "4", "count": 2}, {"digit": "2", "count": 1}, {"digit": "7", "count": 1},
+        ])
+
+    def test_prize_edit_rebuilds_day(self):
+        thirty_days_ago = self.today - timedelta(days=30)
+        with self.captureOnCommitCallbacks(execute=True):
+            PrizeEntry.objects.create(
+                lottery_result=self.results[1], prize_type='8th', prize_amount=100, ticket_number='KR 007777'
+            )
+
+        self.assertIn({"number": "7777", "count": 2}, PrizeFrequencyService.get_repeated_numbers(thirty_days_ago))
+
+    def test_count_tickets_skips_non_ascii_digits(self):
+        # isdigit() is True for these, int() is not defined for the first two
+        last_4, last_digit = PrizeFrequencyService.count_tickets(['12³4', 'KR 12345²', '١٢٣٤', 'KR 000042'])
+
+        self.assertEqual(np.flatnonzero(last_4).tolist(), [42])
+        self.assertEqual(np.flatnonzero(last_digit).tolist(), [2, 4])
+
+    def test_top_slots_breaks_ties_by_slot(self):
+        counts = np.array([3, 0, 5, 3, 3, 1], dtype=np.uint32)
+
+        self.assertEqual(top_slots(counts, 3), [(2, 5), (0, 3), (3, 3)])
+        self.assertEqual(top_slots(counts, 10, min_count=3), [(2, 5), (0, 3), (3, 3), (4, 3)])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=['testserver'])
+class PrizeArchiveTest(TestCase):
+    """Number analytics read the memory-mapped prize archive, not PrizeEntry"""
+
+    def setUp(self):
+        self.archive_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.archive_root.cleanup)
+        settings_override = override_settings(PRIZE_ARCHIVE_ROOT=self.archive_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.enterContext(mock.patch.multiple(PrizeArchiveService, _refresh_requested=True, _last_refresh=None))
+
+        self.lottery = Lottery.objects.create(name='Karunya', code='KR', price=40, first_price=10000000, description='')
+        self.today = timezone.localdate()
+        # bulk_create skips the publish signals, which would start notification threads
+        results = LotteryResult.objects.bulk_create([
+            LotteryResult(lottery=self.lottery, date=self.today - timedelta(days=days_ago), draw_number=f'KR-{days_ago}', is_published=published)
+            for days_ago, published in ((3, True), (20, True), (400, True), (1, False))
+        ])
+        tickets = [
+            (results[0], '1st', 'KR 561234'), (results[0], '5th', '1234'), (results[0], '5th', '0042'),
+            (results[1], '5th', '1234'), (results[1], '6th', '7777'),
+            (results[2], '5th', '0042'), (results[2], '5th', '0042'), (results[3], '5th', '1234'),
+        ]
+        PrizeEntry.objects.bulk_create([
+            PrizeEntry(lottery_result=result, prize_type=prize_type, prize_amount=100, ticket_number=ticket)
+            for result, prize_type, ticket in tickets
+        ])
+
+    def test_refresh_and_query(self):
+        self.assertIsNone(PrizeArchiveService.get_archive())
+        manifest = PrizeArchiveService.build()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('results:number-analytics'), {'days': 0, 'limit': 2, 'numbers': '42,9999'})
+        data = response.json()
+
+        self.assertEqual(manifest['rows'], 7)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(data['hot_numbers'], [{"number": "0042", "count": 3}, {"number": "1234", "count": 3}])
+        self.assertEqual(data['gaps'][0], {"number": "0042", "last_seen": str(self.today - timedelta(days=3)), "days_since": 3})
+        self.assertEqual(data['gaps'][1]['days_since'], None)
+        self.assertEqual(data['cold_numbers'][0]['number'], '7777')
+        self.assertEqual(data['digit_positions'][3]['counts'][2], 3)
+
+    def test_filters_and_refresh(self):
+        PrizeArchiveService.build()
+        response = self.client.get(reverse('results:number-analytics'), {'days': 30, 'prize_types': '5th', 'lottery': 'KR'})
+
+        self.assertEqual(response.json()['prizes'], 3)
+        self.assertEqual(self.client.get(reverse('results:number-analytics'), {'prize_types': '11th'}).status_code, 400)
+
+        # A window longer than the calendar is the whole archive, not a 500
+        response = self.client.get(reverse('results:number-analytics'), {'days': 10 ** 12})
+        self.assertEqual(response.json()['prizes'], 7)
+
+        # A refresh is picked up by the next request
+        LotteryResult.objects.filter(is_published=False).update(is_published=True)
+        PrizeArchiveService.build()
+        response = self.client.get(reverse('results:number-analytics'), {'days': 30, 'prize_types': '5th'})
+        self.assertEqual(response.json()['prizes'], 4)
+
+    def test_requested_refreshes_build_once_per_interval(self):
+        # The first check of a process builds
+        self.assertEqual(PrizeArchiveService.refresh_if_due()['rows'], 7)
+        self.assertIsNone(PrizeArchiveService.refresh_if_due())
+
+        LotteryResult.objects.filter(is_published=False).update(is_published=True)
+        PrizeArchiveService.request_refresh()
+        self.assertIsNone(PrizeArchiveService.refresh_if_due())
+        with override_settings(LOTTERY_SETTINGS={**settings.LOTTERY_SETTINGS, 'PRIZE_ARCHIVE_REFRESH_SECONDS': 0}):
+            self.assertEqual(PrizeArchiveService.refresh_if_due()['rows'], 8)
+        self.assertEqual(PrizeArchiveService.get_archive().manifest['rows'], 8)
+
+
+class LotteryPredictionEngineTest(TestCase):
+    """Models are scored by backtesting every draw against the draws before it"""
+
+    def setUp(self):
+        lottery = Lottery.objects.create(name='Karunya', code='KR', price=40, first_price=10000000, description='')
+        start = date(2025, 1, 4)
+        # bulk_create skips the publish signals, which would start notification threads
+        results = LotteryResult.objects.bulk_create([
+            LotteryResult(lottery=lottery, date=start + timedelta(days=7 * week), draw_number=f'KR-{week}', is_published=True)
+            for week in range(20)
+        ])
+        # The same five numbers win the 5th prize of every draw; 6th prizes are spread out
+        PrizeEntry.objects.bulk_create([
+            PrizeEntry(lottery_result=result, prize_type='5th', prize_amount=1000, ticket_number=f'{number:04d}')
+            for result in results for number in (11, 2222, 3456, 4000, 9999)
+        ] + [
+            PrizeEntry(lottery_result=result, prize_type='6th', prize_amount=500, ticket_number=f'KR {week * 500 + index:06d}')
+            for week, result in enumerate(results) for index in range(3)
+        ])
+
+    def test_train_backtests_and_stores_in_bulk(self):
+        engine = LotteryPredictionEngine(top_k=5, min_history=5, keep_history=4, workers=1)
+
+        summary = engine.train()
+
+        frequency = PredictionModel.objects.get(algorithm='frequency', lottery_type='Karunya', prize_type='5th')
+        self.assertEqual(summary['jobs'], 2)
+        self.assertEqual(summary['algorithms']['frequency']['tested'], 30)
+        self.assertEqual(frequency.accuracy_score, 1.0)
+        self.assertEqual(frequency.parameters['precision'], 1.0)
+        self.assertEqual(PredictionModel.objects.get(algorithm='frequency', lottery_type='Karunya', prize_type='6th').accuracy_score, 0.0)
+        self.assertTrue(PredictionModel.objects.filter(name='Default Ensemble Model', lottery_type='').exists())
+
+        history = PredictionHistory.objects.filter(model_used=frequency)
+        self.assertEqual(history.filter(draw_date__isnull=False).count(), 4)
+        self.assertEqual(history.get(draw_date__isnull=True).predicted_numbers, ['0011', '2222', '3456', '4000', '9999'])
+
+        # Retraining replaces the previous run
+        engine.train()
+        self.assertEqual(PredictionHistory.objects.filter(model_used=frequency).count(), 5)
+
+    def test_pool_matches_in_process(self):
+        engine = LotteryPredictionEngine(top_k=5, min_history=5, workers=2)
+        jobs = engine.load_jobs()
+
+        in_process = [run_backtest(job) for job in jobs]
+        pooled = engine.backtest(jobs)
+
+        for (_, _, expected), (_, _, actual) in zip(in_process, pooled):
+            for algorithm in expected:
+                self.assertEqual(actual[algorithm].next_draw, expected[algorithm].next_draw)
+                self.assertEqual(actual[algorithm].hits, expected[algorithm].hits)
+
+
+OUTBOX_SETTINGS = {**settings.LOTTERY_SETTINGS, 'NOTIFICATION_BATCH_SIZE': 10, 'NOTIFICATION_RETRY_BASE_SECONDS': 0}
+
+
+@override_settings(LOTTERY_SETTINGS=OUTBOX_SETTINGS, CACHES=LOCMEM_CACHES)
+class NotificationOutboxTest(TestCase):
+    """Publishing queues a durable job; the worker sends it in checkpointed batches"""
+
+    def setUp(self):
+        self.lottery = Lottery.objects.create(name='Karunya', code='KR', price=40, first_price=10000000, description='')
+        FcmToken.objects.bulk_create([
+            FcmToken(phone_number=f'98765{index:05d}', name=f'User {index}', fcm_token=f'token-{index:03d}')
+            for index in range(35)
+        ])
+        self.sent = []
+
+    def fake_send(self, fail_tokens=(), crash_after=None, error_code='UNAVAILABLE'):
+        def send_to_tokens(tokens, title, body, data=None, image_url=None):
+            if crash_after is not None and len(self.sent) >= crash_after:
+                raise RuntimeError('worker killed')
+            delivered = [token for token in tokens if token not in fail_tokens]
+            self.sent.extend(delivered)
+            retry = [token for token in tokens if token in fail_tokens]
+            return {'delivered': delivered, 'invalid': [], 'retry': retry,
+                    'unavailable': retry if error_code == 'UNAVAILABLE' else [],
+                    'errors': dict.fromkeys(retry, error_code), 'error_codes': dict.fromkeys(retry, error_code)}
+        return send_to_tokens
+
+    def test_publish_queues_job_without_sending(self):
+        with mock.patch.object(FCMService, 'send_to_tokens') as send:
+            result = LotteryResult.objects.create(lottery=self.lottery, date=timezone.now().date(), draw_number='KR-1', is_published=True)
+            result.results_ready_notification = True
+            result.save()
+            result.save()
+
+        send.assert_not_called()
+        self.assertEqual(NotificationJob.objects.filter(lottery_result=result, kind='new_result').count(), 1)
+        self.assertEqual(NotificationJob.objects.filter(lottery_result=result, kind='result_ready').count(), 1)
+
+        with mock.patch.object(FCMService, 'send_to_tokens', side_effect=self.fake_send()):
+            self.assertEqual(NotificationOutboxService.run_once('worker-1'), 2)
+
+        self.assertEqual(len(self.sent), 70)
+        result.refresh_from_db()
+        self.assertTrue(result.notification_sent)
+
+    def test_worker_refuses_to_start_without_credentials(self):
+        job = NotificationOutboxService.enqueue('custom', 'Title', 'Body')
+
+        with mock.patch.object(FCMService, 'get_transport', return_value=None):
+            with self.assertRaises(CommandError):
+                call_command('run_notification_worker', '--once', stdout=StringIO())
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.sent_count), ('pending', 0))
+
+            # The worker closes its connection after each run, the test's own one here
+            with mock.patch.object(FCMService, 'send_to_tokens', side_effect=self.fake_send()), \
+                    mock.patch('results.management.commands.run_notification_worker.close_old_connections'):
+                call_command('run_notification_worker', '--once', '--allow-test-mode', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+
+    def test_resumed_job_skips_delivered_tokens(self):
+        job = NotificationOutboxService.enqueue('custom', 'Title', 'Body')
+
+        with mock.patch.object(FCMService, 'send_to_tokens', side_effect=self.fake_send(crash_after=20)):
+            with self.assertRaises(RuntimeError):
+                NotificationOutboxService.run_once('worker-1')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.sent_count), ('running', 20))
+
+        # The crashed worker's lease expires and another worker resumes from the checkpoint
+        NotificationJob.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        with mock.patch.object(FCMService, 'send_to_tokens', side_effect=self.fake_send()):
+            NotificationOutboxService.run_once('worker-2')
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.sent_count, 35)
+        self.assertEqual(sorted(self.sent), sorted(set(self.sent)))
+
+    def test_unavailable_fcm_backs_off_the_job(self):
+        job = NotificationOutboxService.enqueue('custom', 'Title', 'Body')
+
+        with mock.patch.object(FCMService, 'send_to_tokens', side_effect=self.fake_send(fail_tokens={'token-003'})) as send:
+            NotificationOutboxService.run_once('worker-1')
+        job.refresh_from_db()
+
+        # 1 send + 3 retries of the failing batch, then the job is rescheduled past the batch
+        token_id = FcmToken.objects.get(fcm_token='token-003').pk
+        self.assertEqual(send.call_count, 4)
+        self.assertEqual((job.status, job.attempts, job.sent_count), ('pending', 1, 9))
+        self.assertEqual((job.retry_token_ids, job.retry_attempts), ([token_id], {str(token_id): 1}))
+        self.assertEqual(job.cursor_token_id, FcmToken.objects.get(fcm_token='token-009').pk)
+        self.assertGreater(job.next_attempt_at, timezone.now())
+
+        NotificationJob.objects.filter(pk=job.pk).update(next_attempt_at=timezone.now())
+        self.sent.clear()
+        with mock.patch.object(FCMService, 'send_to_tokens', side_effect=self.fake_send()):
+            NotificationOutboxService.run_once('worker-1')
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.sent_count), ('completed', 35))
+        self.assertEqual(self.sent[0], 'token-003')
+        self.assertEqual(len(self.sent), 26)
+        self.assertEqual(job.retry_attempts, {})
+
+    def test_failing_token_given_up_without_holding_back_the_rest(self):
+        job = NotificationOutboxService.enqueue('custom', 'Title', 'Body')
+        send = self.fake_send(fail_tokens={'token-003'}, error_code='UNKNOWN')
+
+        with mock.patch.object(FCMService, 'send_to_tokens', side_effect=send):
+            NotificationOutboxService.run_once('worker-1')
+            job.refresh_from_db()
+            # Every other token is delivered in the first run; the failing one waits for the next
+            self.assertEqual((job.status, job.attempts, job.sent_count), ('pending', 0, 34))
+            self.assertEqual(len(job.retry_token_ids), 1)
+
+            for _ in range(OUTBOX_SETTINGS['NOTIFICATION_TOKEN_MAX_ATTEMPTS'] - 1):
+                NotificationJob.objects.filter(pk=job.pk).update(next_attempt_at=timezone.now())
+                NotificationOutboxService.run_once('worker-1')
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.sent_count, job.failure_count), ('completed', 34, 1))
+        self.assertEqual((job.retry_token_ids, job.retry_attempts), ([], {}))
+        self.assertEqual(sorted(self.sent), sorted(f'token-{index:03d}' for index in range(35) if index != 3))
+
+
+    def test_dead_tokens_deactivated_in_chunked_set_updates(self):
+        FcmToken.objects.filter(fcm_token='token-034').update(is_active=False)
+        server = FakeFCMServer(invalid_tokens={'token-002', 'token-005', 'token-011', 'token-020', 'token-029'},
+                               errors={'token-007': 'SENDER_ID_MISMATCH'})
+        transport = server.client(concurrency=10)
+        previous = FCMService.set_transport(transport)
+        job = NotificationOutboxService.enqueue('custom', 'Title', 'Body')
+        try:
+            with self.settings(LOTTERY_SETTINGS={**OUTBOX_SETTINGS, 'TOKEN_UPDATE_CHUNK_SIZE': 4}):
+                with CaptureQueriesContext(connection) as queries:
+                    NotificationOutboxService.run_once('worker-1')
+        finally:
+            FCMService.set_transport(previous)
+            transport.close()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.active_tokens_at_start, job.sent_count), ('completed', 34, 28))
+        self.assertEqual(job.deactivated_count, 6)
+        self.assertAlmostEqual(job.active_set_shrink, 6 / 34 * 100)
+        self.assertEqual(job.error_counts, {'UNREGISTERED': 5, 'SENDER_ID_MISMATCH': 1})
+        self.assertEqual(FcmToken.objects.filter(is_active=True).count(), 28)
+
+        # One statement per chunk of 4 tokens, never one per token
+        updates = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('UPDATE "fcm_tokens"')]
+        deactivations = [sql for sql in updates if '"is_active" = false' in sql]
+        # Batches of 10 deliver 7, 9, 8 and 4 tokens and hold 3, 1, 2 and 0 dead ones
+        self.assertEqual(len(updates) - len(deactivations), 2 + 3 + 2 + 1)
+        self.assertEqual(len(deactivations), 3)
+        self.assertTrue(all(' IN (' in sql for sql in updates))
+
+
+    def run_with_server(self, server):
+        transport = server.client(concurrency=10)
+        previous = FCMService.set_transport(transport)
+        job = NotificationOutboxService.enqueue('custom', 'Title', 'Body')
+        try:
+            NotificationOutboxService.run_once('worker-1')
+        finally:
+            FCMService.set_transport(previous)
+            transport.close()
+        job.refresh_from_db()
+        return job
+
+    def test_invalid_argument_deactivates_only_tokens_it_names(self):
+        job = self.run_with_server(FakeFCMServer(errors={'token-003': 'INVALID_ARGUMENT'}))
+
+        self.assertEqual((job.status, job.sent_count, job.failure_count, job.deactivated_count), ('completed', 34, 1, 1))
+        self.assertFalse(FcmToken.objects.get(fcm_token='token-003').is_active)
+
+        message = SendResult('token-001', False, 400, 'INVALID_ARGUMENT', "Invalid value at 'message.data[0].value'")
+        self.assertEqual(message.outcome, 'rejected')
+
+    def test_third_party_auth_error_rejects_only_its_token(self):
+        server = FakeFCMServer(errors={'token-003': 'THIRD_PARTY_AUTH_ERROR'})
+
+        job = self.run_with_server(server)
+
+        # Not retried, not deactivated, and every token after it is still sent
+        self.assertEqual(server.received.count('token-003'), 1)
+        self.assertEqual(len(server.received), 35)
+        self.assertEqual((job.status, job.sent_count, job.failure_count, job.deactivated_count), ('completed', 34, 1, 0))
+        self.assertEqual(job.error_counts, {'THIRD_PARTY_AUTH_ERROR': 1})
+        self.assertTrue(FcmToken.objects.get(fcm_token='token-003').is_active)
+
+    def test_batch_rejected_for_its_payload_deactivates_nothing(self):
+        server = FakeFCMServer(payload_error="Invalid value at 'message.android.notification.image'")
+
+        job = self.run_with_server(server)
+
+        # The first batch is rejected as a whole and the job stops there
+        self.assertEqual(len(server.received), 10)
+        self.assertEqual((job.status, job.sent_count, job.deactivated_count), ('failed', 0, 0))
+        self.assertEqual(job.error_counts, {'INVALID_ARGUMENT': 10})
+        self.assertIn("message.android.notification.image", job.last_error)
+        self.assertEqual(FcmToken.objects.filter(is_active=True).count(), 35)
+
+
+class TokenStreamTest(TestCase):
+    def setUp(self):
+        FcmToken.objects.bulk_create([
+            FcmToken(phone_number=f"9{i:09d}", name=f"User {i}", fcm_token=f"token-{i:03d}", is_active=i % 5 != 0)
+            for i in range(1, 24)
+        ])
+
+    def test_keyset_batches_cover_active_tokens_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            batches = list(iter_token_batches(batch_size=5))
+
+        tokens = [token for batch in batches for _, token in batch]
+        expected = list(FcmToken.objects.filter(is_active=True).order_by('id').values_list('fcm_token', flat=True))
+        self.assertEqual(tokens, expected)
+        self.assertEqual([len(batch) for batch in batches], [5, 5, 5, 4])
+        # One query per batch plus the empty one that ends the stream, none of them with OFFSET
+        self.assertEqual(len(queries), 5)
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
+
+
+class FCMTransportTest(TestCase):
+    def setUp(self):
+        self.server = FakeFCMServer(latency=0.01, invalid_tokens={'token-004', 'token-017'},
+                                    errors={'token-009': 'QUOTA_EXCEEDED', 'token-010': 'UNAVAILABLE'})
+        self.transport = self.server.client(concurrency=5)
+        self.previous = FCMService.set_transport(self.transport)
+
+    def tearDown(self):
+        FCMService.set_transport(self.previous)
+        self.transport.close()
+
+    def test_send_classifies_fcm_errors(self):
+        tokens = [f"token-{i:03d}" for i in range(1, 21)]
+        outcome = FCMService.send_to_tokens(tokens, 'Title', 'Body', {'type': 'custom'})
+
+        self.assertEqual(sorted(outcome['invalid']), ['token-004', 'token-017'])
+        self.assertEqual(sorted(outcome['retry']), ['token-009', 'token-010'])
+        self.assertEqual(sorted(outcome['unavailable']), ['token-009', 'token-010'])
+        self.assertEqual(len(outcome['delivered']), 16)
+        self.assertTrue(outcome['errors']['token-009'].startswith('QUOTA_EXCEEDED'))
+        self.assertEqual(self.server.max_in_flight, 5)
+
+        results = self.transport.send([FCMService._build_message('token-009', 'Title', 'Body', image_url=FCMService.FALLBACK_IMAGE)])
+        self.assertEqual((results[0].status, results[0].retry_after, results[0].outcome), (429, 1.0, 'retry'))
+
+
+class AdaptiveRateControllerTest(TestCase):
+    def setUp(self):
+        self.now = 100.0
+        self.controller = AdaptiveRateController(initial_window=10, min_window=2, max_window=40, rate=100, burst=5,
+                                                 latency_target=0.2, clock=lambda: self.now)
+
+    def test_window_grows_per_round_trip_and_halves_once_per_congestion(self):
+        for _ in range(10):
+            self.controller.record(200, 0.05)
+        self.assertEqual(self.controller.window_size, 10)
+        for _ in range(12):
+            self.controller.record(200, 0.05)
+        self.assertEqual(self.controller.window_size, 12)
+
+        # A burst of 429s within one round trip halves the window once
+        for _ in range(5):
+            self.controller.record(429, 0.05)
+        self.assertEqual(self.controller.window_size, 6)
+        self.now += 0.1
+        self.controller.record(503, 0.05)
+        self.assertEqual(self.controller.window_size, 3)
+
+        # Slow responses shrink it gently, down to the minimum
+        for _ in range(10):
+            self.now += 1
+            self.controller.record(200, 0.6)
+        self.assertEqual(self.controller.window_size, 2)
+        self.assertGreaterEqual(self.controller.snapshot()['slow'], 8)
+
+    def test_token_bucket_and_retry_after(self):
+        waits = [round(self.controller.reserve(), 6) for _ in range(8)]
+        self.assertEqual(waits[:6], [0.0] * 6)
+        self.assertAlmostEqual(waits[7], 0.02)
+
+        self.now += 1
+        self.controller.record(429, 0.05, retry_after=3)
+        self.assertAlmostEqual(self.controller.reserve(), 3.0)
+        self.assertEqual(self.controller.snapshot()['pauses'], 1)
+
+    def test_adaptive_window_avoids_throttling_storm(self):
+        server = FakeFCMServer(latency=0.005, capacity=10, retry_after=0)
+        transport = server.client(controller=AdaptiveRateController(initial_window=4, max_window=100))
+        previous = FCMService.set_transport(transport)
+        try:
+            outcomes = [FCMService.send_to_tokens([f"token-{b}-{i}" for i in range(100)], 'Title', 'Body') for b in range(4)]
+        finally:
+            FCMService.set_transport(previous)
+            transport.close()
+
+        self.assertEqual(sum(len(outcome['delivered']) + len(outcome['retry']) for outcome in outcomes), 400)
+        self.assertLess(server.throttled, 60)
+        self.assertLessEqual(transport.controller.window_size, 12)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=['testserver'])
+class PeoplesPredictionTest(TestCase):
+    """Predictions are tallied per 3:00 PM IST cycle and read from the cache or the ten tally rows"""
+
+    IST = pytz.timezone('Asia/Kolkata')
+
+    def setUp(self):
+        cache.clear()
+
+    def at(self, day, hour, minute=0, second=0):
+        return self.IST.localize(datetime.combine(day, time(hour, minute, second)))
+
+    def record(self, digit, moment):
+        with mock.patch('results.services.peoples_predictions.timezone.now', return_value=moment):
+            with self.captureOnCommitCallbacks(execute=True):
+                PeoplesPredictionService.record(digit)
+
+    def test_cycle_changes_at_3_pm_ist(self):
+        day = date(2026, 10, 16)
+
+        self.assertEqual(PeoplesPredictionService.cycle_for(self.at(day, 14, 59, 59)), day - timedelta(days=1))
+        self.assertEqual(PeoplesPredictionService.cycle_for(self.at(day, 15)), day)
+        self.assertEqual(PeoplesPredictionService.cycle_for(self.at(day + timedelta(days=1), 14, 59, 59)), day)
+
+        self.record(5, self.at(day, 14, 59, 59))
+        self.record(5, self.at(day, 15))
+        self.record(7, self.at(day, 15))
+
+        self.assertEqual(PeoplesPredictionService.get_tallies(day - timedelta(days=1))[5], 1)
+        tallies = PeoplesPredictionService.get_tallies(day)
+        self.assertEqual((tallies[5], tallies[7], sum(tallies.values())), (1, 1, 2))
+
+    def test_cache_miss_falls_back_to_tally_rows(self):
+        day = date(2026, 10, 16)
+        for digit in (3, 3, 8):
+            self.record(digit, self.at(day, 16))
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(PeoplesPredictionService.get_tallies(day)[3], 2)
+        # Cached again, and later predictions are counted in the cached counters
+        self.record(8, self.at(day, 17))
+        with self.assertNumQueries(0):
+            tallies = PeoplesPredictionService.get_tallies(day)
+        self.assertEqual((tallies[3], tallies[8]), (2, 2))
+
+        # One counter missing is a miss too
+        cache.delete(PeoplesPredictionService.cache_key(day, 0))
+        with self.assertNumQueries(1):
+            self.assertEqual(PeoplesPredictionService.get_tallies(day)[8], 2)
+
+    def test_post_rejects_anything_but_one_ascii_digit(self):
+        url = reverse('results:lottery-prediction')
+        for value in ('', 'a', '12', '-1', '²', '٣'):
+            response = self.client.post(url, {'peoples_prediction': value})
+            self.assertEqual(response.status_code, 400, value)
+        self.assertFalse(PeoplesPrediction.objects.exists())
+
+        response = self.client.post(url, {'peoples_prediction': '7'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(PeoplesPredictionTally.objects.get(cycle=PeoplesPredictionService.cycle_for(), digit=7).count, 1)
+
+
+class PeoplesPredictionConcurrencyTest(TransactionTestCase):
+    """Concurrent first predictions of a cycle create its ten rows once and lose no count"""
+
+    THREADS = 20
+
+    def test_concurrent_first_predictions(self):
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+
+        def worker(index):
+            try:
+                barrier.wait()
+                PeoplesPredictionService.record(index % 10)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        moment = timezone.now()
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        with mock.patch('results.services.peoples_predictions.timezone.now', return_value=moment):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        cycle = PeoplesPredictionService.cycle_for(moment)
+        tallies = dict(PeoplesPredictionTally.objects.filter(cycle=cycle).values_list('digit', 'count'))
+        self.assertEqual(errors, [])
+        self.assertEqual(tallies, dict.fromkeys(range(10), self.THREADS // 10))
+        self.assertEqual(PeoplesPrediction.objects.count(), self.THREADS)
@@ -30,15 +30,27 @@ urlpatterns = [
 
     # Get lottery result by unique_id (POST request with unique_id in body)
     path('get-by-unique-id/', views.LotteryResultByUniqueIdView.as_view(), name='lottery-result-by-unique-id'),
-    
+
+    # Delta sync of results and prizes (GET ?since=<sequence>)
+    path('changes/', views.ResultChangesView.as_view(), name='result-changes'),
+
     path('check-ticket/', views.TicketCheckView.as_view(), name='check-ticket'),
 
+    # Check a whole book of tickets for one phone number and date
+    path('check-ticket/batch/', views.TicketBatchCheckView.as_view(), name='check-ticket-batch'),
+
     path('news/', views.NewsListAPIView.as_view(), name='news-list'),
 
     path('predict/', LotteryPredictionAPIView.as_view(), name='lottery-prediction'),
 
+    # Hot numbers, gaps and digit-position frequencies from the memory-mapped prize archive
+    path('analytics/numbers/', views.NumberAnalyticsAPIView.as_view(), name='number-analytics'),
+
     path('live-videos/', LiveVideoListView.as_view(), name='live-videos-list'),
 
+    # Server-Sent Events stream of a result during the live draw (ASGI)
+    path('live/<uuid:unique_id>/stream/', views.live_result_stream, name='live-result-stream'),
+
     path('lottery-percentage/', LotteryWinningPercentageAPI.as_view(), name='lottery-percentage'),
 
     path('user-points/', views.UserPointsHistoryView.as_view(), name='user-points'),
@@ -0,0 +1,46 @@
+import threading
+from typing import Callable, Iterable
+
+from django.db import transaction
+
+# Open batches per (database alias, batch name, savepoint ids) in this thread: (items, flush)
+_pending = threading.local()
+
+
+def batch_on_commit(name: str, items: Iterable, callback: Callable[[set], None], using=None):
+    """
+    Collect items under a batch name and call callback(items) once when the current
+    transaction commits (immediately in autocommit mode).
+
+    Bulk prize edits fire one signal per row; batching turns them into one cache bump,
+    version bump or snapshot refresh per transaction.
+
+    A batch lives exactly as long as its on_commit callback: when a rollback discards the
+    callback, the items go with it and the next call starts a new batch. Items added inside
+    a savepoint get a batch of their own, so rolling the savepoint back drops only them.
+    """
+    connection = transaction.get_connection(using)
+    batches = _pending.__dict__.setdefault('batches', {})
+    key = (connection.alias, name, tuple(connection.savepoint_ids))
+
+    registered = {id(func) for _, func, _ in connection.run_on_commit}
+    batch = batches.get(key)
+    if batch is not None and id(batch[1]) in registered:
+        batch[0].update(items)
+        return
+
+    # Forget batches whose callbacks a rollback discarded
+    for stale in [other for other, (_, flush) in batches.items()
+                  if other[0] == connection.alias and id(flush) not in registered]:
+        del batches[stale]
+
+    pending = set(items)
+
+    def flush():
+        if batches.get(key, (None, None))[1] is flush:
+            del batches[key]
+        if pending:
+            callback(pending)
+
+    batches[key] = (pending, flush)
+    transaction.on_commit(flush, using=using)
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from typing import Callable, Dict, Iterable, Optional, Union
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .cache_utils import make_cache_key
+from .on_commit import batch_on_commit
+
+logger = logging.getLogger('lottery_app')
+
+# Per-worker hit/miss counters, keyed by cache policy name
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_stats_lock = threading.Lock()
+
+
+def _tag_key(tag: str) -> str:
+    return make_cache_key("tag", tag)
+
+
+def get_tag_versions(tags: Iterable[str]) -> Dict[str, int]:
+    """Read the current version of each tag in a single cache round trip"""
+    tags = sorted(set(tags))
+    stored = cache.get_many([_tag_key(tag) for tag in tags])
+
+    versions = {}
+    for tag in tags:
+        version = stored.get(_tag_key(tag))
+        if version is None:
+            # Start from the clock so a tag whose version was culled never reuses an old version
+            version = int(time.time() * 1000)
+            if not cache.add(_tag_key(tag), version, None):
+                version = cache.get(_tag_key(tag), version)
+        versions[tag] = version
+    return versions
+
+
+def invalidate_tags(*tags: str) -> bool:
+    """
+    Invalidate every cached response carrying one of the tags.
+    Bumping the tag version changes the cache key of those responses, so this is O(1) per tag
+    and stale entries simply age out.
+    """
+    try:
+        for tag in set(tags):
+            try:
+                cache.incr(_tag_key(tag))
+            except ValueError:
+                cache.add(_tag_key(tag), int(time.time() * 1000), None)
+        logger.debug(f"Response cache tags invalidated: {', '.join(sorted(set(tags)))}")
+        return True
+    except Exception as e:
+        logger.info(f"Cache unavailable, tags not invalidated: {e}")
+        return False
+
+
+def invalidate_tags_on_commit(*tags: str):
+    """Invalidate tags once the current transaction commits, deduplicated per transaction"""
+    batch_on_commit('response_cache_tags', tags, lambda batch: invalidate_tags(*batch))
+
+
+def _record(name: str, hit: bool):
+    with _stats_lock:
+        _stats[name]['hits' if hit else 'misses'] += 1
+
+
+def get_cache_stats() -> Dict:
+    """Hit/miss counters of this worker process"""
+    with _stats_lock:
+        views = {}
+        for name, counts in sorted(_stats.items()):
+            total = counts['hits'] + counts['misses']
+            views[name] = {
+                'hits': counts['hits'],
+                'misses': counts['misses'],
+                'hit_rate': round(counts['hits'] / total, 3) if total else 0.0,
+            }
+    return {'worker_pid': os.getpid(), 'views': views}
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def cache_response(name: str,
+                   tags: Union[Iterable[str], Callable[[Dict], Iterable[str]]],
+                   timeout: Optional[int] = None,
+                   vary_on_query: Iterable[str] = (),
+                   vary_on_body: Iterable[str] = (),
+                   vary_on: Optional[Callable[[Request], Dict]] = None):
+    """
+    Declarative response cache policy for DRF handlers (function views or view methods).
+
+    name:          policy name used in cache keys and hit/miss counters
+    tags:          tag templates formatted with the request params (e.g. 'result:{unique_id}'),
+                   or a callable receiving the params and returning the tags
+    timeout:       cache timeout in seconds (defaults to LOTTERY_SETTINGS['DEFAULT_CACHE_TIMEOUT'])
+    vary_on_query: query params that are part of the cache key
+    vary_on_body:  request body fields that are part of the cache key
+    vary_on:       callable returning extra key params (e.g. the current date)
+
+    Successful responses are rendered to JSON once and the bytes are served on every hit.
+    """
+    vary_on_query = tuple(vary_on_query)
+    vary_on_body = tuple(vary_on_body)
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            if not settings.FEATURE_FLAGS.get('ENABLE_CACHING', True):
+                return handler(*args, **kwargs)
+
+            request = next(arg for arg in args if isinstance(arg, Request))
+
+            try:
+                params = {param: request.query_params.get(param) or '' for param in vary_on_query}
+                params.update({param: str(request.data.get(param) or '') for param in vary_on_body})
+                params.update(kwargs)
+                if vary_on:
+                    params.update(vary_on(request))
+
+                if callable(tags):
+                    response_tags = list(tags(params))
+                else:
+                    response_tags = [tag.format(**params) for tag in tags]
+
+                versions = get_tag_versions(response_tags)
+                params_hash = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+                version_hash = hashlib.md5(json.dumps(versions, sort_keys=True).encode()).hexdigest()
+                cache_key = make_cache_key("response", name, params_hash, version_hash)
+
+                cached = cache.get(cache_key)
+            except Exception as e:
+                logger.info(f"Response cache unavailable for {name}: {e}")
+                return handler(*args, **kwargs)
+
+            if cached is not None:
+                _record(name, hit=True)
+                response = HttpResponse(cached, content_type='application/json')
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _record(name, hit=False)
+            response = handler(*args, **kwargs)
+
+            if response.status_code != 200:
+                return response
+
+            if hasattr(response, 'data'):
+                content = JSONRenderer().render(response.data).decode('utf-8')
+            else:
+                # Handler already returned pre-rendered JSON (e.g. a stored result snapshot)
+                content = response.content.decode('utf-8')
+            try:
+                cache.set(
+                    cache_key,
+                    content,
+                    timeout if timeout is not None else settings.LOTTERY_SETTINGS['DEFAULT_CACHE_TIMEOUT']
+                )
+            except Exception as e:
+                logger.info(f"Response cache write failed for {name}: {e}")
+
+            response = HttpResponse(content, content_type='application/json')
+            response['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+
+    return decorator
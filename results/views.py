@@ -10,10 +10,10 @@ from django.utils import timezone
 from datetime import date,time
 from django.utils.timezone import now, localtime
 import uuid
-from .models import Lottery, LotteryResult, PrizeEntry, ImageUpdate, News, PeoplesPrediction
+from .models import Lottery, LotteryResult, PrizeEntry, ImageUpdate, News
 from .models import PrizeEntry, LiveVideo
 from django.db.models import Q, Sum
-from .serializers import LotteryResultSerializer, LotteryResultDetailSerializer
+from .serializers import LotteryResultSerializer, LotteryResultDetailSerializer, ordered_prizes_prefetch
 from django.contrib.auth import get_user_model
 from .serializers import TicketCheckSerializer, NewsSerializer
 from .serializers import LiveVideoSerializer
@@ -23,15 +23,23 @@ from rest_framework.permissions import AllowAny
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 import logging
 import numpy as np
-from collections import Counter
 from .services.fcm_service import FCMService
+from .services.result_snapshot import ResultSnapshotService
+from .services.peoples_predictions import PeoplesPredictionService
+from .services.prize_frequency import PrizeFrequencyService
+from .services.prize_archive import PrizeArchiveService, PRIZE_TYPES
+from .services.ticket_index import is_ticket_pattern, expand_ticket_pattern
+from .services.result_payloads import recent_results_queryset, build_results_list_payload, build_today_results_payload
+from .utils.response_cache import cache_response
+from .utils.conditional_get import conditional_content
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.db import transaction, IntegrityError
+from django.conf import settings
 import json
 from results.models import FcmToken
 from functools import lru_cache
@@ -43,6 +51,18 @@ import re
 logger = logging.getLogger('lottery_app')
 
 
+def today_cache_params(request):
+    """Date-dependent payloads are cached per day"""
+    return {'today': date.today().isoformat()}
+
+
+def results_list_cache_tags(params):
+    """A list filtered by lottery only depends on that lottery's results"""
+    if params.get('lottery_code'):
+        return [f"lottery:{params['lottery_code']}", 'updates']
+    return ['results', 'updates']
+
+
 class LotteryResultListView(generics.ListAPIView):
     """
     API endpoint to get all published lottery results
@@ -51,57 +71,21 @@ class LotteryResultListView(generics.ListAPIView):
     pagination_class = None  # Disable pagination for this view
     
     def get_queryset(self):
-        queryset = LotteryResult.objects.filter(is_published=True).select_related('lottery').prefetch_related('prizes')
-        
-        # Filter by lottery code if provided
-        lottery_code = self.request.query_params.get('lottery_code', None)
-        if lottery_code:
-            queryset = queryset.filter(lottery__code=lottery_code)
-        
-        # Filter by date if provided
-        result_date = self.request.query_params.get('date', None)
-        if result_date:
-            queryset = queryset.filter(date=result_date)
-
-        # Get results from last 30 days
-        from datetime import timedelta
-        thirty_days_ago = timezone.now().date() - timedelta(days=30)
-        queryset = queryset.filter(date__gte=thirty_days_ago)
-
-        return queryset.order_by('-date', '-created_at')
+        # Filter by lottery code / date if provided, limited to the last 30 days
+        return recent_results_queryset(
+            lottery_code=self.request.query_params.get('lottery_code', None),
+            result_date=self.request.query_params.get('date', None)
+        )
     
+    @conditional_content(('results', 'updates'), daily=True)
+    @cache_response(
+        'results_list',
+        tags=results_list_cache_tags,
+        vary_on_query=('lottery_code', 'date'),
+        vary_on=today_cache_params
+    )
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-
-        # Get image settings from database
-        image_settings = ImageUpdate.get_images()
-
-        # Get active text update from database
-        from .models import TextUpdate
-        text_update = TextUpdate.get_active_text()
-
-        return Response({
-            'status': 'success',
-            'count': queryset.count(),
-            'total_points': 1250,  # Static value since points system removed
-            'text_update': text_update,  # Add text update to response
-            'updates': {
-                "image1": {
-                    "image_url": image_settings.update_image1,
-                    "redirect_link": image_settings.redirect_link1
-                },
-                "image2": {
-                    "image_url": image_settings.update_image2,
-                    "redirect_link": image_settings.redirect_link2
-                },
-                "image3": {
-                    "image_url": image_settings.update_image3,
-                    "redirect_link": image_settings.redirect_link3
-                }
-            },
-            'results': serializer.data
-        })
+        return Response(build_results_list_payload(self.get_queryset()))
     
     def get_total_points(self, request):
         """
@@ -150,6 +134,12 @@ class LotteryResultByUniqueIdView(APIView):
     API endpoint to retrieve lottery result by unique_id passed in request body
     """
 
+    @cache_response(
+        'result_detail',
+        tags=('result:{unique_id}',),
+        timeout=settings.LOTTERY_SETTINGS['PREVIOUS_RESULTS_CACHE_TIMEOUT'],
+        vary_on_body=('unique_id',)
+    )
     def post(self, request):
         unique_id = request.data.get('unique_id')
 
@@ -168,30 +158,22 @@ class LotteryResultByUniqueIdView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Serve the pre-rendered snapshot when it is up to date
+        content = ResultSnapshotService.get_content(unique_id)
+        if content is not None:
+            return HttpResponse(content, content_type='application/json')
+
         try:
             # Get the lottery result with related data
-            lottery_result = LotteryResult.objects.select_related('lottery').prefetch_related('prizes').get(
+            lottery_result = LotteryResult.objects.select_related('lottery').prefetch_related(ordered_prizes_prefetch()).get(
                 unique_id=unique_id,
                 is_published=True
             )
 
-            # Check if all ticket_numbers are 4-digit numbers only
-            def is_grid_format(prizes):
-                for prize in prizes:
-                    num = prize.ticket_number.strip()
-                    if len(num) != 4 or not num.isdigit():
-                        return False
-                return True
-
-            is_grid = is_grid_format(lottery_result.prizes.all())
+            # Render and store the snapshot for the next request
+            content = ResultSnapshotService.store(lottery_result)
 
-            # Serialize the data
-            serializer = LotteryResultDetailSerializer(lottery_result)
-
-            return Response({
-                'status': 'success',
-                'result': serializer.data,
-            }, status=status.HTTP_200_OK)
+            return HttpResponse(content, content_type='application/json')
 
         except LotteryResult.DoesNotExist:
             return Response(
@@ -200,23 +182,18 @@ class LotteryResultByUniqueIdView(APIView):
             )
 
 @api_view(['GET'])
+@conditional_content(('results',), daily=True)
+@cache_response(
+    'today_results',
+    tags=('results',),
+    timeout=settings.LOTTERY_SETTINGS['TODAY_RESULTS_CACHE_TIMEOUT'],
+    vary_on=today_cache_params
+)
 def today_results(request):
     """
     API endpoint to get today's lottery results
     """
-    today = date.today()
-    results = LotteryResult.objects.filter(
-        date=today, 
-        is_published=True
-    ).select_related('lottery').prefetch_related('prizes')
-    
-    serializer = LotteryResultSerializer(results, many=True)
-    return Response({
-        'status': 'success',
-        'date': today,
-        'count': results.count(),
-        'results': serializer.data
-    })
+    return Response(build_today_results_payload(date.today()))
 
 @api_view(['GET'])
 def results_by_date(request, date_str):
@@ -231,7 +208,7 @@ def results_by_date(request, date_str):
         results = LotteryResult.objects.filter(
             date=result_date, 
             is_published=True
-        ).select_related('lottery').prefetch_related('prizes')
+        ).select_related('lottery').prefetch_related(ordered_prizes_prefetch())
         
         # Determine day label
         today = date.today()
@@ -264,7 +241,7 @@ def latest_result(request, lottery_code):
         latest_result = LotteryResult.objects.filter(
             lottery=lottery,
             is_published=True
-        ).select_related('lottery').prefetch_related('prizes').order_by('-date', '-created_at').first()
+        ).select_related('lottery').prefetch_related(ordered_prizes_prefetch()).order_by('-date', '-created_at').first()
         
         if not latest_result:
             return Response(
@@ -294,7 +271,7 @@ def lottery_results_by_code(request, lottery_code):
         results = LotteryResult.objects.filter(
             lottery=lottery,
             is_published=True
-        ).select_related('lottery').prefetch_related('prizes').order_by('-date', '-created_at')
+        ).select_related('lottery').prefetch_related(ordered_prizes_prefetch()).order_by('-date', '-created_at')
         
         # Manual pagination (without DRF pagination wrapper)
         page = request.query_params.get('page', 1)
@@ -457,23 +434,29 @@ class TicketCheckView(APIView):
 
     def check_ticket_prizes(self, ticket_number, lottery_result):
         """Check if ticket won any prizes in the given result"""
-        from .models import PrizeEntry
-        
-        last_4_digits = ticket_number[-4:] if len(ticket_number) >= 4 else ticket_number
+        from .services.ticket_index import TicketIndexService
 
-        # Get full ticket matches
-        winning_tickets = PrizeEntry.objects.filter(
-            ticket_number=ticket_number,
-            lottery_result=lottery_result
-        )
+        # Get full ticket matches and last 4 digits matches (excluding full matches)
+        # from the per-worker winning ticket index instead of querying PrizeEntry per scan
+        winning_tickets, small_prize_tickets = TicketIndexService.find_wins(ticket_number, lottery_result)
+
+        return self.build_prize_data(ticket_number, winning_tickets, small_prize_tickets)
 
-        # Get last 4 digits matches (excluding full matches)
-        small_prize_tickets = PrizeEntry.objects.filter(
-            ticket_number=last_4_digits,
-            lottery_result=lottery_result
-        ).exclude(ticket_number=ticket_number)
+    def check_ticket_range(self, ticket_codes, lottery_result):
+        """Check every encoded ticket of a range/series pattern; returns [(ticket_number, prize_data)] for winners"""
+        from .services.ticket_index import TicketIndexService
 
-        all_wins = list(winning_tickets) + list(small_prize_tickets)
+        return [
+            (ticket_number, self.build_prize_data(ticket_number, winning_tickets, small_prize_tickets))
+            for ticket_number, winning_tickets, small_prize_tickets
+            in TicketIndexService.find_wins_bulk(ticket_codes, lottery_result)
+        ]
+
+    def build_prize_data(self, ticket_number, winning_tickets, small_prize_tickets):
+        """Group full ticket and last 4 digit matches into the prize data of a ticket"""
+        last_4_digits = ticket_number[-4:] if len(ticket_number) >= 4 else ticket_number
+
+        all_wins = winning_tickets + small_prize_tickets
         
         if not all_wins:
             return None
@@ -506,7 +489,7 @@ class TicketCheckView(APIView):
         Check if user is eligible for rewards (cash back or points)
         Returns: (is_eligible, reason) tuple
         """
-        from .models import DailyPointsAwarded, DailyCashAwarded
+        from .models import DailyCashAwarded
         
         # Normalize phone number for consistency
         normalized_phone = self.normalize_phone_number(phone_number)
@@ -526,64 +509,58 @@ class TicketCheckView(APIView):
         if current_time_ist < result_publish_time:
             return (False, "Rewards given only after 3:00 PM IST")
         
-        # Rule 4: One Award Per User Per Day (check both cash and points)
-        if DailyCashAwarded.has_received_cash_today(normalized_phone):
+        # Rule 4: One Award Per User Per Day (check both cash and points, in one query)
+        rewards_received = DailyCashAwarded.get_rewards_received_today(normalized_phone)
+        if 'cash' in rewards_received:
             return (False, "Cash back already received today for this phone number")
         
-        if DailyPointsAwarded.has_received_points_today(normalized_phone):
+        if 'points' in rewards_received:
             return (False, "Points already awarded today for this phone number")
         
         return (True, "Eligible for rewards")
 
-    def calculate_cash_back_award(self, ticket_number, phone_number, check_date, won_prize, is_today, current_time_ist):
+    def check_cash_back_available(self, ticket_number, phone_number, check_date, won_prize, is_today, current_time_ist,
+                                  eligibility=None):
         """
-        Try to award cash back first (₹1-₹10 random for first 30 eligible users)
-        Returns: (cash_awarded, reason) tuple
+        Check if cash back can be tried first (pre-drawn ₹1-₹10 awards for first 30 eligible users)
+        eligibility: (is_eligible, reason) already resolved for this request, checked here if None
+        Returns: (daily_cash_pool, reason) tuple, daily_cash_pool is None when not available
         """
         from .models import DailyCashPool
-        import random
         
         # Check basic eligibility first
-        is_eligible, reason = self.check_reward_eligibility(
-            ticket_number, phone_number, check_date, won_prize, is_today, current_time_ist
-        )
+        if eligibility is None:
+            eligibility = self.check_reward_eligibility(
+                ticket_number, phone_number, check_date, won_prize, is_today, current_time_ist
+            )
+        is_eligible, reason = eligibility
         
         if not is_eligible:
             return (None, reason)
         
-        # Rule 5: Daily Cash Pool Control (30 users max, ₹100 budget)
+        # Rule 5: Daily Cash Pool Control (30 users max, ₹100 budget). The pool totals are
+        # updated after each award commits and can lag behind, so whether a slot is left is
+        # decided by the slot claim in award_cash_back_to_user, not by the totals.
         daily_cash_pool = DailyCashPool.get_today_pool()
         
-        # Check if cash back is still available
-        if daily_cash_pool.users_awarded >= daily_cash_pool.max_users:
-            return (None, "Cash back limit reached (30 users per day)")
-        
-        if daily_cash_pool.remaining_amount <= 0:
-            return (None, "Daily cash pool exhausted")
-        
-        # Rule 6: Random Cash Generation (₹1-₹10)
-        random_cash = random.randint(1, 10)
-        
-        # Cap to available pool budget (but should always have enough for 30 users)
-        actual_cash = min(random_cash, int(daily_cash_pool.remaining_amount))
-        
-        if actual_cash <= 0:
-            return (None, "No cash available in daily pool")
-        
-        return (actual_cash, "Cash back awarded successfully")
+        return (daily_cash_pool, "Cash back available")
 
-    def calculate_points_award(self, ticket_number, phone_number, check_date, won_prize, is_today, current_time_ist):
+    def calculate_points_award(self, ticket_number, phone_number, check_date, won_prize, is_today, current_time_ist,
+                               eligibility=None):
         """
         Calculate points award (fallback when cash back not available)
+        eligibility: (is_eligible, reason) already resolved for this request, checked here if None
         Returns: (points_awarded, reason) tuple
         """
         from .models import DailyPointsPool
         import random
         
         # Check basic eligibility first
-        is_eligible, reason = self.check_reward_eligibility(
-            ticket_number, phone_number, check_date, won_prize, is_today, current_time_ist
-        )
+        if eligibility is None:
+            eligibility = self.check_reward_eligibility(
+                ticket_number, phone_number, check_date, won_prize, is_today, current_time_ist
+            )
+        is_eligible, reason = eligibility
         
         if not is_eligible:
             return (None, reason)
@@ -604,28 +581,26 @@ class TicketCheckView(APIView):
         
         return (actual_points, "Points awarded successfully")
 
-    def award_cash_back_to_user(self, phone_number, cash_amount, ticket_number, lottery_name, check_date):
+    def award_cash_back_to_user(self, phone_number, ticket_number, lottery_name, check_date, daily_cash_pool=None):
         """
-        Award cash back to user with full transaction tracking
-        Returns: (success, message) tuple
+        Award the next pre-drawn cash back slot to user with full transaction tracking
+        Returns: (cash_amount, message) tuple, cash_amount is None when nothing was awarded
         """
         from .models import DailyCashPool, DailyCashAwarded, UserCashBalance, CashTransaction
         
+        normalized_phone = self.normalize_phone_number(phone_number)
+        if daily_cash_pool is None:
+            daily_cash_pool = DailyCashPool.get_today_pool()
+
         try:
+            # One short transaction: claim the next free slot (SKIP LOCKED, so concurrent awards
+            # never wait on each other) and record the award. A failed award frees its slot again.
             with transaction.atomic():
-                normalized_phone = self.normalize_phone_number(phone_number)
-                
-                # Get today's cash pool with row lock
-                daily_cash_pool = DailyCashPool.get_today_pool()
-                
-                # Double-check pool can award cash
-                if not daily_cash_pool.can_award_cash(cash_amount):
-                    return (False, "Daily cash pool insufficient or user limit reached")
-                
-                # Award cash from pool
-                if not daily_cash_pool.award_cash(cash_amount):
-                    return (False, "Failed to deduct from cash pool")
-                
+                slot = daily_cash_pool.claim_slot(normalized_phone)
+                if slot is None:
+                    return (None, "Daily cash pool exhausted or user limit reached")
+                cash_amount = int(slot.cash_amount)  # Whole rupees, as in the API response
+
                 # Get or create user cash balance
                 user_cash_balance = UserCashBalance.get_or_create_user(normalized_phone)
                 balance_before = user_cash_balance.total_cash
@@ -636,7 +611,7 @@ class TicketCheckView(APIView):
                 
                 # Record daily cash award (prevents duplicate awards)
                 DailyCashAwarded.record_cash_award(
-                    normalized_phone, cash_amount, ticket_number, lottery_name
+                    normalized_phone, cash_amount, ticket_number, lottery_name, slot.slot_number
                 )
                 
                 # Create cash transaction record
@@ -652,13 +627,16 @@ class TicketCheckView(APIView):
                     daily_cash_pool_date=daily_cash_pool.date,
                     description=f"Lottery check cash back: {ticket_number} ({lottery_name})"
                 )
+
+                # Pool totals are updated after commit
+                daily_cash_pool.record_slot_claimed(cash_amount)
                 
-                logger.info(f"✅ Cash back awarded: {normalized_phone} +₹{cash_amount} (Pool: {daily_cash_pool.users_awarded}/{daily_cash_pool.max_users} users, ₹{daily_cash_pool.remaining_amount} remaining)")
-                return (True, f"Successfully awarded ₹{cash_amount} cash back")
+            logger.info(f"✅ Cash back awarded: {normalized_phone} +₹{cash_amount} (Pool slot {slot.slot_number}/{daily_cash_pool.max_users})")
+            return (cash_amount, f"Successfully awarded ₹{cash_amount} cash back")
                 
         except Exception as e:
             logger.error(f"❌ Cash back award failed: {e}")
-            return (False, f"Cash back award failed: {str(e)}")
+            return (None, f"Cash back award failed: {str(e)}")
 
     def award_points_to_user(self, phone_number, points_amount, ticket_number, lottery_name, check_date):
         """
@@ -667,21 +645,15 @@ class TicketCheckView(APIView):
         """
         from .models import DailyPointsPool, DailyPointsAwarded, UserPointsBalance, PointsTransaction
         
+        normalized_phone = self.normalize_phone_number(phone_number)
+        daily_pool = DailyPointsPool.get_today_pool()
+
+        # Claim points from today's pool in one conditional UPDATE (no row lock held across the award)
+        if not DailyPointsPool.claim_points(points_amount, daily_pool.date):
+            return (False, "Daily pool insufficient")
+
         try:
             with transaction.atomic():
-                normalized_phone = self.normalize_phone_number(phone_number)
-                
-                # Get today's pool with row lock
-                daily_pool = DailyPointsPool.get_today_pool()
-                
-                # Double-check pool has enough points
-                if not daily_pool.can_award_points(points_amount):
-                    return (False, "Daily pool insufficient")
-                
-                # Award points from pool
-                if not daily_pool.award_points(points_amount):
-                    return (False, "Failed to deduct from pool")
-                
                 # Get or create user balance
                 user_balance = UserPointsBalance.get_or_create_user(normalized_phone)
                 balance_before = user_balance.total_points
@@ -709,10 +681,12 @@ class TicketCheckView(APIView):
                     description=f"Lottery check reward: {ticket_number} ({lottery_name})"
                 )
                 
-                logger.info(f"✅ Points awarded: {normalized_phone} +{points_amount} pts (Pool: {daily_pool.remaining_points} remaining)")
-                return (True, f"Successfully awarded {points_amount} points")
+            logger.info(f"✅ Points awarded: {normalized_phone} +{points_amount} pts")
+            return (True, f"Successfully awarded {points_amount} points")
                 
         except Exception as e:
+            # Give the claimed points back to the pool
+            DailyPointsPool.release_points(points_amount, daily_pool.date)
             logger.error(f"❌ Points award failed: {e}")
             return (False, f"Points award failed: {str(e)}")
 
@@ -756,6 +730,20 @@ class TicketCheckView(APIView):
                 )
                 return Response(response, status=status.HTTP_400_BAD_REQUEST)
 
+            # Ticket ranges and series patterns (e.g. AB123400-AB123499, A*123456)
+            ticket_codes = None
+            if is_ticket_pattern(ticket_number):
+                try:
+                    ticket_codes = expand_ticket_pattern(
+                        ticket_number, settings.LOTTERY_SETTINGS.get('MAX_TICKET_RANGE_SIZE', 10000)
+                    )
+                except ValueError as e:
+                    error_data = self.create_data_structure(ticket_number, "", str(check_date), False, False, False)
+                    response = self.create_standard_response(
+                        400, "fail", "Invalid Ticket Range", str(e), None, None, error_data
+                    )
+                    return Response(response, status=status.HTTP_400_BAD_REQUEST)
+
             try:
                 lottery = Lottery.objects.get(code=lottery_code)
             except Lottery.DoesNotExist:
@@ -771,29 +759,26 @@ class TicketCheckView(APIView):
             current_datetime_ist = timezone.now().astimezone(ist)
             current_date_ist = current_datetime_ist.date()
             current_time_ist = current_datetime_ist.time()
-            result_publish_time = time(15, 0)  # 3:00 PM
-
-            # Check if requested date matches lottery's scheduled day
-            requested_day = check_date.strftime('%A').lower()
-            lottery_day = self.get_expected_lottery_day(lottery_code)
-            is_lottery_day_match = (requested_day == lottery_day)
             is_today = (check_date == current_date_ist)
 
-            # Look for exact date result first
-            exact_result = LotteryResult.objects.filter(
-                lottery=lottery,
-                date=check_date,
-                is_published=True
-            ).first()
+            result_kind, lottery_result = self.resolve_check_result(
+                lottery, check_date, current_date_ist, current_time_ist
+            )
 
-            if exact_result:
+            if ticket_codes is not None:
+                # Bulk check of a range or series pattern
+                return self.handle_ticket_range(
+                    lottery, ticket_number, ticket_codes, check_date, result_kind, lottery_result
+                )
+
+            if result_kind == 'exact':
                 # Result exists for the exact requested date
                 return self.handle_exact_date_result(
                     lottery, ticket_number, phone_number, check_date, 
-                    exact_result, is_today, current_time_ist
+                    lottery_result, is_today, current_time_ist
                 )
             
-            elif is_lottery_day_match and is_today and current_time_ist < result_publish_time:
+            elif result_kind == 'not_published':
                 # Correct lottery day but before 3 PM - result not published yet
                 return self.handle_result_not_published_same_day(
                     lottery, ticket_number, phone_number, check_date
@@ -802,7 +787,7 @@ class TicketCheckView(APIView):
             else:
                 # Different day or no result for requested date - show most recent result
                 return self.handle_different_day_result(
-                    lottery, ticket_number, phone_number, check_date
+                    lottery, ticket_number, phone_number, check_date, lottery_result
                 )
 
         except Exception as e:
@@ -818,8 +803,99 @@ class TicketCheckView(APIView):
             )
             return Response(response, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def handle_result_not_published_same_day(self, lottery, ticket_number, phone_number, check_date):
-        """Handle case when result is not published yet (before 3 PM on correct lottery day)"""
+    def resolve_check_result(self, lottery, check_date, current_date_ist, current_time_ist):
+        """
+        Decide which result a check on check_date is answered from.
+        Returns ('exact', result), ('not_published', None) or ('previous', latest result or None)
+        """
+        from .models import LotteryResult
+
+        result_publish_time = time(15, 0)  # 3:00 PM
+
+        # Check if requested date matches lottery's scheduled day
+        requested_day = check_date.strftime('%A').lower()
+        lottery_day = self.get_expected_lottery_day(lottery.code)
+        is_lottery_day_match = (requested_day == lottery_day)
+        is_today = (check_date == current_date_ist)
+
+        # Look for exact date result first
+        exact_result = LotteryResult.objects.filter(
+            lottery=lottery,
+            date=check_date,
+            is_published=True
+        ).first()
+
+        if exact_result:
+            # Result exists for the exact requested date
+            return ('exact', exact_result)
+
+        if is_lottery_day_match and is_today and current_time_ist < result_publish_time:
+            # Correct lottery day but before 3 PM - result not published yet
+            return ('not_published', None)
+
+        # Different day or no result for requested date - use the most recent published result
+        previous_result = LotteryResult.objects.filter(
+            lottery=lottery,
+            is_published=True
+        ).order_by('-date').first()
+        return ('previous', previous_result)
+
+    def award_rewards(self, ticket_number, phone_number, lottery, check_date, won_prize, is_today, current_time_ist):
+        """
+        Try to award cash back first, then points as fallback
+        Returns: (cash_back_awarded, points_awarded) tuple
+        """
+        cash_back_awarded = None
+        points_awarded = None
+
+        # Eligibility is resolved once and shared by the cash back and points checks
+        eligibility = self.check_reward_eligibility(
+            ticket_number, phone_number, check_date, won_prize, is_today, current_time_ist
+        )
+
+        # Priority 1: Try cash back first
+        daily_cash_pool, cash_reason = self.check_cash_back_available(
+            ticket_number, phone_number, check_date, won_prize, is_today, current_time_ist, eligibility
+        )
+        
+        if daily_cash_pool:
+            # Award the next pre-drawn cash back slot to user
+            cash_amount, cash_award_message = self.award_cash_back_to_user(
+                phone_number, ticket_number, lottery.name, check_date, daily_cash_pool
+            )
+            
+            if cash_amount:
+                cash_back_awarded = cash_amount
+                logger.info(f"✅ Cash back awarded: {phone_number} +₹{cash_amount}")
+            else:
+                cash_reason = cash_award_message
+                
+        if not cash_back_awarded:
+            # Priority 2: Try points as fallback (also when every cash back slot was already claimed)
+            logger.info(f"ℹ️ No cash back available: {cash_reason}")
+            
+            calculated_points, points_reason = self.calculate_points_award(
+                ticket_number, phone_number, check_date, won_prize, is_today, current_time_ist, eligibility
+            )
+            
+            if calculated_points:
+                # Award points to user
+                points_award_success, points_award_message = self.award_points_to_user(
+                    phone_number, calculated_points, ticket_number, lottery.name, check_date
+                )
+                
+                if points_award_success:
+                    points_awarded = calculated_points
+                    logger.info(f"✅ Points awarded: {phone_number} +{calculated_points} pts")
+                else:
+                    logger.warning(f"⚠️ Points calculation passed but award failed: {points_award_message}")
+            else:
+                logger.info(f"ℹ️ No points awarded: {points_reason}")
+
+        return (cash_back_awarded, points_awarded)
+
+    def build_not_published_response(self, lottery, ticket_number, check_date):
+        """Response when result is not published yet (before 3 PM on correct lottery day)"""
         # Get the correct day name for the lottery
         lottery_day = self.get_expected_lottery_day(ticket_number[0].upper())
         
@@ -834,59 +910,11 @@ class TicketCheckView(APIView):
             200, "success", "Result is not published", 
             message, None, None, data  # No rewards when result not published
         )
-        return Response(response, status=status.HTTP_200_OK)
+        return response, status.HTTP_200_OK
 
-    def handle_exact_date_result(self, lottery, ticket_number, phone_number, check_date, lottery_result, is_today, current_time_ist):
-        """Handle case when result exists for the exact requested date"""
-        # Check if ticket won
-        prize_data = self.check_ticket_prizes(ticket_number, lottery_result)
-        won_prize = bool(prize_data)
-        
-        # Initialize reward variables
-        cash_back_awarded = None
-        points_awarded = None
-        
-        # Try to award rewards (only for today's non-winning tickets after 3 PM)
-        if is_today:
-            # Priority 1: Try cash back first
-            calculated_cash, cash_reason = self.calculate_cash_back_award(
-                ticket_number, phone_number, check_date, won_prize, is_today, current_time_ist
-            )
-            
-            if calculated_cash:
-                # Award cash back to user
-                cash_award_success, cash_award_message = self.award_cash_back_to_user(
-                    phone_number, calculated_cash, ticket_number, lottery.name, check_date
-                )
-                
-                if cash_award_success:
-                    cash_back_awarded = calculated_cash
-                    logger.info(f"✅ Cash back awarded: {phone_number} +₹{calculated_cash}")
-                else:
-                    logger.warning(f"⚠️ Cash back calculation passed but award failed: {cash_award_message}")
-                    
-            else:
-                # Priority 2: Try points as fallback
-                logger.info(f"ℹ️ No cash back available: {cash_reason}")
-                
-                calculated_points, points_reason = self.calculate_points_award(
-                    ticket_number, phone_number, check_date, won_prize, is_today, current_time_ist
-                )
-                
-                if calculated_points:
-                    # Award points to user
-                    points_award_success, points_award_message = self.award_points_to_user(
-                        phone_number, calculated_points, ticket_number, lottery.name, check_date
-                    )
-                    
-                    if points_award_success:
-                        points_awarded = calculated_points
-                        logger.info(f"✅ Points awarded: {phone_number} +{calculated_points} pts")
-                    else:
-                        logger.warning(f"⚠️ Points calculation passed but award failed: {points_award_message}")
-                else:
-                    logger.info(f"ℹ️ No points awarded: {points_reason}")
-        
+    def build_exact_date_response(self, lottery, ticket_number, check_date, lottery_result, is_today,
+                                  prize_data, points_awarded, cash_back_awarded):
+        """Response when result exists for the exact requested date"""
         if prize_data:
             # Won prize on requested date
             if is_today:
@@ -928,18 +956,10 @@ class TicketCheckView(APIView):
                 200, "success", result_status, message, points_awarded, cash_back_awarded, data
             )
         
-        return Response(response, status=status.HTTP_200_OK)
-
-    def handle_different_day_result(self, lottery, ticket_number, phone_number, check_date):
-        """Handle checking lottery on wrong day - always show most recent result with isPreviousResult: true"""
-        from .models import LotteryResult
-        
-        # Find the most recent published result for this lottery
-        previous_result = LotteryResult.objects.filter(
-            lottery=lottery,
-            is_published=True
-        ).order_by('-date').first()
+        return response, status.HTTP_200_OK
 
+    def build_different_day_response(self, lottery, ticket_number, check_date, previous_result):
+        """Response when checking on the wrong day - most recent result with isPreviousResult: true"""
         if not previous_result:
             # No previous data available at all
             data = self.create_data_structure(
@@ -950,7 +970,7 @@ class TicketCheckView(APIView):
                 400, "fail", "No Previous data", 
                 "No result data found on database", None, None, data  # No rewards for previous results
             )
-            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+            return response, status.HTTP_400_BAD_REQUEST
 
         # Check if ticket won in the most recent result
         prize_data = self.check_ticket_prizes(ticket_number, previous_result)
@@ -978,7 +998,222 @@ class TicketCheckView(APIView):
                 "Better luck next time", None, None, data  # No rewards for previous results
             )
         
+        return response, status.HTTP_200_OK
+
+    def handle_result_not_published_same_day(self, lottery, ticket_number, phone_number, check_date):
+        """Handle case when result is not published yet (before 3 PM on correct lottery day)"""
+        response, status_code = self.build_not_published_response(lottery, ticket_number, check_date)
+        return Response(response, status=status_code)
+
+    def handle_exact_date_result(self, lottery, ticket_number, phone_number, check_date, lottery_result, is_today, current_time_ist):
+        """Handle case when result exists for the exact requested date"""
+        # Check if ticket won
+        prize_data = self.check_ticket_prizes(ticket_number, lottery_result)
+        won_prize = bool(prize_data)
+        
+        # Initialize reward variables
+        cash_back_awarded = None
+        points_awarded = None
+        
+        # Try to award rewards (only for today's non-winning tickets after 3 PM)
+        if is_today:
+            cash_back_awarded, points_awarded = self.award_rewards(
+                ticket_number, phone_number, lottery, check_date, won_prize, is_today, current_time_ist
+            )
+
+        response, status_code = self.build_exact_date_response(
+            lottery, ticket_number, check_date, lottery_result, is_today,
+            prize_data, points_awarded, cash_back_awarded
+        )
+        return Response(response, status=status_code)
+
+    def handle_ticket_range(self, lottery, ticket_pattern, ticket_codes, check_date, result_kind, lottery_result):
+        """Handle a range or series pattern: vectorized match of every ticket, no rewards for bulk checks"""
+        if result_kind == 'not_published':
+            response, status_code = self.build_not_published_response(lottery, ticket_pattern, check_date)
+            return Response(response, status=status_code)
+
+        if not lottery_result:
+            response, status_code = self.build_different_day_response(lottery, ticket_pattern, check_date, None)
+            return Response(response, status=status_code)
+
+        is_previous_result = (result_kind == 'previous')
+        winners = self.check_ticket_range(ticket_codes, lottery_result)
+        total_amount = sum(prize_data['total_amount'] for _, prize_data in winners)
+
+        winning_tickets = [
+            self.create_data_structure(
+                ticket_number, lottery.name, check_date,
+                True, not is_previous_result, is_previous_result, lottery_result, prize_data
+            )
+            for ticket_number, prize_data in winners
+        ]
+
+        if winners:
+            result_status = "Range Result"
+            message = (f"Congratulations! {len(winners)} of {len(ticket_codes):,} tickets won "
+                       f"₹{total_amount:,.0f} in the {lottery.name} draw.")
+        else:
+            result_status = "Range Result no price"
+            message = f"No winning tickets among {len(ticket_codes):,} tickets. Better luck next time"
+
+        data = {
+            "ticketNumber": ticket_pattern,
+            "lotteryName": lottery.name,
+            "requestedDate": str(check_date),
+            "wonPrize": bool(winners),
+            "resultPublished": not is_previous_result,
+            "isPreviousResult": is_previous_result,
+            "ticketsChecked": len(ticket_codes),
+            "totalPrizeAmount": total_amount,
+            "winningTickets": winning_tickets,
+            "previousResult": self.create_previous_result(lottery_result)
+        }
+        response = self.create_standard_response(
+            200, "success", result_status, message, None, None, data  # No rewards for bulk checks
+        )
         return Response(response, status=status.HTTP_200_OK)
+
+    def handle_different_day_result(self, lottery, ticket_number, phone_number, check_date, previous_result=None):
+        """Handle checking lottery on wrong day - always show most recent result with isPreviousResult: true"""
+        from .models import LotteryResult
+        
+        # Find the most recent published result for this lottery
+        if previous_result is None:
+            previous_result = LotteryResult.objects.filter(
+                lottery=lottery,
+                is_published=True
+            ).order_by('-date').first()
+
+        response, status_code = self.build_different_day_response(lottery, ticket_number, check_date, previous_result)
+        return Response(response, status=status_code)
+
+
+class TicketBatchCheckView(TicketCheckView):
+    """
+    Check a whole book of tickets for one phone number and date in a single request.
+    Each lottery and its result are resolved once, every ticket is matched against the
+    winning ticket index, and the reward rules are applied once for the request (to the
+    first non-winning ticket). Per-ticket results use the single check response shape.
+    """
+
+    def post(self, request):
+        from .serializers import TicketBatchCheckSerializer
+
+        try:
+            serializer = TicketBatchCheckSerializer(data=request.data)
+
+            if not serializer.is_valid():
+                return Response({
+                    "statusCode": 400,
+                    "status": "fail",
+                    "message": f"Invalid data: {serializer.errors}",
+                    "count": 0,
+                    "results": []
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            ticket_numbers = serializer.validated_data['ticket_numbers']
+            phone_number = serializer.validated_data['phone_number']
+            check_date = serializer.validated_data['date']
+
+            # Use IST timezone for accurate time checking
+            ist = pytz.timezone('Asia/Kolkata')
+            current_datetime_ist = timezone.now().astimezone(ist)
+            current_date_ist = current_datetime_ist.date()
+            current_time_ist = current_datetime_ist.time()
+            is_today = (check_date == current_date_ist)
+
+            # Resolve every lottery of the book in one query and its result once
+            lottery_codes = {ticket_number[0].upper() for ticket_number in ticket_numbers}
+            lotteries = {
+                lottery.code.upper(): lottery
+                for lottery in Lottery.objects.filter(code__in=lottery_codes)
+            }
+            resolved = {
+                code: self.resolve_check_result(lottery, check_date, current_date_ist, current_time_ist)
+                for code, lottery in lotteries.items()
+                if self.get_expected_lottery_day(code)
+            }
+
+            # Single pass: match every ticket against its result's winning ticket index
+            entries = []
+            for ticket_number in ticket_numbers:
+                lottery_code = ticket_number[0].upper()
+                lottery = lotteries.get(lottery_code)
+                result_kind, lottery_result = resolved.get(lottery_code, (None, None))
+
+                if result_kind == 'exact':
+                    prize_data = self.check_ticket_prizes(ticket_number, lottery_result)
+                else:
+                    prize_data = None
+                entries.append((ticket_number, lottery, result_kind, lottery_result, prize_data))
+
+            # Reward rules once per request, for the first non-winning ticket of today's result
+            rewarded_ticket = None
+            cash_back_awarded = None
+            points_awarded = None
+            if is_today:
+                for ticket_number, lottery, result_kind, lottery_result, prize_data in entries:
+                    if result_kind == 'exact' and not prize_data:
+                        rewarded_ticket = ticket_number
+                        cash_back_awarded, points_awarded = self.award_rewards(
+                            ticket_number, phone_number, lottery, check_date, False, is_today, current_time_ist
+                        )
+                        break
+
+            results = []
+            for ticket_number, lottery, result_kind, lottery_result, prize_data in entries:
+                lottery_code = ticket_number[0].upper()
+
+                if not self.get_expected_lottery_day(lottery_code):
+                    error_data = self.create_data_structure(ticket_number, "", str(check_date), False, False, False)
+                    response = self.create_standard_response(
+                        400, "fail", "Invalid Lottery Code", 
+                        f"Invalid lottery code: {lottery_code}", None, None, error_data
+                    )
+                elif lottery is None:
+                    error_data = self.create_data_structure(ticket_number, "", str(check_date), False, False, False)
+                    response = self.create_standard_response(
+                        400, "fail", "Lottery Not Found", 
+                        f'Lottery with code "{lottery_code}" not found', None, None, error_data
+                    )
+                elif result_kind == 'exact':
+                    is_rewarded = (ticket_number == rewarded_ticket)
+                    response, _ = self.build_exact_date_response(
+                        lottery, ticket_number, check_date, lottery_result, is_today, prize_data,
+                        points_awarded if is_rewarded else None,
+                        cash_back_awarded if is_rewarded else None
+                    )
+                    if is_rewarded:
+                        rewarded_ticket = None  # Duplicate ticket numbers are rewarded once
+                elif result_kind == 'not_published':
+                    response, _ = self.build_not_published_response(lottery, ticket_number, check_date)
+                else:
+                    response, _ = self.build_different_day_response(lottery, ticket_number, check_date, lottery_result)
+                results.append(response)
+
+            return Response({
+                "statusCode": 200,
+                "status": "success",
+                "message": f"Checked {len(results)} tickets",
+                "count": len(results),
+                "points": points_awarded,
+                "cashBack": cash_back_awarded,
+                "results": results
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error(f"❌ Unexpected error in TicketBatchCheckView: {e}")
+            import traceback
+            logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+
+            return Response({
+                "statusCode": 500,
+                "status": "error",
+                "message": "An unexpected error occurred. Please try again later.",
+                "count": 0,
+                "results": []
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
 
 # <--------------NEWS SECTION---------------->
@@ -990,6 +1225,8 @@ class NewsListAPIView(generics.ListAPIView):
     serializer_class = NewsSerializer
     pagination_class = None  # Disable pagination since we want exactly 20
 
+    @conditional_content(('news',))
+    @cache_response('news_list', tags=('news',))
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         serializer = self.get_serializer(queryset, many=True)
@@ -1048,102 +1285,44 @@ class LotteryPredictionAPIView(APIView):
     def get_repeated_numbers_last_30_days(self):
         """
         Get repeated last 4 digits from all lotteries and all 4th-10th prize types from last 30 days
+        Summed from the daily prize frequency vectors (see PrizeFrequencyService)
         """
         from datetime import datetime, timedelta
-        from collections import Counter
         
         # Calculate 30 days ago
         thirty_days_ago = datetime.now().date() - timedelta(days=30)
         
-        # Get all 4-digit numbers from 4th-10th prizes across all lotteries from last 30 days
-        prize_entries = PrizeEntry.objects.filter(
-            lottery_result__date__gte=thirty_days_ago,
-            lottery_result__is_published=True,
-            prize_type__in=['4th', '5th', '6th', '7th', '8th', '9th', '10th']
-        ).values_list('ticket_number', flat=True)
-        
-        # Extract last 4 digits and count frequencies
-        last_4_digits = []
-        for ticket_number in prize_entries:
-            if ticket_number:
-                ticket_str = str(ticket_number).strip()
-                if len(ticket_str) >= 4:
-                    last_4 = ticket_str[-4:]
-                    if last_4.isdigit():
-                        last_4_digits.append(last_4.zfill(4))
-        
-        # Count frequencies
-        frequency_counter = Counter(last_4_digits)
-        
-        # Convert to required format and sort by count (highest first), limit to 9 numbers
-        repeated_numbers = [
-            {"number": number, "count": count} 
-            for number, count in frequency_counter.most_common()
-            if count > 1  # Only include numbers that appeared more than once
-        ][:9]  # Limit to maximum 9 numbers
-        
-        return repeated_numbers
+        # Numbers that appeared more than once, highest count first, maximum 9 numbers
+        return PrizeFrequencyService.get_repeated_numbers(thirty_days_ago, limit=9)
 
     def get_repeated_single_digits_last_7_days(self):
         """
         Get repeated single digits (last digit of ticket numbers) from all lotteries 
         and all 4th-10th prize types from last 7 days
+        Summed from the daily prize frequency vectors (see PrizeFrequencyService)
         """
         from datetime import datetime, timedelta
-        from collections import Counter
         
         # Calculate 7 days ago
         seven_days_ago = datetime.now().date() - timedelta(days=7)
         
-        # Get all ticket numbers from 4th-10th prizes across all lotteries from last 7 days
-        prize_entries = PrizeEntry.objects.filter(
-            lottery_result__date__gte=seven_days_ago,
-            lottery_result__is_published=True,
-            prize_type__in=['4th', '5th', '6th', '7th', '8th', '9th', '10th']
-        ).values_list('ticket_number', flat=True)
-        
-        # Extract last digit and count frequencies
-        last_digits = []
-        for ticket_number in prize_entries:
-            if ticket_number:
-                ticket_str = str(ticket_number).strip()
-                if ticket_str and ticket_str[-1].isdigit():
-                    last_digits.append(ticket_str[-1])
-        
-        # Count frequencies
-        frequency_counter = Counter(last_digits)
-        
-        # Convert to required format and sort by count (highest first), limit to top 4
-        repeated_single_digits = [
-            {"digit": digit, "count": count} 
-            for digit, count in frequency_counter.most_common(4)
-        ]
-        
-        return repeated_single_digits
+        # Top 4 digits by count
+        return PrizeFrequencyService.get_repeated_single_digits(seven_days_ago, limit=4)
 
     def get_peoples_predictions(self):
         """
         Get top 4 most repeated peoples predictions from current day cycle (3:00 PM to next day 3:00 PM)
+        Read from the cycle's ten digit tallies (old cycles are expired by a scheduled job)
         """
-        from collections import Counter
-        
-        # Clean up old predictions first
-        PeoplesPrediction.cleanup_old_predictions()
-        
-        # Get all current predictions
-        predictions = PeoplesPrediction.objects.all().values_list('peoples_prediction', flat=True)
-        
-        # Count frequencies
-        frequency_counter = Counter(predictions)
-        
-        # Convert to required format and sort by count (highest first), limit to top 4
-        peoples_predictions = [
-            {"digit": digit, "count": count} 
-            for digit, count in frequency_counter.most_common(4)
-        ]
-        
-        return peoples_predictions
-
+        return PeoplesPredictionService.get_top_digits(4)
+
+    # People's predictions keep arriving between publishes, so this entry is kept short-lived
+    @cache_response(
+        'predictions',
+        tags=('results',),
+        timeout=settings.LOTTERY_SETTINGS['TODAY_RESULTS_CACHE_TIMEOUT'],
+        vary_on=today_cache_params
+    )
     def get(self, request):
         """
         Get repeated numbers from last 30 days and repeated single digits from last 7 days across all lotteries
@@ -1182,16 +1361,19 @@ class LotteryPredictionAPIView(APIView):
         """
         try:
             # Get prediction from request
-            peoples_prediction = request.data.get('peoples_prediction')
+            peoples_prediction = str(request.data.get('peoples_prediction', '')).strip()
+            # ASCII only: isdigit() also accepts digits like '²' that int() cannot parse
+            if len(peoples_prediction) != 1 or peoples_prediction not in '0123456789':
+                return Response({
+                    'status': 'error',
+                    'message': 'peoples_prediction must be a single digit (0-9)'
+                }, status=status.HTTP_400_BAD_REQUEST)
             
             # Get user IP for tracking
             user_ip = self.get_client_ip(request)
             
-            # Store the prediction
-            PeoplesPrediction.objects.create(
-                peoples_prediction=str(peoples_prediction),
-                user_ip=user_ip
-            )
+            # Store the prediction and count it in the current cycle's tally
+            PeoplesPredictionService.record(int(peoples_prediction), user_ip)
             
             return Response({
                 'status': 'success'
@@ -1216,6 +1398,68 @@ class LotteryPredictionAPIView(APIView):
 
 
 
+class NumberAnalyticsAPIView(APIView):
+    """
+    Number analytics over the whole prize archive: hot numbers, gaps since last appearance
+    and digit-position frequencies of the last 4 digits.
+    GET ?days=<n, 0 for all>&lottery=<code>&prize_types=4th,5th&limit=<n>&numbers=1234,0042
+    """
+    permission_classes = [AllowAny]
+
+    DEFAULT_DAYS = 365
+    MAX_LIMIT = 100
+
+    def get(self, request):
+        archive = PrizeArchiveService.get_archive()
+        if archive is None:
+            return Response({
+                'status': 'error',
+                'message': 'Number analytics are not available yet'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        try:
+            days = int(request.query_params.get('days', self.DEFAULT_DAYS))
+            limit = int(request.query_params.get('limit', 10))
+            numbers = [int(number) for number in request.query_params.get('numbers', '').split(',') if number.strip()]
+        except (TypeError, ValueError):
+            return Response({
+                'status': 'error',
+                'message': 'days, limit and numbers must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        prize_types = [prize_type.strip() for prize_type in request.query_params.get('prize_types', '').split(',') if prize_type.strip()]
+        if days < 0 or not 1 <= limit <= self.MAX_LIMIT or any(not 0 <= number <= 9999 for number in numbers) \
+                or any(prize_type not in PRIZE_TYPES for prize_type in prize_types):
+            return Response({
+                'status': 'error',
+                'message': f'days must be 0 or more, limit 1-{self.MAX_LIMIT}, numbers 0000-9999 and prize_types one of {", ".join(PRIZE_TYPES)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        lottery_ids = None
+        lottery_code = request.query_params.get('lottery')
+        if lottery_code:
+            lottery_ids = list(Lottery.objects.filter(code=lottery_code).values_list('id', flat=True))
+
+        today = timezone.localdate()
+        # A window reaching back past date.min is the whole archive
+        start = today - timedelta(days=days) if 0 < days < (today - date.min).days else None
+        rows = archive.select(start=start, lottery_ids=lottery_ids, prize_types=prize_types or None)
+        last_seen = archive.last_seen(rows)
+
+        return Response({
+            'status': 'success',
+            'archive': {
+                'version': archive.manifest['version'],
+                'latest_date': archive.manifest['latest_date'],
+            },
+            'prizes': int(rows.size),
+            'hot_numbers': archive.hot_numbers(rows, limit),
+            'cold_numbers': archive.cold_numbers(last_seen, today, limit),
+            'digit_positions': archive.digit_positions(rows),
+            'gaps': archive.gaps(last_seen, numbers, today),
+        })
+
+
 # <--------------LIVE SECTION ---------------->
 
 class LiveVideoListView(generics.ListAPIView):
@@ -1246,6 +1490,7 @@ class LiveVideoListView(generics.ListAPIView):
         
         return queryset.order_by('-date')
     
+    @cache_response('live_videos', tags=('live_videos',), vary_on_query=('status', 'search'))
     def list(self, request, *args, **kwargs):
         """Custom list method to add success message"""
         queryset = self.get_queryset()
@@ -1259,6 +1504,40 @@ class LiveVideoListView(generics.ListAPIView):
     
 
 
+@require_http_methods(["GET"])
+async def live_result_stream(request, unique_id):
+    """
+    Server-Sent Events stream of a published result during the live draw:
+    'prize' events (id = prize id) as the scraper merges them and 'status' events of the
+    scraping session. Reconnecting clients send Last-Event-ID (or ?last_event_id=) to
+    receive the prizes they missed. Requires the ASGI server.
+    """
+    from django.http import StreamingHttpResponse
+    from .services.live_events import LiveEventService
+
+    lottery_result_id = await LotteryResult.objects.filter(
+        unique_id=unique_id,
+        is_published=True
+    ).values_list('id', flat=True).afirst()
+    if lottery_result_id is None:
+        return JsonResponse({'error': 'Lottery result not found'}, status=404)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    response = StreamingHttpResponse(
+        LiveEventService.stream(lottery_result_id, last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+
 class LotteryWinningPercentageAPI(APIView):
     """
     Daily reset lottery API - percentages change after 3 PM each day
@@ -1846,4 +2125,74 @@ class UserPointsHistoryView(APIView):
             error_response = self.create_error_response(
                 "An unexpected error occurred. Please try again later."
             )
-            return Response(error_response, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response(error_response, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# <--------------CHANGE FEED SECTION---------------->
+
+class ResultChangesView(APIView):
+    """
+    Delta sync of results and prizes.
+    GET ?since=<sequence>&limit=<n> returns what changed after `since` and the `next_since`
+    to send on the next call. since=0 returns reset=true: load /results/ and sync from next_since.
+    """
+
+    def get(self, request):
+        from .services.change_feed import ChangeFeedService
+
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', ChangeFeedService.DEFAULT_LIMIT))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'since and limit must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(ChangeFeedService.get_changes(since, limit))
+
+
+# <--------------STATIC EXPORT SECTION---------------->
+
+@require_http_methods(["GET", "HEAD"])
+def serve_results_export(request, path):
+    """
+    The export manifest (kept outside public/, since it is the one file that changes) and export
+    files written after this worker started (whitenoise only indexes public/ at startup).
+    Serves the brotli/gzip variant the client accepts, without touching the database.
+    """
+    from django.http import FileResponse, Http404
+    from django.utils._os import safe_join
+    from django.core.exceptions import SuspiciousFileOperation
+    from .services.static_export import StaticExportService
+
+    is_manifest = path == StaticExportService.MANIFEST_NAME
+    try:
+        if is_manifest:
+            file_path = str(StaticExportService.get_manifest_path())
+        else:
+            file_path = safe_join(settings.RESULTS_EXPORT_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Export file not found")
+
+    if not path.endswith('.json') or not os.path.isfile(file_path):
+        raise Http404("Export file not found")
+
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    content_encoding = None
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if encoding in accept_encoding and os.path.isfile(file_path + suffix):
+            file_path, content_encoding = file_path + suffix, encoding
+            break
+
+    response = FileResponse(open(file_path, 'rb'), content_type='application/json')
+    if content_encoding:
+        response['Content-Encoding'] = content_encoding
+    response['Vary'] = 'Accept-Encoding'
+
+    # Every export path is written once; only the manifest changes
+    if is_manifest:
+        response['Cache-Control'] = 'public, max-age=60'
+    else:
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -0,0 +1,330 @@
+"""
+User Activity Write-Behind Buffer
+
+App opens hit /api/users/track-activity/ far more often than the analytics need to be
+fresh, so hits are counted in a buffer and written to UserActivity in bulk:
+
+- InProcessActivityBuffer: hits of this process only, flushed by its timer thread every
+  USER_ACTIVITY_FLUSH_SECONDS and once more at exit. Only this process can flush them
+  (`manage.py flush_user_activity` cannot reach them), and a process killed without a
+  clean exit (SIGKILL, OOM, a deploy that outlives its grace period) loses the hits of its
+  last flush interval. A graceful gunicorn shutdown runs the exit flush.
+- RedisActivityBuffer: used when REDIS_URL is set. Hits of every worker go to one Redis
+  hash, so any process (the timer thread or `manage.py flush_user_activity`) can flush them,
+  and they survive the web processes.
+
+Hits are buffered per IST day, so a flush keeps the daily reset of access_count and
+first_access even when the buffer spans midnight; last_access is the time of the latest
+hit, not of the flush. Each flush also adds the day's
+unique_ids to the DailyUniqueUsers sketches and its counts to DailyActivitySummary. New
+installs are unique_ids missing from AppInstall, which outlives the pruned UserActivity rows.
+"""
+
+import atexit
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+import pytz
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import AppInstall, DailyActivitySummary, DailyUniqueUsers, UserActivity
+
+logger = logging.getLogger('lottery_app')
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+class ActivityHits:
+    """Buffered hits of one (IST day, app, unique_id)"""
+
+    __slots__ = ('count', 'first_access', 'last_access', 'phone_number')
+
+    def __init__(self, count, first_access, last_access, phone_number=None):
+        self.count = count
+        self.first_access = first_access
+        self.last_access = last_access
+        self.phone_number = phone_number
+
+    def merge(self, other):
+        self.count += other.count
+        self.first_access = min(self.first_access, other.first_access)
+        self.last_access = max(self.last_access, other.last_access)
+        self.phone_number = other.phone_number or self.phone_number
+
+
+class InProcessActivityBuffer:
+    """Hits of this process, keyed by (IST day, app_name, unique_id)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def record(self, key, hits):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = hits
+            else:
+                entry.merge(hits)
+
+    def drain(self):
+        """Take all buffered hits"""
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        return entries
+
+    def restore(self, entries):
+        """Put back hits whose flush failed"""
+        for key, hits in entries.items():
+            self.record(key, hits)
+
+    def pending(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class RedisActivityBuffer:
+    """
+    Hits of all processes in one Redis hash. A hit is one pipelined round trip;
+    draining reads and deletes the hash atomically.
+    """
+
+    BUFFER_KEY = 'lottery_app:user_activity:buffer'
+
+    def __init__(self, url):
+        self.url = url
+        self._client = None
+
+    def get_client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    @staticmethod
+    def encode_key(key):
+        day, app_name, unique_id = key
+        return json.dumps([day, app_name, unique_id])
+
+    def record(self, key, hits):
+        field = self.encode_key(key)
+        pipe = self.get_client().pipeline(transaction=False)
+        pipe.hincrby(self.BUFFER_KEY, f"n|{field}", hits.count)
+        pipe.hsetnx(self.BUFFER_KEY, f"f|{field}", hits.first_access.timestamp())
+        pipe.hset(self.BUFFER_KEY, f"l|{field}", hits.last_access.timestamp())
+        if hits.phone_number:
+            pipe.hset(self.BUFFER_KEY, f"p|{field}", hits.phone_number)
+        pipe.execute()
+
+    def drain(self):
+        pipe = self.get_client().pipeline(transaction=True)
+        pipe.hgetall(self.BUFFER_KEY)
+        pipe.delete(self.BUFFER_KEY)
+        values, _ = pipe.execute()
+
+        fields = {}
+        for name, value in values.items():
+            kind, field = name.decode('utf-8').split('|', 1)
+            fields.setdefault(field, {})[kind] = value.decode('utf-8')
+
+        entries = {}
+        for field, parts in fields.items():
+            if 'n' not in parts:
+                continue
+            first_access = datetime.fromtimestamp(float(parts.get('f', parts.get('l'))), tz=pytz.UTC)
+            last_access = datetime.fromtimestamp(float(parts.get('l', parts.get('f'))), tz=pytz.UTC)
+            entries[tuple(json.loads(field))] = ActivityHits(
+                int(parts['n']), first_access, last_access, parts.get('p')
+            )
+        return entries
+
+    def restore(self, entries):
+        for key, hits in entries.items():
+            self.record(key, hits)
+
+    def pending(self):
+        return sum(1 for name in self.get_client().hkeys(self.BUFFER_KEY) if name.startswith(b'n|'))
+
+
+class ActivityBufferService:
+    """
+    Buffer activity hits and flush them to UserActivity in bulk
+    """
+
+    _buffer = None
+    _buffer_lock = threading.Lock()
+    _flusher = None
+
+    @classmethod
+    def get_buffer(cls):
+        if cls._buffer is None:
+            with cls._buffer_lock:
+                if cls._buffer is None:
+                    redis_url = getattr(settings, 'REDIS_URL', None)
+                    cls._buffer = RedisActivityBuffer(redis_url) if redis_url else InProcessActivityBuffer()
+        return cls._buffer
+
+    @classmethod
+    def set_buffer(cls, buffer):
+        """Swap the buffer (tests use an InProcessActivityBuffer)"""
+        cls._buffer = buffer
+
+    @classmethod
+    def record_hit(cls, unique_id, app_name, phone_number=None, accessed_at=None):
+        """Count one app open, without touching the database"""
+        accessed_at = accessed_at or timezone.now()
+        day = accessed_at.astimezone(IST).date().isoformat()
+        cls.get_buffer().record(
+            (day, app_name, unique_id),
+            ActivityHits(1, accessed_at, accessed_at, phone_number or None)
+        )
+        cls.ensure_flusher()
+
+    @classmethod
+    def flush(cls) -> int:
+        """Write all buffered hits to UserActivity; returns the number of activity rows written"""
+        buffer = cls.get_buffer()
+        entries = buffer.drain()
+        if not entries:
+            return 0
+
+        try:
+            for attempt in range(3):
+                try:
+                    return cls.apply(entries)
+                except IntegrityError:
+                    # A row was created by a concurrent flush: retry, it is updated this time
+                    if attempt == 2:
+                        raise
+        except Exception as e:
+            buffer.restore(entries)
+            logger.error(f"Error flushing user activity ({len(entries)} buffered): {e}")
+            raise
+
+    @classmethod
+    def apply(cls, entries) -> int:
+        """
+        Merge buffered hits into UserActivity with the endpoint's daily semantics: hits of a
+        day after first_access's day restart access_count and first_access.
+        """
+        by_user = {}
+        for (day, app_name, unique_id), hits in sorted(entries.items()):
+            by_user.setdefault((app_name, unique_id), []).append((day, hits))
+
+        now = timezone.now()
+        with transaction.atomic():
+            existing = {}
+            for app_name in {app_name for app_name, _ in by_user}:
+                unique_ids = [unique_id for name, unique_id in by_user if name == app_name]
+                # Locked, so concurrent flushes add up instead of overwriting each other
+                for activity in UserActivity.objects.select_for_update().filter(
+                    app_name=app_name, unique_id__in=unique_ids
+                ):
+                    existing[(activity.app_name, activity.unique_id)] = activity
+
+            # Users without a row may only have been pruned; AppInstall remembers every install
+            installed = set()
+            for app_name in {app_name for app_name, _ in by_user}:
+                missing = [unique_id for name, unique_id in by_user if name == app_name and (name, unique_id) not in existing]
+                installed.update(
+                    (app_name, unique_id) for unique_id in AppInstall.objects.filter(
+                        app_name=app_name, unique_id__in=missing
+                    ).values_list('unique_id', flat=True)
+                )
+
+            created, updated, installs = [], [], []
+            new_installs = {}
+            for (app_name, unique_id), days in by_user.items():
+                activity = existing.get((app_name, unique_id))
+                is_new = activity is None
+                if is_new and (app_name, unique_id) not in installed:
+                    first_day = days[0][0]
+                    new_installs[(first_day, app_name)] = new_installs.get((first_day, app_name), 0) + 1
+                    installs.append(AppInstall(app_name=app_name, unique_id=unique_id, first_seen=first_day))
+
+                for day, hits in days:
+                    if activity is None:
+                        activity = UserActivity(
+                            unique_id=unique_id,
+                            app_name=app_name,
+                            phone_number=hits.phone_number,
+                            access_count=hits.count,
+                            first_access=hits.first_access,
+                            last_access=hits.last_access,
+                        )
+                    elif activity.first_access.astimezone(IST).date().isoformat() < day:
+                        # New day - reset access_count and first_access
+                        activity.access_count = hits.count
+                        activity.first_access = hits.first_access
+                    else:
+                        # Same day - add up the access count
+                        activity.access_count += hits.count
+
+                    # Update phone number if it's now provided and wasn't before
+                    if hits.phone_number and not activity.phone_number:
+                        activity.phone_number = hits.phone_number
+                    activity.last_access = max(activity.last_access, hits.last_access)
+
+                activity.updated_at = now
+                (created if is_new else updated).append(activity)
+
+            UserActivity.objects.bulk_create(created, batch_size=500)
+            AppInstall.objects.bulk_create(installs, batch_size=500)
+            UserActivity.objects.bulk_update(
+                updated,
+                ['access_count', 'first_access', 'phone_number', 'last_access', 'updated_at'],
+                batch_size=500
+            )
+
+            # Daily unique users sketches (HyperLogLog) and daily summaries, one merge per app and day
+            unique_ids_by_day, opens_by_day = {}, {}
+            for (day, app_name, unique_id), hits in entries.items():
+                unique_ids_by_day.setdefault((day, app_name), []).append(unique_id)
+                opens_by_day[(day, app_name)] = opens_by_day.get((day, app_name), 0) + hits.count
+            for (day, app_name), unique_ids in sorted(unique_ids_by_day.items()):
+                unique_users = DailyUniqueUsers.record(app_name, day, unique_ids)
+                DailyActivitySummary.add(
+                    day, app_name,
+                    opens=opens_by_day[(day, app_name)],
+                    new_installs=new_installs.get((day, app_name), 0),
+                    unique_users=unique_users
+                )
+
+        return len(created) + len(updated)
+
+    @classmethod
+    def ensure_flusher(cls):
+        """Start this process's timer thread that flushes the buffer every few seconds"""
+        if cls._flusher is not None:
+            return
+        interval = settings.LOTTERY_SETTINGS.get('USER_ACTIVITY_FLUSH_SECONDS', 30)
+        if not interval:
+            return
+
+        with cls._buffer_lock:
+            if cls._flusher is None:
+                cls._flusher = threading.Thread(
+                    target=cls.run_flusher, args=(interval,), name='user-activity-flusher', daemon=True
+                )
+                cls._flusher.start()
+                atexit.register(cls.flush_quietly)
+
+    @classmethod
+    def run_flusher(cls, interval):
+        while True:
+            time.sleep(interval)
+            cls.flush_quietly()
+
+    @classmethod
+    def flush_quietly(cls):
+        try:
+            cls.flush()
+        except Exception:
+            pass  # Logged by flush(), hits are kept for the next run
+        finally:
+            close_old_connections()
@@ -6,7 +6,8 @@ from django.http import JsonResponse
 from django.urls import path
 from django.utils.html import format_html
 from django.utils import timezone
-from .models import User, Feedback, UserActivity
+from .models import User, Feedback, UserActivity, DailyUniqueUsers, DailyActivitySummary
+from .hyperloglog import standard_error
 from .signals import get_user_count
 import pytz
 
@@ -253,25 +254,24 @@ class UserActivityAdmin(admin.ModelAdmin):
 		"""Add statistics to the admin changelist view"""
 		extra_context = extra_context or {}
 
-		# Get today's stats for each app
+		# Get today's stats for each app from the daily summaries (not the live table)
 		ist = pytz.timezone('Asia/Kolkata')
-		today_start = timezone.now().astimezone(ist).replace(hour=0, minute=0, second=0, microsecond=0)
+		today = timezone.now().astimezone(ist).date()
+		today_summaries = {
+			summary.app_name: summary
+			for summary in DailyActivitySummary.objects.filter(date=today)
+		}
 
-		# Lotto app stats
-		lotto_today_users = UserActivity.objects.filter(
-			app_name='lotto',
-			last_access__gte=today_start
-		).count()
+		# Lotto app stats (today's unique users are a HyperLogLog estimate)
+		lotto_today_users = today_summaries['lotto'].unique_users if 'lotto' in today_summaries else 0
 
-		lotto_total_users = UserActivity.objects.filter(app_name='lotto').count()
+		# Total users: installs summed over the days (the summaries were seeded with the installs tracked before them)
+		lotto_total_users = DailyActivitySummary.get_totals('lotto')['new_installs']
 
 		# Lotto lite app stats
-		lotto_lite_today_users = UserActivity.objects.filter(
-			app_name='lotto lite',
-			last_access__gte=today_start
-		).count()
+		lotto_lite_today_users = today_summaries['lotto lite'].unique_users if 'lotto lite' in today_summaries else 0
 
-		lotto_lite_total_users = UserActivity.objects.filter(app_name='lotto lite').count()
+		lotto_lite_total_users = DailyActivitySummary.get_totals('lotto lite')['new_installs']
 
 		# Add to context
 		extra_context['lotto_today_users'] = lotto_today_users
@@ -289,3 +289,65 @@ class UserActivityAdmin(admin.ModelAdmin):
 	def has_delete_permission(self, request, obj=None):
 		"""Allow deletion for cleanup purposes"""
 		return True
+
+
+@admin.register(DailyUniqueUsers)
+class DailyUniqueUsersAdmin(admin.ModelAdmin):
+	"""
+	Unique users per app per IST day, estimated from HyperLogLog sketches
+	Week / month columns are unions of the 7 / 30 daily sketches ending on that day
+	"""
+	list_display = ('date', 'app_name', 'unique_users_display', 'week_unique_users', 'month_unique_users', 'updated_at')
+	list_filter = ('app_name', 'date')
+	readonly_fields = ('date', 'app_name', 'unique_users_display', 'week_unique_users', 'month_unique_users', 'updated_at')
+	fields = readonly_fields
+	ordering = ('-date', 'app_name')
+	list_per_page = 30
+
+	def error_note(self):
+		return f"±{standard_error() * 100:.1f}%"
+
+	def unique_users_display(self, obj):
+		return f"~{obj.unique_users:,} ({self.error_note()})"
+	unique_users_display.short_description = 'Unique Users (Day)'
+
+	def week_unique_users(self, obj):
+		return f"~{DailyUniqueUsers.estimate_week(obj.app_name, obj.date):,}"
+	week_unique_users.short_description = 'Unique Users (7 Days)'
+
+	def month_unique_users(self, obj):
+		return f"~{DailyUniqueUsers.estimate_month(obj.app_name, obj.date):,}"
+	month_unique_users.short_description = 'Unique Users (30 Days)'
+
+	def has_add_permission(self, request):
+		"""Sketches are written by the activity flush"""
+		return False
+
+	def has_change_permission(self, request, obj=None):
+		return False
+
+
+@admin.register(DailyActivitySummary)
+class DailyActivitySummaryAdmin(admin.ModelAdmin):
+	"""
+	Daily usage rollup per app: opens, unique users (HyperLogLog estimate) and new installs
+	"""
+	list_display = ('date', 'app_name', 'opens', 'unique_users', 'new_installs', 'opens_per_user', 'updated_at')
+	list_filter = ('app_name', 'date')
+	readonly_fields = ('date', 'app_name', 'opens', 'unique_users', 'new_installs', 'opens_per_user', 'updated_at')
+	fields = readonly_fields
+	ordering = ('-date', 'app_name')
+	date_hierarchy = 'date'
+
+	def opens_per_user(self, obj):
+		if not obj.unique_users:
+			return '-'
+		return f"{obj.opens / obj.unique_users:.1f}"
+	opens_per_user.short_description = 'Opens / User'
+
+	def has_add_permission(self, request):
+		"""Summaries are written by the activity flush"""
+		return False
+
+	def has_change_permission(self, request, obj=None):
+		return False
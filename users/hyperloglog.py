@@ -0,0 +1,94 @@
+"""
+HyperLogLog distinct counter
+
+Estimates the number of distinct strings added, in a fixed 2**precision bytes of registers.
+Sketches merge by taking the register-wise maximum, so a week or a month of daily sketches
+unions into one estimate without ever storing the ids.
+
+Error bound: the relative standard error is 1.04 / sqrt(2**precision). With the default
+precision 12 (4096 registers, 4 KB) that is 1.63%, so about 99.7% of estimates fall within
+±4.9% (3 standard errors) of the exact count. Small counts use linear counting and are
+near-exact.
+"""
+
+import hashlib
+
+import numpy as np
+
+DEFAULT_PRECISION = 12
+
+
+def standard_error(precision=DEFAULT_PRECISION) -> float:
+    """Relative standard error of an estimate"""
+    return 1.04 / np.sqrt(1 << precision)
+
+
+class HyperLogLog:
+    """Mergeable distinct counter over strings, stored as one byte per register"""
+
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError('precision must be between 4 and 16')
+        self.precision = precision
+        self.size = 1 << precision
+        if registers is None:
+            self.registers = np.zeros(self.size, dtype=np.uint8)
+        else:
+            self.registers = np.frombuffer(bytes(registers), dtype=np.uint8).copy()
+            if len(self.registers) != self.size:
+                raise ValueError(f'expected {self.size} registers, got {len(self.registers)}')
+
+    @classmethod
+    def from_bytes(cls, data, precision=DEFAULT_PRECISION):
+        return cls(precision, data)
+
+    def to_bytes(self) -> bytes:
+        return self.registers.tobytes()
+
+    def add(self, value):
+        hashed = int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+        index = hashed >> (64 - self.precision)
+        remainder_bits = 64 - self.precision
+        remainder = hashed & ((1 << remainder_bits) - 1)
+        # Position of the leftmost 1 bit of the remaining bits
+        rank = remainder_bits - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """Union with another sketch of the same precision (in place)"""
+        if other.precision != self.precision:
+            raise ValueError('cannot merge sketches of different precision')
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    @classmethod
+    def union(cls, sketches, precision=DEFAULT_PRECISION):
+        result = cls(precision)
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
+
+    def count(self) -> int:
+        """Estimated number of distinct values added"""
+        size = self.size
+        if size >= 128:
+            alpha = 0.7213 / (1 + 1.079 / size)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[size]
+
+        estimate = alpha * size * size / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+
+        # Small range: linear counting over the empty registers
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * size and empty:
+            estimate = size * np.log(size / empty)
+        # 64-bit hashes need no large range correction at these cardinalities
+        return int(round(estimate))
+
+    def __len__(self):
+        return self.count()
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.activity_buffer import ActivityBufferService, InProcessActivityBuffer
+
+
+class Command(BaseCommand):
+    help = 'Flush buffered track-activity hits to UserActivity (once, or as a worker with --interval)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep flushing every N seconds (default: flush once and exit)'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+
+        if isinstance(ActivityBufferService.get_buffer(), InProcessActivityBuffer):
+            # This process's buffer is always empty, the hits live in the web processes
+            raise CommandError(
+                'REDIS_URL is not set: hits are buffered inside each web process and only its '
+                'timer thread can flush them'
+            )
+
+        while True:
+            pending = ActivityBufferService.get_buffer().pending()
+            written = ActivityBufferService.flush()
+            self.stdout.write(f'💾 Flushed {pending} buffered entries, {written} activity rows written')
+
+            if not interval:
+                break
+            time.sleep(interval)
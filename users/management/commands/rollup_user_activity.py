@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+import pytz
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.activity_buffer import ActivityBufferService
+from users.models import DailyActivitySummary, UserActivity
+
+
+class Command(BaseCommand):
+    help = 'Roll up user activity into daily summaries and prune stale raw UserActivity rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backfill-days',
+            type=int,
+            default=0,
+            help='Also build missing summaries of the last N days from the raw rows'
+        )
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=settings.LOTTERY_SETTINGS.get('USER_ACTIVITY_RETENTION_DAYS', 90),
+            help='Prune raw rows not accessed for this many days'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Rows deleted per statement'
+        )
+        parser.add_argument(
+            '--no-prune',
+            action='store_true',
+            help='Only roll up, keep all raw rows'
+        )
+
+    def handle(self, *args, **options):
+        # Buffered hits first, so the summaries are complete
+        written = ActivityBufferService.flush()
+        self.stdout.write(f'💾 Flushed buffered activity: {written} rows written')
+
+        today = timezone.now().astimezone(pytz.timezone('Asia/Kolkata')).date()
+        created = 0
+        for days_ago in range(options['backfill_days'] + 1):
+            created += DailyActivitySummary.snapshot_from_activity(today - timedelta(days=days_ago))
+        self.stdout.write(f'📊 Summaries created from raw rows: {created}')
+
+        if options['no_prune']:
+            return
+
+        deleted = UserActivity.prune_stale(options['retention_days'], options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'🧹 Pruned {deleted} UserActivity rows idle for {options["retention_days"]}+ days'
+        ))
@@ -0,0 +1,29 @@
+# Generated manually on 2026-10-17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_alter_useractivity_first_access'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyUniqueUsers',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True, help_text='IST day')),
+                ('app_name', models.CharField(choices=[('lotto', 'Lotto'), ('lotto lite', 'Lotto Lite')], db_index=True, max_length=20)),
+                ('registers', models.BinaryField(help_text='HyperLogLog registers (one byte each)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Unique Users',
+                'verbose_name_plural': 'Daily Unique Users',
+                'ordering': ['-date', 'app_name'],
+                'unique_together': {('date', 'app_name')},
+            },
+        ),
+    ]
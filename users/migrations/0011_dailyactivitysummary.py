@@ -0,0 +1,31 @@
+# Generated manually on 2026-10-17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_dailyuniqueusers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivitySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True, help_text='IST day')),
+                ('app_name', models.CharField(choices=[('lotto', 'Lotto'), ('lotto lite', 'Lotto Lite')], db_index=True, max_length=20)),
+                ('opens', models.PositiveIntegerField(default=0, help_text='App opens (tracked hits) on this day')),
+                ('unique_users', models.PositiveIntegerField(default=0, help_text='Unique users (HyperLogLog estimate)')),
+                ('new_installs', models.PositiveIntegerField(default=0, help_text='unique_ids seen for the first time on this day')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Activity Summary',
+                'verbose_name_plural': 'Daily Activity Summaries',
+                'ordering': ['-date', 'app_name'],
+                'unique_together': {('date', 'app_name')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated manually on 2026-10-17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_dailyactivitysummary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='useractivity',
+            name='last_access',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Last time user accessed the app'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated manually on 2026-10-17
+
+import pytz
+from django.db import migrations, models
+
+
+def seed_installs(apps, schema_editor):
+    """
+    Record the unique_ids already tracked as installs, and add the installs made before the
+    daily summaries existed to the summaries of their days, so the summed totals include them
+    """
+    UserActivity = apps.get_model('users', 'UserActivity')
+    AppInstall = apps.get_model('users', 'AppInstall')
+    DailyActivitySummary = apps.get_model('users', 'DailyActivitySummary')
+    ist = pytz.timezone('Asia/Kolkata')
+
+    installs, new_installs = [], {}
+    for app_name, unique_id, created_at in UserActivity.objects.values_list(
+        'app_name', 'unique_id', 'created_at'
+    ).iterator(chunk_size=5000):
+        day = created_at.astimezone(ist).date()
+        installs.append(AppInstall(app_name=app_name, unique_id=unique_id, first_seen=day))
+        new_installs[(day, app_name)] = new_installs.get((day, app_name), 0) + 1
+        if len(installs) == 5000:
+            AppInstall.objects.bulk_create(installs, ignore_conflicts=True)
+            installs = []
+    AppInstall.objects.bulk_create(installs, ignore_conflicts=True)
+
+    for (day, app_name), count in new_installs.items():
+        summary, _ = DailyActivitySummary.objects.get_or_create(date=day, app_name=app_name)
+        # A summary of that day already counts the installs flushed since the rollup started
+        if count > summary.new_installs:
+            summary.new_installs = count
+            summary.save(update_fields=['new_installs'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_alter_useractivity_last_access'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppInstall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unique_id', models.CharField(max_length=255)),
+                ('app_name', models.CharField(choices=[('lotto', 'Lotto'), ('lotto lite', 'Lotto Lite')], max_length=20)),
+                ('first_seen', models.DateField(help_text='IST day of the first tracked open')),
+            ],
+            options={
+                'verbose_name': 'App Install',
+                'verbose_name_plural': 'App Installs',
+                'unique_together': {('app_name', 'unique_id')},
+            },
+        ),
+        migrations.RunPython(seed_installs, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 # users\models.py
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
 class UserManager(BaseUserManager):
@@ -104,7 +105,8 @@ class LotteryPurchase(models.Model):
 
     def check_win_status(self):
         """Check if this ticket won based on lottery results"""
-        from results.models import LotteryResult, PrizeEntry, Lottery
+        from results.models import LotteryResult, Lottery
+        from results.services.ticket_index import TicketIndexService
         from datetime import date
 
         # Get lottery code from first letter of ticket number
@@ -139,22 +141,11 @@ class LotteryPurchase(models.Model):
                     # Today or future date - pending
                     return "pending"
 
-            # Check if ticket won any prize
-            last_4_digits = self.lottery_number[-4:] if len(self.lottery_number) >= 4 else self.lottery_number
+            # Check if ticket won any prize (full ticket match first, then last 4 digits match)
+            # using the in-memory winning ticket index
+            full_matches, partial_matches = TicketIndexService.find_wins(self.lottery_number, lottery_result)
 
-            # Check full ticket match
-            full_match = PrizeEntry.objects.filter(
-                ticket_number=self.lottery_number,
-                lottery_result=lottery_result
-            ).first()
-
-            # Check last 4 digits match
-            partial_match = PrizeEntry.objects.filter(
-                ticket_number=last_4_digits,
-                lottery_result=lottery_result
-            ).exclude(ticket_number=self.lottery_number).first()
-
-            winning_prize = full_match or partial_match
+            winning_prize = (full_matches or partial_matches or [None])[0]
 
             if winning_prize:
                 # Update winning status
@@ -208,7 +199,8 @@ class UserActivity(models.Model):
 	# Usage tracking
 	access_count = models.IntegerField(default=1, help_text="Number of times this user accessed the app TODAY (resets daily at midnight)")
 	first_access = models.DateTimeField(help_text="First time user accessed the app TODAY (resets daily at midnight)")
-	last_access = models.DateTimeField(auto_now=True, help_text="Last time user accessed the app")
+	# Set from the buffered hit, not the flush time (auto_now would stamp every bulk write)
+	last_access = models.DateTimeField(default=timezone.now, help_text="Last time user accessed the app")
 
 	# Metadata
 	created_at = models.DateTimeField(auto_now_add=True)
@@ -287,11 +279,41 @@ class UserActivity(models.Model):
 		ist = pytz.timezone('Asia/Kolkata')
 		today_start = timezone.now().astimezone(ist).replace(hour=0, minute=0, second=0, microsecond=0)
 
+		# Constant time estimate from the day's sketch, exact count before the first sketch
+		estimate = DailyUniqueUsers.estimate(app_name, today_start.date())
+		if estimate is not None:
+			return estimate
+
 		return cls.objects.filter(
 			app_name=app_name,
 			last_access__gte=today_start
 		).count()
 
+	@classmethod
+	def prune_stale(cls, retention_days, chunk_size=5000):
+		"""
+		Delete rows not accessed for retention_days, chunk_size rows per statement so the
+		tracking flush is never blocked for long. Their history lives on in DailyActivitySummary
+		and their unique_ids in AppInstall.
+		Returns: number of rows deleted
+		"""
+		from django.utils import timezone
+		from datetime import timedelta
+
+		cutoff = timezone.now() - timedelta(days=retention_days)
+		deleted = 0
+		for app_name, _ in cls.APP_CHOICES:
+			# Per app, so the (app_name, -last_access) index finds the stale rows
+			while True:
+				ids = list(cls.objects.filter(
+					app_name=app_name,
+					last_access__lt=cutoff
+				).order_by('last_access').values_list('id', flat=True)[:chunk_size])
+				if not ids:
+					break
+				deleted += cls.objects.filter(id__in=ids).delete()[0]
+		return deleted
+
 	@classmethod
 	def is_new_user(cls, phone_number):
 		"""
@@ -317,4 +339,184 @@ class UserActivity(models.Model):
 
 		except User.DoesNotExist:
 			# Phone number exists in activity but not in User model - consider as new
-			return True
\ No newline at end of file
+			return True
+
+
+class AppInstall(models.Model):
+	"""
+	Every unique_id ever seen per app, kept when its UserActivity row is pruned
+	A flush counts a unique_id as a new install only when it has no row here, so users
+	returning after USER_ACTIVITY_RETENTION_DAYS are not counted again
+	"""
+	unique_id = models.CharField(max_length=255)
+	app_name = models.CharField(max_length=20, choices=UserActivity.APP_CHOICES)
+	first_seen = models.DateField(help_text="IST day of the first tracked open")
+
+	class Meta:
+		verbose_name = "App Install"
+		verbose_name_plural = "App Installs"
+		unique_together = [['app_name', 'unique_id']]
+
+	def __str__(self):
+		return f"{self.app_name} {self.unique_id} (since {self.first_seen})"
+
+
+class DailyUniqueUsers(models.Model):
+	"""
+	HyperLogLog sketch of the unique_ids that opened an app on one IST day
+	Estimates unique users in constant time and 4 KB per app per day (±1.63% standard error),
+	and unions days into weekly / monthly uniques
+	"""
+	date = models.DateField(db_index=True, help_text="IST day")
+	app_name = models.CharField(max_length=20, choices=UserActivity.APP_CHOICES, db_index=True)
+	registers = models.BinaryField(help_text="HyperLogLog registers (one byte each)")
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		verbose_name = "Daily Unique Users"
+		verbose_name_plural = "Daily Unique Users"
+		ordering = ['-date', 'app_name']
+		unique_together = [['date', 'app_name']]
+
+	def __str__(self):
+		return f"{self.app_name} {self.date}: ~{self.unique_users} unique users"
+
+	@property
+	def sketch(self):
+		from .hyperloglog import HyperLogLog
+		return HyperLogLog.from_bytes(self.registers)
+
+	@property
+	def unique_users(self):
+		return self.sketch.count()
+
+	@classmethod
+	def record(cls, app_name, day, unique_ids):
+		"""
+		Add unique_ids to the sketch of an app's day (call inside a transaction)
+		Returns: the day's new unique users estimate
+		"""
+		from .hyperloglog import HyperLogLog
+
+		sketch = HyperLogLog()
+		sketch.update(unique_ids)
+
+		# Make sure the row exists, then merge under its lock
+		cls.objects.get_or_create(date=day, app_name=app_name, defaults={'registers': sketch.to_bytes()})
+		row = cls.objects.select_for_update().get(date=day, app_name=app_name)
+		row.registers = sketch.merge(row.sketch).to_bytes()
+		row.save(update_fields=['registers', 'updated_at'])
+		return sketch.count()
+
+	@classmethod
+	def estimate(cls, app_name, start_date, end_date=None):
+		"""
+		Estimated unique users of an app from start_date to end_date (inclusive), a union of the
+		daily sketches. Returns None when no day of the range has a sketch.
+		"""
+		from .hyperloglog import HyperLogLog
+
+		rows = cls.objects.filter(
+			app_name=app_name,
+			date__gte=start_date,
+			date__lte=end_date or start_date
+		).values_list('registers', flat=True)
+
+		sketches = [HyperLogLog.from_bytes(registers) for registers in rows]
+		if not sketches:
+			return None
+		return HyperLogLog.union(sketches).count()
+
+	@classmethod
+	def estimate_week(cls, app_name, end_date):
+		"""Unique users of the 7 days ending on end_date"""
+		from datetime import timedelta
+		return cls.estimate(app_name, end_date - timedelta(days=6), end_date)
+
+	@classmethod
+	def estimate_month(cls, app_name, end_date):
+		"""Unique users of the 30 days ending on end_date"""
+		from datetime import timedelta
+		return cls.estimate(app_name, end_date - timedelta(days=29), end_date)
+
+
+class DailyActivitySummary(models.Model):
+	"""
+	Per-day usage rollup of an app, kept after the raw UserActivity rows reset or are pruned
+	Filled by the activity flush; analytics and admin read these instead of UserActivity
+	"""
+	date = models.DateField(db_index=True, help_text="IST day")
+	app_name = models.CharField(max_length=20, choices=UserActivity.APP_CHOICES, db_index=True)
+	opens = models.PositiveIntegerField(default=0, help_text="App opens (tracked hits) on this day")
+	unique_users = models.PositiveIntegerField(default=0, help_text="Unique users (HyperLogLog estimate)")
+	new_installs = models.PositiveIntegerField(default=0, help_text="unique_ids seen for the first time on this day")
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		verbose_name = "Daily Activity Summary"
+		verbose_name_plural = "Daily Activity Summaries"
+		ordering = ['-date', 'app_name']
+		unique_together = [['date', 'app_name']]
+
+	def __str__(self):
+		return f"{self.app_name} {self.date}: {self.opens} opens, ~{self.unique_users} users, {self.new_installs} new"
+
+	@classmethod
+	def add(cls, day, app_name, opens=0, new_installs=0, unique_users=None):
+		"""Add a flush's counts to a day's summary"""
+		from django.utils import timezone
+
+		cls.objects.get_or_create(date=day, app_name=app_name)
+		updates = {
+			'opens': models.F('opens') + opens,
+			'new_installs': models.F('new_installs') + new_installs,
+			'updated_at': timezone.now(),
+		}
+		if unique_users is not None:
+			updates['unique_users'] = unique_users
+		cls.objects.filter(date=day, app_name=app_name).update(**updates)
+
+	@classmethod
+	def snapshot_from_activity(cls, day):
+		"""
+		Build a missing summary of a day from the raw UserActivity rows (for days before the
+		rollup existed). Exact for today; rows reset since then no longer count for older days.
+		Returns: number of summaries created
+		"""
+		from datetime import datetime, time, timedelta
+		import pytz
+
+		ist = pytz.timezone('Asia/Kolkata')
+		day_start = ist.localize(datetime.combine(day, time.min))
+		day_end = day_start + timedelta(days=1)
+
+		created = 0
+		for app_name, _ in UserActivity.APP_CHOICES:
+			if cls.objects.filter(date=day, app_name=app_name).exists():
+				continue
+			on_day = UserActivity.objects.filter(
+				app_name=app_name,
+				first_access__gte=day_start,
+				first_access__lt=day_end
+			)
+			totals = on_day.aggregate(opens=models.Sum('access_count'), unique_users=models.Count('id'))
+			cls.objects.create(
+				date=day,
+				app_name=app_name,
+				opens=totals['opens'] or 0,
+				unique_users=totals['unique_users'] or 0,
+				new_installs=AppInstall.objects.filter(app_name=app_name, first_seen=day).count()
+			)
+			created += 1
+		return created
+
+	@classmethod
+	def get_totals(cls, app_name, start_date=None, end_date=None):
+		"""Opens and new installs of an app over a date range (all days by default)"""
+		summaries = cls.objects.filter(app_name=app_name)
+		if start_date:
+			summaries = summaries.filter(date__gte=start_date)
+		if end_date:
+			summaries = summaries.filter(date__lte=end_date)
+		totals = summaries.aggregate(opens=models.Sum('opens'), new_installs=models.Sum('new_installs'))
+		return {'opens': totals['opens'] or 0, 'new_installs': totals['new_installs'] or 0}
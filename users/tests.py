@@ -1,3 +1,239 @@
-from django.test import TestCase
+from datetime import datetime, time, timedelta
+from importlib import import_module
 
-# Create your tests here.
+import pytz
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .activity_buffer import ActivityBufferService, InProcessActivityBuffer
+from .hyperloglog import HyperLogLog, standard_error
+from .models import AppInstall, DailyActivitySummary, DailyUniqueUsers, UserActivity
+
+# 3 standard errors: about 99.7% of estimates fall within this relative error
+ERROR_BOUND = 3 * standard_error()
+
+NO_FLUSHER = {**settings.LOTTERY_SETTINGS, 'USER_ACTIVITY_FLUSH_SECONDS': 0}
+
+
+class HyperLogLogTest(SimpleTestCase):
+
+    def assertWithinBound(self, estimate, exact):
+        self.assertLessEqual(abs(estimate - exact), ERROR_BOUND * exact, f"estimate {estimate} vs exact {exact}")
+
+    def test_estimate_within_error_bound(self):
+        for exact in (1000, 20000, 100000):
+            sketch = HyperLogLog()
+            sketch.update(f"{exact}-{index}" for index in range(exact))
+            # Repeats do not count
+            sketch.update(f"{exact}-{index}" for index in range(0, exact, 7))
+
+            self.assertWithinBound(sketch.count(), exact)
+
+    def test_small_counts_near_exact(self):
+        sketch = HyperLogLog()
+        sketch.update(str(1730000000000 + index) for index in range(50))
+
+        self.assertLessEqual(abs(sketch.count() - 50), 1)
+        self.assertEqual(HyperLogLog().count(), 0)
+
+    def test_union_of_days(self):
+        # 7 overlapping days of 5,000 users each, 2,000 new users per day
+        days = [{f"user-{index}" for index in range(day * 2000, day * 2000 + 5000)} for day in range(7)]
+        sketches = []
+        for ids in days:
+            sketch = HyperLogLog()
+            sketch.update(ids)
+            sketches.append(sketch)
+
+        week = HyperLogLog.union(sketches)
+
+        self.assertWithinBound(week.count(), len(set().union(*days)))
+        # Merge order does not matter
+        self.assertEqual(week.to_bytes(), HyperLogLog.union(reversed(sketches)).to_bytes())
+
+    def test_bytes_round_trip(self):
+        sketch = HyperLogLog()
+        sketch.update(str(index) for index in range(3000))
+
+        restored = HyperLogLog.from_bytes(sketch.to_bytes())
+
+        self.assertEqual(len(sketch.to_bytes()), 4096)
+        self.assertEqual(restored.count(), sketch.count())
+
+
+@override_settings(LOTTERY_SETTINGS=NO_FLUSHER)
+class DailyUniqueUsersTest(TestCase):
+
+    def setUp(self):
+        self.previous_buffer = ActivityBufferService.get_buffer()
+        ActivityBufferService.set_buffer(InProcessActivityBuffer())
+
+    def tearDown(self):
+        ActivityBufferService.set_buffer(self.previous_buffer)
+
+    def test_flush_feeds_daily_sketch(self):
+        for index in range(3000):
+            ActivityBufferService.record_hit(str(1730000000000 + index), 'lotto')
+        for index in range(0, 3000, 3):
+            ActivityBufferService.record_hit(str(1730000000000 + index), 'lotto')
+        for index in range(40):
+            ActivityBufferService.record_hit(str(1730000000000 + index), 'lotto lite')
+        ActivityBufferService.flush()
+
+        exact = UserActivity.objects.filter(app_name='lotto').count()
+        estimate = UserActivity.get_todays_unique_users('lotto')
+
+        self.assertEqual(exact, 3000)
+        self.assertLessEqual(abs(estimate - exact), ERROR_BOUND * exact)
+        self.assertLessEqual(abs(UserActivity.get_todays_unique_users('lotto lite') - 40), 1)
+        self.assertEqual(UserActivity.objects.get(unique_id='1730000000000', app_name='lotto').access_count, 2)
+
+    def test_week_and_month_unions(self):
+        today = timezone.now().astimezone(pytz.timezone('Asia/Kolkata')).date()
+        exact_week, exact_month = set(), set()
+        for days_ago in range(30):
+            ids = [f"device-{index}" for index in range(days_ago * 300, days_ago * 300 + 1000)]
+            DailyUniqueUsers.record('lotto', today - timedelta(days=days_ago), ids)
+            exact_month.update(ids)
+            if days_ago < 7:
+                exact_week.update(ids)
+
+        week = DailyUniqueUsers.estimate_week('lotto', today)
+        month = DailyUniqueUsers.estimate_month('lotto', today)
+
+        self.assertLessEqual(abs(week - len(exact_week)), ERROR_BOUND * len(exact_week))
+        self.assertLessEqual(abs(month - len(exact_month)), ERROR_BOUND * len(exact_month))
+        self.assertIsNone(DailyUniqueUsers.estimate('lotto lite', today))
+
+
+@override_settings(LOTTERY_SETTINGS=NO_FLUSHER)
+class DailyActivitySummaryTest(TestCase):
+
+    def setUp(self):
+        self.previous_buffer = ActivityBufferService.get_buffer()
+        ActivityBufferService.set_buffer(InProcessActivityBuffer())
+
+    def tearDown(self):
+        ActivityBufferService.set_buffer(self.previous_buffer)
+
+    def test_flushes_roll_up_into_summary(self):
+        now = timezone.now()
+        yesterday = now - timedelta(days=1)
+        for unique_id in ('1001', '1002', '1003'):
+            ActivityBufferService.record_hit(unique_id, 'lotto', accessed_at=yesterday)
+        ActivityBufferService.flush()
+
+        # Two returning users (one of them twice) and one new install today
+        for unique_id in ('1001', '1001', '1002', '1004'):
+            ActivityBufferService.record_hit(unique_id, 'lotto', accessed_at=now)
+        ActivityBufferService.flush()
+
+        ist = pytz.timezone('Asia/Kolkata')
+        today_summary = DailyActivitySummary.objects.get(date=now.astimezone(ist).date(), app_name='lotto')
+        yesterday_summary = DailyActivitySummary.objects.get(date=yesterday.astimezone(ist).date(), app_name='lotto')
+
+        self.assertEqual((today_summary.opens, today_summary.unique_users, today_summary.new_installs), (4, 3, 1))
+        self.assertEqual((yesterday_summary.opens, yesterday_summary.unique_users, yesterday_summary.new_installs), (3, 3, 3))
+        self.assertEqual(DailyActivitySummary.get_totals('lotto'), {'opens': 7, 'new_installs': 4})
+        # The raw row only keeps today's count
+        self.assertEqual(UserActivity.objects.get(unique_id='1001').access_count, 2)
+
+    def test_prune_stale_rows_in_chunks(self):
+        for index in range(25):
+            ActivityBufferService.record_hit(str(2000 + index), 'lotto lite')
+        ActivityBufferService.flush()
+        UserActivity.objects.filter(unique_id__lt='2020').update(last_access=timezone.now() - timedelta(days=100))
+
+        deleted = UserActivity.prune_stale(retention_days=90, chunk_size=7)
+
+        self.assertEqual(deleted, 20)
+        self.assertEqual(UserActivity.objects.count(), 5)
+        # Summaries outlive the raw rows
+        self.assertEqual(DailyActivitySummary.get_totals('lotto lite')['opens'], 25)
+
+    def test_pruned_user_is_not_a_new_install_again(self):
+        ActivityBufferService.record_hit('4001', 'lotto', accessed_at=timezone.now() - timedelta(days=100))
+        ActivityBufferService.flush()
+        UserActivity.prune_stale(retention_days=90)
+        self.assertFalse(UserActivity.objects.filter(unique_id='4001').exists())
+
+        ActivityBufferService.record_hit('4001', 'lotto')
+        ActivityBufferService.record_hit('4002', 'lotto')
+        ActivityBufferService.flush()
+
+        self.assertEqual(DailyActivitySummary.get_totals('lotto')['new_installs'], 2)
+        self.assertEqual(AppInstall.objects.filter(app_name='lotto').count(), 2)
+
+    def test_migration_seeds_installs_tracked_before_the_summaries(self):
+        seed_installs = import_module('users.migrations.0013_appinstall').seed_installs
+        ActivityBufferService.record_hit('5001', 'lotto lite')
+        ActivityBufferService.flush()
+        # Two installs from before the rollup: raw rows only, one of them on an earlier day
+        earlier = timezone.now() - timedelta(days=3)
+        UserActivity.objects.create(unique_id='5002', app_name='lotto lite', first_access=earlier)
+        UserActivity.objects.filter(unique_id='5002').update(created_at=earlier)
+        UserActivity.objects.create(unique_id='5003', app_name='lotto lite', first_access=timezone.now())
+
+        seed_installs(django_apps, None)
+
+        self.assertEqual(DailyActivitySummary.get_totals('lotto lite')['new_installs'], 3)
+        self.assertEqual(AppInstall.objects.filter(app_name='lotto lite').count(), 3)
+        # Running it again changes nothing
+        seed_installs(django_apps, None)
+        self.assertEqual(DailyActivitySummary.get_totals('lotto lite')['new_installs'], 3)
+
+
+@override_settings(LOTTERY_SETTINGS=NO_FLUSHER)
+class ActivityDailyResetTest(TestCase):
+    """Flushes keep the endpoint's daily semantics when the buffered hits span IST midnight"""
+
+    def setUp(self):
+        self.previous_buffer = ActivityBufferService.get_buffer()
+        ActivityBufferService.set_buffer(InProcessActivityBuffer())
+
+        ist = pytz.timezone('Asia/Kolkata')
+        self.day = timezone.now().astimezone(ist).date() - timedelta(days=2)
+        midnight = ist.localize(datetime.combine(self.day + timedelta(days=1), time(0)))
+        self.before_midnight = midnight - timedelta(minutes=2)
+        self.after_midnight = midnight + timedelta(minutes=1)
+
+    def tearDown(self):
+        ActivityBufferService.set_buffer(self.previous_buffer)
+
+    def test_one_flush_across_midnight(self):
+        for accessed_at in (self.before_midnight, self.before_midnight, self.after_midnight):
+            ActivityBufferService.record_hit('3001', 'lotto', accessed_at=accessed_at)
+        ActivityBufferService.flush()
+
+        activity = UserActivity.objects.get(unique_id='3001')
+        # Only the new day's hits count, and last_access is the latest hit rather than the flush
+        self.assertEqual(activity.access_count, 1)
+        self.assertEqual(activity.first_access, self.after_midnight)
+        self.assertEqual(activity.last_access, self.after_midnight)
+
+        summaries = DailyActivitySummary.objects.filter(app_name='lotto').order_by('date')
+        self.assertEqual(
+            [(summary.date, summary.opens, summary.new_installs) for summary in summaries],
+            [(self.day, 2, 1), (self.day + timedelta(days=1), 1, 0)]
+        )
+
+    def test_flushes_before_and_after_midnight(self):
+        ActivityBufferService.record_hit('3002', 'lotto', accessed_at=self.before_midnight)
+        ActivityBufferService.record_hit('3002', 'lotto', accessed_at=self.before_midnight)
+        ActivityBufferService.flush()
+        self.assertEqual(UserActivity.objects.get(unique_id='3002').access_count, 2)
+
+        ActivityBufferService.record_hit('3002', 'lotto', accessed_at=self.after_midnight)
+        ActivityBufferService.flush()
+        activity = UserActivity.objects.get(unique_id='3002')
+        self.assertEqual((activity.access_count, activity.first_access), (1, self.after_midnight))
+
+        # Later hits of the same day add up
+        later = self.after_midnight + timedelta(hours=1)
+        ActivityBufferService.record_hit('3002', 'lotto', accessed_at=later)
+        ActivityBufferService.flush()
+        activity = UserActivity.objects.get(unique_id='3002')
+        self.assertEqual((activity.access_count, activity.first_access, activity.last_access),
+                         (2, self.after_midnight, later))
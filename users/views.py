@@ -4,11 +4,10 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, LotteryPurchaseSerializer, LotteryStatisticsSerializer, FeedbackSerializer, UserActivitySerializer
-from .models import User, LotteryPurchase, Feedback, UserActivity
+from .models import User, LotteryPurchase, Feedback
+from .activity_buffer import ActivityBufferService
 from rest_framework.decorators import api_view, permission_classes
 from django.contrib.auth import get_user_model
-from django.utils import timezone
-from django.db import transaction
 import uuid
 import logging
 logger = logging.getLogger('lottery_app')
@@ -217,49 +216,15 @@ class UserActivityTrackingView(APIView):
 			phone_number = serializer.validated_data.get('phone_number')
 			app_name = serializer.validated_data['app_name']
 
-			# Get current time in IST
-			import pytz
-			ist = pytz.timezone('Asia/Kolkata')
-			current_time = timezone.now().astimezone(ist)
-			today_start = current_time.replace(hour=0, minute=0, second=0, microsecond=0)
-
-			# Use transaction to handle concurrent requests safely
-			with transaction.atomic():
-				# Try to get existing activity record
-				activity, created = UserActivity.objects.get_or_create(
-					unique_id=unique_id,
-					app_name=app_name,
-					defaults={
-						'phone_number': phone_number,
-						'access_count': 1,
-						'first_access': current_time
-					}
-				)
-
-				if not created:
-					# Update phone number if it's now provided and wasn't before
-					if phone_number and not activity.phone_number:
-						activity.phone_number = phone_number
-
-					# Check if first_access is from a previous day (before today)
-					first_access_ist = activity.first_access.astimezone(ist)
-					if first_access_ist < today_start:
-						# New day - reset access_count to 1 and first_access to current time
-						activity.access_count = 1
-						activity.first_access = current_time
-					else:
-						# Same day - increment access count
-						activity.access_count += 1
-
-					activity.save(update_fields=['access_count', 'phone_number', 'first_access', 'last_access'])
+			# Count the hit in the write-behind buffer; it reaches UserActivity on the next flush
+			# (same daily reset of access_count / first_access, see ActivityBufferService.apply)
+			ActivityBufferService.record_hit(unique_id, app_name, phone_number)
 
 			# Log the activity
-			logger.info(
-				f"User activity tracked: App={app_name}, "
+			logger.debug(
+				f"User activity buffered: App={app_name}, "
 				f"UniqueID={str(unique_id)[:8]}..., "
-				f"Phone={phone_number or 'None'}, "
-				f"Access#{activity.access_count}, "
-				f"New={'Yes' if created else 'No'}"
+				f"Phone={phone_number or 'None'}"
 			)
 
 			return Response({